@@ -120,10 +120,12 @@ class VolumeController(wsgi.Controller):
                                           sort_dirs=sort_dirs,
                                           filters=filters,
                                           viewable_admin_meta=True,
-                                          offset=offset)
+                                          offset=offset,
+                                          summary=not is_detail)
 
-        for volume in volumes:
-            api_utils.add_visible_admin_metadata(volume)
+        if is_detail:
+            for volume in volumes:
+                api_utils.add_visible_admin_metadata(volume)
 
         req.cache_db_volumes(volumes.objects)
 
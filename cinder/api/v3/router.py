@@ -30,6 +30,7 @@ from cinder.api.v3 import group_snapshots
 from cinder.api.v3 import group_specs
 from cinder.api.v3 import group_types
 from cinder.api.v3 import groups
+from cinder.api.v3 import image_volume_cache
 from cinder.api.v3 import limits
 from cinder.api.v3 import messages
 from cinder.api.v3 import resource_filters
@@ -197,6 +198,12 @@ class APIRouter(cinder.api.openstack.APIRouter):
                         controller=self.resources['workers'],
                         collection={'cleanup': 'POST'})
 
+        self.resources['image_volume_cache'] = (
+            image_volume_cache.create_resource())
+        mapper.resource('image_volume_cache', 'image_volume_cache',
+                        controller=self.resources['image_volume_cache'],
+                        collection={'warm': 'POST'})
+
         self.resources['resource_filters'] = resource_filters.create_resource(
             ext_mgr)
         mapper.resource('resource_filter', 'resource_filters',
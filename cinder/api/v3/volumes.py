@@ -173,14 +173,16 @@ class VolumeController(volumes_v2.VolumeController):
                                           sort_dirs=sort_dirs,
                                           filters=filters.copy(),
                                           viewable_admin_meta=True,
-                                          offset=offset)
+                                          offset=offset,
+                                          summary=not is_detail)
         total_count = None
         if show_count:
             total_count = self.volume_api.calculate_resource_count(
                 context, 'volume', filters)
 
-        for volume in volumes:
-            api_utils.add_visible_admin_metadata(volume)
+        if is_detail:
+            for volume in volumes:
+                api_utils.add_visible_admin_metadata(volume)
 
         req.cache_db_volumes(volumes.objects)
 
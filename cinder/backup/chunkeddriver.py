@@ -22,10 +22,16 @@
 """
 
 import abc
+import bisect
+import collections
+import contextlib
 import hashlib
 import json
+import math
 import os
+import struct
 import sys
+import time
 
 import eventlet
 from oslo_config import cfg
@@ -60,8 +66,48 @@ backup_opts = [
                         ('gzip', "Same as 'zlib'"),
                         ('bz2', 'Use Burrows-Wheeler transform compression'),
                         ('bzip2', "Same as 'bz2'"),
-                        ('zstd', 'Use the Zstandard compression algorithm')],
+                        ('zstd', 'Use the Zstandard compression algorithm'),
+                        ('lz4', 'Use the LZ4 frame compression algorithm')],
                help="Compression algorithm for backups ('none' to disable)"),
+    cfg.BoolOpt('backup_compression_skip_incompressible',
+                default=False,
+                help='Estimate the entropy of a sample of every backup chunk '
+                     'and store the chunks that look incompressible, like '
+                     'already compressed or encrypted data, without trying '
+                     'to compress them.'),
+    cfg.IntOpt('backup_upload_workers',
+               default=1,
+               min=1,
+               help='Number of backup chunks that chunked backup drivers '
+                    'compress and upload to the backup repository '
+                    'concurrently. With the default of 1 chunks are '
+                    'processed serially. Higher values overlap reading, '
+                    'hashing and compressing the volume data with the '
+                    'uploads. The drivers whose object writers are not safe '
+                    'for concurrent use, like Swift and Google Cloud '
+                    'Storage, compress that many chunks concurrently but '
+                    'still write them one at a time. Each in-flight chunk '
+                    'is held in memory.'),
+    cfg.IntOpt('backup_restore_workers',
+               default=1,
+               min=1,
+               help='Number of backup objects that chunked backup drivers '
+                    'download concurrently when restoring an incremental '
+                    'backup chain. Only used by the drivers whose object '
+                    'readers are safe for concurrent use, currently S3, '
+                    'NFS, Posix and GlusterFS. Each in-flight download '
+                    'holds one chunk in memory.'),
+    cfg.StrOpt('backup_sha256file_format',
+               default='json',
+               choices=[('json', 'Store the hashes as a JSON list of '
+                                 'hexadecimal strings'),
+                        ('binary', 'Store the hashes as an array of raw '
+                                   '32 byte digests')],
+               help='Format of the sha256 file that chunked backup drivers '
+                    'write for every backup and read from the parent of an '
+                    'incremental backup. Both formats can always be read, '
+                    'only set it to binary once all the backup services '
+                    'have been upgraded.'),
 ]
 
 CONF = cfg.CONF
@@ -89,6 +135,200 @@ def _write_volume(volume_is_new, volume_file, volume_offset, content):
         volume_file.write(content)
 
 
+class _ChunkUploadPool(object):
+    """Bounded pool of greenthreads uploading backup chunks.
+
+    Spawning blocks while all the workers are busy, so at most ``size``
+    chunks are held in memory waiting to be written.  The first upload
+    failure is stored and raised on the next call to spawn or wait.
+    """
+
+    def __init__(self, size):
+        self._pool = eventlet.GreenPool(size)
+        self._error = None
+
+    def _run(self, func, *args, **kwargs):
+        if self._error is not None:
+            return
+        try:
+            func(*args, **kwargs)
+        except Exception as exc:
+            if self._error is None:
+                self._error = exc
+
+    def _raise_error(self):
+        if self._error is not None:
+            error, self._error = self._error, None
+            raise error
+
+    def spawn(self, func, *args, **kwargs):
+        self._raise_error()
+        self._pool.spawn_n(self._run, func, *args, **kwargs)
+
+    def wait(self, reraise=True):
+        """Wait for all in-flight uploads to finish."""
+        self._pool.waitall()
+        if reraise:
+            self._raise_error()
+
+
+# Chunks whose sampled entropy, in bits per byte, reaches this value are
+# considered incompressible.
+_INCOMPRESSIBLE_ENTROPY = 7.9
+_ENTROPY_SAMPLES = 16
+_ENTROPY_SAMPLE_SIZE = 4 * units.Ki
+
+
+def _estimate_entropy(data):
+    """Estimate the Shannon entropy of `data` in bits per byte.
+
+    Only _ENTROPY_SAMPLES evenly spaced slices of the data are looked at, so
+    the cost does not depend on the chunk size.
+    """
+    view = memoryview(data)
+    step = len(view) // _ENTROPY_SAMPLES
+    if step > _ENTROPY_SAMPLE_SIZE:
+        sample = b''.join(view[offset:offset + _ENTROPY_SAMPLE_SIZE]
+                          for offset in range(0, len(view), step))
+    else:
+        sample = view.tobytes()
+    if not sample:
+        return 0.0
+    total = len(sample)
+    return -sum(count / total * math.log2(count / total)
+                for count in collections.Counter(sample).values())
+
+
+def _timed_compress(compressor, data):
+    """Compress data, returning it and the seconds spent compressing it."""
+    start = time.monotonic()
+    compressed_data = compressor.compress(data)
+    return compressed_data, time.monotonic() - start
+
+
+_DIGEST_SIZE = hashlib.sha256().digest_size
+_SHA256FILE_MAGIC = b'CINDER-SHA256\x00'
+_SHA256FILE_HEADER = struct.Struct('!I')
+
+
+class _DigestList(object):
+    """Compact list of SHA-256 digests.
+
+    The digests are kept back to back in a single bytearray instead of as one
+    hexadecimal string per block, while indexing and iterating still return
+    the hexadecimal strings stored in the JSON sha256 files.
+    """
+
+    def __init__(self, data=b''):
+        self.data = bytearray(data)
+
+    @classmethod
+    def from_hexdigests(cls, hexdigests):
+        return cls(b''.join(bytes.fromhex(sha) for sha in hexdigests))
+
+    def extend(self, digests):
+        """Append the packed digests returned by _calculate_sha."""
+        self.data += digests
+
+    def __len__(self):
+        return len(self.data) // _DIGEST_SIZE
+
+    def __getitem__(self, index):
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError('digest index out of range')
+        offset = index * _DIGEST_SIZE
+        return self.data[offset:offset + _DIGEST_SIZE].hex()
+
+    def __iter__(self):
+        for offset in range(0, len(self.data), _DIGEST_SIZE):
+            yield self.data[offset:offset + _DIGEST_SIZE].hex()
+
+
+def _changed_blocks(digests, parent, first_block):
+    """Return the (start, end) block ranges where digests differ from parent.
+
+    `digests` holds the packed digests of consecutive blocks and is compared
+    with the parent digests starting at block `first_block`. Ranges that match
+    as a whole are skipped with a single comparison, so unchanged data costs
+    one comparison per chunk instead of one per block. Block indexes are
+    relative to the start of `digests`.
+    """
+    current = memoryview(digests)
+    offset = first_block * _DIGEST_SIZE
+    parent = memoryview(parent)[offset:offset + len(current)]
+    changed = []
+
+    def _compare(start, end):
+        first = start * _DIGEST_SIZE
+        last = end * _DIGEST_SIZE
+        if current[first:last] == parent[first:last]:
+            return
+        if end - start == 1:
+            if changed and changed[-1][1] == start:
+                changed[-1] = (changed[-1][0], end)
+            else:
+                changed.append((start, end))
+            return
+        middle = (start + end) // 2
+        _compare(start, middle)
+        _compare(middle, end)
+
+    _compare(0, len(current) // _DIGEST_SIZE)
+    return changed
+
+
+def _subtract_extents(start, end, extents):
+    """Return the parts of [start, end) not covered by `extents`.
+
+    `extents` is a sorted list of disjoint (start, end) tuples.
+    """
+    result = []
+    idx = max(bisect.bisect_right(extents, (start,)) - 1, 0)
+    for ext_start, ext_end in extents[idx:]:
+        if ext_start >= end:
+            break
+        if ext_end <= start:
+            continue
+        if ext_start > start:
+            result.append((start, ext_start))
+        start = max(start, ext_end)
+        if start >= end:
+            break
+    if start < end:
+        result.append((start, end))
+    return result
+
+
+def _add_extent(extents, start, end):
+    """Merge [start, end) into the sorted list of disjoint `extents`."""
+    lo = bisect.bisect_left(extents, (start,))
+    if lo and extents[lo - 1][1] >= start:
+        lo -= 1
+    hi = lo
+    while hi < len(extents) and extents[hi][0] <= end:
+        hi += 1
+    if lo < hi:
+        start = min(start, extents[lo][0])
+        end = max(end, extents[hi - 1][1])
+    extents[lo:hi] = [(start, end)]
+
+
+def _flush_volume(volume_file):
+    # force flush every write to avoid long blocking write on close
+    volume_file.flush()
+
+    # Be tolerant to IO implementations that do not support fileno()
+    try:
+        fileno = volume_file.fileno()
+    except IOError:
+        LOG.debug("volume_file does not support fileno() so skipping "
+                  "fsync()")
+    else:
+        os.fsync(fileno)
+
+
 # Object writer and reader returned by inheriting classes must not have any
 # logging calls, as well as the compression libraries, as eventlet has a bug
 # (https://github.com/eventlet/eventlet/issues/432) that would result in
@@ -108,6 +348,14 @@ class ChunkedBackupDriver(driver.BackupDriver, metaclass=abc.ABCMeta):
 
     DRIVER_VERSION = '1.0.0'
     DRIVER_VERSION_MAPPING = {'1.0.0': '_restore_v1'}
+    # Drivers whose object writers can be used from several native threads
+    # at once, for instance because every writer has its own connection to
+    # the backup repository, set this to upload chunks concurrently. The
+    # chunks of the other drivers are compressed concurrently but written
+    # one at a time.
+    SUPPORTS_CONCURRENT_WRITERS = False
+    # Same for the object readers, to download objects concurrently.
+    SUPPORTS_CONCURRENT_READERS = False
 
     def _get_compressor(self, algorithm):
         try:
@@ -122,6 +370,9 @@ class ChunkedBackupDriver(driver.BackupDriver, metaclass=abc.ABCMeta):
             elif algorithm.lower() == 'zstd':
                 import zstd as compressor
                 result = compressor
+            elif algorithm.lower() == 'lz4':
+                import lz4.frame as compressor
+                result = compressor
             else:
                 result = None
             if result:
@@ -148,6 +399,15 @@ class ChunkedBackupDriver(driver.BackupDriver, metaclass=abc.ABCMeta):
         self.data_block_num = CONF.backup_object_number_per_notification
         self.az = CONF.storage_availability_zone
         self.backup_compression_algorithm = CONF.backup_compression_algorithm
+        self.upload_workers = CONF.backup_upload_workers
+        # Chunks are still compressed concurrently when the object writers
+        # can't be used concurrently, only writing them is serialized.
+        self._write_lock = None
+        if not self.SUPPORTS_CONCURRENT_WRITERS:
+            self._write_lock = eventlet.semaphore.Semaphore()
+        self.restore_workers = 1
+        if self.SUPPORTS_CONCURRENT_READERS:
+            self.restore_workers = CONF.backup_restore_workers
         self.compressor = \
             self._get_compressor(CONF.backup_compression_algorithm)
         self.support_force_delete = True
@@ -275,7 +535,7 @@ class ChunkedBackupDriver(driver.BackupDriver, metaclass=abc.ABCMeta):
         return filename
 
     def _write_metadata(self, backup, volume_id, container, object_list,
-                        volume_meta, extra_metadata=None):
+                        volume_meta, extra_metadata=None, compression=None):
         filename = self._metadata_filename(backup)
         LOG.debug('_write_metadata started, container name: %(container)s,'
                   ' metadata filename: %(filename)s.',
@@ -292,6 +552,8 @@ class ChunkedBackupDriver(driver.BackupDriver, metaclass=abc.ABCMeta):
         metadata['volume_meta'] = volume_meta
         if extra_metadata:
             metadata['extra_metadata'] = extra_metadata
+        if compression:
+            metadata['compression'] = compression
         metadata_json = json.dumps(metadata, sort_keys=True, indent=2)
         metadata_json = metadata_json.encode('utf-8')
         with self._get_object_writer(container, filename) as writer:
@@ -311,11 +573,19 @@ class ChunkedBackupDriver(driver.BackupDriver, metaclass=abc.ABCMeta):
         sha256file['backup_description'] = backup['display_description']
         sha256file['created_at'] = str(backup['created_at'])
         sha256file['chunk_size'] = self.sha_block_size_bytes
-        sha256file['sha256s'] = sha256_list
-        sha256file_json = json.dumps(sha256file, sort_keys=True, indent=2)
-        sha256file_json = sha256file_json.encode('utf-8')
+        if CONF.backup_sha256file_format == 'binary':
+            if not isinstance(sha256_list, _DigestList):
+                sha256_list = _DigestList.from_hexdigests(sha256_list)
+            header = json.dumps(sha256file, sort_keys=True).encode('utf-8')
+            sha256file_data = b''.join((_SHA256FILE_MAGIC,
+                                        _SHA256FILE_HEADER.pack(len(header)),
+                                        header, sha256_list.data))
+        else:
+            sha256file['sha256s'] = list(sha256_list)
+            sha256file_data = json.dumps(sha256file, sort_keys=True, indent=2)
+            sha256file_data = sha256file_data.encode('utf-8')
         with self._get_object_writer(container, filename) as writer:
-            writer.write(sha256file_json)
+            writer.write(sha256file_data)
         LOG.debug('_write_sha256file finished.')
 
     def _read_metadata(self, backup):
@@ -332,15 +602,29 @@ class ChunkedBackupDriver(driver.BackupDriver, metaclass=abc.ABCMeta):
         return metadata
 
     def _read_sha256file(self, backup):
+        """Read the sha256 file of a backup.
+
+        sha256 files in the binary format return their hashes as a
+        _DigestList, JSON ones as a list of hexadecimal strings.
+        """
         container = backup['container']
         filename = self._sha256_filename(backup)
         LOG.debug('_read_sha256file started, container name: %(container)s, '
                   'sha256 filename: %(filename)s.',
                   {'container': container, 'filename': filename})
         with self._get_object_reader(container, filename) as reader:
-            sha256file_json = reader.read()
-        sha256file_json = sha256file_json.decode('utf-8')
-        sha256file = json.loads(sha256file_json)
+            sha256file_data = reader.read()
+        if sha256file_data.startswith(_SHA256FILE_MAGIC):
+            offset = len(_SHA256FILE_MAGIC)
+            (header_len,) = _SHA256FILE_HEADER.unpack_from(sha256file_data,
+                                                           offset)
+            offset += _SHA256FILE_HEADER.size
+            header = sha256file_data[offset:offset + header_len]
+            sha256file = json.loads(header.decode('utf-8'))
+            sha256file['sha256s'] = _DigestList(
+                memoryview(sha256file_data)[offset + header_len:])
+        else:
+            sha256file = json.loads(sha256file_data.decode('utf-8'))
         LOG.debug('_read_sha256file finished.')
         return sha256file
 
@@ -381,8 +665,13 @@ class ChunkedBackupDriver(driver.BackupDriver, metaclass=abc.ABCMeta):
                 volume_size_bytes)
 
     def _backup_chunk(self, backup, container, data, data_offset,
-                      object_meta, extra_metadata):
-        """Backup data chunk based on the object metadata and offset."""
+                      object_meta, extra_metadata, upload_pool=None):
+        """Backup data chunk based on the object metadata and offset.
+
+        The chunk is added to the object list right away, so the list keeps
+        the volume order even when an upload_pool compresses and writes the
+        chunks concurrently.
+        """
         object_prefix = object_meta['prefix']
         object_list = object_meta['list']
 
@@ -393,18 +682,16 @@ class ChunkedBackupDriver(driver.BackupDriver, metaclass=abc.ABCMeta):
         obj[object_name]['offset'] = data_offset
         obj[object_name]['length'] = len(data)
         LOG.debug('Backing up chunk of data from volume.')
-        algorithm, output_data = self._prepare_output_data(data)
-        obj[object_name]['compression'] = algorithm
-        LOG.debug('About to put_object')
-        with self._get_object_writer(
-                container, object_name, extra_metadata=extra_metadata
-        ) as writer:
-            writer.write(output_data)
-        md5 = eventlet.tpool.execute(
-            secretutils.md5, data, usedforsecurity=False).hexdigest()
-        obj[object_name]['md5'] = md5
-        LOG.debug('backup MD5 for %(object_name)s: %(md5)s',
-                  {'object_name': object_name, 'md5': md5})
+        compression_stats = object_meta.get('compression_stats')
+        if upload_pool is not None:
+            # Compression runs in the upload workers, so the chunks in
+            # flight are compressed in parallel native threads.
+            upload_pool.spawn(self._upload_chunk, container, object_name,
+                              obj[object_name], data, extra_metadata,
+                              compression_stats)
+        else:
+            self._upload_chunk(container, object_name, obj[object_name],
+                               data, extra_metadata, compression_stats)
         object_list.append(obj)
         object_id += 1
         object_meta['list'] = object_list
@@ -413,15 +700,58 @@ class ChunkedBackupDriver(driver.BackupDriver, metaclass=abc.ABCMeta):
         LOG.debug('Calling eventlet.sleep(0)')
         eventlet.sleep(0)
 
-    def _prepare_output_data(self, data):
+    def _upload_chunk(self, container, object_name, obj, data,
+                      extra_metadata, compression_stats=None):
+        """Compress and write a chunk, recording it in the object entry."""
+        algorithm, output_data = self._prepare_output_data(data,
+                                                           compression_stats)
+        obj['compression'] = algorithm
+        LOG.debug('About to put_object')
+        with self._write_lock or contextlib.nullcontext():
+            with self._get_object_writer(
+                    container, object_name, extra_metadata=extra_metadata
+            ) as writer:
+                writer.write(output_data)
+        md5 = eventlet.tpool.execute(
+            secretutils.md5, data, usedforsecurity=False).hexdigest()
+        obj['md5'] = md5
+        LOG.debug('backup MD5 for %(object_name)s: %(md5)s',
+                  {'object_name': object_name, 'md5': md5})
+
+    def _prepare_output_data(self, data, compression_stats=None):
+        """Compress data, returning the algorithm used and the output data.
+
+        If a compression_stats dict is given the sizes, compression time and
+        number of skipped chunks are accumulated in it.
+        """
         if self.compressor is None:
             return 'none', data
         data_size_bytes = len(data)
+        if CONF.backup_compression_skip_incompressible:
+            entropy = _estimate_entropy(data)
+            if entropy >= _INCOMPRESSIBLE_ENTROPY:
+                LOG.debug('Chunk of %(data_size_bytes)d bytes looks '
+                          'incompressible (entropy %(entropy).3f bits per '
+                          'byte). Using original data for this chunk.',
+                          {'data_size_bytes': data_size_bytes,
+                           'entropy': entropy})
+                if compression_stats is not None:
+                    compression_stats['skipped_chunks'] += 1
+                    compression_stats['original_bytes'] += data_size_bytes
+                    compression_stats['compressed_bytes'] += data_size_bytes
+                return 'none', data
         # Execute compression in native thread so it doesn't prevent
-        # cooperative greenthread switching.
-        compressed_data = self.compressor.compress(data)
+        # cooperative greenthread switching.  It is timed in that thread, so
+        # that waiting for a free native thread isn't counted.
+        compressed_data, elapsed = eventlet.tpool.execute(
+            _timed_compress, self.compressor, data)
         comp_size_bytes = len(compressed_data)
         algorithm = CONF.backup_compression_algorithm.lower()
+        if compression_stats is not None:
+            compression_stats['original_bytes'] += data_size_bytes
+            compression_stats['compressed_bytes'] += min(comp_size_bytes,
+                                                         data_size_bytes)
+            compression_stats['compression_seconds'] += elapsed
         if comp_size_bytes >= data_size_bytes:
             LOG.debug('Compression of this chunk was ineffective: '
                       'original length: %(data_size_bytes)d, '
@@ -439,6 +769,23 @@ class ChunkedBackupDriver(driver.BackupDriver, metaclass=abc.ABCMeta):
                    })
         return algorithm, compressed_data
 
+    def _get_compression_summary(self, compression_stats):
+        """Return the compression ratio and throughput of a backup."""
+        summary = {'algorithm': self.backup_compression_algorithm.lower(),
+                   'original_bytes': compression_stats['original_bytes'],
+                   'compressed_bytes': compression_stats['compressed_bytes'],
+                   'skipped_chunks': compression_stats['skipped_chunks'],
+                   'ratio': None,
+                   'throughput_mib_per_sec': None}
+        if compression_stats['compressed_bytes']:
+            summary['ratio'] = round(compression_stats['original_bytes'] /
+                                     compression_stats['compressed_bytes'], 3)
+        if compression_stats['compression_seconds']:
+            summary['throughput_mib_per_sec'] = round(
+                compression_stats['original_bytes'] / units.Mi /
+                compression_stats['compression_seconds'], 3)
+        return summary
+
     def _finalize_backup(self, backup, container, object_meta, object_sha256):
         """Write the backup's metadata to the backup repository."""
         object_list = object_meta['list']
@@ -446,6 +793,12 @@ class ChunkedBackupDriver(driver.BackupDriver, metaclass=abc.ABCMeta):
         volume_meta = object_meta['volume_meta']
         sha256_list = object_sha256['sha256s']
         extra_metadata = object_meta.get('extra_metadata')
+        compression = None
+        if object_meta.get('compression_stats') and self.compressor:
+            compression = self._get_compression_summary(
+                object_meta['compression_stats'])
+            LOG.debug('Compression of backup %(backup_id)s: %(compression)s',
+                      {'backup_id': backup.id, 'compression': compression})
         self._write_sha256file(backup,
                                backup.volume_id,
                                container,
@@ -455,7 +808,8 @@ class ChunkedBackupDriver(driver.BackupDriver, metaclass=abc.ABCMeta):
                              container,
                              object_list,
                              volume_meta,
-                             extra_metadata)
+                             extra_metadata,
+                             compression)
         # NOTE(whoami-rajat) : The object_id variable is used to name
         # the backup objects and hence differs from the object_count
         # variable, therefore the increment of object_id value in the last
@@ -507,6 +861,9 @@ class ChunkedBackupDriver(driver.BackupDriver, metaclass=abc.ABCMeta):
     def _calculate_sha(self, data):
         """Calculate SHA256 of a data chunk.
 
+        Returns the digests of every sha block of the chunk packed back to
+        back, as stored in a _DigestList.
+
         This method cannot log anything as it is called on a native thread.
         """
         # NOTE(geguileo): Using memoryview to avoid data copying when slicing
@@ -518,10 +875,9 @@ class ChunkedBackupDriver(driver.BackupDriver, metaclass=abc.ABCMeta):
         while off < datalen:
             chunk_end = min(datalen, off + self.sha_block_size_bytes)
             block = chunk[off:chunk_end]
-            sha = hashlib.sha256(block).hexdigest()
-            shalist.append(sha)
+            shalist.append(hashlib.sha256(block).digest())
             off += self.sha_block_size_bytes
-        return shalist
+        return b''.join(shalist)
 
     def backup(self, backup, volume_file, backup_metadata=True):
         """Backup the given volume.
@@ -542,7 +898,10 @@ class ChunkedBackupDriver(driver.BackupDriver, metaclass=abc.ABCMeta):
             parent_backup = objects.Backup.get_by_id(self.context,
                                                      backup.parent_id)
             parent_backup_shafile = self._read_sha256file(parent_backup)
-            parent_backup_shalist = parent_backup_shafile['sha256s']
+            parent_backup_shalist = parent_backup_shafile.pop('sha256s')
+            if not isinstance(parent_backup_shalist, _DigestList):
+                parent_backup_shalist = _DigestList.from_hexdigests(
+                    parent_backup_shalist)
             if (parent_backup_shafile['chunk_size'] !=
                     self.sha_block_size_bytes):
                 err = (_('Hash block size has changed since the last '
@@ -587,86 +946,88 @@ class ChunkedBackupDriver(driver.BackupDriver, metaclass=abc.ABCMeta):
         if self.enable_progress_timer:
             timer.start(interval=self.backup_timer_interval)
 
-        sha256_list = object_sha256['sha256s']
+        object_meta['compression_stats'] = {'original_bytes': 0,
+                                            'compressed_bytes': 0,
+                                            'compression_seconds': 0.0,
+                                            'skipped_chunks': 0}
+        upload_pool = None
+        if self.upload_workers > 1:
+            upload_pool = _ChunkUploadPool(self.upload_workers)
+
+        sha256_list = _DigestList()
         shaindex = 0
         is_backup_canceled = False
-        while True:
-            # First of all, we check the status of this backup. If it
-            # has been changed to delete or has been deleted, we cancel the
-            # backup process to do forcing delete.
-            with backup.as_read_deleted():
-                backup.refresh()
-            if backup.status in (fields.BackupStatus.DELETING,
-                                 fields.BackupStatus.DELETED):
-                is_backup_canceled = True
-                # To avoid the chunk left when deletion complete, need to
-                # clean up the object of chunk again.
-                self.delete_backup(backup)
-                LOG.debug('Cancel the backup process of %s.', backup.id)
-                break
-            data_offset = volume_file.tell()
-
-            if win32_disk_size is not None:
-                read_bytes = min(self.chunk_size_bytes,
-                                 win32_disk_size - data_offset)
-            else:
-                read_bytes = self.chunk_size_bytes
-            data = volume_file.read(read_bytes)
-
-            if data == b'':
-                break
-
-            # Calculate new shas with the datablock.
-            shalist = eventlet.tpool.execute(self._calculate_sha, data)
-            sha256_list.extend(shalist)
-
-            # If parent_backup is not None, that means an incremental
-            # backup will be performed.
-            if parent_backup:
-                # Find the extent that needs to be backed up.
-                extent_off = -1
-                for idx, sha in enumerate(shalist):
-                    if sha != parent_backup_shalist[shaindex]:
-                        if extent_off == -1:
-                            # Start of new extent.
-                            extent_off = idx * self.sha_block_size_bytes
-                    else:
-                        if extent_off != -1:
-                            # We've reached the end of extent.
-                            extent_end = idx * self.sha_block_size_bytes
-                            segment = data[extent_off:extent_end]
-                            self._backup_chunk(backup, container, segment,
-                                               data_offset + extent_off,
-                                               object_meta,
-                                               extra_metadata)
-                            extent_off = -1
-                    shaindex += 1
-
-                # The last extent extends to the end of data buffer.
-                if extent_off != -1:
-                    extent_end = len(data)
-                    segment = data[extent_off:extent_end]
-                    self._backup_chunk(backup, container, segment,
-                                       data_offset + extent_off,
-                                       object_meta, extra_metadata)
-                    extent_off = -1
-            else:  # Do a full backup.
-                self._backup_chunk(backup, container, data, data_offset,
-                                   object_meta, extra_metadata)
-
-            # Notifications
-            total_block_sent_num += self.data_block_num
-            counter += 1
-            if counter == self.data_block_num:
-                # Send the notification to Ceilometer when the chunk
-                # number reaches the data_block_num.  The backup percentage
-                # is put in the metadata as the extra information.
-                self._send_progress_notification(self.context, backup,
-                                                 object_meta,
-                                                 total_block_sent_num,
-                                                 volume_size_bytes)
-                # Reset the counter
-                counter = 0
+        try:
+            while True:
+                # First of all, we check the status of this backup. If it
+                # has been changed to delete or has been deleted, we cancel the
+                # backup process to do forcing delete.
+                with backup.as_read_deleted():
+                    backup.refresh()
+                if backup.status in (fields.BackupStatus.DELETING,
+                                     fields.BackupStatus.DELETED):
+                    is_backup_canceled = True
+                    # To avoid the chunk left when deletion complete, need to
+                    # clean up the object of chunk again.
+                    if upload_pool is not None:
+                        upload_pool.wait(reraise=False)
+                    self.delete_backup(backup)
+                    LOG.debug('Cancel the backup process of %s.', backup.id)
+                    break
+                data_offset = volume_file.tell()
+
+                if win32_disk_size is not None:
+                    read_bytes = min(self.chunk_size_bytes,
+                                     win32_disk_size - data_offset)
+                else:
+                    read_bytes = self.chunk_size_bytes
+                data = volume_file.read(read_bytes)
+
+                if data == b'':
+                    break
+
+                # Calculate new shas with the datablock.
+                shalist = eventlet.tpool.execute(self._calculate_sha, data)
+                sha256_list.extend(shalist)
+
+                # If parent_backup is not None, that means an incremental
+                # backup will be performed.
+                if parent_backup:
+                    # Find the extents that need to be backed up.
+                    for first, last in _changed_blocks(
+                            shalist, parent_backup_shalist.data, shaindex):
+                        extent_off = first * self.sha_block_size_bytes
+                        extent_end = min(last * self.sha_block_size_bytes,
+                                         len(data))
+                        segment = data[extent_off:extent_end]
+                        self._backup_chunk(backup, container, segment,
+                                           data_offset + extent_off,
+                                           object_meta, extra_metadata,
+                                           upload_pool=upload_pool)
+                    shaindex += len(shalist) // _DIGEST_SIZE
+                else:  # Do a full backup.
+                    self._backup_chunk(backup, container, data, data_offset,
+                                       object_meta, extra_metadata,
+                                       upload_pool=upload_pool)
+
+                # Notifications
+                total_block_sent_num += self.data_block_num
+                counter += 1
+                if counter == self.data_block_num:
+                    # Send the notification to Ceilometer when the chunk
+                    # number reaches the data_block_num.  The backup percentage
+                    # is put in the metadata as the extra information.
+                    self._send_progress_notification(self.context, backup,
+                                                     object_meta,
+                                                     total_block_sent_num,
+                                                     volume_size_bytes)
+                    # Reset the counter
+                    counter = 0
+        except Exception:
+            with excutils.save_and_reraise_exception():
+                # Do not leave uploads running once the backup has failed.
+                if upload_pool is not None:
+                    upload_pool.wait(reraise=False)
 
         # Stop the timer.
         timer.stop()
@@ -674,6 +1035,10 @@ class ChunkedBackupDriver(driver.BackupDriver, metaclass=abc.ABCMeta):
         # but timer.stop().
         if is_backup_canceled:
             return
+        if upload_pool is not None:
+            # The metadata must only reference chunks that made it to the
+            # backup repository.
+            upload_pool.wait()
         # All the data have been sent, the backup_percent reaches 100.
         self._send_progress_end(self.context, backup, object_meta)
 
@@ -689,6 +1054,43 @@ class ChunkedBackupDriver(driver.BackupDriver, metaclass=abc.ABCMeta):
 
         self._finalize_backup(backup, container, object_meta, object_sha256)
 
+    def _check_object_list(self, backup, metadata):
+        """Ensure the objects in the repository match the backup metadata."""
+        metadata_object_names = []
+        for obj in metadata['objects']:
+            metadata_object_names.extend(obj.keys())
+        LOG.debug('metadata_object_names = %s.', metadata_object_names)
+        prune_list = [self._metadata_filename(backup),
+                      self._sha256_filename(backup)]
+        object_names = [object_name for object_name in
+                        self._generate_object_names(backup)
+                        if object_name not in prune_list]
+        if sorted(object_names) != sorted(metadata_object_names):
+            err = _('restore_backup aborted, actual object list '
+                    'does not match object list stored in metadata.')
+            raise exception.InvalidBackup(reason=err)
+
+    def _check_restore_status(self, requested_backup, backup, volume_id):
+        # Abort when status changes to error, available, or anything else
+        with requested_backup.as_read_deleted():
+            requested_backup.refresh()
+        if requested_backup.status != fields.BackupStatus.RESTORING:
+            raise exception.BackupRestoreCancel(back_id=backup.id,
+                                                vol_id=volume_id)
+
+    def _read_object_data(self, container, object_name, compression,
+                          extra_metadata):
+        """Download a backup object and return its decompressed data."""
+        with self._get_object_reader(
+                container, object_name,
+                extra_metadata=extra_metadata) as reader:
+            body = reader.read()
+        decompressor = self._get_compressor(compression)
+        if decompressor is not None:
+            LOG.debug('decompressing data using %s algorithm', compression)
+            return decompressor.decompress(body)
+        return body
+
     def _restore_v1(self, backup, volume_id, metadata, volume_file,
                     volume_is_new, requested_backup):
         """Restore a v1 volume backup.
@@ -702,27 +1104,10 @@ class ChunkedBackupDriver(driver.BackupDriver, metaclass=abc.ABCMeta):
         extra_metadata = metadata.get('extra_metadata')
         container = backup['container']
         metadata_objects = metadata['objects']
-        metadata_object_names = []
-        for obj in metadata_objects:
-            metadata_object_names.extend(obj.keys())
-        LOG.debug('metadata_object_names = %s.', metadata_object_names)
-        prune_list = [self._metadata_filename(backup),
-                      self._sha256_filename(backup)]
-        object_names = [object_name for object_name in
-                        self._generate_object_names(backup)
-                        if object_name not in prune_list]
-        if sorted(object_names) != sorted(metadata_object_names):
-            err = _('restore_backup aborted, actual object list '
-                    'does not match object list stored in metadata.')
-            raise exception.InvalidBackup(reason=err)
+        self._check_object_list(backup, metadata)
 
         for metadata_object in metadata_objects:
-            # Abort when status changes to error, available, or anything else
-            with requested_backup.as_read_deleted():
-                requested_backup.refresh()
-            if requested_backup.status != fields.BackupStatus.RESTORING:
-                raise exception.BackupRestoreCancel(back_id=backup.id,
-                                                    vol_id=volume_id)
+            self._check_restore_status(requested_backup, backup, volume_id)
 
             object_name, obj = list(metadata_object.items())[0]
             LOG.debug('restoring object. backup: %(backup_id)s, '
@@ -735,36 +1120,12 @@ class ChunkedBackupDriver(driver.BackupDriver, metaclass=abc.ABCMeta):
                           'volume_id': volume_id,
                       })
 
-            with self._get_object_reader(
-                    container, object_name,
-                    extra_metadata=extra_metadata) as reader:
-                body = reader.read()
-            compression_algorithm = metadata_object[object_name]['compression']
-            decompressor = self._get_compressor(compression_algorithm)
-            if decompressor is not None:
-                LOG.debug('decompressing data using %s algorithm',
-                          compression_algorithm)
-                decompressed = decompressor.decompress(body)
-                body = None  # Allow Python to free it
-                _write_volume(volume_is_new,
-                              volume_file, obj['offset'], decompressed)
-                decompressed = None  # Allow Python to free it
-            else:
-                _write_volume(volume_is_new,
-                              volume_file, obj['offset'], body)
-                body = None  # Allow Python to free it
+            body = self._read_object_data(container, object_name,
+                                          obj['compression'], extra_metadata)
+            _write_volume(volume_is_new, volume_file, obj['offset'], body)
+            body = None  # Allow Python to free it
 
-            # force flush every write to avoid long blocking write on close
-            volume_file.flush()
-
-            # Be tolerant to IO implementations that do not support fileno()
-            try:
-                fileno = volume_file.fileno()
-            except IOError:
-                LOG.debug("volume_file does not support fileno() so skipping "
-                          "fsync()")
-            else:
-                os.fsync(fileno)
+            _flush_volume(volume_file)
 
             # Restoring a backup to a volume can take some time. Yield so other
             # threads can run, allowing for among other things the service
@@ -773,6 +1134,82 @@ class ChunkedBackupDriver(driver.BackupDriver, metaclass=abc.ABCMeta):
         LOG.debug('v1 volume backup restore of %s finished.',
                   backup_id)
 
+    def _plan_restore(self, backup_list, metadata_list):
+        """Merge the object lists of a backup chain into one extent map.
+
+        backup_list and metadata_list go from the newest backup to the full
+        one. Objects are visited newest first, and every object only keeps the
+        byte ranges that no newer object overwrites, so each range of the
+        volume is restored from exactly one object.
+
+        Returns a list of (backup, metadata, object_name, obj, ranges) tuples
+        sorted by volume offset, where ranges are the (start, end) volume
+        ranges to write from that object. Fully overwritten objects are left
+        out so they are never downloaded.
+        """
+        covered = []
+        plan = []
+        for backup, metadata in zip(backup_list, metadata_list):
+            # Within a backup later objects were written last, so they win.
+            for metadata_object in reversed(metadata['objects']):
+                object_name, obj = list(metadata_object.items())[0]
+                start = obj['offset']
+                end = start + obj['length']
+                ranges = _subtract_extents(start, end, covered)
+                if ranges:
+                    plan.append((backup, metadata, object_name, obj, ranges))
+                _add_extent(covered, start, end)
+        plan.sort(key=lambda item: item[3]['offset'])
+        return plan
+
+    def _restore_flattened(self, backup_list, metadata_list, volume_id,
+                           volume_file, volume_is_new):
+        """Restore a v1 backup chain writing every byte range only once.
+
+        Raises BackupRestoreCancel on any status change of the requested
+        backup, which is the first one in backup_list.
+        """
+        requested_backup = backup_list[0]
+        for backup, metadata in zip(backup_list, metadata_list):
+            self._check_object_list(backup, metadata)
+
+        plan = self._plan_restore(backup_list, metadata_list)
+        LOG.debug('Flattened restore of backup %(backup_id)s: %(num)d of '
+                  '%(total)d objects from %(layers)d backups are needed.',
+                  {'backup_id': requested_backup.id,
+                   'num': len(plan),
+                   'total': sum(len(metadata['objects'])
+                                for metadata in metadata_list),
+                   'layers': len(backup_list)})
+
+        def _download(item):
+            backup, metadata, object_name, obj, ranges = item
+            return self._read_object_data(backup['container'], object_name,
+                                          obj['compression'],
+                                          metadata.get('extra_metadata'))
+
+        # GreenPool.imap returns the results in order and never has more
+        # than restore_workers downloads in flight.
+        pool = eventlet.GreenPool(self.restore_workers)
+        bodies = pool.imap(_download, plan)
+        for item, body in zip(plan, bodies):
+            self._check_restore_status(requested_backup, item[0], volume_id)
+            backup, metadata, object_name, obj, ranges = item
+            LOG.debug('restoring object. backup: %(backup_id)s, '
+                      'object name: %(object_name)s, volume: %(volume_id)s, '
+                      'ranges: %(ranges)s.',
+                      {'backup_id': backup.id, 'object_name': object_name,
+                       'volume_id': volume_id, 'ranges': ranges})
+            body = memoryview(body)
+            for start, end in ranges:
+                offset = start - obj['offset']
+                _write_volume(volume_is_new, volume_file, start,
+                              body[offset:offset + end - start])
+            body = None  # Allow Python to free it
+
+            _flush_volume(volume_file)
+            eventlet.sleep(0)
+
     def restore(self, backup, volume_id, volume_file, volume_is_new):
         """Restore the given volume backup from backup repository.
 
@@ -814,17 +1251,27 @@ class ChunkedBackupDriver(driver.BackupDriver, metaclass=abc.ABCMeta):
             backup_list.append(prev_backup)
             current_backup = prev_backup
 
-        # Do a full restore first, then layer the incremental backups
-        # on top of it in order.
-        index = len(backup_list) - 1
-        while index >= 0:
-            backup1 = backup_list[index]
-            index = index - 1
-            metadata = self._read_metadata(backup1)
-            restore_func(backup1, volume_id, metadata, volume_file,
-                         volume_is_new, backup)
-
-            volume_meta = metadata.get('volume_meta', None)
+        metadata_list = [metadata]
+        for prev_backup in backup_list[1:]:
+            metadata_list.append(self._read_metadata(prev_backup))
+
+        if (len(backup_list) > 1 and
+                all(self.DRIVER_VERSION_MAPPING.get(meta['version']) ==
+                    '_restore_v1' for meta in metadata_list)):
+            # Merge the whole chain and write each byte range only once
+            # instead of layering every incremental backup over the volume.
+            self._restore_flattened(backup_list, metadata_list, volume_id,
+                                    volume_file, volume_is_new)
+        else:
+            # Do a full restore first, then layer the incremental backups
+            # on top of it in order.
+            for backup1, metadata1 in zip(reversed(backup_list),
+                                          reversed(metadata_list)):
+                restore_func(backup1, volume_id, metadata1, volume_file,
+                             volume_is_new, backup)
+
+        for metadata1 in reversed(metadata_list):
+            volume_meta = metadata1.get('volume_meta', None)
             try:
                 if volume_meta:
                     self.put_metadata(volume_id, volume_meta)
@@ -356,6 +356,14 @@ class BackupDriver(base.Base, metaclass=abc.ABCMeta):
         # from BackupDriver supports the force deletion function.
         self.support_force_delete = False
 
+    @classmethod
+    def cleanup_connections(cls):
+        """Close the connections shared by the drivers of the service.
+
+        Called when the backup service stops.
+        """
+        pass
+
     def get_metadata(self, volume_id):
         return self.backup_meta_api.get(volume_id)
 
@@ -49,6 +49,7 @@ import re
 import subprocess
 import tempfile
 import textwrap
+import threading
 import time
 from typing import Dict, List, Optional, Tuple
 
@@ -111,6 +112,14 @@ service_opts = [
                     incremental backup will automatically become a full backup
                     as no common snapshot exists anymore.
                 """)),
+    cfg.IntOpt('backup_ceph_connection_pool_size', default=4, min=0,
+               help='Maximum number of idle connections to the backup Ceph '
+                    'cluster that are kept open for reuse for each pool. '
+                    'Set to 0 to open a new connection for every '
+                    'operation.'),
+    cfg.IntOpt('backup_ceph_connection_pool_idle_timeout', default=60, min=0,
+               help='Number of seconds an idle connection to the backup Ceph '
+                    'cluster is kept open for reuse before it is closed.'),
     cfg.BoolOpt('restore_discard_excess_bytes', default=True,
                 help='If True, always discard excess bytes when restoring '
                      'volumes i.e. pad with zeroes.')
@@ -194,6 +203,9 @@ class CephBackupDriver(driver.BackupDriver):
     gain.
     """
 
+    _rados_pool: Optional[rbd_driver.RADOSConnectionPool] = None
+    _rados_pool_lock = threading.Lock()
+
     def __init__(self, context, execute=None):
         super().__init__(context)
         self.rbd = rbd
@@ -333,30 +345,56 @@ class CephBackupDriver(driver.BackupDriver):
                       "not support journaling")
                 )
 
+    @classmethod
+    def _get_rados_pool(cls) -> rbd_driver.RADOSConnectionPool:
+        # The backup manager creates a driver for every operation, so the
+        # pool is shared by all the drivers of the service. Connections are
+        # pooled per cluster configuration and pool.
+        with cls._rados_pool_lock:
+            if cls._rados_pool is None:
+                cls._rados_pool = rbd_driver.RADOSConnectionPool(
+                    CONF.backup_ceph_connection_pool_size,
+                    CONF.backup_ceph_connection_pool_idle_timeout)
+            return cls._rados_pool
+
+    @classmethod
+    def cleanup_connections(cls) -> None:
+        with cls._rados_pool_lock:
+            pool, cls._rados_pool = cls._rados_pool, None
+        if pool is not None:
+            pool.clear()
+
     def _connect_to_rados(self,
                           pool: Optional[str] = None) -> Tuple['rados.Rados',
                                                                'rados.Ioctx']:
-        """Establish connection to the backup Ceph cluster."""
-        client = eventlet.tpool.Proxy(self.rados.Rados(
-                                      rados_id=self._ceph_backup_user,
-                                      conffile=self._ceph_backup_conf))
-        try:
-            client.connect()
-            pool_to_open = pool or self._ceph_backup_pool
-            ioctx = client.open_ioctx(pool_to_open)
-            return client, ioctx
-        except self.rados.Error:
-            # shutdown cannot raise an exception
-            client.shutdown()
-            raise
+        """Establish connection to the backup Ceph cluster.
 
-    @staticmethod
-    def _disconnect_from_rados(client: 'rados.Rados',
-                               ioctx: 'rados.Ioctx') -> None:
-        """Terminate connection with the backup Ceph cluster."""
-        # closing an ioctx cannot raise an exception
-        ioctx.close()
-        client.shutdown()
+        An idle pooled connection is reused when one is available.
+        """
+        pool_to_open = pool or self._ceph_backup_pool
+
+        def _do_conn() -> Tuple['rados.Rados', 'rados.Ioctx']:
+            client = eventlet.tpool.Proxy(self.rados.Rados(
+                                          rados_id=self._ceph_backup_user,
+                                          conffile=self._ceph_backup_conf))
+            try:
+                client.connect()
+                ioctx = client.open_ioctx(pool_to_open)
+                return client, ioctx
+            except self.rados.Error:
+                # shutdown cannot raise an exception
+                client.shutdown()
+                raise
+
+        key = (self._ceph_backup_user, self._ceph_backup_conf, pool_to_open)
+        return self._get_rados_pool().get(key, _do_conn)
+
+    def _disconnect_from_rados(self,
+                               client: 'rados.Rados',
+                               ioctx: 'rados.Ioctx',
+                               discard: bool = False) -> None:
+        """Release connection with the backup Ceph cluster."""
+        self._get_rados_pool().put(client, ioctx, discard=discard)
 
     @staticmethod
     def _format_base_name(service_metadata: str) -> str:
@@ -568,8 +606,7 @@ class CephBackupDriver(driver.BackupDriver):
                       "backup base image of volume %(volume)s.",
                       {'basename': base_name, 'volume': volume_id})
 
-        with eventlet.tpool.Proxy(rbd_driver.RADOSClient(self,
-                                  backup.container)) as client:
+        with rbd_driver.RADOSClient(self, backup.container) as client:
             rbd_exists, base_name = \
                 self._rbd_image_exists(base_name, volume_id, client,
                                        try_diff_format=try_diff_format)
@@ -761,8 +798,7 @@ class CephBackupDriver(driver.BackupDriver):
                          base_name: str,
                          length: int) -> Tuple[Optional[str], bool]:
         """Create the base_image for a full RBD backup."""
-        with eventlet.tpool.Proxy(rbd_driver.RADOSClient(self,
-                                  container)) as client:
+        with rbd_driver.RADOSClient(self, container) as client:
             self._create_base_image(base_name, length, client)
         # Now we just need to return from_snap=None and image_created=True, if
         # there is some exception in making backup snapshot, will clean up the
@@ -788,8 +824,7 @@ class CephBackupDriver(driver.BackupDriver):
                    'incr': last_incr,
                    })
 
-        with eventlet.tpool.Proxy(rbd_driver.RADOSClient(self,
-                                  container)) as client:
+        with rbd_driver.RADOSClient(self, container) as client:
             try:
                 base_rbd = eventlet.tpool.Proxy(
                     self.rbd.Image(client.ioctx, base_name, read_only=True))
@@ -997,8 +1032,7 @@ class CephBackupDriver(driver.BackupDriver):
         else:
             backup_name = self._get_backup_base_name(volume_id, backup=backup)
 
-        with eventlet.tpool.Proxy(rbd_driver.RADOSClient(self,
-                                  backup.container)) as client:
+        with rbd_driver.RADOSClient(self, backup.container) as client:
             # First create base backup image
             old_format, features = self._get_rbd_support()
             LOG.debug("Creating backup base image='%(name)s' for volume "
@@ -1129,8 +1163,7 @@ class CephBackupDriver(driver.BackupDriver):
 
         LOG.debug("Backing up metadata for volume %s.", backup.volume_id)
         try:
-            with eventlet.tpool.Proxy(rbd_driver.RADOSClient(self,
-                                      backup.container)) as client:
+            with rbd_driver.RADOSClient(self, backup.container) as client:
                 vol_meta_backup = VolumeMetadataBackup(client, backup.id)
                 vol_meta_backup.set(json_meta)
         except exception.VolumeMetadataBackupExists as e:
@@ -1217,8 +1250,7 @@ class CephBackupDriver(driver.BackupDriver):
         :param src_snap: A string, the name of the restore point snapshot,
         optional, used for incremental backups or RBD backup.
         """
-        with eventlet.tpool.Proxy(rbd_driver.RADOSClient(self,
-                                  backup.container)) as client:
+        with rbd_driver.RADOSClient(self, backup.container) as client:
             # In case of snapshot_id, the old base name format is used:
             # volume-<vol-uuid>.backup.base
             # Otherwise, the new base name format is used:
@@ -1267,17 +1299,23 @@ class CephBackupDriver(driver.BackupDriver):
                                                snapshot=_src,
                                                read_only=True))
 
+            meta_io_proxy = None
             try:
                 rbd_meta = linuxrbd.RBDImageMetadata(src_rbd,
                                                      backup.container,
                                                      self._ceph_backup_user,
                                                      self._ceph_backup_conf)
                 rbd_fd = linuxrbd.RBDVolumeIOWrapper(rbd_meta)
-                self._transfer_data(eventlet.tpool.Proxy(rbd_fd), backup_name,
+                meta_io_proxy = eventlet.tpool.Proxy(rbd_fd)
+                self._transfer_data(meta_io_proxy, backup_name,
                                     dest_file, dest_name, length,
                                     discard_zeros=volume_is_new)
             finally:
-                src_rbd.close()
+                # Closing the wrapper will close the image as well
+                if meta_io_proxy:
+                    meta_io_proxy.close()
+                else:
+                    src_rbd.close()
 
     def _check_restore_vol_size(self, backup: 'objects.Backup',
                                 restore_vol, restore_length: int,
@@ -1291,8 +1329,7 @@ class CephBackupDriver(driver.BackupDriver):
         backup_base = self._get_backup_base_name(backup.volume_id,
                                                  backup=backup)
 
-        with eventlet.tpool.Proxy(rbd_driver.RADOSClient(self,
-                                  backup.container)) as client:
+        with rbd_driver.RADOSClient(self, backup.container) as client:
             adjust_size = 0
             base_image = eventlet.tpool.Proxy(self.rbd.Image(client.ioctx,
                                               backup_base,
@@ -1353,8 +1390,7 @@ class CephBackupDriver(driver.BackupDriver):
         base has no snapshots/restore points), None is returned. Otherwise, the
         restore point associated with backup_id is returned.
         """
-        with eventlet.tpool.Proxy(rbd_driver.RADOSClient(self,
-                                  self._ceph_backup_pool)) as client:
+        with rbd_driver.RADOSClient(self, self._ceph_backup_pool) as client:
             base_rbd = eventlet.tpool.Proxy(self.rbd.Image(client.ioctx,
                                             base_name, read_only=True))
             try:
@@ -1464,8 +1500,7 @@ class CephBackupDriver(driver.BackupDriver):
         else:
             base_name = self._get_backup_base_name(backup.volume_id)
 
-        with eventlet.tpool.Proxy(rbd_driver.RADOSClient(
-                                  self, backup.container)) as client:
+        with rbd_driver.RADOSClient(self, backup.container) as client:
             diff_allowed, restore_point = \
                 self._diff_restore_allowed(base_name, backup, volume,
                                            volume_file, client)
@@ -1497,7 +1532,7 @@ class CephBackupDriver(driver.BackupDriver):
         otherwise do nothing.
         """
         try:
-            with eventlet.tpool.Proxy(rbd_driver.RADOSClient(self)) as client:
+            with rbd_driver.RADOSClient(self) as client:
                 meta_bak = VolumeMetadataBackup(client, backup.id)
                 meta = meta_bak.get()
                 if meta is not None:
@@ -1567,8 +1602,7 @@ class CephBackupDriver(driver.BackupDriver):
             has_pool = False
 
         if has_pool:
-            with eventlet.tpool.Proxy(rbd_driver.RADOSClient(
-                                      self, backup.container)) as client:
+            with rbd_driver.RADOSClient(self, backup.container) as client:
                 VolumeMetadataBackup(client, backup.id).remove_if_exists()
 
         if delete_failed:
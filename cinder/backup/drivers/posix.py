@@ -73,6 +73,10 @@ CONF.register_opts(posixbackup_service_opts)
 class PosixBackupDriver(chunkeddriver.ChunkedBackupDriver):
     """Provides backup, restore and delete using a Posix file system."""
 
+    # Every object writer and reader is a file of its own.
+    SUPPORTS_CONCURRENT_WRITERS = True
+    SUPPORTS_CONCURRENT_READERS = True
+
     def __init__(self, context, backup_path=None):
         chunk_size_bytes = CONF.backup_file_size
         sha_block_size_bytes = CONF.backup_sha_block_size_bytes
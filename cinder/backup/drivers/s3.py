@@ -168,6 +168,10 @@ def _wrap_exception(func):
 class S3BackupDriver(chunkeddriver.ChunkedBackupDriver):
     """Provides backup, restore and delete of backup objects within S3."""
 
+    # boto3 clients are thread safe.
+    SUPPORTS_CONCURRENT_WRITERS = True
+    SUPPORTS_CONCURRENT_READERS = True
+
     def __init__(self, context):
         chunk_size_bytes = CONF.backup_s3_object_size
         sha_block_size_bytes = CONF.backup_s3_block_size
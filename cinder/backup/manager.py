@@ -177,6 +177,9 @@ class BackupManager(manager.SchedulerDependentManager):
                           resource={'type': 'driver',
                                     'id': self.__class__.__name__})
 
+    def cleanup_host(self):
+        self.service.cleanup_connections()
+
     def reset(self):
         super(BackupManager, self).reset()
         self.backup_rpcapi = backup_rpcapi.BackupAPI()
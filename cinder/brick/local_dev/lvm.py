@@ -17,9 +17,12 @@
 LVM class for performing LVM operations.
 """
 
+import functools
+import json
 import math
 import os
 import re
+import time
 
 from os_brick import executor
 from oslo_concurrency import processutils as putils
@@ -34,6 +37,19 @@ from cinder import utils
 LOG = logging.getLogger(__name__)
 
 MINIMUM_LVM_VERSION = (2, 2, 107)
+# First LVM version that supports --reportformat json
+LVM_JSON_REPORT_VERSION = (2, 2, 158)
+
+
+def _invalidates_lv_cache(func):
+    """Decorator for methods that change the LVs of the VG."""
+    @functools.wraps(func)
+    def wrapper(self, *args, **kwargs):
+        try:
+            return func(self, *args, **kwargs)
+        finally:
+            self.invalidate_lv_cache()
+    return wrapper
 
 
 class LVM(executor.Executor):
@@ -44,7 +60,7 @@ class LVM(executor.Executor):
     def __init__(self, vg_name, root_helper, create_vg=False,
                  physical_volumes=None, lvm_type='default',
                  executor=putils.execute, lvm_conf=None,
-                 suppress_fd_warn=False):
+                 suppress_fd_warn=False, metadata_cache_ttl=0):
 
         """Initialize the LVM object.
 
@@ -59,6 +75,9 @@ class LVM(executor.Executor):
         :param lvm_type: VG and Volume type (default, or thin)
         :param executor: Execute method to use, None uses common/processutils
         :param suppress_fd_warn: Add suppress FD Warn to LVM env
+        :param metadata_cache_ttl: Seconds to reuse the LV information of the
+                                   VG gathered with a single lvs call, 0
+                                   disables the cache
 
         """
         super(LVM, self).__init__(execute=executor, root_helper=root_helper)
@@ -74,6 +93,10 @@ class LVM(executor.Executor):
         self._supports_snapshot_lv_activation = None
         self._supports_lvchange_ignoreskipactivation = None
         self.vg_provisioned_capacity = 0.0
+        self._lv_cache_ttl = metadata_cache_ttl
+        self._lv_cache = None
+        self._lv_cache_time = 0.0
+        self._lv_cache_generation = 0
 
         if lvm_type not in ['default', 'thin']:
             raise exception.Invalid('lvm_type must be "default" or "thin"')
@@ -102,6 +125,14 @@ class LVM(executor.Executor):
                         {'current': lvm_version,
                          'supported': MINIMUM_LVM_VERSION})
 
+        if self._lv_cache_ttl and lvm_version < LVM_JSON_REPORT_VERSION:
+            LOG.warning("LVM version %(current)s doesn't support JSON "
+                        "reports, LV metadata will not be cached. Minimum "
+                        "required version: %(required)s",
+                        {'current': lvm_version,
+                         'required': LVM_JSON_REPORT_VERSION})
+            self._lv_cache_ttl = 0
+
         if create_vg and physical_volumes is not None:
             try:
                 self._create_vg(physical_volumes)
@@ -343,12 +374,72 @@ class LVM(executor.Executor):
 
         return lv_list
 
+    def invalidate_lv_cache(self):
+        """Drop the cached LV information of the VG."""
+        self._lv_cache_generation += 1
+        self._lv_cache = None
+
+    def _get_lv_cache(self):
+        """Return the LVs of the VG keyed by name.
+
+        All the LV fields used by this class are gathered with a single lvs
+        call and reused for metadata_cache_ttl seconds or until an LV of the
+        VG is changed through this object.
+
+        :returns: Dictionary of LV reports, None if caching is disabled
+        """
+        if not self._lv_cache_ttl:
+            return None
+
+        now = time.monotonic()
+        if (self._lv_cache is not None and
+                now - self._lv_cache_time < self._lv_cache_ttl):
+            return self._lv_cache
+
+        generation = self._lv_cache_generation
+        cmd = LVM.LVM_CMD_PREFIX + ['lvs', '--reportformat', 'json',
+                                    '--unit=g', '--nosuffix', '-o',
+                                    'vg_name,lv_name,lv_size,lv_attr,origin',
+                                    '--readonly', self.vg_name]
+        out, _err = self._run_lvm_command(cmd)
+
+        lv_cache = {}
+        for report in json.loads(out)['report']:
+            for lv in report.get('lv', []):
+                lv_cache[lv['lv_name']] = lv
+
+        # The report may predate an LV change made by another thread while
+        # lvs was running, use it for this call only.
+        if generation == self._lv_cache_generation:
+            self._lv_cache = lv_cache
+            self._lv_cache_time = now
+        return lv_cache
+
+    def _get_cached_lv(self, name):
+        """Return the cached report of an LV, None if not available."""
+        lv_cache = self._get_lv_cache()
+        if lv_cache is None:
+            return None
+        return lv_cache.get(name)
+
     def get_volumes(self, lv_name=None):
         """Get all LV's associated with this instantiation (VG).
 
         :returns: List of Dictionaries with LV info
 
         """
+        lv_cache = self._get_lv_cache()
+        if lv_cache is not None:
+            if lv_name is None:
+                lvs = list(lv_cache.values())
+            elif lv_name in lv_cache:
+                lvs = [lv_cache[lv_name]]
+            else:
+                lvs = []
+            if lvs or lv_name is None:
+                return [{'vg': lv['vg_name'], 'name': lv['lv_name'],
+                         'size': lv['lv_size']} for lv in lvs]
+
         return self.get_lv_info(self._root_helper,
                                 self.vg_name,
                                 lv_name)
@@ -518,6 +609,7 @@ class LVM(executor.Executor):
         # leave 5% free for metadata
         return "%sg" % (self.vg_free_space * 0.95)
 
+    @_invalidates_lv_cache
     def create_thin_pool(self, name=None, size_str=None):
         """Creates a thin provisioning pool for this VG.
 
@@ -557,6 +649,7 @@ class LVM(executor.Executor):
         self.vg_thin_pool = name
         return size_str
 
+    @_invalidates_lv_cache
     def create_volume(self, name, size_str, lv_type='default', mirror_count=0):
         """Creates a logical volume on the object's VG.
 
@@ -596,6 +689,7 @@ class LVM(executor.Executor):
                       self.get_all_volume_groups(self._root_helper))
             raise
 
+    @_invalidates_lv_cache
     @utils.retry(putils.ProcessExecutionError)
     def create_lv_snapshot(self, name, source_lv_name, lv_type='default'):
         """Creates a snapshot of a logical volume.
@@ -642,6 +736,7 @@ class LVM(executor.Executor):
                 return True
         return False
 
+    @_invalidates_lv_cache
     @utils.retry(exception.VolumeNotDeactivated, retries=1, interval=2)
     def deactivate_lv(self, name):
         lv_path = self.vg_name + '/' + self._mangle_lv_name(name)
@@ -673,6 +768,7 @@ class LVM(executor.Executor):
         else:
             LOG.debug("Volume %s has been deactivated.", name)
 
+    @_invalidates_lv_cache
     @utils.retry(putils.ProcessExecutionError, retries=5, backoff_rate=2)
     def activate_lv(self, name, is_snapshot=False, permanent=False):
         """Ensure that logical volume/snapshot logical volume is activated.
@@ -717,6 +813,7 @@ class LVM(executor.Executor):
             LOG.error('StdErr  :%s', err.stderr)
             raise
 
+    @_invalidates_lv_cache
     @utils.retry(putils.ProcessExecutionError)
     def delete(self, name):
         """Delete logical volume or snapshot.
@@ -762,6 +859,7 @@ class LVM(executor.Executor):
             LOG.debug('Successfully deleted volume: %s after '
                       'udev settle.', name)
 
+    @_invalidates_lv_cache
     def revert(self, snapshot_name):
         """Revert an LV to snapshot.
 
@@ -778,6 +876,10 @@ class LVM(executor.Executor):
             raise
 
     def lv_has_snapshot(self, name):
+        lv = self._get_cached_lv(name)
+        if lv is not None:
+            return lv['lv_attr'][:1] in ('o', 'O')
+
         cmd = LVM.LVM_CMD_PREFIX + ['lvdisplay', '--noheading', '-C', '-o',
                                     'Attr', '--readonly',
                                     '%s/%s' % (self.vg_name, name)]
@@ -790,6 +892,10 @@ class LVM(executor.Executor):
 
     def lv_is_snapshot(self, name):
         """Return True if LV is a snapshot, False otherwise."""
+        lv = self._get_cached_lv(name)
+        if lv is not None:
+            return lv['lv_attr'][:1] == 's'
+
         cmd = LVM.LVM_CMD_PREFIX + ['lvdisplay', '--noheading', '-C', '-o',
                                     'Attr', '%s/%s' % (self.vg_name, name)]
         out, _err = self._run_lvm_command(cmd)
@@ -801,6 +907,10 @@ class LVM(executor.Executor):
 
     def lv_is_open(self, name):
         """Return True if LV is currently open, False otherwise."""
+        lv = self._get_cached_lv(name)
+        if lv is not None:
+            return lv['lv_attr'][5:6] == 'o'
+
         cmd = LVM.LVM_CMD_PREFIX + ['lvdisplay', '--noheading', '-C', '-o',
                                     'Attr', '%s/%s' % (self.vg_name, name)]
         out, _err = self._run_lvm_command(cmd)
@@ -812,6 +922,10 @@ class LVM(executor.Executor):
 
     def lv_get_origin(self, name):
         """Return the origin of an LV that is a snapshot, None otherwise."""
+        lv = self._get_cached_lv(name)
+        if lv is not None:
+            return lv['origin'] or None
+
         cmd = LVM.LVM_CMD_PREFIX + ['lvdisplay', '--noheading', '-C', '-o',
                                     'Origin', '%s/%s' % (self.vg_name, name)]
         out, _err = self._run_lvm_command(cmd)
@@ -820,6 +934,7 @@ class LVM(executor.Executor):
             return out
         return None
 
+    @_invalidates_lv_cache
     def extend_volume(self, lv_name, new_size):
         """Extend the size of an existing volume."""
         # Volumes with snaps have attributes 'o' or 'O' and will be
@@ -866,6 +981,7 @@ class LVM(executor.Executor):
     def vg_mirror_size(self, mirror_count):
         return (self.vg_free_space / (mirror_count + 1))
 
+    @_invalidates_lv_cache
     def rename_volume(self, lv_name, new_name):
         """Change the name of an existing volume."""
 
@@ -206,7 +206,17 @@ class DbCommands(object):
 
     @args('age_in_days', type=int,
           help='Purge deleted rows older than age in days')
-    def purge(self, age_in_days: int) -> None:
+    @args('--batch-size', dest='batch_size', type=int, default=None,
+          help='Maximum number of rows deleted from a table in each '
+               'transaction. Defaults to the db_purge_batch_size option.')
+    @args('--max-rows-per-second', dest='max_rows_per_second', type=int,
+          default=None,
+          help='Maximum number of rows deleted per second, 0 for no limit. '
+               'Defaults to the db_purge_max_rows_per_second option.')
+    def purge(self,
+              age_in_days: int,
+              batch_size: Optional[int] = None,
+              max_rows_per_second: Optional[int] = None) -> None:
         """Purge deleted rows older than a given age from cinder tables."""
         age_in_days = int(age_in_days)
         if age_in_days < 0:
@@ -215,15 +225,28 @@ class DbCommands(object):
         if age_in_days >= (int(time.time()) / 86400):
             print(_("Maximum age is count of days since epoch."))
             sys.exit(1)
+        if batch_size is not None and batch_size < 1:
+            print(_("Must supply a positive value for batch size"))
+            sys.exit(1)
+        if max_rows_per_second is not None and max_rows_per_second < 0:
+            print(_("Must supply a positive value for max rows per second"))
+            sys.exit(1)
         ctxt = context.get_admin_context()
 
         try:
-            db.purge_deleted_rows(ctxt, age_in_days)
+            purged = db.purge_deleted_rows(
+                ctxt, age_in_days, batch_size=batch_size,
+                max_rows_per_second=max_rows_per_second)
         except db_exc.DBReferenceError:
             print(_("Purge command failed, check cinder-manage "
                     "logs for more details."))
             sys.exit(1)
 
+        for table, rows in purged.items():
+            if rows:
+                print(_('Purged %(rows)d rows from table %(table)s') %
+                      {'rows': rows, 'table': table})
+
     def _run_migration(self,
                        ctxt: context.RequestContext,
                        max_count: int) -> Tuple[dict, bool]:
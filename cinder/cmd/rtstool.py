@@ -36,10 +36,6 @@ class RtstoolImportError(RtstoolError):
 
 def create(backing_device, name, userid, password, iser_enabled,
            initiator_iqns=None, portals_ips=None, portals_port=3260):
-    # List of IPS that will not raise an error when they fail binding.
-    # Originally we will fail on all binding errors.
-    ips_allow_fail = ()
-
     try:
         rtsroot = rtslib_fb.root.RTSRoot()
     except rtslib_fb.utils.RTSLibError:
@@ -52,6 +48,18 @@ def create(backing_device, name, userid, password, iser_enabled,
             # Already exists, use this one
             return
 
+    create_target(backing_device, name, userid, password, iser_enabled,
+                  initiator_iqns=initiator_iqns, portals_ips=portals_ips,
+                  portals_port=portals_port)
+
+
+def create_target(backing_device, name, userid, password, iser_enabled,
+                  initiator_iqns=None, portals_ips=None, portals_port=3260):
+    """Create the storage object and target without checking they exist."""
+    # List of IPS that will not raise an error when they fail binding.
+    # Originally we will fail on all binding errors.
+    ips_allow_fail = ()
+
     so_new = rtslib_fb.BlockStorageObject(name=name,
                                           dev=backing_device)
 
@@ -57,6 +57,9 @@ def main() -> None:
     python_logging.captureWarnings(True)
     utils.monkey_patch()
     gmr.TextGuruMeditation.setup_autorun(version, conf=CONF)
-    server = service.Service.create(binary='cinder-scheduler')
+    # The periodic purge of deleted rows is serialized across schedulers.
+    server = service.Service.create(
+        binary='cinder-scheduler',
+        coordination=CONF.db_purge_interval > 0)
     service.serve(server)
     service.wait()
@@ -34,11 +34,24 @@ Time periods are specified as 'hour', 'month', 'day' or 'year'
 - `year` - previous year. If run on Jan 1, it generates usages for
   Jan 1 through Dec 31 of the previous year.
 
+Resources are read from the database in batches and their notifications are
+sent from a pool of green threads.  When a checkpoint file is configured the
+progress is saved after every batch, so an interrupted audit run for the same
+period resumes where it stopped instead of starting over.
+
 """
 
 import datetime
+import json
+import os
 import sys
+import time
 
+# NOTE: Monkey patching must go before OSLO.log import, otherwise OSLO.context
+# will not use greenthread thread local and all greenthreads will share the
+# same context.
+import eventlet
+eventlet.monkey_patch()
 import iso8601
 from oslo_config import cfg
 from oslo_log import log as logging
@@ -68,6 +81,27 @@ script_opts = [
                 default=False,
                 help="Send the volume and snapshot create and delete "
                      "notifications generated in the specified period."),
+    cfg.IntOpt('batch_size',
+               default=1000,
+               min=1,
+               help="Number of volumes, snapshots or backups loaded from "
+                    "the database at a time."),
+    cfg.IntOpt('workers',
+               default=10,
+               min=1,
+               help="Number of green threads sending notifications "
+                    "concurrently."),
+    cfg.IntOpt('max_resources_per_second',
+               default=0,
+               min=0,
+               help="Maximum number of volumes, snapshots or backups to "
+                    "send notifications for per second. 0 means no limit."),
+    cfg.StrOpt('checkpoint_file',
+               help="File used to record the progress of the audit. If an "
+                    "audit of the same period is interrupted, the next run "
+                    "resumes after the last completed batch. Notifications "
+                    "of the batch that was in progress may be sent again. "
+                    "The file is removed when the audit completes."),
 ]
 CONF.register_cli_opts(script_opts)
 
@@ -192,6 +226,107 @@ def _obj_ref_action(_notify_usage, LOG, obj_ref, extra_info, admin_context,
                            notify_about_usage, type_id_str, type_name)
 
 
+def _load_checkpoint(LOG, begin, end):
+    if not CONF.checkpoint_file:
+        return {}
+    try:
+        with open(CONF.checkpoint_file) as f:
+            checkpoint = json.load(f)
+    except FileNotFoundError:
+        return {}
+    except (OSError, ValueError) as exc_msg:
+        LOG.warning("Ignoring unreadable checkpoint file %(file)s: "
+                    "%(exc_msg)s",
+                    {'file': CONF.checkpoint_file, 'exc_msg': exc_msg})
+        return {}
+
+    if (checkpoint.get('audit_period_beginning') != str(begin) or
+            checkpoint.get('audit_period_ending') != str(end)):
+        LOG.info("Ignoring checkpoint file %s of a different audit period",
+                 CONF.checkpoint_file)
+        return {}
+    LOG.info("Resuming volume usage audit from checkpoint file %s",
+             CONF.checkpoint_file)
+    return checkpoint.get('resources', {})
+
+
+def _save_checkpoint(begin, end, resources):
+    if not CONF.checkpoint_file:
+        return
+    checkpoint = {
+        'audit_period_beginning': str(begin),
+        'audit_period_ending': str(end),
+        'resources': resources,
+    }
+    tmp_file = CONF.checkpoint_file + '.tmp'
+    with open(tmp_file, 'w') as f:
+        json.dump(checkpoint, f)
+    # Replace the checkpoint atomically so a crash while saving it never
+    # leaves a truncated file behind.
+    os.replace(tmp_file, CONF.checkpoint_file)
+
+
+def _remove_checkpoint():
+    if not CONF.checkpoint_file:
+        return
+    try:
+        os.remove(CONF.checkpoint_file)
+    except FileNotFoundError:
+        pass
+
+
+class _RateLimiter(object):
+    """Limit the rate at which resources are handed to the worker pool."""
+
+    def __init__(self, max_per_second):
+        self.interval = 1.0 / max_per_second if max_per_second else 0
+        self.next_time = time.monotonic()
+
+    def wait(self):
+        if not self.interval:
+            return
+        now = time.monotonic()
+        if self.next_time > now:
+            time.sleep(self.next_time - now)
+        else:
+            self.next_time = now
+        self.next_time += self.interval
+
+
+def _audit_resources(LOG, pool, limiter, checkpoint, begin, end,
+                     resource_name, get_all_active_by_window, _notify_usage,
+                     notify_about_usage, type_id_str, type_name, extra_info,
+                     admin_context):
+    marker = checkpoint.get(resource_name)
+    if marker is True:
+        LOG.info("Skipping %s already audited", resource_name)
+        return
+
+    count = 0
+    while True:
+        objs = get_all_active_by_window(admin_context, begin, end,
+                                        marker=marker,
+                                        limit=CONF.batch_size)
+        for obj_ref in objs:
+            limiter.wait()
+            pool.spawn_n(_obj_ref_action, _notify_usage, LOG, obj_ref,
+                         extra_info, admin_context, begin, end,
+                         notify_about_usage, type_id_str, type_name)
+        pool.waitall()
+
+        count += len(objs)
+        if len(objs) < CONF.batch_size:
+            break
+        marker = objs[-1].id
+        checkpoint[resource_name] = marker
+        _save_checkpoint(begin, end, checkpoint)
+
+    checkpoint[resource_name] = True
+    _save_checkpoint(begin, end, checkpoint)
+    LOG.info("Found %(count)d %(resource)s", {'count': count,
+                                              'resource': resource_name})
+
+
 def main():
     objects.register_all()
     admin_context = context.get_admin_context()
@@ -213,33 +348,27 @@ def main():
         'audit_period_ending': str(end),
     }
 
-    volumes = objects.VolumeList.get_all_active_by_window(admin_context,
-                                                          begin,
-                                                          end)
-
-    LOG.info("Found %d volumes", len(volumes))
-    for volume_ref in volumes:
-        _obj_ref_action(_vol_notify_usage, LOG, volume_ref, extra_info,
-                        admin_context, begin, end,
-                        cinder.volume.volume_utils.notify_about_volume_usage,
-                        "volume_id", "volume")
-
-    snapshots = objects.SnapshotList.get_all_active_by_window(admin_context,
-                                                              begin, end)
-    LOG.info("Found %d snapshots", len(snapshots))
-    for snapshot_ref in snapshots:
-        _obj_ref_action(_snap_notify_usage, LOG, snapshot_ref, extra_info,
-                        admin_context, begin, end,
-                        cinder.volume.volume_utils.notify_about_snapshot_usage,
-                        "snapshot_id", "snapshot")
-
-    backups = objects.BackupList.get_all_active_by_window(admin_context,
-                                                          begin, end)
-
-    LOG.info("Found %d backups", len(backups))
-    for backup_ref in backups:
-        _obj_ref_action(_backup_notify_usage, LOG, backup_ref, extra_info,
-                        admin_context, begin, end,
-                        cinder.volume.volume_utils.notify_about_backup_usage,
-                        "backup_id", "backup")
+    checkpoint = _load_checkpoint(LOG, begin, end)
+    pool = eventlet.GreenPool(CONF.workers)
+    limiter = _RateLimiter(CONF.max_resources_per_second)
+
+    _audit_resources(LOG, pool, limiter, checkpoint, begin, end, 'volumes',
+                     objects.VolumeList.get_all_active_by_window,
+                     _vol_notify_usage,
+                     cinder.volume.volume_utils.notify_about_volume_usage,
+                     "volume_id", "volume", extra_info, admin_context)
+
+    _audit_resources(LOG, pool, limiter, checkpoint, begin, end, 'snapshots',
+                     objects.SnapshotList.get_all_active_by_window,
+                     _snap_notify_usage,
+                     cinder.volume.volume_utils.notify_about_snapshot_usage,
+                     "snapshot_id", "snapshot", extra_info, admin_context)
+
+    _audit_resources(LOG, pool, limiter, checkpoint, begin, end, 'backups',
+                     objects.BackupList.get_all_active_by_window,
+                     _backup_notify_usage,
+                     cinder.volume.volume_utils.notify_about_backup_usage,
+                     "backup_id", "backup", extra_info, admin_context)
+
+    _remove_checkpoint()
     LOG.info("Volume usage audit completed")
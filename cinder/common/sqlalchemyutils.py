@@ -18,10 +18,10 @@
 
 """Implementation of paginate query."""
 import datetime
+import operator
 
 from oslo_log import log as logging
 import sqlalchemy
-import sqlalchemy.sql as sa_sql
 from sqlalchemy.sql import type_api
 
 from cinder.db import api
@@ -56,6 +56,23 @@ def _get_default_column_value(model, column_name):
     return _TYPE_SCHEMA[attr_type.__visit_name__]
 
 
+def _get_marker_criterion(model, column_name, op, marker_value):
+    """Return the criterion comparing a column with a marker value.
+
+    NULL values are sorted as if they had the default value of the column,
+    so a NULL column matches the criterion when its default value does.
+    This is checked here instead of comparing the column wrapped in a CASE
+    expression so that the database can use the indexes of the column to
+    seek to the marker.
+    """
+    attr = getattr(model, column_name)
+    criterion = op(attr, marker_value)
+    if attr.nullable and op(_get_default_column_value(model, column_name),
+                            marker_value):
+        criterion = sqlalchemy.sql.or_(criterion, attr.is_(None))
+    return criterion
+
+
 # TODO(wangxiyuan): Use oslo_db.sqlalchemy.utils.paginate_query once it is
 # stable and afforded by the minimum version in requirement.txt.
 # copied from glance/db/sqlalchemy/api.py
@@ -142,26 +159,18 @@ def paginate_query(query, model, limit, sort_keys, marker=None,
         for i in range(0, len(sort_keys)):
             crit_attrs = []
             for j in range(0, i):
-                model_attr = getattr(model, sort_keys[j])
-                default = _get_default_column_value(model, sort_keys[j])
-                attr = sa_sql.expression.case(
-                    *[(model_attr.isnot(None), model_attr)],
-                    else_=default,
-                )
-                crit_attrs.append((attr == marker_values[j]))
+                crit_attrs.append(_get_marker_criterion(
+                    model, sort_keys[j], operator.eq, marker_values[j]))
 
             model_attr = getattr(model, sort_keys[i])
-            default = _get_default_column_value(model, sort_keys[i])
-            attr = sa_sql.expression.case(
-                *[(model_attr.isnot(None), model_attr)],
-                else_=default,
-            )
             if isinstance(model_attr.type, sqlalchemy.Boolean):
                 marker_values[i] = int(marker_values[i])
             if sort_dirs[i] == 'desc':
-                crit_attrs.append((attr < marker_values[i]))
+                crit_attrs.append(_get_marker_criterion(
+                    model, sort_keys[i], operator.lt, marker_values[i]))
             elif sort_dirs[i] == 'asc':
-                crit_attrs.append((attr > marker_values[i]))
+                crit_attrs.append(_get_marker_criterion(
+                    model, sort_keys[i], operator.gt, marker_values[i]))
             else:
                 raise ValueError(_("Unknown sort direction, "
                                    "must be 'desc' or 'asc'"))
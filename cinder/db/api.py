@@ -51,6 +51,32 @@ db_opts = [
     cfg.StrOpt('snapshot_name_template',
                default='snapshot-%s',
                help='Template string to be used to generate snapshot names'),
+    cfg.IntOpt('db_purge_batch_size',
+               default=1000, min=1,
+               help='Maximum number of rows deleted from a table in each '
+                    'transaction when purging deleted rows from the '
+                    'database.'),
+    cfg.IntOpt('db_purge_max_rows_per_second',
+               default=0, min=0,
+               help='Maximum number of rows per second deleted when purging '
+                    'deleted rows from the database, to limit the load it '
+                    'puts on the database. 0 means no limit.'),
+    cfg.IntOpt('db_purge_interval',
+               default=0, min=0,
+               help='Interval, in seconds, between runs of the scheduler '
+                    'task that purges the rows deleted more than '
+                    'db_purge_age_in_days days ago from the database. '
+                    '0 disables the task.'),
+    cfg.IntOpt('db_purge_age_in_days',
+               default=30, min=0,
+               help='Age, in days, of the deleted rows purged from the '
+                    'database by the scheduler task enabled with '
+                    'db_purge_interval.'),
+    cfg.IntOpt('db_purge_periodic_max_rows_per_second',
+               default=1000, min=0,
+               help='Maximum number of rows per second deleted by the '
+                    'scheduler task enabled with db_purge_interval. '
+                    '0 means no limit.'),
 ]
 
 backup_opts = [
@@ -444,11 +470,11 @@ def volume_get(context, volume_id):
 
 
 def volume_get_all(context, marker=None, limit=None, sort_keys=None,
-                   sort_dirs=None, filters=None, offset=None):
+                   sort_dirs=None, filters=None, offset=None, summary=False):
     """Get all volumes."""
     return IMPL.volume_get_all(context, marker, limit, sort_keys=sort_keys,
                                sort_dirs=sort_dirs, filters=filters,
-                               offset=offset)
+                               offset=offset, summary=summary)
 
 
 def calculate_resource_count(context, resource_type, filters):
@@ -478,13 +504,14 @@ def volume_get_all_by_generic_group(context, group_id, filters=None):
 
 def volume_get_all_by_project(context, project_id, marker, limit,
                               sort_keys=None, sort_dirs=None, filters=None,
-                              offset=None):
+                              offset=None, summary=False):
     """Get all volumes belonging to a project."""
     return IMPL.volume_get_all_by_project(context, project_id, marker, limit,
                                           sort_keys=sort_keys,
                                           sort_dirs=sort_dirs,
                                           filters=filters,
-                                          offset=offset)
+                                          offset=offset,
+                                          summary=summary)
 
 
 def get_volume_summary(context, project_only, filters=None):
@@ -684,13 +711,16 @@ def snapshot_data_get_for_project(context, project_id, volume_type_id=None,
 
 
 def snapshot_get_all_active_by_window(context, begin, end=None,
-                                      project_id=None):
+                                      project_id=None, marker=None,
+                                      limit=None):
     """Get all the snapshots inside the window.
 
-    Specifying a project_id will filter for a certain project.
+    Specifying a project_id will filter for a certain project.  Specifying a
+    limit will return a page of snapshots sorted by id after the marker id.
     """
     return IMPL.snapshot_get_all_active_by_window(context, begin, end,
-                                                  project_id)
+                                                  project_id, marker=marker,
+                                                  limit=limit)
 
 
 def get_snapshot_summary(context, project_only, filters=None):
@@ -860,13 +890,16 @@ def volume_type_destroy(context, type_id):
     return IMPL.volume_type_destroy(context, type_id)
 
 
-def volume_get_all_active_by_window(context, begin, end=None, project_id=None):
+def volume_get_all_active_by_window(context, begin, end=None, project_id=None,
+                                    marker=None, limit=None):
     """Get all the volumes inside the window.
 
-    Specifying a project_id will filter for a certain project.
+    Specifying a project_id will filter for a certain project.  Specifying a
+    limit will return a page of volumes sorted by id after the marker id.
     """
     return IMPL.volume_get_all_active_by_window(context, begin, end,
-                                                project_id)
+                                                project_id, marker=marker,
+                                                limit=limit)
 
 
 def volume_type_access_get_all(context, type_id):
@@ -1405,13 +1438,16 @@ def backup_get_all_by_volume(context, volume_id, vol_project_id, filters=None):
                                          filters=filters)
 
 
-def backup_get_all_active_by_window(context, begin, end=None, project_id=None):
+def backup_get_all_active_by_window(context, begin, end=None, project_id=None,
+                                    marker=None, limit=None):
     """Get all the backups inside the window.
 
-    Specifying a project_id will filter for a certain project.
+    Specifying a project_id will filter for a certain project.  Specifying a
+    limit will return a page of backups sorted by id after the marker id.
     """
     return IMPL.backup_get_all_active_by_window(context, begin, end,
-                                                project_id)
+                                                project_id, marker=marker,
+                                                limit=limit)
 
 
 def backup_update(context, backup_id, values):
@@ -1784,13 +1820,16 @@ def group_snapshot_creating_from_src():
 ###################
 
 
-def purge_deleted_rows(context, age_in_days):
+def purge_deleted_rows(context, age_in_days, batch_size=None,
+                       max_rows_per_second=None):
     """Purge deleted rows older than given age from cinder tables
 
     Raises InvalidParameterValue if age_in_days is incorrect.
-    :returns: number of deleted rows
+    :returns: dictionary with the number of deleted rows of each table
     """
-    return IMPL.purge_deleted_rows(context, age_in_days=age_in_days)
+    return IMPL.purge_deleted_rows(context, age_in_days=age_in_days,
+                                   batch_size=batch_size,
+                                   max_rows_per_second=max_rows_per_second)
 
 
 def get_booleans_for_table(table_name):
@@ -1832,7 +1871,8 @@ def driver_initiator_data_get(context, initiator, namespace):
 
 
 def image_volume_cache_create(context, host, cluster_name, image_id,
-                              image_updated_at, volume_id, size):
+                              image_updated_at, volume_id, size,
+                              status='available'):
     """Create a new image volume cache entry."""
     return IMPL.image_volume_cache_create(context,
                                           host,
@@ -1840,7 +1880,8 @@ def image_volume_cache_create(context, host, cluster_name, image_id,
                                           image_id,
                                           image_updated_at,
                                           volume_id,
-                                          size)
+                                          size,
+                                          status)
 
 
 def image_volume_cache_delete(context, volume_id):
@@ -1848,6 +1889,16 @@ def image_volume_cache_delete(context, volume_id):
     return IMPL.image_volume_cache_delete(context, volume_id)
 
 
+def image_volume_cache_delete_by_id(context, cache_id):
+    """Delete an image volume cache entry specified by its id."""
+    return IMPL.image_volume_cache_delete_by_id(context, cache_id)
+
+
+def image_volume_cache_update(context, cache_id, values):
+    """Update an image volume cache entry, returning the number updated."""
+    return IMPL.image_volume_cache_update(context, cache_id, values)
+
+
 def image_volume_cache_get_and_update_last_used(context, image_id, **filters):
     """Query for an image volume cache entry."""
     return IMPL.image_volume_cache_get_and_update_last_used(context,
@@ -1855,6 +1906,11 @@ def image_volume_cache_get_and_update_last_used(context, image_id, **filters):
                                                             **filters)
 
 
+def image_volume_cache_add_hit(context, cache_id):
+    """Increment the number of hits of an image volume cache entry."""
+    return IMPL.image_volume_cache_add_hit(context, cache_id)
+
+
 def image_volume_cache_get_by_volume_id(context, volume_id):
     """Query to see if a volume id is an image-volume contained in the cache"""
     return IMPL.image_volume_cache_get_by_volume_id(context, volume_id)
@@ -1865,6 +1921,11 @@ def image_volume_cache_get_all(context, **filters):
     return IMPL.image_volume_cache_get_all(context, **filters)
 
 
+def image_volume_cache_get_usage(context, **filters):
+    """Get the number and total size of the image volume cache entries."""
+    return IMPL.image_volume_cache_get_usage(context, **filters)
+
+
 def image_volume_cache_include_in_cluster(context, cluster,
                                           partial_rename=True, **filters):
     """Include in cluster image volume cache entries matching the filters.
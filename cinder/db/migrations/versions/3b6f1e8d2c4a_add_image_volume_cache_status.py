@@ -0,0 +1,49 @@
+# Licensed under the Apache License, Version 2.0 (the "License"); you may
+# not use this file except in compliance with the License. You may obtain
+# a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+# WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+# License for the specific language governing permissions and limitations
+# under the License.
+
+"""Add status to image volume cache entries
+
+Warming entries are created before their image-volume exists, so the
+volume_id of the entries becomes nullable.
+
+Revision ID: 3b6f1e8d2c4a
+Revises: 9c74c1c6971f
+Create Date: 2026-10-18 09:12:44.518302
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '3b6f1e8d2c4a'
+down_revision = '9c74c1c6971f'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Existing entries point to image-volumes that are ready to be cloned.
+    op.add_column('image_volume_cache_entries',
+                  sa.Column('status', sa.String(255), nullable=False,
+                            server_default='available'))
+
+    connection = op.get_bind()
+    # SQLite doesn't support dropping/altering tables, so we use a workaround
+    if connection.engine.name == 'sqlite':
+        with op.batch_alter_table('image_volume_cache_entries') as batch_op:
+            batch_op.alter_column('volume_id',
+                                  existing_type=sa.String(36),
+                                  nullable=True)
+    else:
+        op.alter_column('image_volume_cache_entries', 'volume_id',
+                        existing_type=sa.String(36),
+                        nullable=True)
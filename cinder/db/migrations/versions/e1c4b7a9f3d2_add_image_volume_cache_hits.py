@@ -0,0 +1,33 @@
+# Licensed under the Apache License, Version 2.0 (the "License"); you may
+# not use this file except in compliance with the License. You may obtain
+# a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+# WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+# License for the specific language governing permissions and limitations
+# under the License.
+
+"""Add hits to image volume cache entries
+
+Revision ID: e1c4b7a9f3d2
+Revises: 3b6f1e8d2c4a
+Create Date: 2026-10-18 11:37:05.204871
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = 'e1c4b7a9f3d2'
+down_revision = '3b6f1e8d2c4a'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.add_column('image_volume_cache_entries',
+                  sa.Column('hits', sa.Integer, nullable=False,
+                            server_default='0'))
@@ -0,0 +1,31 @@
+# Licensed under the Apache License, Version 2.0 (the "License"); you may
+# not use this file except in compliance with the License. You may obtain
+# a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+# WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+# License for the specific language governing permissions and limitations
+# under the License.
+
+"""Add volumes created_at index
+
+Revision ID: f5a2c7d94b18
+Revises: e1c4b7a9f3d2
+Create Date: 2026-10-18 14:12:48.530217
+"""
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = 'f5a2c7d94b18'
+down_revision = 'e1c4b7a9f3d2'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_index('volumes_deleted_created_at_id_idx', 'volumes',
+                    ['deleted', 'created_at', 'id'])
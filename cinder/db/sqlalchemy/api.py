@@ -41,6 +41,7 @@ import functools
 import itertools
 import re
 import sys
+import time
 import uuid
 
 from oslo_config import cfg
@@ -58,6 +59,7 @@ from sqlalchemy import MetaData
 from sqlalchemy import or_, and_
 from sqlalchemy.orm import joinedload, undefer_group, load_only
 from sqlalchemy.orm import RelationshipProperty
+from sqlalchemy.orm import selectinload
 from sqlalchemy import sql
 from sqlalchemy.sql.expression import bindparam
 from sqlalchemy.sql.expression import desc
@@ -2374,6 +2376,27 @@ def _volume_get_query(context, project_only=False, joined_load=True):
         )
 
 
+def _volumes_get_query(context):
+    """Get the query to retrieve lists of volumes.
+
+    Unlike _volume_get_query the metadata, admin metadata and attachments of
+    the volumes are loaded with a separate query for all the volumes instead
+    of being joined, as joining them returns a row for every combination of
+    them, and paginating it requires a subquery.
+    """
+    query = model_query(context, models.Volume).options(
+        selectinload(models.Volume.volume_metadata),
+        joinedload(models.Volume.volume_type),
+        selectinload(models.Volume.volume_attachment),
+        joinedload(models.Volume.consistencygroup),
+        joinedload(models.Volume.group),
+    )
+    if is_admin_context(context):
+        query = query.options(
+            selectinload(models.Volume.volume_admin_metadata))
+    return query
+
+
 @require_context
 def _volume_get(context, volume_id, joined_load=True, for_update=False):
     result = _volume_get_query(
@@ -2717,6 +2740,7 @@ def volume_get_all(
     sort_dirs=None,
     filters=None,
     offset=None,
+    summary=False,
 ):
     """Retrieves all volumes.
 
@@ -2735,6 +2759,9 @@ def volume_get_all(
     :param filters: dictionary of filters; values that are in lists, tuples,
         or sets cause an 'IN' operation, while exact matching is used for other
         values, see _process_volume_filters function for more information
+    :param offset: number of items to skip
+    :param summary: only retrieve the id and display_name of the volumes,
+        which is all that summary lists show, as dictionaries
     :returns: list of matching volumes
     """
     # Generate the query
@@ -2751,6 +2778,11 @@ def volume_get_all(
     # No volumes would match, return empty list
     if query is None:
         return []
+    if summary:
+        query = query.with_entities(models.Volume.id,
+                                    models.Volume.display_name)
+        return [{'id': volume_id, 'display_name': display_name}
+                for volume_id, display_name in query]
     return query.all()
 
 
@@ -2915,6 +2947,7 @@ def volume_get_all_by_project(
     sort_dirs=None,
     filters=None,
     offset=None,
+    summary=False,
 ):
     """Retrieves all volumes in a project.
 
@@ -2934,6 +2967,9 @@ def volume_get_all_by_project(
     :param filters: dictionary of filters; values that are in lists, tuples,
         or sets cause an 'IN' operation, while exact matching is used for other
         values, see _process_volume_filters function for more information
+    :param offset: number of items to skip
+    :param summary: only retrieve the id and display_name of the volumes,
+        which is all that summary lists show, as dictionaries
     :returns: list of matching volumes
     """
     authorize_project_context(context, project_id)
@@ -2954,9 +2990,28 @@ def volume_get_all_by_project(
     # No volumes would match, return empty list
     if query is None:
         return []
+    if summary:
+        query = query.with_entities(models.Volume.id,
+                                    models.Volume.display_name)
+        return [{'id': volume_id, 'display_name': display_name}
+                for volume_id, display_name in query]
     return query.all()
 
 
+def _paginate_by_id(query, model, marker, limit):
+    """Return a page of the query of at most limit rows after the marker id.
+
+    Unlike _generate_paginate_query the marker is the id itself, so rows
+    can be paged through without loading the marker and even after it has
+    been purged.
+    """
+    if limit is None:
+        return query
+    if marker is not None:
+        query = query.filter(model.id > marker)
+    return query.order_by(model.id).limit(limit)
+
+
 def _generate_paginate_query(
     context,
     marker,
@@ -3005,6 +3060,28 @@ def _generate_paginate_query(
     if marker is not None:
         marker_object = get(context, marker)
 
+    if offset:
+        # Skipping rows with an offset makes the database build every one of
+        # them, with all their joined relations, only to discard them.  So
+        # find the last row before the page selecting only the sort keys,
+        # which the database can resolve using an index, and then get the
+        # page after it as if it was the marker.
+        boundary_query = sqlalchemyutils.paginate_query(
+            query,
+            paginate_type,
+            1,
+            sort_keys,
+            marker=marker_object,
+            sort_dirs=sort_dirs,
+            offset=offset - 1,
+        )
+        marker_object = boundary_query.with_entities(
+            *[getattr(paginate_type, key) for key in sort_keys]
+        ).first()
+        if marker_object is None:
+            return None
+        offset = None
+
     return sqlalchemyutils.paginate_query(
         query,
         paginate_type,
@@ -4129,7 +4206,7 @@ def snapshot_data_get_for_project(
 @require_context
 @main_context_manager.reader
 def snapshot_get_all_active_by_window(
-    context, begin, end=None, project_id=None
+    context, begin, end=None, project_id=None, marker=None, limit=None
 ):
     """Return snapshots that were active during window."""
 
@@ -4146,6 +4223,7 @@ def snapshot_get_all_active_by_window(
         query = query.filter(models.Snapshot.created_at < end)
     if project_id:
         query = query.filter_by(project_id=project_id)
+    query = _paginate_by_id(query, models.Snapshot, marker, limit)
 
     return query.all()
 
@@ -5187,7 +5265,9 @@ def group_type_destroy(context, type_id):
 
 @require_context
 @main_context_manager.reader
-def volume_get_all_active_by_window(context, begin, end=None, project_id=None):
+def volume_get_all_active_by_window(
+    context, begin, end=None, project_id=None, marker=None, limit=None
+):
     """Return volumes that were active during window."""
     query = model_query(context, models.Volume, read_deleted="yes")
     query = query.filter(
@@ -5211,6 +5291,7 @@ def volume_get_all_active_by_window(context, begin, end=None, project_id=None):
 
     if is_admin_context(context):
         query = query.options(joinedload(models.Volume.volume_admin_metadata))
+    query = _paginate_by_id(query, models.Volume, marker, limit)
 
     return query.all()
 
@@ -6510,7 +6591,9 @@ def backup_get_all_by_volume(context, volume_id, vol_project_id, filters=None):
 
 @require_context
 @main_context_manager.reader
-def backup_get_all_active_by_window(context, begin, end=None, project_id=None):
+def backup_get_all_active_by_window(
+    context, begin, end=None, project_id=None, marker=None, limit=None
+):
     """Return backups that were active during window."""
 
     query = model_query(context, models.Backup, read_deleted="yes").options(
@@ -6526,6 +6609,7 @@ def backup_get_all_active_by_window(context, begin, end=None, project_id=None):
         query = query.filter(models.Backup.created_at < end)
     if project_id:
         query = query.filter_by(project_id=project_id)
+    query = _paginate_by_id(query, models.Backup, marker, limit)
 
     return query.all()
 
@@ -8079,10 +8163,63 @@ def group_snapshot_creating_from_src():
 ###############################
 
 
+def _purge_table_rows(context, table, conditions, batch_size,
+                      max_rows_per_second):
+    """Delete the rows of a table matching the conditions in batches.
+
+    Each batch is deleted in its own transaction, so that the locks on the
+    table are released after every batch_size rows.
+    """
+    primary_key = list(table.primary_key.columns)
+    if not primary_key:
+        with main_context_manager.writer.using(context):
+            result = context.session.execute(
+                table.delete().where(and_(*conditions)))
+        return result.rowcount
+
+    rows_purged = 0
+    while True:
+        start = time.monotonic()
+        with main_context_manager.writer.using(context):
+            keys = context.session.execute(
+                sa.select(*primary_key).where(and_(*conditions)).limit(
+                    batch_size)
+            ).all()
+            if not keys:
+                break
+            if len(primary_key) == 1:
+                batch = primary_key[0].in_([key[0] for key in keys])
+            else:
+                batch = sa.tuple_(*primary_key).in_(keys)
+            result = context.session.execute(table.delete().where(batch))
+
+        rows_purged += result.rowcount
+        LOG.debug('Deleted %(rows)d rows from table=%(table)s, %(total)d so '
+                  'far', {'rows': result.rowcount, 'table': table,
+                          'total': rows_purged})
+        if len(keys) < batch_size:
+            break
+
+        if max_rows_per_second:
+            delay = (len(keys) / max_rows_per_second -
+                     (time.monotonic() - start))
+            if delay > 0:
+                time.sleep(delay)
+
+    return rows_purged
+
+
 @require_admin_context
-@main_context_manager.writer
-def purge_deleted_rows(context, age_in_days):
-    """Purge deleted rows older than age from cinder tables."""
+def purge_deleted_rows(context, age_in_days, batch_size=None,
+                       max_rows_per_second=None):
+    """Purge deleted rows older than age from cinder tables.
+
+    Rows are deleted in batches of batch_size rows, each one in its own
+    transaction, and at most max_rows_per_second rows are deleted per
+    second, both defaulting to their configuration options.
+
+    :returns: dictionary with the number of deleted rows of each table
+    """
     try:
         age_in_days = int(age_in_days)
     except ValueError:
@@ -8090,10 +8227,16 @@ def purge_deleted_rows(context, age_in_days):
         LOG.exception(msg, {'age': age_in_days})
         raise exception.InvalidParameterValue(msg % {'age': age_in_days})
 
+    if batch_size is None:
+        batch_size = CONF.db_purge_batch_size
+    if max_rows_per_second is None:
+        max_rows_per_second = CONF.db_purge_max_rows_per_second
+
     engine = get_engine()
     metadata = MetaData()
     metadata.reflect(engine)
 
+    purged = {}
     for table in reversed(metadata.sorted_tables):
         if 'deleted' not in table.columns.keys():
             continue
@@ -8105,24 +8248,28 @@ def purge_deleted_rows(context, age_in_days):
         )
 
         deleted_age = timeutils.utcnow() - dt.timedelta(days=age_in_days)
+        conditions = [
+            table.columns.deleted.is_(True),
+            table.c.deleted_at < deleted_age,
+        ]
+        rows_purged = 0
         try:
             # Delete child records first from quality_of_service_specs
             # table to avoid FK constraints
             if str(table) == 'quality_of_service_specs':
-                context.session.query(models.QualityOfServiceSpecs).filter(
-                    and_(
-                        models.QualityOfServiceSpecs.specs_id.isnot(None),
-                        models.QualityOfServiceSpecs.deleted.is_(True),
-                        models.QualityOfServiceSpecs.deleted_at < deleted_age,
-                    )
-                ).delete()
-            result = context.session.execute(
-                table.delete().where(
-                    and_(
-                        table.columns.deleted.is_(True),
-                        table.c.deleted_at < deleted_age,
-                    )
+                rows_purged += _purge_table_rows(
+                    context,
+                    table,
+                    conditions + [table.c.specs_id.isnot(None)],
+                    batch_size,
+                    max_rows_per_second,
                 )
+            rows_purged += _purge_table_rows(
+                context,
+                table,
+                conditions,
+                batch_size,
+                max_rows_per_second,
             )
         except db_exc.DBReferenceError as ex:
             LOG.error(
@@ -8131,12 +8278,13 @@ def purge_deleted_rows(context, age_in_days):
             )
             raise
 
-        rows_purged = result.rowcount
+        purged[table.name] = rows_purged
         if rows_purged != 0:
             LOG.info(
                 'Deleted %(row)d rows from table=%(table)s',
                 {'row': rows_purged, 'table': table},
             )
+    return purged
 
 
 ###############################
@@ -8379,6 +8527,7 @@ def image_volume_cache_create(
     image_updated_at,
     volume_id,
     size,
+    status='available',
 ):
     cache_entry = models.ImageVolumeCacheEntry()
     cache_entry.host = host
@@ -8387,6 +8536,7 @@ def image_volume_cache_create(
     cache_entry.image_updated_at = image_updated_at
     cache_entry.volume_id = volume_id
     cache_entry.size = size
+    cache_entry.status = status
     context.session.add(cache_entry)
     return cache_entry
 
@@ -8399,6 +8549,24 @@ def image_volume_cache_delete(context, volume_id):
     ).filter_by(volume_id=volume_id).delete()
 
 
+@require_context
+@main_context_manager.writer
+def image_volume_cache_delete_by_id(context, cache_id):
+    context.session.query(
+        models.ImageVolumeCacheEntry,
+    ).filter_by(id=cache_id).delete()
+
+
+@require_context
+@main_context_manager.writer
+def image_volume_cache_update(context, cache_id, values):
+    return (
+        context.session.query(models.ImageVolumeCacheEntry)
+        .filter_by(id=cache_id)
+        .update(values)
+    )
+
+
 @require_context
 @main_context_manager.writer
 def image_volume_cache_get_and_update_last_used(context, image_id, **filters):
@@ -8417,6 +8585,16 @@ def image_volume_cache_get_and_update_last_used(context, image_id, **filters):
     return entry
 
 
+@require_context
+@main_context_manager.writer
+def image_volume_cache_add_hit(context, cache_id):
+    return (
+        context.session.query(models.ImageVolumeCacheEntry)
+        .filter_by(id=cache_id)
+        .update({'hits': models.ImageVolumeCacheEntry.hits + 1})
+    )
+
+
 @require_context
 @main_context_manager.reader
 def image_volume_cache_get_by_volume_id(context, volume_id):
@@ -8439,6 +8617,22 @@ def image_volume_cache_get_all(context, **filters):
     )
 
 
+@require_context
+@main_context_manager.reader
+def image_volume_cache_get_usage(context, **filters):
+    filters = _clean_filters(filters)
+    result = (
+        context.session.query(
+            func.count(models.ImageVolumeCacheEntry.id),
+            func.sum(models.ImageVolumeCacheEntry.size),
+        )
+        .filter_by(**filters)
+        .first()
+    )
+    # NOTE: convert None to 0
+    return (result[0] or 0, result[1] or 0)
+
+
 @require_admin_context
 @main_context_manager.writer
 def image_volume_cache_include_in_cluster(
@@ -8638,7 +8832,7 @@ def remove_temporary_admin_metadata_data_migration(context, max_count):
 
 
 PAGINATION_HELPERS = {
-    models.Volume: (_volume_get_query, _process_volume_filters, _volume_get),
+    models.Volume: (_volumes_get_query, _process_volume_filters, _volume_get),
     models.Snapshot: (_snaps_get_query, _process_snaps_filters, _snapshot_get),
     models.Backup: (_backups_get_query, _process_backups_filters, _backup_get),
     models.QualityOfServiceSpecs: (
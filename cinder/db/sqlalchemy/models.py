@@ -320,6 +320,9 @@ class Volume(BASE, CinderBase):
         # Speed up service start, create volume from image when using direct
         # urls, host REST API, and the cinder-manage update host cmd
         sa.Index('volumes_deleted_host_idx', 'deleted', 'host'),
+        # Speed up paginated listings, which are sorted by these by default
+        sa.Index('volumes_deleted_created_at_id_idx',
+                 'deleted', 'created_at', 'id'),
         CinderBase.__table_args__,
     )
 
@@ -1192,11 +1195,20 @@ class ImageVolumeCacheEntry(BASE, models.ModelBase):
     image_id = sa.Column(sa.String(36), index=True, nullable=False)
     # TODO(stephenfin): Add nullable=False
     image_updated_at = sa.Column(sa.DateTime)
-    volume_id = sa.Column(sa.String(36), nullable=False)
+    # None for warming entries, whose image-volume doesn't exist yet
+    volume_id = sa.Column(sa.String(36), nullable=True)
     size = sa.Column(sa.Integer, nullable=False)
     last_used = sa.Column(
         sa.DateTime, nullable=False, default=lambda: timeutils.utcnow(),
     )
+    # 'warming' while the image-volume is being created, 'available' after
+    status = sa.Column(
+        sa.String(255), nullable=False, server_default='available',
+    )
+    # Number of times the entry has been used to create a volume
+    hits = sa.Column(
+        sa.Integer, nullable=False, default=0, server_default='0',
+    )
 
 
 class Worker(BASE, CinderBase):
@@ -12,11 +12,16 @@
 #    License for the specific language governing permissions and limitations
 #    under the License.
 
-from typing import Optional
+import abc
+import contextlib
+import datetime
+import time
+from typing import Callable, Iterator, Optional
 from zoneinfo import ZoneInfo
 
 from oslo_config import cfg
 from oslo_log import log as logging
+from oslo_service import loopingcall
 from oslo_utils import timeutils
 
 from cinder import context
@@ -28,6 +33,117 @@ CONF = cfg.CONF
 
 LOG = logging.getLogger(__name__)
 
+# Status of the cache entries. Warming entries have no image-volume yet,
+# and are removed once the image-volume has been created.
+AVAILABLE = 'available'
+WARMING = 'warming'
+
+# Seconds after which the hits of an entry that hasn't been used are halved,
+# so that entries that used to be popular can be evicted eventually.
+LFU_HITS_HALF_LIFE = 24 * 3600
+
+# Seconds between checks of a warming entry.
+WARMING_POLL_INTERVAL = 2
+# Seconds between refreshes of the last_used time of a warming entry by the
+# request creating it. Entries not refreshed for WARMING_STALE_TIME seconds
+# were left behind by a request that is no longer running.
+WARMING_HEARTBEAT_INTERVAL = 30
+WARMING_STALE_TIME = 3 * WARMING_HEARTBEAT_INTERVAL
+
+
+class EvictionPolicy(object, metaclass=abc.ABCMeta):
+    """Chooses the image-volume cache entries to evict."""
+
+    @abc.abstractmethod
+    def select(self, entries: list, gb_to_free: int,
+               count_to_free: int) -> list:
+        """Select the entries to evict to free enough space and entries.
+
+        :param entries: Entries ordered from most to least recently used.
+        :param gb_to_free: Total size of the entries to evict.
+        :param count_to_free: Number of entries to evict.
+        :returns: The entries to evict, all of them if there is no way to
+                  free enough space.
+        """
+        pass
+
+    @staticmethod
+    def _take(entries, gb_to_free, count_to_free):
+        selected: list = []
+        for entry in entries:
+            if gb_to_free <= 0 and len(selected) >= count_to_free:
+                break
+            selected.append(entry)
+            gb_to_free -= entry['size']
+        return selected
+
+
+class LRUEvictionPolicy(EvictionPolicy):
+    """Evict the least recently used entries first."""
+
+    def select(self, entries, gb_to_free, count_to_free):
+        return self._take(reversed(entries), gb_to_free, count_to_free)
+
+
+class LFUEvictionPolicy(EvictionPolicy):
+    """Evict the entries with the fewest hits first.
+
+    The hits of an entry are halved for every LFU_HITS_HALF_LIFE seconds it
+    has not been used. Among entries with the same number of hits the least
+    recently used ones are evicted first.
+    """
+
+    def select(self, entries, gb_to_free, count_to_free):
+        now = timeutils.utcnow()
+
+        def decayed_hits(entry):
+            last_used = timeutils.normalize_time(entry['last_used'])
+            idle = max((now - last_used).total_seconds(), 0)
+            return entry['hits'] >> int(idle // LFU_HITS_HALF_LIFE)
+
+        # Sorting is stable, so this keeps the least recently used first.
+        entries = sorted(reversed(entries), key=decayed_hits)
+        return self._take(entries, gb_to_free, count_to_free)
+
+
+class SizeEvictionPolicy(EvictionPolicy):
+    """Evict as few entries as possible.
+
+    This keeps many small images from being evicted to make room for a large
+    one. Among the ways of freeing enough space with that number of entries
+    the least recently used entries are preferred.
+    """
+
+    def select(self, entries, gb_to_free, count_to_free):
+        by_size = sorted(entries, key=lambda entry: entry['size'],
+                         reverse=True)
+        needed = len(self._take(by_size, gb_to_free, count_to_free))
+        if sum(entry['size'] for entry in by_size[:needed]) < gb_to_free:
+            return list(entries)
+
+        # Go through the entries from least recently used, taking each one
+        # as long as the remaining space can still be freed by the largest
+        # of the entries after it.
+        candidates = list(reversed(entries))
+        selected: list = []
+        for i, entry in enumerate(candidates):
+            if len(selected) == needed:
+                break
+            slots = needed - len(selected) - 1
+            largest = sorted((e['size'] for e in candidates[i + 1:]),
+                             reverse=True)[:slots]
+            if entry['size'] + sum(largest) >= gb_to_free:
+                selected.append(entry)
+                gb_to_free -= entry['size']
+        return selected
+
+
+EVICTION_POLICIES: dict[str, Callable[[], EvictionPolicy]] = {
+    'lru': LRUEvictionPolicy,
+    'lfu': LFUEvictionPolicy,
+    'size': SizeEvictionPolicy,
+}
+
 
 class ImageVolumeCache(object):
     def __init__(self,
@@ -35,12 +151,16 @@ class ImageVolumeCache(object):
                  volume_api,
                  max_cache_size_gb: int = 0,
                  max_cache_size_count: int = 0,
-                 clone_across_pools: bool = False):
+                 clone_across_pools: bool = False,
+                 warming_timeout: int = 0,
+                 eviction_policy: str = 'lru'):
         self.db = db
         self.volume_api = volume_api
         self.max_cache_size_gb = int(max_cache_size_gb)
         self.max_cache_size_count = int(max_cache_size_count)
         self.clone_across_pools = bool(clone_across_pools)
+        self.warming_timeout = int(warming_timeout)
+        self.eviction_policy = EVICTION_POLICIES[eviction_policy]()
         self.notifier = rpc.get_notifier('volume', CONF.host)
 
     def get_by_image_volume(self,
@@ -77,6 +197,7 @@ class ImageVolumeCache(object):
         cache_entry = self.db.image_volume_cache_get_and_update_last_used(
             context,
             image_id,
+            status=AVAILABLE,
             **self._get_query_filters(volume_ref)
         )
 
@@ -99,6 +220,12 @@ class ImageVolumeCache(object):
                                     volume_ref['host'])
         return cache_entry
 
+    def record_hit(self,
+                   context: context.RequestContext,
+                   cache_entry: dict) -> None:
+        """Count a volume created from a cache entry."""
+        self.db.image_volume_cache_add_hit(context, cache_entry['id'])
+
     def create_cache_entry(self,
                            context: context.RequestContext,
                            volume_ref: objects.Volume,
@@ -114,22 +241,12 @@ class ImageVolumeCache(object):
                   {'image_id': image_id,
                    'service': volume_ref.service_topic_queue})
 
-        # When we are creating an image from a volume the updated_at field
-        # will be a unicode representation of the datetime. In that case
-        # we just need to parse it into one. If it is an actual datetime
-        # we want to just grab it as a UTC naive datetime.
-        image_updated_at = image_meta['updated_at']
-        if isinstance(image_updated_at, str):
-            image_updated_at = timeutils.parse_strtime(image_updated_at)
-        else:
-            image_updated_at = image_updated_at.astimezone(ZoneInfo('UTC'))
-
         cache_entry = self.db.image_volume_cache_create(
             context,
             volume_ref.host,
             volume_ref.cluster_name,
             image_id,
-            image_updated_at.replace(tzinfo=None),
+            self._get_image_updated_at(image_meta),
             volume_ref.id,
             volume_ref.size
         )
@@ -138,6 +255,146 @@ class ImageVolumeCache(object):
                   {'entry': self._entry_to_str(cache_entry)})
         return cache_entry
 
+    def create_warming_entry(self,
+                             context: context.RequestContext,
+                             volume_ref: objects.Volume,
+                             image_id: str,
+                             image_meta: dict) -> Optional[dict]:
+        """Record that a cache entry for an image is being created.
+
+        The image is being downloaded to the volume described by volume_ref,
+        which will be cloned into the image-volume of the new cache entry.
+        Requests for the same image arriving in the meantime can wait for
+        that entry instead of downloading the image themselves.
+        """
+        if not self.warming_timeout:
+            return None
+
+        cache_entry = self.db.image_volume_cache_create(
+            context,
+            volume_ref.host,
+            volume_ref.cluster_name,
+            image_id,
+            self._get_image_updated_at(image_meta),
+            None,
+            volume_ref.size,
+            status=WARMING
+        )
+
+        LOG.debug('Warming image-volume cache entry created: %(entry)s.',
+                  {'entry': self._entry_to_str(cache_entry)})
+        return cache_entry
+
+    def delete_warming_entry(self,
+                             context: context.RequestContext,
+                             cache_entry: Optional[dict]) -> None:
+        if not cache_entry:
+            return
+        LOG.debug('Removing warming image-volume cache entry: %(entry)s.',
+                  {'entry': self._entry_to_str(cache_entry)})
+        self.db.image_volume_cache_delete_by_id(context, cache_entry['id'])
+
+    def _refresh_warming_entry(self,
+                               context: context.RequestContext,
+                               cache_entry: dict) -> None:
+        try:
+            self.db.image_volume_cache_update(
+                context, cache_entry['id'], {'last_used': timeutils.utcnow()})
+        except Exception:
+            LOG.warning('Failed to refresh warming image-volume cache '
+                        'entry %(entry)s.',
+                        {'entry': self._entry_to_str(cache_entry)})
+
+    @contextlib.contextmanager
+    def warming(self,
+                context: context.RequestContext,
+                volume_ref: objects.Volume,
+                image_id: str,
+                image_meta: dict) -> Iterator[Optional[dict]]:
+        """Keep a warming cache entry for an image while the block runs.
+
+        The entry is refreshed every WARMING_HEARTBEAT_INTERVAL seconds so
+        that other requests don't take it as stale, and is removed when the
+        block exits.
+        """
+        cache_entry = self.create_warming_entry(context, volume_ref,
+                                                image_id, image_meta)
+        heartbeat = None
+        if cache_entry:
+            heartbeat = loopingcall.FixedIntervalLoopingCall(
+                self._refresh_warming_entry, context, cache_entry)
+            heartbeat.start(interval=WARMING_HEARTBEAT_INTERVAL,
+                            initial_delay=WARMING_HEARTBEAT_INTERVAL)
+        try:
+            yield cache_entry
+        finally:
+            if heartbeat:
+                heartbeat.stop()
+            self.delete_warming_entry(context, cache_entry)
+
+    @staticmethod
+    def _is_stale(cache_entry: dict) -> bool:
+        return timeutils.is_older_than(cache_entry['last_used'],
+                                       WARMING_STALE_TIME)
+
+    def get_warming_entry(self,
+                          context: context.RequestContext,
+                          volume_ref: objects.Volume,
+                          image_id: str) -> Optional[dict]:
+        """Get the cache entry being created for an image, if any.
+
+        Entries that haven't been refreshed for WARMING_STALE_TIME seconds
+        were left behind by failed requests and are removed.
+        """
+        if not self.warming_timeout:
+            return None
+
+        entries = self.db.image_volume_cache_get_all(
+            context,
+            image_id=image_id,
+            status=WARMING,
+            **self._get_query_filters(volume_ref))
+
+        for entry in entries:
+            if self._is_stale(entry):
+                LOG.warning('Removing stale warming image-volume cache '
+                            'entry %(entry)s.',
+                            {'entry': self._entry_to_str(entry)})
+                self.delete_warming_entry(context, entry)
+                continue
+            return entry
+        return None
+
+    def wait_for_warming_entry(self,
+                               context: context.RequestContext,
+                               cache_entry: dict) -> bool:
+        """Wait until a warming cache entry is no longer being created.
+
+        Waits for up to the warming timeout, and stops early if the request
+        creating the entry stops refreshing it. Returns True if the entry
+        finished, in which case the new cache entry can be looked up with
+        get_entry unless its creation failed, and False otherwise.
+        """
+        LOG.debug('Waiting for image-volume cache entry %(entry)s.',
+                  {'entry': self._entry_to_str(cache_entry)})
+        deadline = (timeutils.utcnow() +
+                    datetime.timedelta(seconds=self.warming_timeout))
+        while timeutils.utcnow() < deadline:
+            time.sleep(WARMING_POLL_INTERVAL)
+            entries = self.db.image_volume_cache_get_all(
+                context, id=cache_entry['id'])
+            if not entries or entries[0]['status'] != WARMING:
+                return True
+            if self._is_stale(entries[0]):
+                LOG.warning('Stopped waiting for stale image-volume cache '
+                            'entry %(entry)s.',
+                            {'entry': self._entry_to_str(cache_entry)})
+                return False
+
+        LOG.warning('Timed out waiting for image-volume cache entry '
+                    '%(entry)s.', {'entry': self._entry_to_str(cache_entry)})
+        return False
+
     def ensure_space(self,
                      context: context.RequestContext,
                      volume: objects.Volume) -> bool:
@@ -157,17 +414,11 @@ class ImageVolumeCache(object):
                 volume.size > self.max_cache_size_gb):
             return False
 
-        # Assume the entries are ordered by most recently used to least used.
-        entries = self.db.image_volume_cache_get_all(
+        current_count, current_size = self.db.image_volume_cache_get_usage(
             context,
+            status=AVAILABLE,
             **self._get_query_filters(volume))
 
-        current_count = len(entries)
-
-        current_size = 0
-        for entry in entries:
-            current_size += entry['size']
-
         # Add values for the entry we intend to create.
         current_size += volume.size
         current_count += 1
@@ -181,22 +432,34 @@ class ImageVolumeCache(object):
                    'count': current_count,
                    'max_count': self.max_cache_size_count})
 
-        while (((current_size > self.max_cache_size_gb and
-                 self.max_cache_size_gb > 0)
-                or (current_count > self.max_cache_size_count and
-                    self.max_cache_size_count > 0))
-               and len(entries)):
-            entry = entries.pop()
-            LOG.debug('Reclaiming image-volume cache space; removing cache '
-                      'entry %(entry)s.', {'entry': self._entry_to_str(entry)})
-            self._delete_image_volume(context, entry)
-            current_size -= entry['size']
-            current_count -= 1
-            LOG.debug('Image-volume cache for %(service)s new size (GB) = '
-                      '%(size_gb)s, new count = %(count)s.',
-                      {'service': volume.service_topic_queue,
-                       'size_gb': current_size,
-                       'count': current_count})
+        gb_to_free = 0
+        if self.max_cache_size_gb > 0:
+            gb_to_free = max(current_size - self.max_cache_size_gb, 0)
+        count_to_free = 0
+        if self.max_cache_size_count > 0:
+            count_to_free = max(current_count - self.max_cache_size_count, 0)
+
+        if gb_to_free or count_to_free:
+            # Assume the entries are ordered by most recently used to least
+            # used.
+            entries = self.db.image_volume_cache_get_all(
+                context,
+                status=AVAILABLE,
+                **self._get_query_filters(volume))
+
+            for entry in self.eviction_policy.select(entries, gb_to_free,
+                                                     count_to_free):
+                LOG.debug('Reclaiming image-volume cache space; removing '
+                          'cache entry %(entry)s.',
+                          {'entry': self._entry_to_str(entry)})
+                self._delete_image_volume(context, entry)
+                current_size -= entry['size']
+                current_count -= 1
+                LOG.debug('Image-volume cache for %(service)s new size (GB) '
+                          '= %(size_gb)s, new count = %(count)s.',
+                          {'service': volume.service_topic_queue,
+                           'size_gb': current_size,
+                           'count': current_count})
 
         # It is only possible to not free up enough gb, we will always be able
         # to free enough count. This is because 0 means unlimited which means
@@ -255,6 +518,19 @@ class ImageVolumeCache(object):
         # Delete will evict the cache entry.
         self.volume_api.delete(context, volume)
 
+    @staticmethod
+    def _get_image_updated_at(image_meta: dict) -> datetime.datetime:
+        # When we are creating an image from a volume the updated_at field
+        # will be a unicode representation of the datetime. In that case
+        # we just need to parse it into one. If it is an actual datetime
+        # we want to just grab it as a UTC naive datetime.
+        image_updated_at = image_meta['updated_at']
+        if isinstance(image_updated_at, str):
+            image_updated_at = timeutils.parse_strtime(image_updated_at)
+        else:
+            image_updated_at = image_updated_at.astimezone(ZoneInfo('UTC'))
+        return image_updated_at.replace(tzinfo=None)
+
     def _should_update_entry(self,
                              cache_entry: dict,
                              image_meta: dict) -> bool:
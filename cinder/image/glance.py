@@ -17,9 +17,14 @@
 """Implementation of an image service that uses Glance as the backend"""
 
 import copy
+import hashlib
+import http.client
+import io
 import itertools
+import os
 import random
 import shutil
+import stat
 import sys
 import textwrap
 import time
@@ -27,13 +32,17 @@ from typing import (Any, Callable, Iterable, NoReturn, Optional)
 import urllib
 import urllib.parse
 
+from eventlet import greenpool
+from eventlet import tpool
 import glanceclient
 import glanceclient.exc
 from keystoneauth1.loading import session as ks_session
 from oslo_config import cfg
 from oslo_log import log as logging
 from oslo_serialization import jsonutils
+from oslo_utils.secretutils import md5
 from oslo_utils import timeutils
+from oslo_utils import units
 
 from cinder import context
 from cinder import exception
@@ -75,6 +84,21 @@ image_opts = [
                     'catalog. Format is: separated values of the form: '
                     '<service_type>:<service_name>:<endpoint_type> - '
                     'Only used if glance_api_servers are not provided.'),
+    cfg.IntOpt('glance_download_streams',
+               default=1,
+               min=1,
+               help='Number of concurrent streams used to download an image '
+                    'into a file. When greater than 1, images larger than '
+                    'glance_download_range_size_mb are downloaded in byte '
+                    'ranges, each one retried on its own, and the checksum '
+                    'of the image is validated once all of them are done. '
+                    'Images in stores that cannot serve byte ranges are '
+                    'downloaded in a single stream.'),
+    cfg.IntOpt('glance_download_range_size_mb',
+               default=64,
+               min=1,
+               help='Size in MB of the byte ranges an image is downloaded '
+                    'in when glance_download_streams is greater than 1.'),
 ]
 glance_core_properties_opts = [
     cfg.ListOpt('glance_core_properties',
@@ -180,6 +204,61 @@ def get_api_servers(context: context.RequestContext) -> Iterable:
     return itertools.cycle(api_servers_info)
 
 
+class _RangesNotSupported(Exception):
+    """The image store can't serve byte ranges of the image."""
+
+
+def _get_file_descriptor(data: Any) -> Optional[int]:
+    """Return the file descriptor of data if it is a regular file."""
+    try:
+        fd = data.fileno()
+        if (isinstance(data.name, str) and
+                stat.S_ISREG(os.fstat(fd).st_mode)):
+            return fd
+    except (AttributeError, OSError, io.UnsupportedOperation):
+        pass
+    return None
+
+
+def _get_ranges(size: int) -> list[tuple[int, int]]:
+    """Split an image of the given size in ranges to download.
+
+    Returns an empty list if the image fits in a single range.
+    """
+    range_size = CONF.glance_download_range_size_mb * units.Mi
+    if size <= range_size:
+        return []
+    return [(start, min(start + range_size, size))
+            for start in range(0, size, range_size)]
+
+
+def _copy_file_range(src_fd: int, dst_fd: int, start: int, end: int) -> None:
+    while start < end:
+        chunk = os.pread(src_fd, min(units.Mi, end - start), start)
+        if not chunk:
+            raise IOError(_('Unexpected end of file at offset %d.') % start)
+        os.pwrite(dst_fd, chunk, start)
+        start += len(chunk)
+
+
+def _run_concurrently(func: Callable, args_list: list[tuple]) -> None:
+    """Call func with each args in glance_download_streams green threads.
+
+    All the calls are finished before the first error is raised, so nothing
+    is written to the image file anymore once this returns.
+    """
+    def _call(args):
+        try:
+            func(*args)
+        except Exception as e:
+            return e
+
+    pool = greenpool.GreenPool(CONF.glance_download_streams)
+    errors = [error for error in pool.imap(_call, args_list) if error]
+    if errors:
+        raise errors[0]
+
+
 class GlanceClientWrapper(object):
     """Glance client wrapper class that implements retries."""
 
@@ -223,7 +302,7 @@ class GlanceClientWrapper(object):
              context: context.RequestContext,
              method: str,
              *args: Any,
-             **kwargs: str) -> Any:
+             **kwargs: Any) -> Any:
         """Call a glance client method.
 
         If we get a connection error,
@@ -383,6 +462,139 @@ class GlanceImageService(object):
         except Exception:
             _reraise_translated_image_exception(image_id)
 
+    def _copy_file_ranges(self, src: Any, data: Any) -> bool:
+        """Copy an image file to data with concurrent ranged copies.
+
+        Returns False if the file is copied in a single stream instead.
+        """
+        dst_fd = _get_file_descriptor(data)
+        if dst_fd is None or CONF.glance_download_streams < 2:
+            return False
+        ranges = _get_ranges(os.fstat(src.fileno()).st_size)
+        if not ranges:
+            return False
+
+        os.ftruncate(dst_fd, ranges[-1][1])
+        src_fd = src.fileno()
+        _run_concurrently(
+            tpool.execute,
+            [(_copy_file_range, src_fd, dst_fd, start, end)
+             for start, end in ranges])
+        return True
+
+    def _download_range(self,
+                        context: context.RequestContext,
+                        image_id: str,
+                        fd: int,
+                        start: int,
+                        end: int) -> None:
+        """Download a byte range of an image into a file.
+
+        A failed download is resumed from the last byte written, up to
+        glance_num_retries times.
+        """
+        url = '/v2/images/%s/file' % image_id
+        num_attempts = 1 + CONF.glance_num_retries
+        for attempt in range(1, num_attempts + 1):
+            headers = {'Range': 'bytes=%d-%d' % (start, end - 1)}
+            try:
+                resp, body = self._client.call(context, 'get', url,
+                                               headers=headers,
+                                               controller='http_client')
+                if resp.status_code != http.client.PARTIAL_CONTENT:
+                    if hasattr(body, 'close'):
+                        body.close()
+                    raise _RangesNotSupported()
+                for chunk in body:
+                    if start + len(chunk) > end:
+                        raise IOError(_('Received more data than '
+                                        'requested.'))
+                    tpool.execute(os.pwrite, fd, chunk, start)
+                    start += len(chunk)
+                if start != end:
+                    raise IOError(_('Received less data than requested.'))
+                return
+            except (IOError, exception.GlanceConnectionFailed) as e:
+                if attempt == num_attempts:
+                    raise exception.ImageDownloadFailed(image_href=image_id,
+                                                        reason=e)
+                LOG.warning('Error downloading image %(image)s from offset '
+                            '%(start)d, retrying: %(error)s',
+                            {'image': image_id, 'start': start, 'error': e})
+
+    @staticmethod
+    def _verify_download(image_id: str, image: Any, path: str) -> None:
+        """Validate the checksum of an image downloaded in ranges."""
+        hash_algo = getattr(image, 'os_hash_algo', None)
+        expected = getattr(image, 'os_hash_value', None)
+        if hash_algo and expected:
+            hasher = hashlib.new(hash_algo)
+        else:
+            expected = getattr(image, 'checksum', None)
+            if not expected:
+                return
+            hasher = md5(usedforsecurity=False)
+
+        def _hash_file():
+            with open(path, 'rb') as f:
+                for chunk in iter(lambda: f.read(units.Mi), b''):
+                    hasher.update(chunk)
+
+        tpool.execute(_hash_file)
+        if hasher.hexdigest() != expected:
+            raise exception.ImageDownloadFailed(
+                image_href=image_id,
+                reason=_('image checksum %(actual)s does not match the '
+                         'expected %(expected)s.') %
+                {'actual': hasher.hexdigest(), 'expected': expected})
+
+    def _download_ranges(self,
+                         context: context.RequestContext,
+                         image_id: str,
+                         data: Any) -> bool:
+        """Download an image into data with concurrent ranged requests.
+
+        Returns False if the image has to be downloaded in a single stream
+        instead, because it is small, data is not a regular file or the
+        store doesn't support ranges.
+        """
+        fd = _get_file_descriptor(data)
+        if fd is None or CONF.glance_download_streams < 2:
+            return False
+
+        try:
+            image = self._client.call(context, 'get', image_id)
+        except Exception:
+            _reraise_translated_image_exception(image_id)
+        size = getattr(image, 'size', None) or 0
+        ranges = _get_ranges(size)
+        if not ranges:
+            return False
+
+        os.ftruncate(fd, size)
+        try:
+            # The first range tells whether the store supports ranges.
+            self._download_range(context, image_id, fd, *ranges[0])
+        except _RangesNotSupported:
+            LOG.debug('Image %s cannot be downloaded in ranges.', image_id)
+            os.ftruncate(fd, 0)
+            return False
+
+        LOG.debug('Downloading image %(image)s in %(num)d ranges with '
+                  '%(streams)d streams.',
+                  {'image': image_id, 'num': len(ranges),
+                   'streams': CONF.glance_download_streams})
+        try:
+            _run_concurrently(self._download_range,
+                              [(context, image_id, fd, start, end)
+                               for start, end in ranges[1:]])
+        except _RangesNotSupported:
+            raise exception.ImageDownloadFailed(
+                image_href=image_id,
+                reason=_('the image store stopped serving byte ranges.'))
+        self._verify_download(image_id, image, data.name)
+        return True
+
     def download(self,
                  context: context.RequestContext,
                  image_id: str,
@@ -400,9 +612,13 @@ class GlanceImageService(object):
                     # advantages, however we do not have the path to files at
                     # this point in the abstraction.
                     with open(parsed_url.path, "rb") as f:
-                        shutil.copyfileobj(f, data)
+                        if not self._copy_file_ranges(f, data):
+                            shutil.copyfileobj(f, data)
                     return
 
+        if data and self._download_ranges(context, image_id, data):
+            return
+
         try:
             image_chunks = self._client.call(context, 'data', image_id)
         except Exception:
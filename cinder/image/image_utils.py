@@ -23,14 +23,19 @@ Some slight modifications, but at some point
 we should look at maybe pushing this up to Oslo
 """
 
+import collections
 import contextlib
 import errno
 import io
+import itertools
 import math
 import os
 import re
+import stat
 import tempfile
-from typing import ContextManager, Generator, Optional
+import threading
+from typing import ContextManager, Generator, Iterable, Iterator, Optional
+import zlib
 
 import cryptography
 from cursive import exception as cursive_exception
@@ -49,6 +54,7 @@ from cinder import context
 from cinder import exception
 from cinder.i18n import _
 from cinder.image import accelerator
+from cinder.image import format_inspector
 from cinder.image import glance
 import cinder.privsep.format_inspector
 from cinder import utils
@@ -106,11 +112,52 @@ image_opts = [
                      'option allows operators to specify *additional* '
                      'namespaces to be excluded.',
                 default=[]),
+    cfg.BoolOpt('image_download_sharing',
+                default=True,
+                help='Share a single download of an image among the '
+                     'requests of a volume service that need the same image '
+                     'at the same time, instead of downloading and verifying '
+                     'it into image_conversion_dir once per request.'),
+    cfg.IntOpt('image_download_cache_size_gb',
+               default=0,
+               min=0,
+               help='Maximum size in GB of the images kept in '
+                    'image_conversion_dir by a volume service, when '
+                    'image_download_sharing is enabled, after the last '
+                    'request using them is done, so later requests for '
+                    'the same images don\'t download them again. Least '
+                    'recently used images are removed first. With the '
+                    'default of 0 images are removed as soon as they are not '
+                    'in use.'),
+    cfg.BoolOpt('image_download_streaming',
+                default=False,
+                help='Stream raw and gzip compressed images from the image '
+                     'service when creating volumes from them, '
+                     'decompressing and inspecting the image data while it '
+                     'is downloaded. Raw images are then written directly to '
+                     'raw volumes without using image_conversion_dir. '
+                     'Images with signature metadata are not streamed when '
+                     'verify_glance_signatures is enabled.'),
+    cfg.BoolOpt('image_upload_streaming',
+                default=False,
+                help='Compress images uploaded to the image service with '
+                     'the \'compressed\' container format while they are '
+                     'uploaded, instead of compressing them in '
+                     'image_conversion_dir first. Volumes uploaded as raw '
+                     'images are then read and uploaded directly, without '
+                     'any copy in image_conversion_dir, and the holes of '
+                     'sparse volume files are not read.'),
 ]
 
 CONF = cfg.CONF
 CONF.register_opts(image_opts)
 
+# Maximum amount of image data kept in memory while the format of an image
+# streamed from the image service is detected.
+STREAM_INSPECTION_LIMIT = 4 * units.Mi
+
+GZIP_MAGIC_BYTES = b'\x1f\x8b'
+
 QEMU_IMG_LIMITS = processutils.ProcessLimits(
     cpu_time=CONF.image_conversion_cpu_limit,
     address_space=CONF.image_conversion_address_space_limit * units.Gi)
@@ -631,6 +678,24 @@ def verify_glance_image_signature(context: context.RequestContext,
     return False
 
 
+def _raise_fetch_error(e: IOError, path: str, image_id: str) -> None:
+    if e.errno == errno.ENOSPC:
+        params = {'path': os.path.dirname(path),
+                  'image': image_id}
+        reason = _("No space left in image_conversion_dir "
+                   "path (%(path)s) while fetching "
+                   "image %(image)s.") % params
+        LOG.exception(reason)
+        raise exception.ImageTooBig(image_id=image_id,
+                                    reason=reason)
+
+    reason = ("IOError: %(errno)s %(strerror)s" %
+              {'errno': e.errno, 'strerror': e.strerror})
+    LOG.error(reason)
+    raise exception.ImageDownloadFailed(image_href=image_id,
+                                        reason=reason)
+
+
 def fetch(context: context.RequestContext,
           image_service: glance.GlanceImageService,
           image_id: str,
@@ -648,21 +713,7 @@ def fetch(context: context.RequestContext,
                 image_service.download(context, image_id,
                                        tpool.Proxy(image_file))
             except IOError as e:
-                if e.errno == errno.ENOSPC:
-                    params = {'path': os.path.dirname(path),
-                              'image': image_id}
-                    reason = _("No space left in image_conversion_dir "
-                               "path (%(path)s) while fetching "
-                               "image %(image)s.") % params
-                    LOG.exception(reason)
-                    raise exception.ImageTooBig(image_id=image_id,
-                                                reason=reason)
-
-                reason = ("IOError: %(errno)s %(strerror)s" %
-                          {'errno': e.errno, 'strerror': e.strerror})
-                LOG.error(reason)
-                raise exception.ImageDownloadFailed(image_href=image_id,
-                                                    reason=reason)
+                _raise_fetch_error(e, path, image_id)
 
     duration = timeutils.delta_seconds(start_time, timeutils.utcnow())
 
@@ -845,10 +896,12 @@ def check_image_format(source: str,
 def fetch_verify_image(context: context.RequestContext,
                        image_service: glance.GlanceImageService,
                        image_id: str,
-                       dest: str) -> None:
+                       dest: str,
+                       image_meta: Optional[dict] = None) -> None:
     fetch(context, image_service, image_id, dest,
           None, None)
-    image_meta = image_service.show(context, image_id)
+    if image_meta is None:
+        image_meta = image_service.show(context, image_id)
 
     with fileutils.remove_path_on_error(dest):
         has_meta = False if not image_meta else True
@@ -943,6 +996,197 @@ def check_image_conversion_disable(disk_format, volume_format, image_id,
             image_id=image_id)
 
 
+def can_stream_image(image_meta: Optional[dict]) -> bool:
+    """Return whether an image can be streamed from the image service.
+
+    Only raw and gzip compressed images are streamed, since any other image
+    has to be fully downloaded before it can be converted anyway.  Signed
+    images are downloaded so that their signature can be verified.
+    """
+    if not CONF.image_download_streaming or not image_meta:
+        return False
+    if is_xenserver_format(image_meta):
+        return False
+    properties = image_meta.get('properties') or {}
+    if (CONF.verify_glance_signatures != 'disabled' and
+            any(key.startswith('img_signature') for key in properties)):
+        return False
+    return (image_meta.get('disk_format') == 'raw' or
+            image_meta.get('container_format') == 'compressed')
+
+
+def _gunzip_chunks(chunks: Iterable[bytes],
+                   image_id: str) -> Iterator[bytes]:
+    """Decompress a stream of gzip compressed chunks.
+
+    Concatenated gzip members are decompressed one after another, like
+    gunzip does.
+    """
+    decompressor = None
+    pending = b''
+    for chunk in chunks:
+        while chunk:
+            if decompressor is None:
+                # Make sure the magic bytes of a member are read in one go
+                chunk = pending + chunk
+                if len(chunk) < len(GZIP_MAGIC_BYTES):
+                    pending = chunk
+                    break
+                pending = b''
+                if not chunk.startswith(GZIP_MAGIC_BYTES):
+                    raise exception.ImageUnacceptable(
+                        image_id=image_id,
+                        reason=_("Unsupported compressed image format "
+                                 "found. Only gzip is supported currently"))
+                decompressor = zlib.decompressobj(16 + zlib.MAX_WBITS)
+            try:
+                data = decompressor.decompress(chunk, units.Mi)
+            except zlib.error as e:
+                raise exception.ImageUnacceptable(
+                    image_id=image_id,
+                    reason=_("Failed to decompress image: %s") % e)
+            if data:
+                yield data
+            chunk = decompressor.unconsumed_tail
+            if decompressor.eof:
+                chunk = decompressor.unused_data
+                decompressor = None
+    if decompressor is not None or pending:
+        raise exception.ImageDownloadFailed(
+            image_href=image_id,
+            reason=_('compressed image data is truncated.'))
+
+
+def _detect_stream_format(
+        chunks: Iterator[bytes]) -> tuple[
+            Optional[format_inspector.FileInspector], list[bytes]]:
+    """Detect the format of an image while it is being streamed.
+
+    This runs all the format inspectors over the chunks like
+    format_inspector.detect_file_format() does for a file, keeping the
+    chunks it reads so they can still be written out afterwards.
+
+    :returns: the inspector that matched, or None if the format could not
+              be determined within STREAM_INSPECTION_LIMIT bytes, and the
+              chunks that were read
+    """
+    inspectors = {k: v() for k, v in format_inspector.ALL_FORMATS.items()}
+    buffered = []
+    buffered_size = 0
+    for chunk in chunks:
+        buffered.append(chunk)
+        buffered_size += len(chunk)
+        for fmt, inspector in list(inspectors.items()):
+            try:
+                inspector.eat_chunk(chunk)
+            except format_inspector.ImageFormatError:
+                inspectors.pop(fmt)
+                continue
+            if (inspector.format_match and inspector.complete and
+                    fmt != 'raw'):
+                return inspector, buffered
+        if all(i.complete for i in inspectors.values()):
+            break
+        if buffered_size >= STREAM_INSPECTION_LIMIT:
+            return None, buffered
+    return inspectors['raw'], buffered
+
+
+def _write_image_chunks(chunks: Iterable[bytes],
+                        path: str,
+                        image_id: str,
+                        size: Optional[int] = None,
+                        sparse: bool = False) -> int:
+    """Write image chunks to a file or block device.
+
+    :param size: size in GB the image must fit in, or None
+    :param sparse: skip writing zeroed chunks to regular files
+    :returns: the number of bytes written
+    """
+    # Block devices are not known to be zeroed, so only skip zeroes when
+    # writing to a regular file.
+    sparse = sparse and (not os.path.exists(path) or os.path.isfile(path))
+    total = 0
+    with open(path, 'wb') as f:
+        image_file = tpool.Proxy(f)
+        for chunk in chunks:
+            total += len(chunk)
+            if size is not None and total > size * units.Gi:
+                check_virtual_size(total, size, image_id)
+            if sparse and not chunk.strip(b'\0'):
+                image_file.seek(len(chunk), os.SEEK_CUR)
+            else:
+                image_file.write(chunk)
+        if sparse:
+            image_file.truncate(total)
+        image_file.flush()
+        os.fsync(f.fileno())
+    return total
+
+
+@contextlib.contextmanager
+def _writable(path: str) -> Generator[None, None, None]:
+    if (os.name == 'nt' or not os.path.exists(path) or
+            os.access(path, os.W_OK)):
+        yield
+    else:
+        with utils.temporary_chown(path):
+            yield
+
+
+def _fetch_stream(context: context.RequestContext,
+                  image_service: glance.GlanceImageService,
+                  image_id: str,
+                  image_meta: dict,
+                  tmp: str,
+                  dest: str,
+                  volume_format: str,
+                  size: Optional[int] = None,
+                  disable_sparse: bool = False) -> bool:
+    """Stream an image from the image service in a single pass.
+
+    Compressed images are decompressed while they are downloaded.  Images
+    the format inspectors find to be raw are written directly to dest when
+    it is a raw volume, anything else is written to tmp to be checked and
+    converted like a fetched image.
+
+    :returns: True if the image was written to dest, False if it was
+              written to tmp
+    """
+    start_time = timeutils.utcnow()
+    chunks = iter(image_service.download(context, image_id))
+    if image_meta.get('container_format') == 'compressed':
+        LOG.debug("Found image with compressed container format")
+        chunks = _gunzip_chunks(chunks, image_id)
+
+    inspector, buffered = _detect_stream_format(chunks)
+    chunks = itertools.chain(buffered, chunks)
+
+    if (inspector is not None and str(inspector) == 'raw' and
+            image_meta['disk_format'] == 'raw' and volume_format == 'raw'):
+        LOG.debug('Streaming raw image %(image)s to volume %(dest)s.',
+                  {'image': image_id, 'dest': dest})
+        with _writable(dest):
+            written = _write_image_chunks(chunks, dest, image_id, size=size,
+                                          sparse=not disable_sparse)
+        streamed = True
+    else:
+        LOG.debug('Streaming image %(image)s to %(tmp)s, format is %(fmt)s.',
+                  {'image': image_id, 'tmp': tmp,
+                   'fmt': inspector or 'unknown'})
+        try:
+            written = _write_image_chunks(chunks, tmp, image_id)
+        except IOError as e:
+            _raise_fetch_error(e, tmp, image_id)
+        streamed = False
+
+    duration = max(timeutils.delta_seconds(start_time, timeutils.utcnow()), 1)
+    LOG.info("Image stream %(sz).2f MB at %(mbps).2f MB/s",
+             {'sz': written / units.Mi,
+              'mbps': written / units.Mi / duration})
+    return streamed
+
+
 def fetch_to_volume_format(context: context.RequestContext,
                            image_service: glance.GlanceImageService,
                            image_id: str,
@@ -993,8 +1237,17 @@ def fetch_to_volume_format(context: context.RequestContext,
 
         tmp_images = TemporaryImages.for_image_service(image_service)
         tmp_image = tmp_images.get(context, image_id)
+        decompressed = False
         if tmp_image:
             tmp = tmp_image
+        elif can_stream_image(image_meta):
+            # The image is decompressed while it is streamed, and raw images
+            # may be written straight to the volume.
+            if _fetch_stream(context, image_service, image_id, image_meta,
+                             tmp, dest, volume_format, size=size,
+                             disable_sparse=disable_sparse):
+                return
+            decompressed = True
         else:
             fetch(context, image_service, image_id, tmp, user_id, project_id)
 
@@ -1003,7 +1256,8 @@ def fetch_to_volume_format(context: context.RequestContext,
         # transparent level between original image downloaded from
         # Glance and Cinder image service. So the source file path is
         # the same with destination file path.
-        if image_meta.get('container_format') == 'compressed':
+        if (image_meta.get('container_format') == 'compressed' and
+                not decompressed):
             LOG.debug("Found image with compressed container format")
             if not accelerator.is_gzip_compressed(tmp):
                 raise exception.ImageUnacceptable(
@@ -1082,6 +1336,101 @@ def chown_if_needed(volume_path: str) -> Generator[None, None, None]:
             yield
 
 
+class _ChunkReader(object):
+    """A read-only file-like object over an iterator of chunks."""
+
+    def __init__(self, chunks: Iterable[bytes]):
+        self._chunks = iter(chunks)
+        # Current chunk and offset of its first unread byte, reads are sliced
+        # from it without copying the rest of the chunk.
+        self._chunk = b''
+        self._offset = 0
+
+    def read(self, size: int = -1) -> bytes:
+        parts = []
+        while size != 0:
+            if self._offset == len(self._chunk):
+                try:
+                    self._chunk = next(self._chunks)
+                except StopIteration:
+                    break
+                self._offset = 0
+                continue
+            end = (len(self._chunk) if size < 0
+                   else min(self._offset + size, len(self._chunk)))
+            parts.append(self._chunk[self._offset:end])
+            if size > 0:
+                size -= end - self._offset
+            self._offset = end
+        if len(parts) == 1:
+            return parts[0]
+        return b''.join(parts)
+
+
+def _read_volume_chunks(volume_path: str,
+                        chunk_size: int = units.Mi) -> Iterator[bytes]:
+    """Read a volume in chunks.
+
+    The holes of sparse volume files are returned as zeroes without being
+    read.
+    """
+    zeroes = bytes(chunk_size)
+    with open(volume_path, 'rb') as volume_file:
+        fd = volume_file.fileno()
+        size = os.lseek(fd, 0, os.SEEK_END)
+        sparse = (hasattr(os, 'SEEK_DATA') and
+                  stat.S_ISREG(os.fstat(fd).st_mode))
+        offset = 0
+        while offset < size:
+            data_end = size
+            if sparse:
+                try:
+                    data_start = os.lseek(fd, offset, os.SEEK_DATA)
+                except OSError as e:
+                    if e.errno != errno.ENXIO:
+                        raise
+                    # Only a hole is left
+                    data_start = size
+                while offset < data_start:
+                    length = min(chunk_size, data_start - offset)
+                    yield zeroes[:length]
+                    offset += length
+                if offset >= size:
+                    break
+                data_end = os.lseek(fd, offset, os.SEEK_HOLE)
+            while offset < data_end:
+                chunk = tpool.execute(os.pread, fd,
+                                      min(chunk_size, data_end - offset),
+                                      offset)
+                if not chunk:
+                    return
+                yield chunk
+                offset += len(chunk)
+
+
+def _gzip_chunks(chunks: Iterable[bytes]) -> Iterator[bytes]:
+    """Compress a stream of chunks in gzip format."""
+    compressor = zlib.compressobj(wbits=16 + zlib.MAX_WBITS)
+    for chunk in chunks:
+        data = tpool.execute(compressor.compress, chunk)
+        if data:
+            yield data
+    yield compressor.flush()
+
+
+def _upload_stream(context: context.RequestContext,
+                   image_service: glance.GlanceImageService,
+                   image_id: str,
+                   path: str,
+                   store_id: Optional[str] = None,
+                   base_image_ref: Optional[str] = None) -> None:
+    """Upload a file or volume as gzip compressed image data."""
+    chunks = _gzip_chunks(_read_volume_chunks(path))
+    image_service.update(context, image_id, {}, _ChunkReader(chunks),
+                         store_id=store_id,
+                         base_image_ref=base_image_ref)
+
+
 def upload_volume(context: context.RequestContext,
                   image_service: glance.GlanceImageService,
                   image_meta: dict,
@@ -1117,6 +1466,9 @@ def upload_volume(context: context.RequestContext,
                                              base_image_ref=base_image_ref)
             return
 
+    stream = (CONF.image_upload_streaming and
+              image_meta.get('container_format') == 'compressed')
+
     with temporary_file(prefix='vol_upload_') as tmp:
         LOG.debug("%s was %s, converting to %s",
                   image_id, volume_format, image_meta['disk_format'])
@@ -1135,6 +1487,17 @@ def upload_volume(context: context.RequestContext,
                 % {'fmt': fmt, 'backing_file': backing_file})
 
         out_format = fixup_disk_format(image_meta['disk_format'])
+        if stream and fmt == 'raw' and out_format == 'raw':
+            # A raw copy of a raw volume is the volume itself, so it can be
+            # compressed and uploaded as it is read.
+            LOG.debug("Streaming raw volume %(path)s to image %(image)s.",
+                      {'path': volume_path, 'image': image_id})
+            with chown_if_needed(volume_path):
+                _upload_stream(context, image_service, image_id,
+                               volume_path, store_id=store_id,
+                               base_image_ref=base_image_ref)
+            return
+
         convert_image(volume_path, tmp, out_format,
                       run_as_root=run_as_root,
                       compress=compress,
@@ -1148,6 +1511,13 @@ def upload_volume(context: context.RequestContext,
                 reason=_("Converted to %(f1)s, but format is now %(f2)s") %
                 {'f1': out_format, 'f2': data.file_format})
 
+        if stream:
+            LOG.debug("Container_format set to 'compressed', compressing "
+                      "image while uploading.")
+            _upload_stream(context, image_service, image_id, tmp,
+                           store_id=store_id, base_image_ref=base_image_ref)
+            return
+
         # NOTE(ZhengMa): This is used to do image compression on image
         # uploading with 'compressed' container_format.
         # Compress file 'tmp' in-place
@@ -1338,6 +1708,148 @@ def decode_cipher(cipher_spec: str, key_size: int) -> dict[str, str]:
             'ivgen_alg': ivgen_alg}
 
 
+class _SharedImage(object):
+    """An image downloaded once for all the requests using it."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self.size = 0
+        self.refs = 1
+        self.ready = threading.Event()
+        self.error: Optional[Exception] = None
+        self.signature_verified: Optional[bool] = None
+        self.signature_lock = threading.Lock()
+
+
+class ImageDownloadManager(object):
+    """Share image downloads among the requests of a volume service.
+
+    Images are identified by their id and checksum, so a new upload of an
+    image is never served from an older download. The first request
+    downloads and verifies the image while the others wait for it, and the
+    file is removed once nobody uses it and it doesn't fit in
+    image_download_cache_size_gb.
+    """
+
+    def __init__(self):
+        self._images: collections.OrderedDict = collections.OrderedDict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _get_key(image_id: str, image_meta: dict, suffix: str) -> tuple:
+        checksum = (image_meta.get('os_hash_value') or
+                    image_meta.get('checksum'))
+        return (image_id, checksum, suffix)
+
+    @contextlib.contextmanager
+    def fetch(self,
+              context: context.RequestContext,
+              image_service: glance.GlanceImageService,
+              image_id: str,
+              image_meta: dict,
+              suffix: str = '') -> Generator[_SharedImage, None, None]:
+        key = self._get_key(image_id, image_meta, suffix)
+        with self._lock:
+            existing = self._images.get(key)
+            owner = existing is None
+            if existing is None:
+                image = _SharedImage(create_temporary_file(
+                    prefix='image_fetch_%s_' % image_id, suffix=suffix))
+                self._images[key] = image
+            else:
+                image = existing
+                image.refs += 1
+                self._images.move_to_end(key)
+
+        try:
+            if owner:
+                self._download(context, image_service, image_id, key, image)
+            else:
+                LOG.debug('Waiting for the download of image %s by another '
+                          'request.', image_id)
+                image.ready.wait()
+                if image.error:
+                    raise image.error
+            yield image
+        finally:
+            self._release(key, image)
+
+    def _download(self, context, image_service, image_id, key, image):
+        try:
+            fetch_verify_image(context, image_service, image_id, image.path)
+            image.size = os.path.getsize(image.path)
+        except Exception as e:
+            image.error = e
+            with self._lock:
+                if self._images.get(key) is image:
+                    del self._images[key]
+            raise
+        finally:
+            image.ready.set()
+
+    def _release(self, key: tuple, image: _SharedImage) -> None:
+        with self._lock:
+            image.refs -= 1
+            if image.error and not image.refs:
+                fileutils.delete_if_exists(image.path)
+            self._evict()
+
+    def _evict(self) -> None:
+        """Remove the least recently used images that are not in use."""
+        max_size = CONF.image_download_cache_size_gb * units.Gi
+        total = sum(image.size for image in self._images.values())
+        for key, image in list(self._images.items()):
+            if total <= max_size:
+                break
+            if image.refs or not image.ready.is_set():
+                continue
+            LOG.debug('Removing downloaded image %s.', key[0])
+            del self._images[key]
+            fileutils.delete_if_exists(image.path)
+            total -= image.size
+
+    def verify_signature(self,
+                         context: context.RequestContext,
+                         image_service: glance.GlanceImageService,
+                         image_id: str,
+                         path: str) -> bool:
+        """Verify the signature of an image once per download."""
+        with self._lock:
+            image = next((image for image in self._images.values()
+                          if image.path == path), None)
+        if image is None:
+            return verify_glance_image_signature(context, image_service,
+                                                 image_id, path)
+        with image.signature_lock:
+            if image.signature_verified is None:
+                image.signature_verified = verify_glance_image_signature(
+                    context, image_service, image_id, path)
+            return image.signature_verified
+
+
+_download_manager = ImageDownloadManager()
+
+
+def verify_fetched_image_signature(context: context.RequestContext,
+                                   image_service: glance.GlanceImageService,
+                                   image_id: str,
+                                   path: str) -> bool:
+    """Verify the signature of an image fetched with TemporaryImages.
+
+    The signature of a shared download is only verified once.
+    """
+    return _download_manager.verify_signature(context, image_service,
+                                              image_id, path)
+
+
+def _can_share_download(image_meta: dict) -> bool:
+    # Compressed and XenServer images are modified in place before being
+    # converted, so each request needs its own copy.
+    return bool(image_meta and
+                image_meta.get('container_format') != 'compressed' and
+                not is_xenserver_format(image_meta))
+
+
 class TemporaryImages(object):
     """Manage temporarily downloaded images to avoid downloading it twice.
 
@@ -1345,6 +1857,9 @@ class TemporaryImages(object):
     clause, 'tmp' can be used as the downloaded image path. In addition,
     image_utils.fetch() will use the pre-fetched image by the TemporaryImages.
     This is useful to inspect image contents before conversion.
+
+    When image_download_sharing is enabled concurrent fetches of the same
+    image share a single download, so 'tmp' must not be modified.
     """
 
     def __init__(self, image_service: glance.GlanceImageService):
@@ -1360,6 +1875,29 @@ class TemporaryImages(object):
             return instance
         return TemporaryImages(image_service)
 
+    @classmethod
+    @contextlib.contextmanager
+    def _fetch_file(cls,
+                    image_service: glance.GlanceImageService,
+                    context: context.RequestContext,
+                    image_id: str,
+                    suffix: str) -> Generator[str, None, None]:
+        # NOTE: Showing the image also checks that this user has access to
+        # it before using a download made for another request.
+        image_meta = None
+        if CONF.image_download_sharing:
+            image_meta = image_service.show(context, image_id)
+        if image_meta is not None and _can_share_download(image_meta):
+            with _download_manager.fetch(context, image_service, image_id,
+                                         image_meta, suffix) as image:
+                yield image.path
+        else:
+            with temporary_file(prefix='image_fetch_%s_' % image_id,
+                                suffix=suffix) as tmp:
+                fetch_verify_image(context, image_service, image_id, tmp,
+                                   image_meta=image_meta)
+                yield tmp
+
     @classmethod
     @contextlib.contextmanager
     def fetch(cls,
@@ -1368,9 +1906,8 @@ class TemporaryImages(object):
               image_id: str,
               suffix: Optional[str] = '') -> Generator[str, None, None]:
         tmp_images = cls.for_image_service(image_service).temporary_images
-        with temporary_file(prefix='image_fetch_%s_' % image_id,
-                            suffix=suffix) as tmp:
-            fetch_verify_image(context, image_service, image_id, tmp)
+        with cls._fetch_file(image_service, context, image_id,
+                             suffix or '') as tmp:
             user = context.user_id
             if not tmp_images.get(user):
                 tmp_images[user] = {}
@@ -132,6 +132,13 @@ class Manager(base.Base, PeriodicTasks):
         """
         pass
 
+    def cleanup_host(self):
+        """A hook for service to do cleanup work when it shuts down.
+
+        Child classes should override this method.
+        """
+        pass
+
     def is_working(self):
         """Method indicating if service is working correctly.
 
@@ -328,8 +328,10 @@ class SnapshotList(base.ObjectListBase, base.CinderObject):
                                   snapshots, expected_attrs=expected_attrs)
 
     @classmethod
-    def get_all_active_by_window(cls, context, begin, end):
-        snapshots = db.snapshot_get_all_active_by_window(context, begin, end)
+    def get_all_active_by_window(cls, context, begin, end, marker=None,
+                                 limit=None):
+        snapshots = db.snapshot_get_all_active_by_window(
+            context, begin, end, marker=marker, limit=limit)
         expected_attrs = Snapshot._get_expected_attrs(context)
         return base.obj_make_list(context, cls(context), objects.Snapshot,
                                   snapshots, expected_attrs=expected_attrs)
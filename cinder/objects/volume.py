@@ -657,12 +657,27 @@ class VolumeList(base.ObjectListBase, base.CinderObject):
 
         return expected_attrs
 
+    @classmethod
+    def _make_summary_list(cls, context, db_volumes):
+        """Make a list of volumes with only their id and display_name."""
+        volumes = cls(context, objects=[])
+        for db_volume in db_volumes:
+            volume = objects.Volume(context, id=db_volume['id'],
+                                    display_name=db_volume['display_name'])
+            volume.obj_reset_changes()
+            volumes.objects.append(volume)
+        volumes.obj_reset_changes()
+        return volumes
+
     @classmethod
     def get_all(cls, context, marker=None, limit=None, sort_keys=None,
-                sort_dirs=None, filters=None, offset=None):
+                sort_dirs=None, filters=None, offset=None, summary=False):
         volumes = db.volume_get_all(context, marker, limit,
                                     sort_keys=sort_keys, sort_dirs=sort_dirs,
-                                    filters=filters, offset=offset)
+                                    filters=filters, offset=offset,
+                                    summary=summary)
+        if summary:
+            return cls._make_summary_list(context, volumes)
         expected_attrs = cls._get_expected_attrs(context)
         return base.obj_make_list(context, cls(context), objects.Volume,
                                   volumes, expected_attrs=expected_attrs)
@@ -694,11 +709,14 @@ class VolumeList(base.ObjectListBase, base.CinderObject):
     @classmethod
     def get_all_by_project(cls, context, project_id, marker=None, limit=None,
                            sort_keys=None, sort_dirs=None, filters=None,
-                           offset=None):
+                           offset=None, summary=False):
         volumes = db.volume_get_all_by_project(context, project_id, marker,
                                                limit, sort_keys=sort_keys,
                                                sort_dirs=sort_dirs,
-                                               filters=filters, offset=offset)
+                                               filters=filters, offset=offset,
+                                               summary=summary)
+        if summary:
+            return cls._make_summary_list(context, volumes)
         expected_attrs = cls._get_expected_attrs(context)
         return base.obj_make_list(context, cls(context), objects.Volume,
                                   volumes, expected_attrs=expected_attrs)
@@ -709,8 +727,10 @@ class VolumeList(base.ObjectListBase, base.CinderObject):
         return volumes
 
     @classmethod
-    def get_all_active_by_window(cls, context, begin, end):
-        volumes = db.volume_get_all_active_by_window(context, begin, end)
+    def get_all_active_by_window(cls, context, begin, end, marker=None,
+                                 limit=None):
+        volumes = db.volume_get_all_active_by_window(
+            context, begin, end, marker=marker, limit=limit)
         expected_attrs = cls._get_expected_attrs(context)
         return base.obj_make_list(context, cls(context), objects.Volume,
                                   volumes, expected_attrs=expected_attrs)
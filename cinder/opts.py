@@ -56,6 +56,8 @@ from cinder.keymgr import conf_key_mgr as cinder_keymgr_confkeymgr
 from cinder.message import api as cinder_message_api
 from cinder import quota as cinder_quota
 from cinder.scheduler import driver as cinder_scheduler_driver
+from cinder.scheduler.filters import instance_locality_filter as \
+    cinder_scheduler_filters_instancelocalityfilter
 from cinder.scheduler import host_manager as cinder_scheduler_hostmanager
 from cinder.scheduler import manager as cinder_scheduler_manager
 from cinder.scheduler import scheduler_options as \
@@ -271,6 +273,8 @@ def list_opts():
                 cinder_message_api.messages_opts,
                 cinder_quota.quota_opts,
                 cinder_scheduler_driver.scheduler_driver_opts,
+                cinder_scheduler_filters_instancelocalityfilter.
+                instance_locality_filter_opts,
                 cinder_scheduler_hostmanager.host_manager_opts,
                 cinder_scheduler_manager.scheduler_manager_opts,
                 [cinder_scheduler_scheduleroptions.
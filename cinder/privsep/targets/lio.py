@@ -0,0 +1,62 @@
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+"""LIO target helpers using rtslib in the privsep daemon.
+
+Running cinder-rtstool starts a new Python interpreter that has to load rtslib
+on every call, which adds up when many targets have to be checked, like when
+the volume service starts.  These helpers run the same rtslib code within the
+privsep daemon instead.
+"""
+
+import rtslib_fb
+
+from cinder.cmd import rtstool
+import cinder.privsep
+
+
+@cinder.privsep.sys_admin_pctxt.entrypoint
+def get_targets():
+    return [target.wwn for target in rtslib_fb.root.RTSRoot().targets]
+
+
+@cinder.privsep.sys_admin_pctxt.entrypoint
+def create_targets(targets):
+    """Create the targets that don't exist yet in a single pass.
+
+    :param targets: list of dicts with the arguments of rtstool.create_target
+                    for each target
+    :returns: dict with the names of the targets that could not be created
+              and the reason
+    """
+    rtsroot = rtslib_fb.root.RTSRoot()
+    existing = {so.name for so in rtsroot.storage_objects}
+
+    failed = {}
+    for target in targets:
+        if target['name'] in existing:
+            continue
+        try:
+            rtstool.create_target(**target)
+        except Exception as exc:
+            failed[target['name']] = str(exc)
+    return failed
+
+
+@cinder.privsep.sys_admin_pctxt.entrypoint
+def save_to_file(destination_file=None):
+    rtstool.save_to_file(destination_file)
+
+
+@cinder.privsep.sys_admin_pctxt.entrypoint
+def restore_from_file(configuration_file=None):
+    rtstool.restore_from_file(configuration_file)
@@ -17,6 +17,7 @@
 """Quotas for volumes."""
 
 import datetime
+import threading
 
 from oslo_config import cfg
 from oslo_log import log as logging
@@ -75,7 +76,18 @@ quota_opts = [
                      'with default quota.'),
     cfg.IntOpt('per_volume_size_limit',
                default=-1,
-               help='Max size allowed per volume, in gigabytes'), ]
+               help='Max size allowed per volume, in gigabytes'),
+    cfg.IntOpt('quota_resources_cache_time',
+               default=60,
+               min=0,
+               help='Number of seconds the quota resources built from the '
+                    'volume types are kept in memory. Creating, renaming or '
+                    'deleting a volume type refreshes them in the service '
+                    'handling the request, other services and API workers '
+                    'see the change once this time has passed. Quota '
+                    'operations on a resource that is not known yet always '
+                    'refresh them. Set to 0 to build them from the database '
+                    'every time they are used.'), ]
 
 CONF = cfg.CONF
 CONF.register_opts(quota_opts)
@@ -850,10 +862,13 @@ class QuotaEngine(object):
 class VolumeTypeQuotaEngine(QuotaEngine):
     """Represent the set of all quotas."""
 
-    @property
-    def resources(self):
-        """Fetches all possible quota resources."""
+    def __init__(self, quota_driver_class=None):
+        super(VolumeTypeQuotaEngine, self).__init__(quota_driver_class)
+        self._resources_cache = None
+        self._resources_cache_time = None
+        self._resources_lock = threading.Lock()
 
+    def _load_resources(self):
         result = {}
         # Global quotas.
         argses = [('volumes', '_sync_volumes', 'quota_volumes'),
@@ -876,6 +891,46 @@ class VolumeTypeQuotaEngine(QuotaEngine):
                 result[resource.name] = resource
         return result
 
+    @property
+    def resources(self):
+        """Fetches all possible quota resources."""
+        cache_time = CONF.quota_resources_cache_time
+        if not cache_time:
+            return self._load_resources()
+
+        with self._resources_lock:
+            if (self._resources_cache is None or
+                    timeutils.is_older_than(self._resources_cache_time,
+                                            cache_time)):
+                self._resources_cache = self._load_resources()
+                self._resources_cache_time = timeutils.utcnow()
+            return self._resources_cache
+
+    def invalidate_resources(self):
+        """Make the next access to the resources rebuild them."""
+        with self._resources_lock:
+            self._resources_cache = None
+
+    def _check_resource_names(self, names):
+        """Refresh the cached resources if any of the names is unknown.
+
+        Volume types may have been created by other services since the
+        resources were cached.
+        """
+        cached = self._resources_cache
+        if cached is not None and not set(names).issubset(cached):
+            self.invalidate_resources()
+
+    def limit_check(self, context, *args, **values):
+        self._check_resource_names(set(values) - {'project_id'})
+        return super(VolumeTypeQuotaEngine, self).limit_check(
+            context, *args, **values)
+
+    def reserve(self, context, *args, **deltas):
+        self._check_resource_names(set(deltas) - {'expire', 'project_id'})
+        return super(VolumeTypeQuotaEngine, self).reserve(
+            context, *args, **deltas)
+
     def register_resource(self, resource):
         raise NotImplementedError(_("Cannot register resource"))
 
@@ -905,6 +960,7 @@ class VolumeTypeQuotaEngine(QuotaEngine):
             db.quota_update_resource(context,
                                      old_res,
                                      new_res)
+        self.invalidate_resources()
 
 
 class GroupQuotaEngine(QuotaEngine):
@@ -346,7 +346,8 @@ class FilterScheduler(driver.Scheduler):
 
         # Note: remember, we are using an iterator here. So only
         # traverse this list once.
-        backends = self.host_manager.get_all_backend_states(elevated)
+        backends = self.host_manager.get_all_backend_states(
+            elevated, filter_properties=filter_properties)
 
         # Filter local hosts based on requirements ...
         backends = self.host_manager.get_filtered_backends(backends,
@@ -14,33 +14,49 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
+from oslo_log import log as logging
 from oslo_utils import uuidutils
 
+from cinder import objects
 from cinder.scheduler import filters
 from cinder.volume import api as volume
 
+LOG = logging.getLogger(__name__)
 
-class AffinityFilter(filters.BaseBackendFilter):
-    def __init__(self):
-        self.volume_api = volume.API()
 
-    def _get_volumes(self, context, affinity_uuids, backend_state):
-        filters = {'id': affinity_uuids, 'deleted': False}
-        if backend_state.cluster_name:
-            filters['cluster_name'] = backend_state.cluster_name
-        else:
-            filters['host'] = backend_state.host
-        return self.volume_api.get_all(context, filters=filters)
+def _host_matches(value, host):
+    """Match a volume's host or cluster_name like the DB API host filter.
 
+    A value with a pool only matches the exact host, a value with a backend
+    also matches any of its pools, and otherwise it also matches any of the
+    backends of the host.
+    """
+    if not host:
+        return False
+    if host == value:
+        return True
+    if '#' in value:
+        return False
+    if host.startswith(value + '#'):
+        return True
+    return '@' not in value and host.startswith(value + '@')
 
-class DifferentBackendFilter(AffinityFilter):
-    """Schedule volume on a different back-end from a set of volumes."""
 
-    def backend_passes(self, backend_state, filter_properties):
-        context = filter_properties['context']
+class AffinityFilter(filters.BaseBackendFilter):
+    # Name of the scheduler hint with the volumes to apply affinity to
+    hint_name: str
+
+    def __init__(self):
+        self.volume_api = volume.API()
+        # Hinted volumes read by filter_all for all the backends
+        self._volumes = None
+        self.queries_saved = 0
+
+    def _get_affinity_uuids(self, filter_properties):
+        """Return the list of hinted volume uuids, or None if invalid."""
         scheduler_hints = filter_properties.get('scheduler_hints') or {}
 
-        affinity_uuids = scheduler_hints.get('different_host', [])
+        affinity_uuids = scheduler_hints.get(self.hint_name, [])
 
         # scheduler hint verification: affinity_uuids can be a list of uuids
         # or single uuid.  The checks here is to make sure every single string
@@ -49,15 +65,69 @@ class DifferentBackendFilter(AffinityFilter):
         # like a uuid, it is better to fail the request than serving it wrong.
         if isinstance(affinity_uuids, list):
             for uuid in affinity_uuids:
-                if uuidutils.is_uuid_like(uuid):
-                    continue
-                else:
-                    return False
+                if not uuidutils.is_uuid_like(uuid):
+                    return None
         elif uuidutils.is_uuid_like(affinity_uuids):
             affinity_uuids = [affinity_uuids]
         else:
             # Not a list, not a string looks like uuid, don't pass it
             # to DB for query to avoid potential risk.
+            return None
+        return affinity_uuids
+
+    def _get_all_volumes(self, context, affinity_uuids):
+        filters = {'id': affinity_uuids, 'deleted': False}
+        return self.volume_api.get_all(context, filters=filters)
+
+    def _get_volumes(self, context, affinity_uuids, backend_state):
+        volumes = self._volumes
+        if volumes is None:
+            volumes = self._get_all_volumes(context, affinity_uuids)
+
+        if backend_state.cluster_name:
+            matching = [vol for vol in volumes
+                        if _host_matches(backend_state.cluster_name,
+                                         vol.cluster_name)]
+        else:
+            matching = [vol for vol in volumes
+                        if _host_matches(backend_state.host, vol.host)]
+        return objects.VolumeList(objects=matching)
+
+    def filter_all(self, filter_obj_list, filter_properties):
+        """Yield the backends that pass the filter.
+
+        The hinted volumes are read from the DB once for all the backends,
+        instead of once per backend.
+        """
+        backends = list(filter_obj_list)
+        affinity_uuids = self._get_affinity_uuids(filter_properties)
+        if backends and affinity_uuids:
+            self._volumes = self._get_all_volumes(
+                filter_properties['context'], affinity_uuids)
+            self.queries_saved = len(backends) - 1
+            LOG.debug('%(filter)s read the volumes in the %(hint)s hint '
+                      'once for %(count)d backends, saving %(saved)d '
+                      'queries.',
+                      {'filter': self.__class__.__name__,
+                       'hint': self.hint_name, 'count': len(backends),
+                       'saved': self.queries_saved})
+        try:
+            for backend in super(AffinityFilter, self).filter_all(
+                    backends, filter_properties):
+                yield backend
+        finally:
+            self._volumes = None
+
+
+class DifferentBackendFilter(AffinityFilter):
+    """Schedule volume on a different back-end from a set of volumes."""
+
+    hint_name = 'different_host'
+
+    def backend_passes(self, backend_state, filter_properties):
+        context = filter_properties['context']
+        affinity_uuids = self._get_affinity_uuids(filter_properties)
+        if affinity_uuids is None:
             return False
 
         if affinity_uuids:
@@ -70,28 +140,12 @@ class DifferentBackendFilter(AffinityFilter):
 class SameBackendFilter(AffinityFilter):
     """Schedule volume on the same back-end as another volume."""
 
+    hint_name = 'same_host'
+
     def backend_passes(self, backend_state, filter_properties):
         context = filter_properties['context']
-        scheduler_hints = filter_properties.get('scheduler_hints') or {}
-
-        affinity_uuids = scheduler_hints.get('same_host', [])
-
-        # scheduler hint verification: affinity_uuids can be a list of uuids
-        # or single uuid.  The checks here is to make sure every single string
-        # in the list looks like a uuid, otherwise, this filter will fail to
-        # pass.  Note that the filter does *NOT* ignore string doesn't look
-        # like a uuid, it is better to fail the request than serving it wrong.
-        if isinstance(affinity_uuids, list):
-            for uuid in affinity_uuids:
-                if uuidutils.is_uuid_like(uuid):
-                    continue
-                else:
-                    return False
-        elif uuidutils.is_uuid_like(affinity_uuids):
-            affinity_uuids = [affinity_uuids]
-        else:
-            # Not a list, not a string looks like uuid, don't pass it
-            # to DB for query to avoid potential risk.
+        affinity_uuids = self._get_affinity_uuids(filter_properties)
+        if affinity_uuids is None:
             return False
 
         if affinity_uuids:
@@ -13,6 +13,11 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
+import collections
+import threading
+import time
+
+from oslo_config import cfg
 from oslo_log import log as logging
 from oslo_utils import uuidutils
 
@@ -25,11 +30,78 @@ from cinder.volume import volume_utils
 
 LOG = logging.getLogger(__name__)
 
+instance_locality_filter_opts = [
+    cfg.IntOpt('instance_locality_cache_time',
+               default=0,
+               min=0,
+               help='Number of seconds the InstanceLocalityFilter remembers '
+                    'the host of an instance returned by Nova, so it is '
+                    'shared by the scheduling requests with the same '
+                    'local_to_instance hint. Volumes may be scheduled to '
+                    'the previous host of an instance migrated in the '
+                    'meantime, unless that host has no backend left, in '
+                    'which case Nova is asked again. Set to 0 to ask Nova '
+                    'on every request.'),
+    cfg.IntOpt('instance_locality_cache_size',
+               default=1000,
+               min=1,
+               help='Maximum number of instances whose host is remembered '
+                    'by the InstanceLocalityFilter. The least recently used '
+                    'entries are dropped first.'),
+]
+
+CONF = cfg.CONF
+CONF.register_opts(instance_locality_filter_opts)
+
 HINT_KEYWORD = 'local_to_instance'
 INSTANCE_HOST_PROP = 'OS-EXT-SRV-ATTR:host'
 REQUESTS_TIMEOUT = 5
 
 
+class InstanceHostCache(object):
+    """Bounded LRU cache of instance hosts with a time to live."""
+
+    def __init__(self):
+        self._entries = collections.OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, instance_uuid):
+        """Return the cached host of an instance, or None."""
+        with self._lock:
+            entry = self._entries.get(instance_uuid)
+            if entry is None:
+                return None
+            host, expires = entry
+            if expires <= time.monotonic():
+                del self._entries[instance_uuid]
+                return None
+            self._entries.move_to_end(instance_uuid)
+            return host
+
+    def set(self, instance_uuid, host):
+        cache_time = CONF.instance_locality_cache_time
+        if not cache_time:
+            return
+        with self._lock:
+            self._entries[instance_uuid] = (host,
+                                            time.monotonic() + cache_time)
+            self._entries.move_to_end(instance_uuid)
+            while len(self._entries) > CONF.instance_locality_cache_size:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, instance_uuid=None):
+        """Forget the host of an instance, or of all of them."""
+        with self._lock:
+            if instance_uuid is None:
+                self._entries.clear()
+            else:
+                self._entries.pop(instance_uuid, None)
+
+
+# Shared by all the filter instances, which only live for one request.
+_instance_host_cache = InstanceHostCache()
+
+
 class InstanceLocalityFilter(filters.BaseBackendFilter):
     """Schedule volume on the same host as a given instance.
 
@@ -50,12 +122,35 @@ class InstanceLocalityFilter(filters.BaseBackendFilter):
     """
 
     def __init__(self):
-        # Cache Nova API answers directly into the Filter object.
-        # Since a BaseBackendFilter instance lives only during the volume's
-        # scheduling, the cache is re-created for every new volume creation.
+        # Cache Nova API answers directly into the Filter object, so they are
+        # available for the whole volume's scheduling even if the shared
+        # cache has expired or is disabled.
         self._cache = {}
+        # Instances whose host was taken from the shared cache
+        self._shared_cache_hits = set()
         super(InstanceLocalityFilter, self).__init__()
 
+    def filter_all(self, filter_obj_list, filter_properties):
+        backends = list(filter_obj_list)
+        parent = super(InstanceLocalityFilter, self)
+        passing = list(parent.filter_all(backends, filter_properties))
+
+        scheduler_hints = filter_properties.get('scheduler_hints') or {}
+        instance_uuid = scheduler_hints.get(HINT_KEYWORD, None)
+        if passing or instance_uuid not in self._shared_cache_hits:
+            return passing
+
+        # No backend is on the host remembered for the instance, which may
+        # have been migrated since, so ask Nova again.
+        LOG.debug('No backend on cached host %(host)s of instance '
+                  '%(instance)s, refreshing it.',
+                  {'host': self._cache[instance_uuid],
+                   'instance': instance_uuid})
+        _instance_host_cache.invalidate(instance_uuid)
+        self._shared_cache_hits.discard(instance_uuid)
+        del self._cache[instance_uuid]
+        return list(parent.filter_all(backends, filter_properties))
+
     def backend_passes(self, backend_state, filter_properties):
         context = filter_properties['context']
         backend = volume_utils.extract_host(backend_state.backend_id, 'host')
@@ -82,6 +177,13 @@ class InstanceLocalityFilter(filters.BaseBackendFilter):
         if instance_uuid in self._cache:
             return self._cache[instance_uuid] == backend
 
+        # Then in the cache shared with previous requests
+        instance_host = _instance_host_cache.get(instance_uuid)
+        if instance_host is not None:
+            self._cache[instance_uuid] = instance_host
+            self._shared_cache_hits.add(instance_uuid)
+            return instance_host == backend
+
         server = nova.API().get_server(context, instance_uuid,
                                        privileged_user=True,
                                        timeout=REQUESTS_TIMEOUT)
@@ -95,6 +197,7 @@ class InstanceLocalityFilter(filters.BaseBackendFilter):
                                             HINT_KEYWORD)
 
         self._cache[instance_uuid] = getattr(server, INSTANCE_HOST_PROP)
+        _instance_host_cache.set(instance_uuid, self._cache[instance_uuid])
 
         # Match if given instance is hosted on backend
         return self._cache[instance_uuid] == backend
@@ -15,6 +15,7 @@
 
 """Manage backends in the current zone."""
 
+import collections
 from collections import abc
 import random
 import typing
@@ -31,6 +32,7 @@ from cinder import context as cinder_context
 from cinder import exception
 from cinder import objects
 from cinder.scheduler import filters
+from cinder.scheduler.filters import extra_specs_ops
 from cinder import utils
 from cinder.volume import volume_types
 from cinder.volume import volume_utils
@@ -59,15 +61,32 @@ host_manager_opts = [
                default='cinder.scheduler.weights.OrderedHostWeightHandler',
                help='Which handler to use for selecting the host/pool '
                     'after weighing'),
+    cfg.IntOpt('scheduler_service_list_cache_time',
+               default=0,
+               min=0,
+               help='Number of seconds the scheduler reuses the list of '
+                    'volume services read from the database to build the '
+                    'backend states. With the default of 0 the list is read '
+                    'on every scheduling request. Capabilities reported by '
+                    'the volume services are applied regardless of this '
+                    'value. Cached services are checked for being up with '
+                    'their last report, so the value is capped to '
+                    'service_down_time - report_interval.'),
 ]
 
 CONF = cfg.CONF
 CONF.register_opts(host_manager_opts)
 CONF.import_opt('scheduler_driver', 'cinder.scheduler.manager')
 CONF.import_opt('max_over_subscription_ratio', 'cinder.volume.driver')
+CONF.import_opt('report_interval', 'cinder.service')
 
 LOG = logging.getLogger(__name__)
 
+# Fields of a volume service the scheduler uses, changes to other fields like
+# updated_at don't require updating the backend state.
+SERVICE_STATE_FIELDS = ('host', 'cluster_name', 'disabled', 'frozen',
+                        'availability_zone')
+
 
 class ReadOnlyDict(abc.Mapping):
     """A read-only dict."""
@@ -469,6 +488,15 @@ class HostManager(object):
         'max_over_subscription_ratio',
         'reserved_percentage'])
 
+    # Capabilities with an index of the pools reporting each of their values,
+    # used to narrow down the pools before running the CapabilitiesFilter.
+    INDEXED_CAPABILITIES = (
+        'storage_protocol',
+        'vendor_name',
+        'thin_provisioning_support',
+        'thick_provisioning_support',
+        'multiattach')
+
     def __init__(self):
         self.service_states = {}  # { <host|cluster>: {<service>: {cap k : v}}}
         self.backend_state_map: dict[str, BackendState] = {}
@@ -484,6 +512,15 @@ class HostManager(object):
         self.weight_classes = self.weight_handler.get_all_classes()
 
         self._no_capabilities_backends = set()  # Services without capabilities
+        self._volume_services = None
+        self._volume_services_time = None
+        self._service_list_cache_time = self._get_service_list_cache_time()
+        # Capabilities last applied to each entry in backend_state_map
+        self._applied_capabilities: dict[str, dict] = {}
+        self._pool_index_dirty = True
+        self._all_pools: dict[str, PoolState] = {}
+        self._pool_capability_index: dict = {}
+        self._pool_az_index: dict = {}
         self._update_backend_state_map(cinder_context.get_admin_context())
         self.service_states_last_update = {}
 
@@ -675,16 +712,45 @@ class HostManager(object):
                 len(set(self.backend_state_map)) > 0 and
                 len(self._no_capabilities_backends) == 0)
 
+    @staticmethod
+    def _get_service_list_cache_time() -> int:
+        # Services that reported report_interval seconds ago must not be
+        # considered down before the cached list is read again.
+        max_cache_time = max(CONF.service_down_time - CONF.report_interval, 0)
+        cache_time = CONF.scheduler_service_list_cache_time
+        if cache_time > max_cache_time:
+            LOG.warning("scheduler_service_list_cache_time (%(cache_time)s) "
+                        "must be lower than service_down_time - "
+                        "report_interval, using %(max_cache_time)s instead.",
+                        {'cache_time': cache_time,
+                         'max_cache_time': max_cache_time})
+            cache_time = max_cache_time
+        return cache_time
+
+    def _get_volume_services(
+            self,
+            context: cinder_context.RequestContext) -> objects.ServiceList:
+        cache_time = self._service_list_cache_time
+        if (cache_time and self._volume_services_time and
+                not timeutils.is_older_than(self._volume_services_time,
+                                            cache_time)):
+            return self._volume_services
+
+        topic = constants.VOLUME_TOPIC
+        self._volume_services = objects.ServiceList.get_all(context,
+                                                            {'topic': topic,
+                                                             'disabled': False,
+                                                             'frozen': False})
+        if cache_time:
+            self._volume_services_time = timeutils.utcnow()
+        return self._volume_services
+
     def _update_backend_state_map(
             self,
             context: cinder_context.RequestContext) -> None:
 
         # Get resource usage across the available volume nodes:
-        topic = constants.VOLUME_TOPIC
-        volume_services = objects.ServiceList.get_all(context,
-                                                      {'topic': topic,
-                                                       'disabled': False,
-                                                       'frozen': False})
+        volume_services = self._get_volume_services(context)
         active_backends = set()
         active_hosts = set()
         no_capabilities_backends = set()
@@ -711,17 +777,28 @@ class HostManager(object):
 
             # Since the service could have been added or remove from a cluster
             backend_state = self.backend_state_map.get(backend_key, None)
+            service_dict = dict(service)
             if not backend_state:
                 backend_state = self.backend_state_cls(
                     host,
                     service.cluster_name,
                     capabilities=capabilities,
-                    service=dict(service))
+                    service=service_dict)
                 self.backend_state_map[backend_key] = backend_state
+            elif (self._applied_capabilities.get(backend_key) is
+                    capabilities and
+                    not self._service_changed(backend_state.service,
+                                              service_dict)):
+                # Nothing has changed since the last time, and applying the
+                # same capabilities again wouldn't change the backend state.
+                active_backends.add(backend_key)
+                continue
 
             # update capabilities and attributes in backend_state
             backend_state.update_from_volume_capability(capabilities,
-                                                        service=dict(service))
+                                                        service=service_dict)
+            self._applied_capabilities[backend_key] = capabilities
+            self._pool_index_dirty = True
             active_backends.add(backend_key)
 
         self._no_capabilities_backends = no_capabilities_backends
@@ -736,6 +813,16 @@ class HostManager(object):
                 LOG.info("Removing non-active backend: %(backend)s from "
                          "scheduler cache.", {'backend': backend_key})
             del self.backend_state_map[backend_key]
+            self._applied_capabilities.pop(backend_key, None)
+            self._pool_index_dirty = True
+
+    @staticmethod
+    def _service_changed(old_service: Optional[abc.Mapping],
+                         new_service: abc.Mapping) -> bool:
+        if old_service is None:
+            return True
+        return any(old_service.get(field) != new_service.get(field)
+                   for field in SERVICE_STATE_FIELDS)
 
     def revert_volume_consumed_capacity(self,
                                         pool_name: str,
@@ -747,31 +834,120 @@ class HostManager(object):
                     pool_state.consume_from_volume({'size': -size},
                                                    update_time=False)
 
+    def _update_pool_index(self) -> None:
+        """Rebuild the pool map and indexes if any backend has changed."""
+        if not self._pool_index_dirty:
+            return
+
+        all_pools = {}
+        capability_index: dict = {
+            name: collections.defaultdict(set)
+            for name in self.INDEXED_CAPABILITIES}
+        az_index = collections.defaultdict(set)
+        for backend_key, state in self.backend_state_map.items():
+            for key in state.pools:
+                pool = state.pools[key]
+                # use backend_key.pool_name to make sure key is unique
+                pool_key = '.'.join([backend_key, pool.pool_name])
+                all_pools[pool_key] = pool
+                az_index[pool.service.get('availability_zone')].add(pool_key)
+                capabilities = pool.capabilities or {}
+                for name in self.INDEXED_CAPABILITIES:
+                    # Pools not reporting the capability can never pass the
+                    # CapabilitiesFilter for it, so they are not indexed.
+                    if name not in capabilities:
+                        continue
+                    value = capabilities[name]
+                    values = value if isinstance(value, list) else [value]
+                    for value in values:
+                        # Unhashable values are indexed under None with the
+                        # pools always being candidates.
+                        try:
+                            capability_index[name][value].add(pool_key)
+                        except TypeError:
+                            capability_index[name][None].add(pool_key)
+
+        self._all_pools = all_pools
+        self._pool_capability_index = capability_index
+        self._pool_az_index = az_index
+        self._pool_index_dirty = False
+
+    def _get_candidate_pool_keys(self,
+                                 filter_properties: dict) -> Optional[set]:
+        """Return the keys of the pools that may pass the enabled filters.
+
+        Uses the pool indexes to apply the availability zone and the indexed
+        capabilities requirements of the request, so the filters only need to
+        run on pools that can pass them. Returns None when the request can't
+        be narrowed down.
+        """
+        filter_names = {cls.__name__ for cls in self.enabled_filters}
+        candidates = None
+
+        if 'AvailabilityZoneFilter' in filter_names:
+            spec = filter_properties.get('request_spec') or {}
+            availability_zones = spec.get('availability_zones')
+            if not availability_zones:
+                props = spec.get('resource_properties') or {}
+                availability_zone = props.get('availability_zone')
+                availability_zones = ([availability_zone]
+                                      if availability_zone else None)
+            if availability_zones:
+                candidates = set()
+                for availability_zone in availability_zones:
+                    candidates |= self._pool_az_index.get(availability_zone,
+                                                          set())
+
+        if 'CapabilitiesFilter' in filter_names:
+            resource_type = filter_properties.get('resource_type') or {}
+            extra_specs = resource_type.get('extra_specs', None) or {}
+            for key, req in extra_specs.items():
+                scope = key.split(':')
+                if scope[0] == 'capabilities':
+                    del scope[0]
+                if (len(scope) != 1 or
+                        scope[0] not in self.INDEXED_CAPABILITIES):
+                    continue
+                index = self._pool_capability_index[scope[0]]
+                matching = set(index.get(None, set()))
+                for value, pool_keys in index.items():
+                    if value is not None and extra_specs_ops.match(value, req):
+                        matching |= pool_keys
+                candidates = (matching if candidates is None
+                              else candidates & matching)
+
+        return candidates
+
     def get_all_backend_states(
             self,
-            context: cinder_context.RequestContext) -> Iterable:
+            context: cinder_context.RequestContext,
+            filter_properties: Optional[dict] = None) -> Iterable:
         """Returns a dict of all the backends the HostManager knows about.
 
         Each of the consumable resources in BackendState are
         populated with capabilities scheduler received from RPC.
 
+        If filter_properties are given only the pools that may pass the
+        enabled filters for them are returned.
+
         For example:
           {'192.168.1.100': BackendState(), ...}
         """
 
         self._update_backend_state_map(context)
-
-        # build a pool_state map and return that map instead of
-        # backend_state_map
-        all_pools = {}
-        for backend_key, state in self.backend_state_map.items():
-            for key in state.pools:
-                pool = state.pools[key]
-                # use backend_key.pool_name to make sure key is unique
-                pool_key = '.'.join([backend_key, pool.pool_name])
-                all_pools[pool_key] = pool
-
-        return all_pools.values()
+        self._update_pool_index()
+
+        if filter_properties:
+            candidates = self._get_candidate_pool_keys(filter_properties)
+            if candidates is not None:
+                LOG.debug("Pool index narrowed down %(total)d pools to "
+                          "%(count)d candidates.",
+                          {'total': len(self._all_pools),
+                           'count': len(candidates)})
+                return [pool for pool_key, pool in self._all_pools.items()
+                        if pool_key in candidates]
+
+        return list(self._all_pools.values())
 
     def _filter_pools_by_volume_type(
             self,
@@ -35,6 +35,7 @@ from oslo_utils import versionutils
 
 from cinder.backup import rpcapi as backup_rpcapi
 from cinder import context
+from cinder import coordination
 from cinder import db
 from cinder import exception
 from cinder import flow_utils
@@ -109,6 +110,7 @@ class SchedulerManager(manager.CleanableManager, manager.Manager):
         self.message_api = mess_api.API()
         self.rpc_api_version = versionutils.convert_version_to_int(
             self.RPC_API_VERSION)
+        self._purge_thread = None
 
     def init_host_with_rpc(self):
         ctxt = context.get_admin_context()
@@ -136,6 +138,34 @@ class SchedulerManager(manager.CleanableManager, manager.Manager):
     def _clean_expired_reservation(self, context):
         QUOTAS.expire(context)
 
+    @periodic_task.periodic_task(spacing=CONF.db_purge_interval,
+                                 enabled=CONF.db_purge_interval > 0)
+    def _purge_deleted_rows(self, context):
+        # The purge can take long, run it in its own green thread so it
+        # doesn't delay the other periodic tasks.
+        if self._purge_thread is not None and not self._purge_thread.dead:
+            LOG.debug('Previous purge of deleted rows still running, '
+                      'skipping.')
+            return
+        self._purge_thread = eventlet.spawn(self._do_purge_deleted_rows,
+                                            context)
+
+    def _do_purge_deleted_rows(self, context):
+        # Only one scheduler purges the deleted rows at a time.
+        lock = coordination.COORDINATOR.get_lock('purge_deleted_rows')
+        if not lock.acquire(blocking=False):
+            LOG.debug('Deleted rows are being purged by another scheduler, '
+                      'skipping.')
+            return
+        try:
+            db.purge_deleted_rows(
+                context, CONF.db_purge_age_in_days,
+                max_rows_per_second=CONF.db_purge_periodic_max_rows_per_second)
+        except Exception:
+            LOG.exception('Failed to purge deleted rows from the database.')
+        finally:
+            lock.release()
+
     def update_service_capabilities(self, context, service_name=None,
                                     host=None, capabilities=None,
                                     cluster_name=None, timestamp=None,
@@ -441,6 +441,11 @@ class Service(service.Service):
         except Exception:
             pass
 
+        try:
+            self.manager.cleanup_host()
+        except Exception:
+            LOG.exception('Failed to clean up %s on shutdown.', self.binary)
+
         if self.coordination:
             try:
                 coordination.COORDINATOR.stop()
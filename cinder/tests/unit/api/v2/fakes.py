@@ -165,7 +165,8 @@ def fake_volume_api_get(self, context, volume_id, viewable_admin_meta=False):
 
 def fake_volume_get_all(context, search_opts=None, marker=None, limit=None,
                         sort_keys=None, sort_dirs=None, filters=None,
-                        viewable_admin_meta=False, offset=None):
+                        viewable_admin_meta=False, offset=None,
+                        summary=False):
     return [create_fake_volume(fake.VOLUME_ID, project_id=fake.PROJECT_ID),
             create_fake_volume(fake.VOLUME2_ID, project_id=fake.PROJECT2_ID),
             create_fake_volume(fake.VOLUME3_ID, project_id=fake.PROJECT3_ID)]
@@ -174,7 +175,8 @@ def fake_volume_get_all(context, search_opts=None, marker=None, limit=None,
 def fake_volume_get_all_by_project(self, context, marker, limit,
                                    sort_keys=None, sort_dirs=None,
                                    filters=None,
-                                   viewable_admin_meta=False, offset=None):
+                                   viewable_admin_meta=False, offset=None,
+                                   summary=False):
     return [fake_volume_get(self, context, fake.VOLUME_ID,
                             viewable_admin_meta=True)]
 
@@ -183,7 +185,7 @@ def fake_volume_api_get_all_by_project(self, context, marker, limit,
                                        sort_keys=None, sort_dirs=None,
                                        filters=None,
                                        viewable_admin_meta=False,
-                                       offset=None):
+                                       offset=None, summary=False):
     vol = fake_volume_get(self, context, fake.VOLUME_ID,
                           viewable_admin_meta=viewable_admin_meta)
     vol_obj = fake_volume.fake_volume_obj(context, **vol)
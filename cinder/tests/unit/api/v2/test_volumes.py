@@ -913,7 +913,7 @@ class VolumeApiTest(test.TestCase):
                                            sort_keys=None, sort_dirs=None,
                                            filters=None,
                                            viewable_admin_meta=False,
-                                           offset=0):
+                                           offset=0, summary=False):
             return [
                 v2_fakes.create_fake_volume(fake.VOLUME_ID,
                                             display_name='vol1'),
@@ -1020,7 +1020,7 @@ class VolumeApiTest(test.TestCase):
                                            sort_keys=None, sort_dirs=None,
                                            filters=None,
                                            viewable_admin_meta=False,
-                                           offset=0):
+                                           offset=0, summary=False):
             return [
                 v2_fakes.create_fake_volume(fake.VOLUME_ID,
                                             display_name='vol1'),
@@ -1205,7 +1205,7 @@ class VolumeApiTest(test.TestCase):
                                            sort_keys=None, sort_dirs=None,
                                            filters=None,
                                            viewable_admin_meta=False,
-                                           offset=0):
+                                           offset=0, summary=False):
             self.assertTrue(filters['no_migration_targets'])
             self.assertNotIn('all_tenants', filters)
             return [v2_fakes.create_fake_volume(fake.VOLUME_ID,
@@ -1214,7 +1214,8 @@ class VolumeApiTest(test.TestCase):
         def fake_volume_get_all(context, marker, limit,
                                 sort_keys=None, sort_dirs=None,
                                 filters=None,
-                                viewable_admin_meta=False, offset=0):
+                                viewable_admin_meta=False, offset=0,
+                                summary=False):
             return []
         self.mock_object(db, 'volume_get_all_by_project',
                          fake_volume_get_all_by_project)
@@ -1233,7 +1234,7 @@ class VolumeApiTest(test.TestCase):
                                             sort_keys=None, sort_dirs=None,
                                             filters=None,
                                             viewable_admin_meta=False,
-                                            offset=0):
+                                            offset=0, summary=False):
             self.assertNotIn('no_migration_targets', filters)
             return [v2_fakes.create_fake_volume(fake.VOLUME_ID,
                                                 display_name='vol2')]
@@ -1241,7 +1242,8 @@ class VolumeApiTest(test.TestCase):
         def fake_volume_get_all2(context, marker, limit,
                                  sort_keys=None, sort_dirs=None,
                                  filters=None,
-                                 viewable_admin_meta=False, offset=0):
+                                 viewable_admin_meta=False, offset=0,
+                                 summary=False):
             return []
         self.mock_object(db, 'volume_get_all_by_project',
                          fake_volume_get_all_by_project2)
@@ -1258,13 +1260,14 @@ class VolumeApiTest(test.TestCase):
                                             sort_keys=None, sort_dirs=None,
                                             filters=None,
                                             viewable_admin_meta=False,
-                                            offset=0):
+                                            offset=0, summary=False):
             return []
 
         def fake_volume_get_all3(context, marker, limit,
                                  sort_keys=None, sort_dirs=None,
                                  filters=None,
-                                 viewable_admin_meta=False, offset=0):
+                                 viewable_admin_meta=False, offset=0,
+                                 summary=False):
             self.assertNotIn('no_migration_targets', filters)
             self.assertNotIn('all_tenants', filters)
             return [v2_fakes.create_fake_volume(fake.VOLUME3_ID,
@@ -1506,7 +1509,7 @@ class VolumeApiTest(test.TestCase):
             context, None, CONF.osapi_max_limit,
             sort_keys=['created_at'], sort_dirs=['desc'],
             filters={'display_name': display_name},
-            viewable_admin_meta=True, offset=0)
+            viewable_admin_meta=True, offset=0, summary=False)
 
     @mock.patch('cinder.volume.api.API.get_all')
     def test_get_volumes_filter_with_string(self, get_all):
@@ -1547,7 +1550,7 @@ class VolumeApiTest(test.TestCase):
             context, None, CONF.osapi_max_limit,
             sort_keys=['created_at'], sort_dirs=['desc'],
             filters={'display_name': 'Volume-573108026', 'bootable': True},
-            viewable_admin_meta=True, offset=0)
+            viewable_admin_meta=True, offset=0, summary=False)
 
     @mock.patch('cinder.volume.api.API.get_all')
     def test_get_volumes_filter_with_false(self, get_all):
@@ -1561,7 +1564,7 @@ class VolumeApiTest(test.TestCase):
             context, None, CONF.osapi_max_limit,
             sort_keys=['created_at'], sort_dirs=['desc'],
             filters={'display_name': 'Volume-573108026', 'bootable': False},
-            viewable_admin_meta=True, offset=0)
+            viewable_admin_meta=True, offset=0, summary=False)
 
     @mock.patch('cinder.volume.api.API.get_all')
     def test_get_volumes_filter_with_list(self, get_all):
@@ -1577,7 +1580,7 @@ class VolumeApiTest(test.TestCase):
             sort_keys=['created_at'], sort_dirs=['desc'],
             filters={'id': [fake.VOLUME_ID, fake.VOLUME2_ID, fake.VOLUME3_ID]},
             viewable_admin_meta=True,
-            offset=0)
+            offset=0, summary=False)
 
     @mock.patch('cinder.volume.api.API.get_all')
     def test_get_volumes_filter_with_expression(self, get_all):
@@ -1590,7 +1593,8 @@ class VolumeApiTest(test.TestCase):
         get_all.assert_called_once_with(
             context, None, CONF.osapi_max_limit,
             sort_keys=['created_at'], sort_dirs=['desc'],
-            filters={'display_name': 'd-'}, viewable_admin_meta=True, offset=0)
+            filters={'display_name': 'd-'}, viewable_admin_meta=True, offset=0,
+            summary=False)
 
     @mock.patch('cinder.volume.api.API.get_all')
     def test_get_volumes_filter_with_status(self, get_all):
@@ -1605,7 +1609,7 @@ class VolumeApiTest(test.TestCase):
             ctxt, None, CONF.osapi_max_limit,
             sort_keys=['created_at'], sort_dirs=['desc'],
             filters={'status': 'available'}, viewable_admin_meta=True,
-            offset=0)
+            offset=0, summary=False)
 
     @mock.patch('cinder.volume.api.API.get_all')
     def test_get_volumes_filter_with_metadata(self, get_all):
@@ -1620,7 +1624,7 @@ class VolumeApiTest(test.TestCase):
             ctxt, None, CONF.osapi_max_limit,
             sort_keys=['created_at'], sort_dirs=['desc'],
             filters={'metadata': {'fake_key': 'fake_value'}},
-            viewable_admin_meta=True, offset=0)
+            viewable_admin_meta=True, offset=0, summary=False)
 
     @mock.patch('cinder.volume.api.API.get_all')
     def test_get_volumes_filter_with_availability_zone(self, get_all):
@@ -1635,7 +1639,7 @@ class VolumeApiTest(test.TestCase):
             ctxt, None, CONF.osapi_max_limit,
             sort_keys=['created_at'], sort_dirs=['desc'],
             filters={'availability_zone': 'nova'}, viewable_admin_meta=True,
-            offset=0)
+            offset=0, summary=False)
 
     @mock.patch('cinder.volume.api.API.get_all')
     def test_get_volumes_filter_with_bootable(self, get_all):
@@ -1650,7 +1654,7 @@ class VolumeApiTest(test.TestCase):
             ctxt, None, CONF.osapi_max_limit,
             sort_keys=['created_at'], sort_dirs=['desc'],
             filters={'bootable': True}, viewable_admin_meta=True,
-            offset=0)
+            offset=0, summary=False)
 
     @mock.patch('cinder.volume.api.API.get_all')
     def test_get_volumes_filter_with_invalid_filter(self, get_all):
@@ -1666,7 +1670,7 @@ class VolumeApiTest(test.TestCase):
             ctxt, None, CONF.osapi_max_limit,
             sort_keys=['created_at'], sort_dirs=['desc'],
             filters={'availability_zone': 'nova'}, viewable_admin_meta=True,
-            offset=0)
+            offset=0, summary=False)
 
     @mock.patch('cinder.volume.api.API.get_all')
     def test_get_volumes_sort_by_name(self, get_all):
@@ -1682,7 +1686,7 @@ class VolumeApiTest(test.TestCase):
         get_all.assert_called_once_with(
             ctxt, None, CONF.osapi_max_limit,
             sort_dirs=['desc'], viewable_admin_meta=True,
-            sort_keys=['display_name'], filters={}, offset=0)
+            sort_keys=['display_name'], filters={}, offset=0, summary=False)
 
     def test_get_volume_filter_options_using_config(self):
         filter_list = ["name", "status", "metadata", "bootable",
@@ -0,0 +1,132 @@
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+from http import HTTPStatus
+from unittest import mock
+
+import ddt
+from oslo_serialization import jsonutils
+import webob
+
+from cinder.api import microversions as mv
+from cinder.api.v3 import router as router_v3
+from cinder.common import constants
+from cinder import context
+from cinder import exception
+from cinder import objects
+from cinder.tests.unit.api import fakes
+from cinder.tests.unit import fake_constants as fake
+from cinder.tests.unit import test
+
+
+def app():
+    # no auth, just let environ['cinder.context'] pass through
+    api = router_v3.APIRouter()
+    mapper = fakes.urlmap.URLMap()
+    mapper['/v3'] = api
+    return mapper
+
+
+@ddt.ddt
+@mock.patch('cinder.volume.rpcapi.VolumeAPI.warm_image_cache')
+@mock.patch('cinder.volume.api.API._get_service_by_host_cluster')
+@mock.patch('cinder.image.glance.GlanceImageService.show')
+class ImageVolumeCacheTestCase(test.TestCase):
+    """Test Case for the image volume cache API."""
+    def setUp(self):
+        super(ImageVolumeCacheTestCase, self).setUp()
+
+        self.context = context.RequestContext(user_id=None,
+                                              project_id=fake.PROJECT_ID,
+                                              is_admin=True,
+                                              read_deleted='no',
+                                              overwrite=False)
+        self.service = objects.Service(id=1, host='host1',
+                                       binary=constants.VOLUME_BINARY)
+
+    def _get_resp_post(self, body, version=mv.IMAGE_VOLUME_CACHE_WARM,
+                       ctxt=None):
+        """Helper to execute a POST image_volume_cache API call."""
+        req = webob.Request.blank('/v3/%s/image_volume_cache/warm' %
+                                  fake.PROJECT_ID)
+        req.method = 'POST'
+        req.headers['Content-Type'] = 'application/json'
+        req.headers['OpenStack-API-Version'] = 'volume ' + version
+        req.environ['cinder.context'] = ctxt or self.context
+        req.body = jsonutils.dump_as_bytes(body)
+        res = req.get_response(app())
+        return res
+
+    @ddt.data({'host': 'host1@lvm#pool'},
+              {'cluster_name': 'cluster@lvm'})
+    def test_warm(self, location, show_mock, service_mock, rpc_mock):
+        service_mock.return_value = self.service
+        body = dict(image_id=fake.IMAGE_ID, **location)
+
+        res = self._get_resp_post(body)
+
+        self.assertEqual(HTTPStatus.ACCEPTED, res.status_code)
+        service_mock.assert_called_once_with(mock.ANY,
+                                             location.get('host'),
+                                             location.get('cluster_name'),
+                                             'image-volume cache')
+        show_mock.assert_called_once_with(mock.ANY, fake.IMAGE_ID)
+        rpc_mock.assert_called_once_with(mock.ANY,
+                                         list(location.values())[0],
+                                         fake.IMAGE_ID)
+
+    def test_warm_old_api_version(self, show_mock, service_mock, rpc_mock):
+        res = self._get_resp_post(
+            {'image_id': fake.IMAGE_ID, 'host': 'host1@lvm'},
+            mv.get_prior_version(mv.IMAGE_VOLUME_CACHE_WARM))
+        self.assertEqual(HTTPStatus.NOT_FOUND, res.status_code)
+        rpc_mock.assert_not_called()
+
+    def test_warm_not_authorized(self, show_mock, service_mock, rpc_mock):
+        ctxt = context.RequestContext(user_id=None,
+                                      project_id=fake.PROJECT_ID,
+                                      is_admin=False,
+                                      read_deleted='no',
+                                      overwrite=False)
+        res = self._get_resp_post(
+            {'image_id': fake.IMAGE_ID, 'host': 'host1@lvm'}, ctxt=ctxt)
+        self.assertEqual(HTTPStatus.FORBIDDEN, res.status_code)
+        rpc_mock.assert_not_called()
+
+    @ddt.data({'image_id': fake.IMAGE_ID},
+              {'image_id': fake.IMAGE_ID, 'host': 'host1@lvm',
+               'cluster_name': 'cluster@lvm'},
+              {'image_id': 'non UUID', 'host': 'host1@lvm'},
+              {'host': 'host1@lvm'},
+              {'image_id': fake.IMAGE_ID, 'host': 'host1@lvm',
+               'fake_key': 'value'})
+    def test_warm_wrong_param(self, body, show_mock, service_mock,
+                              rpc_mock):
+        res = self._get_resp_post(body)
+        self.assertEqual(HTTPStatus.BAD_REQUEST, res.status_code)
+        rpc_mock.assert_not_called()
+
+    def test_warm_service_not_found(self, show_mock, service_mock, rpc_mock):
+        service_mock.side_effect = exception.ServiceNotFound(
+            service_id='host1@lvm')
+        res = self._get_resp_post({'image_id': fake.IMAGE_ID,
+                                   'host': 'host1@lvm'})
+        self.assertEqual(HTTPStatus.NOT_FOUND, res.status_code)
+        rpc_mock.assert_not_called()
+
+    def test_warm_image_not_found(self, show_mock, service_mock, rpc_mock):
+        service_mock.return_value = self.service
+        show_mock.side_effect = exception.ImageNotFound(image_id=fake.IMAGE_ID)
+        res = self._get_resp_post({'image_id': fake.IMAGE_ID,
+                                   'host': 'host1@lvm'})
+        self.assertEqual(HTTPStatus.NOT_FOUND, res.status_code)
+        rpc_mock.assert_not_called()
@@ -218,6 +218,9 @@ class BackupCephTestCase(test.TestCase):
 
         self.volume_file.seek(0)
 
+        # The pool of connections is shared by the drivers of the service.
+        self.addCleanup(ceph.CephBackupDriver.cleanup_connections)
+
         # Always trigger an exception if a command is executed since it should
         # always be dealt with gracefully. At time of writing on rbd
         # export/import-diff is executed and if they fail we expect to find
@@ -298,6 +301,61 @@ class BackupCephTestCase(test.TestCase):
         self.assertFalse(oldformat)
         self.assertEqual(1 | 2 | 4 | 8 | 16 | 64, features)
 
+    @common_mocks
+    def test_connect_to_rados_reuses_pooled_connection(self):
+        client = self.mock_rados.Rados.return_value
+        client.state = 'connected'
+        client.open_ioctx.return_value.state = 'open'
+
+        with rbd_driver.RADOSClient(self.service) as first:
+            pass
+        with rbd_driver.RADOSClient(self.service) as second:
+            pass
+
+        self.assertIs(first.cluster, second.cluster)
+        client.connect.assert_called_once_with()
+        client.open_ioctx.assert_called_once_with('backups')
+        client.shutdown.assert_not_called()
+
+    @common_mocks
+    def test_connect_to_rados_pool_shared_by_drivers(self):
+        client = self.mock_rados.Rados.return_value
+        client.state = 'connected'
+        client.open_ioctx.return_value.state = 'open'
+
+        with rbd_driver.RADOSClient(self.service) as first:
+            pass
+        other_service = ceph.CephBackupDriver(self.ctxt)
+        with rbd_driver.RADOSClient(other_service) as second:
+            pass
+
+        self.assertIs(first.cluster, second.cluster)
+        client.connect.assert_called_once_with()
+
+        ceph.CephBackupDriver.cleanup_connections()
+
+        client.shutdown.assert_called_once_with()
+        with rbd_driver.RADOSClient(other_service):
+            pass
+        self.assertEqual(2, client.connect.call_count)
+
+    @common_mocks
+    def test_connect_to_rados_discards_connection_on_error(self):
+        client = self.mock_rados.Rados.return_value
+        client.state = 'connected'
+        client.open_ioctx.return_value.state = 'open'
+
+        def _use_connection():
+            with rbd_driver.RADOSClient(self.service):
+                raise MockImageNotFoundException()
+
+        self.assertRaises(MockImageNotFoundException, _use_connection)
+        with rbd_driver.RADOSClient(self.service):
+            pass
+
+        self.assertEqual(2, client.connect.call_count)
+        client.shutdown.assert_called_once_with()
+
     @common_mocks
     def test_get_backup_snap_name(self):
         snap_name = 'backup.%s.snap.3824923.1412' % (fake.VOLUME3_ID)
@@ -1060,7 +1118,7 @@ class BackupCephTestCase(test.TestCase):
                 # Check that the _get_backup_base_name was called
                 # twice due to the exception
                 self.assertEqual(mock_name.call_count, 2)
-                self.assertEqual(mock_proxy.call_count, 2)
+                self.assertEqual(mock_proxy.call_count, 1)
 
     @common_mocks
     def test_discard_bytes(self):
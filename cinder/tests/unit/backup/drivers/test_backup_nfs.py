@@ -894,6 +894,10 @@ class BackupNFSTestCase(test.TestCase):
             self.assertTrue(filecmp.cmp(self.volume_file.name,
                             restored_file.name))
 
+    def test_restore_delta_binary_sha256file(self):
+        self.flags(backup_sha256file_format='binary')
+        self.test_restore_delta()
+
     def test_delete(self):
         volume_id = fake.VOLUME_ID
         self._create_backup_db_entry(volume_id=volume_id)
@@ -392,6 +392,12 @@ class BackupTestCase(BaseBackupTest):
                          volume_rpcapi.client.serializer._base.version_cap)
         self.assertIsNone(volume_rpcapi.client.serializer._base.manifest)
 
+    def test_cleanup_host(self):
+        with mock.patch.object(self.backup_mgr.service,
+                               'cleanup_connections') as mock_cleanup:
+            self.backup_mgr.cleanup_host()
+        mock_cleanup.assert_called_once_with()
+
     @ddt.data(True, False)
     def test_is_working(self, initialized):
         self.backup_mgr.is_initialized = initialized
@@ -13,7 +13,10 @@
 #    under the License.
 """Tests for the base chunkedbackupdriver class."""
 
+import hashlib
 import json
+import os
+import time
 from unittest import mock
 
 from oslo_config import cfg
@@ -211,6 +214,12 @@ class ChunkedDriverTestCase(test.TestCase):
     def test_get_compressor_zstd(self):
         self.assertIn('zstd', str(self.driver._get_compressor('zstd')))
 
+    def test_get_compressor_lz4(self):
+        lz4 = mock.MagicMock()
+        with mock.patch.dict('sys.modules', {'lz4': lz4,
+                                             'lz4.frame': lz4.frame}):
+            self.assertEqual(lz4.frame, self.driver._get_compressor('lz4'))
+
     def test_get_compressor_invalid(self):
         self.assertRaises(ValueError, self.driver._get_compressor, 'winzip')
 
@@ -292,6 +301,48 @@ class ChunkedDriverTestCase(test.TestCase):
                              metadata.get('chunk_size'))
             self.assertEqual(['sha'], metadata.get('sha256s'))
 
+    def test_write_sha256file_binary(self):
+        self.override_config('backup_sha256file_format', 'binary')
+        digests = [hashlib.sha256(b'a').hexdigest(),
+                   hashlib.sha256(b'b').hexdigest()]
+        obj_writer = TestObjectWriter('', '')
+        with mock.patch.object(self.driver, 'get_object_writer',
+                               return_value=obj_writer):
+            self.driver._write_sha256file(self.backup, 'volid', 'contain_name',
+                                          digests)
+
+        written_data = obj_writer.written_data
+        self.assertTrue(written_data.startswith(cbd._SHA256FILE_MAGIC))
+        self.assertEqual(b''.join(bytes.fromhex(sha) for sha in digests),
+                         written_data[-64:])
+
+        obj_reader = mock.MagicMock()
+        obj_reader.__enter__.return_value.read.return_value = written_data
+        with mock.patch.object(self.driver, 'get_object_reader',
+                               return_value=obj_reader):
+            sha256file = self.driver._read_sha256file(self.backup)
+
+        self.assertEqual(self.backup.id, sha256file['backup_id'])
+        self.assertEqual(self.driver.sha_block_size_bytes,
+                         sha256file['chunk_size'])
+        self.assertIsInstance(sha256file['sha256s'], cbd._DigestList)
+        self.assertEqual(2, len(sha256file['sha256s']))
+        self.assertEqual(digests, list(sha256file['sha256s']))
+        self.assertEqual(digests[1], sha256file['sha256s'][-1])
+
+    def test_changed_blocks(self):
+        def _digests(*blocks):
+            return b''.join(hashlib.sha256(b).digest() for b in blocks)
+
+        parent = _digests(b'a', b'b', b'c', b'd', b'e', b'f')
+        self.assertEqual([], cbd._changed_blocks(
+            _digests(b'c', b'd', b'e'), parent, 2))
+        self.assertEqual([(0, 2), (3, 4)], cbd._changed_blocks(
+            _digests(b'x', b'y', b'c', b'z', b'e'), parent, 0))
+        # Blocks beyond the end of the parent list are always changed.
+        self.assertEqual([(1, 3)], cbd._changed_blocks(
+            _digests(b'f', b'g', b'h'), parent, 5))
+
     def test_read_metadata(self):
         obj_reader = TestObjectReader('', '')
         with mock.patch.object(self.driver, 'get_object_reader',
@@ -381,6 +432,89 @@ class ChunkedDriverTestCase(test.TestCase):
         self.assertEqual(0, chunk['offset'])
         self.assertEqual(len(TEST_DATA), chunk['length'])
 
+    def test_estimate_entropy(self):
+        self.assertEqual(0.0, cbd._estimate_entropy(b''))
+        self.assertEqual(0.0, cbd._estimate_entropy(b'\0' * units.Mi))
+        self.assertAlmostEqual(1.0, cbd._estimate_entropy(b'ab' * units.Ki))
+        self.assertGreater(cbd._estimate_entropy(os.urandom(units.Mi)),
+                           cbd._INCOMPRESSIBLE_ENTROPY)
+
+    def test_prepare_output_data_skip_incompressible(self):
+        self.override_config('backup_compression_skip_incompressible', True)
+        self.driver.compressor = mock.Mock()
+        stats = {'original_bytes': 0, 'compressed_bytes': 0,
+                 'compression_seconds': 0.0, 'skipped_chunks': 0}
+        data = os.urandom(units.Mi)
+
+        result = self.driver._prepare_output_data(data, stats)
+
+        self.assertEqual(('none', data), result)
+        self.driver.compressor.compress.assert_not_called()
+        self.assertEqual({'original_bytes': units.Mi,
+                          'compressed_bytes': units.Mi,
+                          'compression_seconds': 0.0,
+                          'skipped_chunks': 1}, stats)
+
+    def test_prepare_output_data_stats(self):
+        self.driver.compressor = self.driver._get_compressor('zlib')
+        stats = {'original_bytes': 0, 'compressed_bytes': 0,
+                 'compression_seconds': 0.0, 'skipped_chunks': 0}
+
+        algorithm, output = self.driver._prepare_output_data(TEST_DATA, stats)
+
+        self.assertEqual('zlib', algorithm)
+        self.assertEqual(len(TEST_DATA), stats['original_bytes'])
+        self.assertEqual(len(output), stats['compressed_bytes'])
+        self.assertEqual(0, stats['skipped_chunks'])
+
+    @mock.patch('eventlet.tpool.execute')
+    @mock.patch('time.monotonic', side_effect=[10.0, 12.5])
+    def test_prepare_output_data_stats_compression_time(self, mock_time,
+                                                        mock_execute):
+        mock_execute.side_effect = lambda f, *args: f(*args)
+        self.driver.compressor = mock.Mock(
+            **{'compress.return_value': b'compressed'})
+        stats = {'original_bytes': 0, 'compressed_bytes': 0,
+                 'compression_seconds': 0.0, 'skipped_chunks': 0}
+
+        self.driver._prepare_output_data(TEST_DATA, stats)
+
+        mock_execute.assert_called_once_with(cbd._timed_compress,
+                                             self.driver.compressor,
+                                             TEST_DATA)
+        self.assertEqual(2.5, stats['compression_seconds'])
+
+    def test_get_compression_summary(self):
+        summary = self.driver._get_compression_summary(
+            {'original_bytes': 4 * units.Mi, 'compressed_bytes': units.Mi,
+             'compression_seconds': 2.0, 'skipped_chunks': 1})
+
+        self.assertEqual({'algorithm': 'zlib',
+                          'original_bytes': 4 * units.Mi,
+                          'compressed_bytes': units.Mi,
+                          'skipped_chunks': 1,
+                          'ratio': 4.0,
+                          'throughput_mib_per_sec': 2.0}, summary)
+
+    def test_finalize_backup_compression_summary(self):
+        self.driver.compressor = self.driver._get_compressor('zlib')
+        (object_meta, object_sha256, extra_metadata, container,
+         volume_size_bytes) = self.driver._prepare_backup(self.backup)
+        object_meta['compression_stats'] = {'original_bytes': 10,
+                                            'compressed_bytes': 5,
+                                            'compression_seconds': 0.0,
+                                            'skipped_chunks': 0}
+
+        with mock.patch.object(self.driver, '_write_sha256file'), \
+                mock.patch.object(self.driver,
+                                  '_write_metadata') as mock_write:
+            self.driver._finalize_backup(self.backup, container, object_meta,
+                                         object_sha256)
+
+        compression = mock_write.call_args[0][6]
+        self.assertEqual(2.0, compression['ratio'])
+        self.assertIsNone(compression['throughput_mib_per_sec'])
+
     def test_finalize_backup(self):
         (object_meta, object_sha256, extra_metadata, container,
          volume_size_bytes) = self.driver._prepare_backup(self.backup)
@@ -447,6 +581,131 @@ class ChunkedDriverTestCase(test.TestCase):
         self.assert_notify_called(mock_notify,
                                   (['INFO', 'backup.createprogress'],))
 
+    @mock.patch('cinder.tests.unit.fake_notifier.FakeNotifier._notify')
+    def test_backup_concurrent_uploads(self, mock_notify):
+        self.driver.upload_workers = 3
+        chunks = [b'chunk-%d' % i for i in range(5)]
+        volume_file = mock.Mock()
+        volume_file.tell.side_effect = [i * 7 for i in range(6)]
+        volume_file.read.side_effect = chunks + [b'']
+        writers = {}
+
+        def get_writer(container, object_name, extra_metadata=None):
+            writers[object_name] = TestObjectWriter(container, object_name)
+            return writers[object_name]
+
+        with mock.patch.object(self.driver, 'get_object_writer',
+                               side_effect=get_writer), \
+                mock.patch.object(self.driver,
+                                  '_finalize_backup') as mock_finalize:
+            self.driver.backup(self.backup, volume_file,
+                               backup_metadata=False)
+
+        object_meta = mock_finalize.call_args[0][2]
+        self.assertEqual(6, object_meta['id'])
+        for i, (obj, data) in enumerate(zip(object_meta['list'], chunks)):
+            object_name = 'test--%05d' % (i + 1)
+            self.assertEqual([object_name], list(obj))
+            self.assertEqual(i * 7, obj[object_name]['offset'])
+            self.assertEqual(data, writers[object_name].written_data)
+            self.assertIn('md5', obj[object_name])
+
+    @mock.patch('cinder.tests.unit.fake_notifier.FakeNotifier._notify')
+    def test_backup_concurrent_upload_failure(self, mock_notify):
+        self.driver.upload_workers = 2
+        volume_file = mock.Mock()
+        volume_file.tell.side_effect = [0, 7, 14]
+        volume_file.read.side_effect = [b'chunk-0', b'chunk-1', b'']
+
+        with mock.patch.object(self.driver, 'get_object_writer',
+                               side_effect=exception.BackupDriverException(
+                                   reason='upload failed')), \
+                mock.patch.object(self.driver,
+                                  '_finalize_backup') as mock_finalize:
+            self.assertRaises(exception.BackupDriverException,
+                              self.driver.backup, self.backup, volume_file,
+                              backup_metadata=False)
+
+        mock_finalize.assert_not_called()
+
+    def test_upload_workers(self):
+        self.override_config('backup_upload_workers', 4)
+        self.mock_object(ConcreteChunkedDriver, 'SUPPORTS_CONCURRENT_WRITERS',
+                         True)
+
+        driver = ConcreteChunkedDriver(self.ctxt)
+
+        self.assertEqual(4, driver.upload_workers)
+
+    def test_upload_workers_concurrent_writers_unsupported(self):
+        self.override_config('backup_upload_workers', 4)
+
+        driver = ConcreteChunkedDriver(self.ctxt)
+
+        # Chunks are compressed concurrently, but written one at a time
+        self.assertEqual(4, driver.upload_workers)
+        self.assertIsNotNone(driver._write_lock)
+
+    @mock.patch('cinder.tests.unit.fake_notifier.FakeNotifier._notify')
+    def test_backup_concurrent_compression_serial_writes(self, mock_notify):
+        self.driver.upload_workers = 3
+        self.driver.compressor = self.driver._get_compressor('zlib')
+        chunks = [TEST_DATA[i:] for i in range(4)]
+        volume_file = mock.Mock()
+        volume_file.tell.side_effect = range(5)
+        volume_file.read.side_effect = chunks + [b'']
+        events = []
+
+        class SlowWriter(TestObjectWriter):
+            def write(self, data):
+                events.append('start')
+                time.sleep(0.01)
+                events.append('end')
+                super(SlowWriter, self).write(data)
+
+        with mock.patch.object(self.driver, 'get_object_writer',
+                               side_effect=SlowWriter), \
+                mock.patch.object(self.driver, '_finalize_backup'), \
+                mock.patch.object(self.driver, '_prepare_output_data',
+                                  wraps=self.driver._prepare_output_data
+                                  ) as mock_prepare:
+            self.driver.backup(self.backup, volume_file,
+                               backup_metadata=False)
+
+        self.assertEqual(4, mock_prepare.call_count)
+        # Writes never overlap
+        self.assertEqual(['start', 'end'] * 4, events)
+
+    def test_restore_workers(self):
+        self.override_config('backup_restore_workers', 4)
+        self.mock_object(ConcreteChunkedDriver, 'SUPPORTS_CONCURRENT_READERS',
+                         True)
+
+        driver = ConcreteChunkedDriver(self.ctxt)
+
+        self.assertEqual(4, driver.restore_workers)
+
+    def test_restore_workers_concurrent_readers_unsupported(self):
+        self.override_config('backup_restore_workers', 4)
+
+        driver = ConcreteChunkedDriver(self.ctxt)
+
+        self.assertEqual(1, driver.restore_workers)
+
+    @mock.patch('cinder.tests.unit.fake_notifier.FakeNotifier._notify')
+    @mock.patch.object(cbd, '_ChunkUploadPool')
+    def test_backup_concurrent_read_failure(self, mock_pool, mock_notify):
+        self.driver.upload_workers = 2
+        volume_file = mock.Mock()
+        volume_file.tell.side_effect = [0, 7]
+        volume_file.read.side_effect = [b'chunk-0', IOError]
+
+        self.assertRaises(IOError, self.driver.backup, self.backup,
+                          volume_file, backup_metadata=False)
+
+        mock_pool.return_value.spawn.assert_called_once()
+        mock_pool.return_value.wait.assert_called_once_with(reraise=False)
+
     def test_backup_invalid_size(self):
         self.driver.chunk_size_bytes = 999
         self.driver.sha_block_size_bytes = 1024
@@ -460,15 +719,99 @@ class ChunkedDriverTestCase(test.TestCase):
         restore_test = mock.Mock()
         self.driver._restore_v1 = restore_test
 
+        with mock.patch.object(self.driver, 'put_metadata') as mock_put:
+            self.driver.restore(self.backup, self.volume, volume_file, False)
+            self.assertEqual(1, mock_put.call_count)
+
+        restore_test.assert_called_once_with(
+            self.backup, self.volume, mock.ANY, volume_file, False,
+            self.backup)
+
+    def test_restore_incremental_chain(self):
+        volume_file = mock.Mock()
+        restore_test = mock.Mock()
+        self.driver._restore_v1 = restore_test
+
         # Create a second backup
         backup = self._create_backup_db_entry(
             self.volume, parent_id=self.backup.id)
 
-        with mock.patch.object(self.driver, 'put_metadata') as mock_put:
+        with mock.patch.object(self.driver, 'put_metadata') as mock_put, \
+                mock.patch.object(self.driver,
+                                  '_restore_flattened') as mock_flattened:
             self.driver.restore(backup, self.volume, volume_file, False)
             self.assertEqual(2, mock_put.call_count)
 
-        restore_test.assert_called()
+        restore_test.assert_not_called()
+        mock_flattened.assert_called_once_with(
+            [backup, mock.ANY], [mock.ANY, mock.ANY], self.volume,
+            volume_file, False)
+        self.assertEqual(self.backup.id,
+                         mock_flattened.call_args[0][0][1].id)
+
+    def test_subtract_extents(self):
+        extents = [(10, 20), (30, 40)]
+        self.assertEqual([(0, 10), (20, 30), (40, 50)],
+                         cbd._subtract_extents(0, 50, extents))
+        self.assertEqual([], cbd._subtract_extents(12, 18, extents))
+        self.assertEqual([(20, 25)], cbd._subtract_extents(15, 25, extents))
+        self.assertEqual([(0, 5)], cbd._subtract_extents(0, 5, extents))
+
+    def test_add_extent(self):
+        extents = []
+        cbd._add_extent(extents, 30, 40)
+        cbd._add_extent(extents, 10, 20)
+        self.assertEqual([(10, 20), (30, 40)], extents)
+        cbd._add_extent(extents, 20, 30)
+        self.assertEqual([(10, 40)], extents)
+        cbd._add_extent(extents, 50, 60)
+        cbd._add_extent(extents, 5, 55)
+        self.assertEqual([(5, 60)], extents)
+
+    def test_plan_restore(self):
+        def _obj(name, offset, length):
+            return {name: {'offset': offset, 'length': length,
+                           'compression': 'none'}}
+
+        full = {'objects': [_obj('full-1', 0, 10), _obj('full-2', 10, 10),
+                            _obj('full-3', 20, 10)]}
+        incr1 = {'objects': [_obj('incr1-1', 5, 10)]}
+        incr2 = {'objects': [_obj('incr2-1', 8, 4), _obj('incr2-2', 10, 10)]}
+
+        plan = self.driver._plan_restore(['b2', 'b1', 'b0'],
+                                         [incr2, incr1, full])
+
+        self.assertEqual(
+            [('b0', 'full-1', [(0, 5)]),
+             ('b1', 'incr1-1', [(5, 8)]),
+             ('b2', 'incr2-1', [(8, 10)]),
+             ('b2', 'incr2-2', [(10, 20)]),
+             ('b0', 'full-3', [(20, 30)])],
+            [(item[0], item[2], item[4]) for item in plan])
+
+    def test_restore_flattened(self):
+        backup = self._create_backup_db_entry(
+            self.volume, parent_id=self.backup.id,
+            status=fields.BackupStatus.RESTORING)
+        backups = [backup, self.backup]
+        full = {'objects': [{'full-1': {'offset': 0, 'length': 4,
+                                        'compression': 'none'}}]}
+        incr = {'objects': [{'incr-1': {'offset': 2, 'length': 2,
+                                        'compression': 'none'}}]}
+        data = {'full-1': b'abcd', 'incr-1': b'XY'}
+        volume_file = mock.Mock()
+        volume_file.fileno.side_effect = IOError
+
+        with mock.patch.object(self.driver, '_check_object_list'), \
+                mock.patch.object(self.driver, '_read_object_data',
+                                  side_effect=lambda c, name, *a: data[name]):
+            self.driver._restore_flattened(backups, [incr, full], 'volid',
+                                           volume_file, False)
+
+        volume_file.seek.assert_has_calls([mock.call(0), mock.call(2)])
+        written = [bytes(call[0][0])
+                   for call in volume_file.write.call_args_list]
+        self.assertEqual([b'ab', b'XY'], written)
 
     def test_delete_backup(self):
         with mock.patch.object(self.driver, 'delete_object') as mock_delete:
@@ -13,6 +13,7 @@
 #    License for the specific language governing permissions and limitations
 #    under the License.
 
+import json
 from unittest import mock
 
 import ddt
@@ -95,6 +96,16 @@ class BrickLvmTestCase(test.TestCase):
                     "lWyauW-dKpG-Rz7E-xtKY-jeju-QsYU-SLG7Z2\n"
             data += "  fake-vg-3:10.00:10.00:0:"\
                     "mXzbuX-dKpG-Rz7E-xtKY-jeju-QsYU-SLG8Z3\n"
+        elif (_lvm_prefix + 'lvs --reportformat json --unit=g --nosuffix '
+              '-o vg_name,lv_name,lv_size,lv_attr,origin --readonly fake-vg'
+              == cmd_string):
+            lvs = [('fake-1', '1.00', 'owi-a-----', ''),
+                   ('fake-snapshot', '1.00', 'swi-a-s---', 'fake-1'),
+                   ('fake-open', '2.00', '-wi-ao----', '')]
+            data = json.dumps({'report': [{'lv': [
+                {'vg_name': 'fake-vg', 'lv_name': name, 'lv_size': size,
+                 'lv_attr': attr, 'origin': origin}
+                for name, size, attr, origin in lvs]}]})
         elif (_lvm_prefix + 'lvs --noheadings '
               '--unit=g -o vg_name,name,size --nosuffix --readonly '
               'fake-vg/lv-nothere' in cmd_string):
@@ -451,6 +462,100 @@ class BrickLvmTestCase(test.TestCase):
 
             self.vg.activate_lv('my-lv')
 
+    def _make_cached_vg(self, lvm_version=(2, 3, 7)):
+        with mock.patch.object(brick.LVM, 'get_lvm_version',
+                               return_value=lvm_version):
+            return brick.LVM(
+                self.configuration.volume_group_name,
+                'sudo',
+                False, None,
+                'default',
+                self.fake_execute,
+                suppress_fd_warn=self.configuration.lvm_suppress_fd_warnings,
+                metadata_cache_ttl=5)
+
+    def test_lv_cache(self):
+        vg = self._make_cached_vg()
+
+        with mock.patch.object(vg, '_run_lvm_command',
+                               wraps=vg._run_lvm_command) as mock_run:
+            self.assertEqual(
+                [{'vg': 'fake-vg', 'name': 'fake-1', 'size': '1.00'},
+                 {'vg': 'fake-vg', 'name': 'fake-snapshot', 'size': '1.00'},
+                 {'vg': 'fake-vg', 'name': 'fake-open', 'size': '2.00'}],
+                vg.get_volumes())
+            self.assertEqual('2.00', vg.get_volume('fake-open')['size'])
+            self.assertTrue(vg.lv_has_snapshot('fake-1'))
+            self.assertFalse(vg.lv_has_snapshot('fake-open'))
+            self.assertTrue(vg.lv_is_snapshot('fake-snapshot'))
+            self.assertFalse(vg.lv_is_snapshot('fake-1'))
+            self.assertTrue(vg.lv_is_open('fake-open'))
+            self.assertFalse(vg.lv_is_open('fake-1'))
+            self.assertEqual('fake-1', vg.lv_get_origin('fake-snapshot'))
+            self.assertIsNone(vg.lv_get_origin('fake-1'))
+
+        mock_run.assert_called_once()
+
+    def test_lv_cache_unknown_lv(self):
+        vg = self._make_cached_vg()
+
+        self.assertIsNone(vg.get_volume('fake-unknown'))
+        self.assertEqual('test-found-lv-name',
+                         vg.get_volume('test-found-lv-name')['name'])
+
+    def test_lv_cache_invalidated(self):
+        vg = self._make_cached_vg()
+
+        with mock.patch.object(vg, '_run_lvm_command',
+                               wraps=vg._run_lvm_command) as mock_run:
+            vg.get_volumes()
+            vg.create_volume('fake-new', '1G')
+            vg.get_volumes()
+
+        # lvs, lvcreate and lvs again
+        self.assertEqual(3, mock_run.call_count)
+
+    def test_lv_cache_invalidated_during_lvs(self):
+        vg = self._make_cached_vg()
+        run_lvm_command = vg._run_lvm_command
+
+        def _run_lvm_command(cmd, *args, **kwargs):
+            out = run_lvm_command(cmd, *args, **kwargs)
+            if 'lvs' in cmd:
+                # Another thread changes an LV while lvs is running
+                vg.invalidate_lv_cache()
+            return out
+
+        with mock.patch.object(vg, '_run_lvm_command',
+                               side_effect=_run_lvm_command) as mock_run:
+            self.assertIsNotNone(vg.get_volume('fake-1'))
+            self.assertIsNone(vg._lv_cache)
+            vg.get_volume('fake-1')
+
+        self.assertEqual(2, mock_run.call_count)
+
+    @mock.patch('time.monotonic')
+    def test_lv_cache_expired(self, mock_time):
+        vg = self._make_cached_vg()
+
+        with mock.patch.object(vg, '_run_lvm_command',
+                               wraps=vg._run_lvm_command) as mock_run:
+            mock_time.return_value = 100
+            vg.get_volumes()
+            mock_time.return_value = 104
+            vg.get_volumes()
+            self.assertEqual(1, mock_run.call_count)
+
+            mock_time.return_value = 105
+            vg.get_volumes()
+            self.assertEqual(2, mock_run.call_count)
+
+    def test_lv_cache_old_lvm_version(self):
+        vg = self._make_cached_vg(lvm_version=(2, 2, 107))
+
+        self.assertIsNone(vg._get_lv_cache())
+        self.assertEqual('fake-1', vg.get_volumes()[0]['name'])
+
     def test_get_mirrored_available_capacity(self):
         self.assertEqual(2.0, self.vg.vg_mirror_free_space(1))
 
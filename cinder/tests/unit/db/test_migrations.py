@@ -239,6 +239,9 @@ class MigrationsWalk(
         # we added an online migration to set the value, but we also provide
         # a default on the OVO, the ORM, and the DB engine.
         '9ab1b092a404',
+        # Making volume_id of image volume cache entries nullable is
+        # backward compatible, since the previous release always sets it.
+        '3b6f1e8d2c4a',
         # Removing allocated_id and allocated columns is acceptable now since
         # we stopped using them in the code on the previous release.
         # TODO: (D Release) Uncomment next line
@@ -396,6 +399,26 @@ class MigrationsWalk(
         self.assertEqual({'backups', 'backup_gigabytes'},
                          {r[0] for r in res})
 
+    def _check_3b6f1e8d2c4a(self, connection):
+        """Test image volume cache entries have a status and no volume."""
+        entries = db_utils.get_table(connection, 'image_volume_cache_entries')
+        self.assertIn('status', entries.c)
+        self.assertIsInstance(entries.c.status.type, self.VARCHAR_TYPE)
+        self.assertFalse(entries.c.status.nullable)
+        self.assertTrue(entries.c.volume_id.nullable)
+
+    def _check_e1c4b7a9f3d2(self, connection):
+        """Test image volume cache entries have a hit counter."""
+        entries = db_utils.get_table(connection, 'image_volume_cache_entries')
+        self.assertIn('hits', entries.c)
+        self.assertIsInstance(entries.c.hits.type, sqlalchemy.types.INTEGER)
+        self.assertFalse(entries.c.hits.nullable)
+
+    def _check_f5a2c7d94b18(self, connection):
+        """Test volumes have an index for paginated listings."""
+        self.assertTrue(db_utils.index_exists_on_columns(
+            connection, 'volumes', ['deleted', 'created_at', 'id']))
+
     # TODO: (D Release) Uncomment method _check_afd7494d43b7 and create a
     # migration with hash afd7494d43b7 using the following command:
     #   $ tox -e venv -- alembic -c cinder/db/alembic.ini revision \
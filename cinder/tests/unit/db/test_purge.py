@@ -16,6 +16,8 @@
 """Tests for db purge."""
 
 import datetime
+import time
+from unittest import mock
 import uuid
 
 from oslo_db import exception as db_exc
@@ -345,6 +347,44 @@ class PurgeDeletedTest(test.TestCase):
         self.assertEqual(4, vol_glance_meta_rows)
         self.assertEqual(4, qos_rows)
 
+    def test_purge_deleted_rows_in_batches(self):
+        purged = db.purge_deleted_rows(self.context, age_in_days=10,
+                                       batch_size=1)
+
+        with db_api.main_context_manager.writer.using(self.context):
+            vol_rows = self.context.session.query(self.volumes).count()
+            vol_type_rows = self.context.session.query(self.vol_types).count()
+            qos_rows = self.context.session.query(self.qos).count()
+
+        # Same result as purging all the rows at once
+        self.assertEqual(2, vol_rows)
+        self.assertEqual(5, vol_type_rows)
+        self.assertEqual(4, qos_rows)
+        self.assertEqual(4, purged['volumes'])
+        self.assertEqual(8, purged['volume_glance_metadata'])
+        self.assertEqual(8, purged['quality_of_service_specs'])
+        self.assertEqual(0, purged['services'])
+
+    @mock.patch('time.sleep')
+    def test_purge_deleted_rows_throttled(self, mock_sleep):
+        self.mock_object(time, 'monotonic', return_value=0)
+
+        db.purge_deleted_rows(self.context, age_in_days=10, batch_size=2,
+                              max_rows_per_second=4)
+
+        # Full batches of 2 rows take 0.5 seconds at 4 rows per second
+        mock_sleep.assert_any_call(0.5)
+
+    def test_purge_deleted_rows_default_batch_size(self):
+        self.override_config('db_purge_batch_size', 3)
+        mock_purge = self.mock_object(db_api, '_purge_table_rows',
+                                      return_value=0)
+
+        db.purge_deleted_rows(self.context, age_in_days=10)
+
+        for call in mock_purge.call_args_list:
+            self.assertEqual((3, 0), call[0][3:])
+
     def test_purge_deleted_rows_bad_args(self):
         # Test with no age argument
         self.assertRaises(TypeError, db.purge_deleted_rows, self.context)
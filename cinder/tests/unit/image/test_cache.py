@@ -20,6 +20,7 @@ from oslo_utils import timeutils
 
 from cinder import context as ctxt
 from cinder.db.sqlalchemy import models
+from cinder import exception
 from cinder.image import cache as image_cache
 from cinder import objects
 from cinder.tests.unit import fake_constants as fake
@@ -41,17 +42,26 @@ class ImageVolumeCacheTestCase(test.TestCase):
                       'size': 0}
         self.volume.update(vol_params)
         self.volume_ovo = objects.Volume(self.context, **vol_params)
+        self.mock_db.image_volume_cache_get_usage.side_effect = (
+            self._get_usage)
 
-    def _build_cache(self, max_gb=0, max_count=0, clone_across_pools=False):
+    def _get_usage(self, context, **filters):
+        entries = self.mock_db.image_volume_cache_get_all.return_value
+        return len(entries), sum(entry['size'] for entry in entries)
+
+    def _build_cache(self, max_gb=0, max_count=0, clone_across_pools=False,
+                     warming_timeout=0, eviction_policy='lru'):
         cache = image_cache.ImageVolumeCache(self.mock_db,
                                              self.mock_volume_api,
                                              max_gb,
                                              max_count,
-                                             clone_across_pools)
+                                             clone_across_pools,
+                                             warming_timeout,
+                                             eviction_policy)
         cache.notifier = self.notifier
         return cache
 
-    def _build_entry(self, size=10):
+    def _build_entry(self, size=10, hits=0):
         entry = {
             'id': 1,
             'host': 'test@foo#bar',
@@ -60,7 +70,8 @@ class ImageVolumeCacheTestCase(test.TestCase):
             'image_updated_at': timeutils.utcnow(with_timezone=True),
             'volume_id': '70a599e0-31e7-49b7-b260-868f441e862b',
             'size': size,
-            'last_used': timeutils.utcnow(with_timezone=True)
+            'last_used': timeutils.utcnow(with_timezone=True),
+            'hits': hits,
         }
         return entry
 
@@ -121,6 +132,7 @@ class ImageVolumeCacheTestCase(test.TestCase):
          image_volume_cache_get_and_update_last_used.assert_called_once_with)(
             self.context,
             entry['image_id'],
+            status=image_cache.AVAILABLE,
             **expect
         )
 
@@ -216,6 +228,184 @@ class ImageVolumeCacheTestCase(test.TestCase):
             self.volume_ovo.size
         )
 
+    def test_create_warming_entry(self):
+        cache = self._build_cache(warming_timeout=60)
+        entry = self._build_entry()
+        entry['volume_id'] = None
+        image_meta = {
+            'updated_at': entry['image_updated_at']
+        }
+        self.mock_db.image_volume_cache_create.return_value = entry
+        created_entry = cache.create_warming_entry(self.context,
+                                                   self.volume_ovo,
+                                                   entry['image_id'],
+                                                   image_meta)
+        self.assertEqual(entry, created_entry)
+        self.mock_db.image_volume_cache_create.assert_called_once_with(
+            self.context,
+            self.volume_ovo.host,
+            self.volume_ovo.cluster_name,
+            entry['image_id'],
+            entry['image_updated_at'].replace(tzinfo=None),
+            None,
+            self.volume_ovo.size,
+            status=image_cache.WARMING
+        )
+
+        cache.delete_warming_entry(self.context, created_entry)
+        self.mock_db.image_volume_cache_delete_by_id.assert_called_once_with(
+            self.context, entry['id'])
+        # Warming entries are not evicted
+        self.assertEqual([], self.notifier.notifications)
+
+    def test_create_warming_entry_disabled(self):
+        cache = self._build_cache()
+        entry = self._build_entry()
+        self.assertIsNone(cache.create_warming_entry(
+            self.context, self.volume_ovo, entry['image_id'],
+            {'updated_at': entry['image_updated_at']}))
+        self.assertIsNone(cache.get_warming_entry(
+            self.context, self.volume_ovo, entry['image_id']))
+        cache.delete_warming_entry(self.context, None)
+        self.mock_db.image_volume_cache_create.assert_not_called()
+        self.mock_db.image_volume_cache_get_all.assert_not_called()
+        self.mock_db.image_volume_cache_delete_by_id.assert_not_called()
+
+    @mock.patch('oslo_service.loopingcall.FixedIntervalLoopingCall')
+    def test_warming(self, mock_looping_call):
+        cache = self._build_cache(warming_timeout=60)
+        entry = self._build_entry()
+        self.mock_db.image_volume_cache_create.return_value = entry
+
+        with cache.warming(self.context, self.volume_ovo, entry['image_id'],
+                           {'updated_at': entry['image_updated_at']}) as e:
+            self.assertEqual(entry, e)
+            mock_looping_call.assert_called_once_with(
+                cache._refresh_warming_entry, self.context, entry)
+            mock_looping_call.return_value.start.assert_called_once_with(
+                interval=image_cache.WARMING_HEARTBEAT_INTERVAL,
+                initial_delay=image_cache.WARMING_HEARTBEAT_INTERVAL)
+            self.mock_db.image_volume_cache_delete_by_id.assert_not_called()
+
+        mock_looping_call.return_value.stop.assert_called_once_with()
+        self.mock_db.image_volume_cache_delete_by_id.assert_called_once_with(
+            self.context, entry['id'])
+
+    @mock.patch('oslo_service.loopingcall.FixedIntervalLoopingCall')
+    def test_warming_error(self, mock_looping_call):
+        cache = self._build_cache(warming_timeout=60)
+        entry = self._build_entry()
+        self.mock_db.image_volume_cache_create.return_value = entry
+
+        def fail():
+            with cache.warming(self.context, self.volume_ovo,
+                               entry['image_id'],
+                               {'updated_at': entry['image_updated_at']}):
+                raise exception.ImageCopyFailure(reason='error')
+
+        self.assertRaises(exception.ImageCopyFailure, fail)
+        mock_looping_call.return_value.stop.assert_called_once_with()
+        self.mock_db.image_volume_cache_delete_by_id.assert_called_once_with(
+            self.context, entry['id'])
+
+    @mock.patch('oslo_service.loopingcall.FixedIntervalLoopingCall')
+    def test_warming_disabled(self, mock_looping_call):
+        cache = self._build_cache()
+        entry = self._build_entry()
+
+        with cache.warming(self.context, self.volume_ovo, entry['image_id'],
+                           {'updated_at': entry['image_updated_at']}) as e:
+            self.assertIsNone(e)
+
+        mock_looping_call.assert_not_called()
+        self.mock_db.image_volume_cache_create.assert_not_called()
+        self.mock_db.image_volume_cache_delete_by_id.assert_not_called()
+
+    def test_refresh_warming_entry(self):
+        cache = self._build_cache(warming_timeout=60)
+        entry = self._build_entry()
+        now = timeutils.utcnow()
+
+        with mock.patch.object(timeutils, 'utcnow', return_value=now):
+            cache._refresh_warming_entry(self.context, entry)
+
+        self.mock_db.image_volume_cache_update.assert_called_once_with(
+            self.context, entry['id'], {'last_used': now})
+
+    def test_get_warming_entry_removes_stale(self):
+        cache = self._build_cache(warming_timeout=3600)
+        stale_entry = self._build_entry()
+        stale_entry['id'] = 2
+        stale_entry['last_used'] = (
+            timeutils.utcnow() -
+            timedelta(seconds=image_cache.WARMING_STALE_TIME + 1))
+        entry = self._build_entry()
+        # Warming for longer than the warming timeout, but still refreshed
+        # by the request creating it.
+        entry['last_used'] = timeutils.utcnow()
+        self.mock_db.image_volume_cache_get_all.return_value = [stale_entry,
+                                                                entry]
+
+        found_entry = cache.get_warming_entry(self.context, self.volume_ovo,
+                                              entry['image_id'])
+
+        self.assertEqual(entry, found_entry)
+        self.mock_db.image_volume_cache_get_all.assert_called_once_with(
+            self.context, image_id=entry['image_id'],
+            status=image_cache.WARMING,
+            cluster_name=self.volume_ovo.cluster_name)
+        self.mock_db.image_volume_cache_delete_by_id.assert_called_once_with(
+            self.context, 2)
+
+    @mock.patch('time.sleep')
+    def test_wait_for_warming_entry(self, mock_sleep):
+        cache = self._build_cache(warming_timeout=60)
+        entry = self._build_entry()
+        entry['last_used'] = timeutils.utcnow()
+        entry['status'] = image_cache.WARMING
+        self.mock_db.image_volume_cache_get_all.side_effect = [[entry], []]
+
+        self.assertTrue(cache.wait_for_warming_entry(self.context, entry))
+
+        self.assertEqual(2, mock_sleep.call_count)
+        self.mock_db.image_volume_cache_get_all.assert_called_with(
+            self.context, id=entry['id'])
+
+    @mock.patch('time.sleep')
+    def test_wait_for_warming_entry_timeout(self, mock_sleep):
+        cache = self._build_cache(warming_timeout=60)
+        now = timeutils.utcnow()
+        entry = self._build_entry()
+        # The timeout counts from the start of the wait, not from the
+        # creation of the entry.
+        entry['last_used'] = now - timedelta(seconds=3600)
+        entry['status'] = image_cache.WARMING
+        refreshed_entry = dict(entry, last_used=now)
+        self.mock_db.image_volume_cache_get_all.return_value = [
+            refreshed_entry]
+
+        with mock.patch.object(timeutils, 'utcnow',
+                               side_effect=[now, now, now,
+                                            now + timedelta(seconds=61)]):
+            self.assertFalse(cache.wait_for_warming_entry(self.context,
+                                                          entry))
+
+        mock_sleep.assert_called_once_with(image_cache.WARMING_POLL_INTERVAL)
+
+    @mock.patch('time.sleep')
+    def test_wait_for_warming_entry_stale(self, mock_sleep):
+        cache = self._build_cache(warming_timeout=600)
+        entry = self._build_entry()
+        entry['last_used'] = (
+            timeutils.utcnow() -
+            timedelta(seconds=image_cache.WARMING_STALE_TIME + 1))
+        entry['status'] = image_cache.WARMING
+        self.mock_db.image_volume_cache_get_all.return_value = [entry]
+
+        self.assertFalse(cache.wait_for_warming_entry(self.context, entry))
+
+        mock_sleep.assert_called_once_with(image_cache.WARMING_POLL_INTERVAL)
+
     def test_ensure_space_unlimited(self):
         cache = self._build_cache(max_gb=0, max_count=0)
         has_space = cache.ensure_space(self.context, self.volume)
@@ -257,7 +447,8 @@ class ImageVolumeCacheTestCase(test.TestCase):
         mock_delete.assert_any_call(self.context, entry2)
         mock_delete.assert_any_call(self.context, entry3)
         self.mock_db.image_volume_cache_get_all.assert_called_with(
-            self.context, cluster_name=self.volume_ovo.cluster_name)
+            self.context, status=image_cache.AVAILABLE,
+            cluster_name=self.volume_ovo.cluster_name)
 
     def test_ensure_space_need_count(self):
         cache = self._build_cache(max_gb=0, max_count=2)
@@ -307,3 +498,119 @@ class ImageVolumeCacheTestCase(test.TestCase):
         has_space = cache.ensure_space(self.context, self.volume_ovo)
         self.assertFalse(has_space)
         mock_delete.assert_not_called()
+
+    def test_ensure_space_fits_without_loading_entries(self):
+        cache = self._build_cache(max_gb=30, max_count=5)
+        self.mock_db.image_volume_cache_get_usage.side_effect = None
+        self.mock_db.image_volume_cache_get_usage.return_value = (4, 20)
+
+        self.volume_ovo.size = 10
+        has_space = cache.ensure_space(self.context, self.volume_ovo)
+
+        self.assertTrue(has_space)
+        self.mock_db.image_volume_cache_get_usage.assert_called_once_with(
+            self.context, status=image_cache.AVAILABLE,
+            cluster_name=self.volume_ovo.cluster_name)
+        self.mock_db.image_volume_cache_get_all.assert_not_called()
+
+    def test_ensure_space_lfu(self):
+        cache = self._build_cache(max_gb=30, max_count=0,
+                                  eviction_policy='lfu')
+        mock_delete = mock.patch.object(cache, '_delete_image_volume').start()
+
+        # Most recently used first
+        entry1 = self._build_entry(size=5, hits=1)
+        entry2 = self._build_entry(size=10, hits=8)
+        entry3 = self._build_entry(size=5, hits=1)
+        entry4 = self._build_entry(size=5, hits=3)
+        self.mock_db.image_volume_cache_get_all.return_value = [
+            entry1, entry2, entry3, entry4]
+
+        self.volume_ovo.size = 12
+        has_space = cache.ensure_space(self.context, self.volume_ovo)
+
+        self.assertTrue(has_space)
+        self.assertEqual([mock.call(self.context, entry3),
+                          mock.call(self.context, entry1)],
+                         mock_delete.call_args_list)
+
+    def test_ensure_space_lfu_decay(self):
+        cache = self._build_cache(max_gb=30, max_count=0,
+                                  eviction_policy='lfu')
+        mock_delete = mock.patch.object(cache, '_delete_image_volume').start()
+
+        # Most recently used first
+        entry1 = self._build_entry(size=5, hits=1)
+        entry2 = self._build_entry(size=10, hits=2)
+        entry3 = self._build_entry(size=10, hits=8)
+        # Hits are halved for every half-life the entry hasn't been used
+        entry3['last_used'] -= timedelta(
+            seconds=3 * image_cache.LFU_HITS_HALF_LIFE)
+        self.mock_db.image_volume_cache_get_all.return_value = [
+            entry1, entry2, entry3]
+
+        self.volume_ovo.size = 10
+        has_space = cache.ensure_space(self.context, self.volume_ovo)
+
+        self.assertTrue(has_space)
+        mock_delete.assert_called_once_with(self.context, entry3)
+
+    def test_record_hit(self):
+        cache = self._build_cache()
+        entry = self._build_entry()
+
+        cache.record_hit(self.context, entry)
+
+        self.mock_db.image_volume_cache_add_hit.assert_called_once_with(
+            self.context, entry['id'])
+
+    def test_ensure_space_size(self):
+        cache = self._build_cache(max_gb=30, max_count=0,
+                                  eviction_policy='size')
+        mock_delete = mock.patch.object(cache, '_delete_image_volume').start()
+
+        # Most recently used first
+        entry1 = self._build_entry(size=12)
+        entry2 = self._build_entry(size=13)
+        entry3 = self._build_entry(size=2)
+        entry4 = self._build_entry(size=3)
+        self.mock_db.image_volume_cache_get_all.return_value = [
+            entry1, entry2, entry3, entry4]
+
+        # 10GB have to be freed: LRU would evict 3 entries, this policy only
+        # evicts the least recently used of the large ones.
+        self.volume_ovo.size = 10
+        has_space = cache.ensure_space(self.context, self.volume_ovo)
+
+        self.assertTrue(has_space)
+        mock_delete.assert_called_once_with(self.context, entry2)
+
+    @ddt.data(('lru', [4, 3, 2]), ('lfu', [2, 1]), ('size', [4, 2]))
+    @ddt.unpack
+    def test_eviction_policies(self, policy, expected):
+        # Most recently used first
+        entries = [self._build_entry(size=size, hits=hits)
+                   for size, hits in ((8, 0), (8, 0), (1, 1), (2, 2))]
+        for i, entry in enumerate(entries, 1):
+            entry['id'] = i
+
+        selected = image_cache.EVICTION_POLICIES[policy]().select(
+            entries, 9, 1)
+
+        self.assertEqual(expected, [entry['id'] for entry in selected])
+
+    @ddt.data('lru', 'lfu', 'size')
+    def test_eviction_policies_count(self, policy):
+        entries = [self._build_entry(size=size) for size in (1, 2, 3)]
+
+        selected = image_cache.EVICTION_POLICIES[policy]().select(
+            entries, 0, 2)
+
+        # Only the number of entries matters, evict the least recently used
+        self.assertEqual(entries[:0:-1], selected)
+
+    def test_eviction_policy_without_select(self):
+        class FakeEvictionPolicy(image_cache.EvictionPolicy):
+            pass
+
+        self.assertRaises(TypeError, FakeEvictionPolicy)
@@ -15,15 +15,19 @@
 
 
 import datetime
+import hashlib
 import itertools
+import os
 import traceback
 from unittest import mock
 
 import ddt
+import fixtures
 import glanceclient.exc
 from keystoneauth1.loading import session as ks_session
 from keystoneauth1 import session
 from oslo_config import cfg
+from oslo_utils import units
 
 from cinder import context
 from cinder import exception
@@ -1202,6 +1206,135 @@ class TestGlanceImageService(test.TestCase):
                           glance_wrapper.call, 'fake_context', 'method')
 
 
+class FakeRangeHttpClient(object):
+    """Serves byte ranges of the image data like the Glance API does."""
+
+    def __init__(self, image_data, supports_ranges=True):
+        self.image_data = image_data
+        self.supports_ranges = supports_ranges
+        self.requests = []
+        self.failures = []
+
+    def get(self, url, headers=None):
+        self.requests.append(headers['Range'])
+        if not self.supports_ranges:
+            return mock.Mock(status_code=200), iter([self.image_data])
+        start, end = map(int, headers['Range'][len('bytes='):].split('-'))
+        body = self.image_data[start:end + 1]
+        chunks = [body[i:i + 1000] for i in range(0, len(body), 1000)]
+        if headers['Range'] in self.failures:
+            self.failures.remove(headers['Range'])
+
+            def _failing_body():
+                yield chunks[0]
+                raise IOError('connection reset')
+
+            return mock.Mock(status_code=206), _failing_body()
+        return mock.Mock(status_code=206), iter(chunks)
+
+
+class TestGlanceImageServiceRangedDownload(test.TestCase):
+
+    def setUp(self):
+        super(TestGlanceImageServiceRangedDownload, self).setUp()
+        self.flags(glance_download_streams=3,
+                   glance_download_range_size_mb=1)
+        self.image_data = os.urandom(2 * units.Mi + 1234)
+        self.client = glance_stubs.StubGlanceClient()
+        self.client.data = lambda image_id: [self.image_data]
+        self.client.images.data = self.client.data
+        self.client.http_client = FakeRangeHttpClient(self.image_data)
+        self.mock_object(glance, '_create_glance_client',
+                         return_value=self.client)
+        self.service = glance.GlanceImageService(
+            client=glance.GlanceClientWrapper('fake', 'fake_host', 9292))
+        self.context = context.RequestContext('fake', 'fake',
+                                              auth_token=True)
+        self.tmp_dir = self.useFixture(fixtures.TempDir()).path
+        self.path = os.path.join(self.tmp_dir, 'image')
+        self.mock_object(glance.time, 'sleep', return_value=None)
+
+    def _create_image(self, checksum=None, size=None):
+        checksum = checksum or hashlib.md5(self.image_data).hexdigest()
+        image = self.client.create(name='test image', checksum=checksum,
+                                   size=size or len(self.image_data))
+        return image.id
+
+    def _download(self, image_id):
+        with open(self.path, 'wb') as f:
+            self.service.download(self.context, image_id, f)
+        with open(self.path, 'rb') as f:
+            return f.read()
+
+    def test_download_ranges(self):
+        image_id = self._create_image()
+
+        self.assertEqual(self.image_data, self._download(image_id))
+        self.assertEqual(
+            ['bytes=0-1048575', 'bytes=1048576-2097151',
+             'bytes=2097152-2098385'],
+            sorted(self.client.http_client.requests))
+
+    def test_download_ranges_resume(self):
+        self.client.http_client.failures = ['bytes=1048576-2097151']
+        image_id = self._create_image()
+
+        self.assertEqual(self.image_data, self._download(image_id))
+        self.assertIn('bytes=1049576-2097151',
+                      self.client.http_client.requests)
+
+    def test_download_ranges_retries_exceeded(self):
+        self.flags(glance_num_retries=0)
+        self.client.http_client.failures = ['bytes=1048576-2097151']
+        image_id = self._create_image()
+
+        self.assertRaises(exception.ImageDownloadFailed,
+                          self._download, image_id)
+
+    def test_download_ranges_checksum_mismatch(self):
+        image_id = self._create_image(checksum='bad checksum')
+
+        self.assertRaises(exception.ImageDownloadFailed,
+                          self._download, image_id)
+
+    def test_download_ranges_not_supported(self):
+        self.client.http_client.supports_ranges = False
+        image_id = self._create_image()
+
+        self.assertEqual(self.image_data, self._download(image_id))
+        self.assertEqual(1, len(self.client.http_client.requests))
+
+    def test_download_single_range(self):
+        self.flags(glance_download_range_size_mb=4)
+        image_id = self._create_image()
+
+        self.assertEqual(self.image_data, self._download(image_id))
+        self.assertEqual([], self.client.http_client.requests)
+
+    def test_download_ranges_not_a_file(self):
+        image_id = self._create_image()
+        writer = mock.Mock(spec=['write'])
+
+        self.service.download(self.context, image_id, writer)
+
+        writer.write.assert_called_once_with(self.image_data)
+        self.assertEqual([], self.client.http_client.requests)
+
+    def test_download_ranges_from_direct_file(self):
+        src = os.path.join(self.tmp_dir, 'store')
+        with open(src, 'wb') as f:
+            f.write(self.image_data)
+        self.flags(allowed_direct_url_schemes=['file'])
+        image_id = self.client.create(
+            name='test image', direct_url='file://%s' % src).id
+        self.mock_object(glance, 'GlanceClientWrapper',
+                         return_value=self.service._client)
+        mock_copy = self.mock_object(glance.shutil, 'copyfileobj')
+
+        self.assertEqual(self.image_data, self._download(image_id))
+        mock_copy.assert_not_called()
+
+
 def _create_failing_glance_client(info):
     class MyGlanceStubClient(glance_stubs.StubGlanceClient):
         """A client that fails the first time, then succeeds."""
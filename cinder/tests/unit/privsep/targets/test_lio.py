@@ -0,0 +1,46 @@
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+from unittest import mock
+
+from cinder.privsep.targets import lio
+from cinder.tests.unit import test
+
+
+@mock.patch('cinder.privsep.sys_admin_pctxt.client_mode', False)
+@mock.patch('rtslib_fb.root.RTSRoot')
+class TestLioPrivsep(test.TestCase):
+
+    def test_get_targets(self, mock_rtsroot):
+        mock_rtsroot.return_value.targets = [mock.Mock(wwn='iqn1'),
+                                             mock.Mock(wwn='iqn2')]
+
+        self.assertEqual(['iqn1', 'iqn2'], lio.get_targets())
+
+    @mock.patch('cinder.cmd.rtstool.create_target')
+    def test_create_targets(self, mock_create_target, mock_rtsroot):
+        existing = mock.Mock()
+        existing.name = 'iqn1'
+        mock_rtsroot.return_value.storage_objects = [existing]
+        mock_create_target.side_effect = [None, Exception('error')]
+        targets = [{'name': 'iqn1', 'backing_device': '/dev/vg/vol1'},
+                   {'name': 'iqn2', 'backing_device': '/dev/vg/vol2'},
+                   {'name': 'iqn3', 'backing_device': '/dev/vg/vol3'}]
+
+        failed = lio.create_targets(targets)
+
+        self.assertEqual({'iqn3': 'error'}, failed)
+        mock_rtsroot.assert_called_once_with()
+        mock_create_target.assert_has_calls([
+            mock.call(name='iqn2', backing_device='/dev/vg/vol2'),
+            mock.call(name='iqn3', backing_device='/dev/vg/vol3')])
+        self.assertEqual(2, mock_create_target.call_count)
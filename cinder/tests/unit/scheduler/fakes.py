@@ -253,6 +253,14 @@ class FakeHostManager(host_manager.HostManager):
         self.weight_classes = helpers.ALL_WEIGHER_CLASSES[:]
 
         self._no_capabilities_backends = set()  # Services without capabilities
+        self._volume_services = None
+        self._volume_services_time = None
+        self._service_list_cache_time = 0
+        self._applied_capabilities = {}
+        self._pool_index_dirty = True
+        self._all_pools = {}
+        self._pool_capability_index = {}
+        self._pool_az_index = {}
         self._update_backend_state_map(cinder_context.get_admin_context())
         self.service_states_last_update = {}
 
@@ -142,7 +142,7 @@ class FilterSchedulerTestCase(test_scheduler.SchedulerTestCase):
         # a non-admin context.  DB actions should work.
         self.was_admin = False
 
-        def fake_get(ctxt):
+        def fake_get(ctxt, filter_properties=None):
             # Make sure this is called with admin context, even though
             # we're using user context below.
             self.was_admin = ctxt.is_admin
@@ -25,6 +25,7 @@ from cinder import db
 from cinder import exception
 from cinder.scheduler import filters
 from cinder.scheduler.filters import extra_specs_ops
+from cinder.scheduler.filters import instance_locality_filter
 from cinder.tests.unit import fake_constants as fake
 from cinder.tests.unit.scheduler import fakes
 from cinder.tests.unit.scheduler import helpers
@@ -815,6 +816,66 @@ class AffinityFilterTestCase(BackendFiltersTestCase):
 
         self.assertFalse(filt_cls.backend_passes(host, filter_properties))
 
+    def test_different_filter_all_single_query(self):
+        filt_cls = self.class_map['DifferentBackendFilter']()
+        backends = [fakes.FakeBackendState('host1@lvm#pool0', {}),
+                    fakes.FakeBackendState('host1@lvm#pool1', {}),
+                    fakes.FakeBackendState('host2@lvm#pool0', {}),
+                    fakes.FakeBackendState('host3', {})]
+        volume1 = utils.create_volume(self.context, host='host1@lvm#pool1')
+        volume2 = utils.create_volume(self.context, host='host3@lvm#pool0')
+
+        filter_properties = {'context': self.context.elevated(),
+                             'scheduler_hints': {
+            'different_host': [volume1.id, volume2.id], }}
+
+        with mock.patch.object(filt_cls.volume_api, 'get_all',
+                               wraps=filt_cls.volume_api.get_all) as get_all:
+            result = list(filt_cls.filter_all(backends, filter_properties))
+
+        get_all.assert_called_once_with(
+            filter_properties['context'],
+            filters={'id': [volume1.id, volume2.id], 'deleted': False})
+        self.assertEqual(['host1@lvm#pool0', 'host2@lvm#pool0'],
+                         [backend.host for backend in result])
+        self.assertEqual(3, filt_cls.queries_saved)
+
+    def test_same_filter_all_single_query(self):
+        filt_cls = self.class_map['SameBackendFilter']()
+        backends = [fakes.FakeBackendState('host1@lvm#pool0', {}),
+                    fakes.FakeBackendState('host1@lvm#pool1', {}),
+                    fakes.FakeBackendState('host2@lvm#pool0', {}),
+                    fakes.FakeBackendState('clustered@lvm#pool0',
+                                           {'cluster_name': 'cluster@lvm'})]
+        volume1 = utils.create_volume(self.context, host='host1@lvm#pool1')
+        volume2 = utils.create_volume(self.context, host='host9@lvm#pool0',
+                                      cluster_name='cluster@lvm#pool0')
+
+        filter_properties = {'context': self.context.elevated(),
+                             'scheduler_hints': {
+            'same_host': [volume1.id, volume2.id], }}
+
+        with mock.patch.object(filt_cls.volume_api, 'get_all',
+                               wraps=filt_cls.volume_api.get_all) as get_all:
+            result = list(filt_cls.filter_all(backends, filter_properties))
+
+        get_all.assert_called_once()
+        self.assertEqual(['host1@lvm#pool1', 'clustered@lvm#pool0'],
+                         [backend.host for backend in result])
+
+    def test_same_filter_all_invalid_hint(self):
+        filt_cls = self.class_map['SameBackendFilter']()
+        backends = [fakes.FakeBackendState('host1', {})]
+        filter_properties = {'context': self.context.elevated(),
+                             'scheduler_hints': {
+            'same_host': "NOT-a-valid-UUID", }}
+
+        with mock.patch.object(filt_cls.volume_api, 'get_all') as get_all:
+            result = list(filt_cls.filter_all(backends, filter_properties))
+
+        self.assertEqual([], result)
+        get_all.assert_not_called()
+
 
 class DriverFilterTestCase(BackendFiltersTestCase):
     def test_passing_function(self):
@@ -1014,6 +1075,9 @@ class InstanceLocalityFilterTestCase(BackendFiltersTestCase):
               [{'publicURL': 'http://novahost:8774/v2/e3f0833dc08b4cea'}]},
              {'type': 'identity', 'name': 'keystone', 'endpoints':
               [{'publicURL': 'http://keystonehost:5000/v2.0'}]}]
+        cache = instance_locality_filter._instance_host_cache
+        cache.invalidate()
+        self.addCleanup(cache.invalidate)
 
     @mock.patch('novaclient.client.discover_extensions')
     @mock.patch('cinder.compute.nova.novaclient')
@@ -1093,6 +1157,93 @@ class InstanceLocalityFilterTestCase(BackendFiltersTestCase):
         self.assertRaises(exception.APITimeout,
                           filt_cls.backend_passes, host, filter_properties)
 
+    def _get_server_host_calls(self, filter_count):
+        server = mock.Mock(**{'OS-EXT-SRV-ATTR:host': 'host1'})
+        uuid = fake.INSTANCE_ID
+        host = fakes.FakeBackendState('host1', {})
+        filter_properties = {'context': self.context,
+                             'scheduler_hints': {'local_to_instance': uuid},
+                             'request_spec': {'volume_id': fake.VOLUME_ID}}
+        with mock.patch.object(nova.API, 'get_server',
+                               return_value=server) as mock_get_server:
+            for i in range(filter_count):
+                filt_cls = self.class_map['InstanceLocalityFilter']()
+                self.assertTrue(filt_cls.backend_passes(host,
+                                                        filter_properties))
+                self.assertTrue(filt_cls.backend_passes(host,
+                                                        filter_properties))
+        return mock_get_server.call_count
+
+    def test_cache_shared_across_requests(self):
+        self.override_config('instance_locality_cache_time', 60)
+        self.assertEqual(1, self._get_server_host_calls(3))
+
+        instance_locality_filter._instance_host_cache.invalidate(
+            fake.INSTANCE_ID)
+        self.assertEqual(1, self._get_server_host_calls(1))
+
+    def test_cache_disabled(self):
+        self.assertEqual(3, self._get_server_host_calls(3))
+
+    def test_cache_refreshed_when_no_backend_on_cached_host(self):
+        self.override_config('instance_locality_cache_time', 60)
+        uuid = fake.INSTANCE_ID
+        backends = [fakes.FakeBackendState('host1', {}),
+                    fakes.FakeBackendState('host2', {})]
+        filter_properties = {'context': self.context,
+                             'scheduler_hints': {'local_to_instance': uuid},
+                             'request_spec': {'volume_id': fake.VOLUME_ID}}
+        # The instance was migrated from host3, which has no backend
+        instance_locality_filter._instance_host_cache.set(uuid, 'host3')
+        server = mock.Mock(**{'OS-EXT-SRV-ATTR:host': 'host2'})
+
+        with mock.patch.object(nova.API, 'get_server',
+                               return_value=server) as mock_get_server:
+            filt_cls = self.class_map['InstanceLocalityFilter']()
+            result = filt_cls.filter_all(backends, filter_properties)
+
+        self.assertEqual([backends[1]], result)
+        mock_get_server.assert_called_once()
+        self.assertEqual(
+            'host2',
+            instance_locality_filter._instance_host_cache.get(uuid))
+
+    def test_no_backend_on_host_from_nova(self):
+        uuid = fake.INSTANCE_ID
+        backends = [fakes.FakeBackendState('host1', {})]
+        filter_properties = {'context': self.context,
+                             'scheduler_hints': {'local_to_instance': uuid},
+                             'request_spec': {'volume_id': fake.VOLUME_ID}}
+        server = mock.Mock(**{'OS-EXT-SRV-ATTR:host': 'host2'})
+
+        with mock.patch.object(nova.API, 'get_server',
+                               return_value=server) as mock_get_server:
+            filt_cls = self.class_map['InstanceLocalityFilter']()
+            result = filt_cls.filter_all(backends, filter_properties)
+
+        self.assertEqual([], result)
+        mock_get_server.assert_called_once()
+
+    @mock.patch('time.monotonic')
+    def test_instance_host_cache_expiry_and_size(self, mock_monotonic):
+        self.override_config('instance_locality_cache_time', 10)
+        self.override_config('instance_locality_cache_size', 2)
+        cache = instance_locality_filter.InstanceHostCache()
+        mock_monotonic.return_value = 100
+
+        cache.set('uuid1', 'host1')
+        cache.set('uuid2', 'host2')
+        self.assertEqual('host1', cache.get('uuid1'))
+        # uuid2 is the least recently used entry now
+        cache.set('uuid3', 'host3')
+        self.assertIsNone(cache.get('uuid2'))
+        self.assertEqual('host1', cache.get('uuid1'))
+        self.assertEqual('host3', cache.get('uuid3'))
+
+        mock_monotonic.return_value = 110
+        self.assertIsNone(cache.get('uuid1'))
+        self.assertIsNone(cache.get('uuid3'))
+
 
 class TestFilter(filters.BaseBackendFilter):
     pass
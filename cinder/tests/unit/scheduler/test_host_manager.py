@@ -859,6 +859,134 @@ class HostManagerTestCase(test.TestCase):
             test_service.TestService._compare(self, volume_node,
                                               backend_state_map[host].service)
 
+    def _create_indexed_backends(self, ctxt):
+        backends = (('host1', 'zone1', 'iSCSI'),
+                    ('host2', 'zone2', 'iSCSI'),
+                    ('host3', 'zone1', ['FC', 'NVMe']))
+        for host, availability_zone, protocol in backends:
+            db.service_create(ctxt,
+                              {'host': host,
+                               'topic': constants.VOLUME_TOPIC,
+                               'binary': constants.VOLUME_BINARY,
+                               'availability_zone': availability_zone,
+                               'created_at': timeutils.utcnow()})
+            self.host_manager.update_service_capabilities(
+                'volume', host, {'free_capacity_gb': 100,
+                                 'storage_protocol': protocol,
+                                 'vendor_name': 'Open Source'},
+                None, None)
+
+    @mock.patch('cinder.objects.Service.is_up', True)
+    def test_get_all_backend_states_filter_properties(self):
+        ctxt = context.RequestContext(fake.USER_ID, fake.PROJECT_ID, True)
+        self._create_indexed_backends(ctxt)
+
+        res = self.host_manager.get_all_backend_states(ctxt)
+        self.assertEqual(3, len(res))
+
+        filter_properties = {
+            'request_spec': {'resource_properties':
+                             {'availability_zone': 'zone1'}},
+            'resource_type': {'extra_specs':
+                              {'capabilities:storage_protocol': '<in> FC',
+                               'vendor_name': 'Open Source',
+                               'capabilities:volume_backend_name': 'x',
+                               'vendor:feature': 'y'}}}
+        res = self.host_manager.get_all_backend_states(
+            ctxt, filter_properties=filter_properties)
+        self.assertEqual(['host3#_pool0'], [pool.host for pool in res])
+
+        filter_properties = {'request_spec': {'availability_zones':
+                                              ['zone1', 'zone2']}}
+        res = self.host_manager.get_all_backend_states(
+            ctxt, filter_properties=filter_properties)
+        self.assertEqual(3, len(res))
+
+        filter_properties = {'resource_type': {'extra_specs':
+                                               {'storage_protocol': 'iSCSI'}}}
+        res = self.host_manager.get_all_backend_states(
+            ctxt, filter_properties=filter_properties)
+        self.assertEqual({'host1#_pool0', 'host2#_pool0'},
+                         {pool.host for pool in res})
+
+    @mock.patch('cinder.objects.Service.is_up', True)
+    def test_get_all_backend_states_filter_not_enabled(self):
+        ctxt = context.RequestContext(fake.USER_ID, fake.PROJECT_ID, True)
+        self._create_indexed_backends(ctxt)
+        self.host_manager.enabled_filters = (
+            self.host_manager._choose_backend_filters(['CapacityFilter']))
+
+        filter_properties = {
+            'request_spec': {'availability_zones': ['zone2']},
+            'resource_type': {'extra_specs': {'storage_protocol': 'FC'}}}
+        res = self.host_manager.get_all_backend_states(
+            ctxt, filter_properties=filter_properties)
+        self.assertEqual(3, len(res))
+
+    @mock.patch('cinder.objects.Service.is_up', True)
+    @mock.patch.object(
+        host_manager.BackendState, 'update_from_volume_capability',
+        autospec=True,
+        side_effect=host_manager.BackendState.update_from_volume_capability)
+    def test_get_all_backend_states_unchanged_capabilities(self,
+                                                           mock_update):
+        ctxt = context.RequestContext(fake.USER_ID, fake.PROJECT_ID, True)
+        self._create_indexed_backends(ctxt)
+        self.host_manager.get_all_backend_states(ctxt)
+        mock_update.reset_mock()
+
+        self.host_manager.get_all_backend_states(ctxt)
+        self.host_manager.get_all_backend_states(ctxt)
+        self.assertEqual(0, mock_update.call_count)
+
+        # Service heartbeats don't change the backend state
+        service = objects.Service.get_by_args(ctxt, 'host1',
+                                              constants.VOLUME_BINARY)
+        service.updated_at = timeutils.utcnow()
+        service.report_count += 1
+        service.save()
+        self.host_manager.get_all_backend_states(ctxt)
+        self.assertEqual(0, mock_update.call_count)
+
+        self.host_manager.update_service_capabilities(
+            'volume', 'host1', {'free_capacity_gb': 50}, None, None)
+        self.host_manager.get_all_backend_states(ctxt)
+        self.assertEqual(1, mock_update.call_count)
+
+        service.availability_zone = 'zone2'
+        service.save()
+        self.host_manager.get_all_backend_states(ctxt)
+        self.assertEqual(2, mock_update.call_count)
+
+    @mock.patch('cinder.objects.ServiceList.get_all')
+    def test_get_volume_services_cache(self, mock_get_all):
+        ctxt = context.get_admin_context()
+        mock_get_all.reset_mock()
+
+        self.host_manager._get_volume_services(ctxt)
+        self.host_manager._get_volume_services(ctxt)
+        self.assertEqual(2, mock_get_all.call_count)
+
+        self.override_config('scheduler_service_list_cache_time', 30)
+        self.host_manager._service_list_cache_time = (
+            self.host_manager._get_service_list_cache_time())
+        mock_get_all.reset_mock()
+        self.host_manager._get_volume_services(ctxt)
+        self.host_manager._get_volume_services(ctxt)
+        mock_get_all.assert_called_once_with(
+            ctxt, {'topic': constants.VOLUME_TOPIC, 'disabled': False,
+                   'frozen': False})
+
+    @ddt.data((30, 30), (50, 50), (51, 50), (600, 50))
+    @ddt.unpack
+    def test_get_service_list_cache_time(self, cache_time, expected):
+        self.override_config('service_down_time', 60)
+        self.override_config('report_interval', 10)
+        self.override_config('scheduler_service_list_cache_time', cache_time)
+
+        self.assertEqual(expected,
+                         self.host_manager._get_service_list_cache_time())
+
     @mock.patch('cinder.db.service_get_all')
     @mock.patch('cinder.objects.service.Service.is_up',
                 new_callable=mock.PropertyMock)
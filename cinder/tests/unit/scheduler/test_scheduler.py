@@ -248,6 +248,61 @@ class SchedulerManagerTestCase(test.TestCase):
 
         mock_clean.assert_called_once_with(self.context)
 
+    @mock.patch('eventlet.spawn')
+    def test_purge_deleted_rows(self, mock_spawn):
+        self.manager._purge_deleted_rows(self.context)
+
+        mock_spawn.assert_called_once_with(
+            self.manager._do_purge_deleted_rows, self.context)
+        self.assertEqual(mock_spawn.return_value, self.manager._purge_thread)
+
+    @mock.patch('eventlet.spawn')
+    def test_purge_deleted_rows_still_running(self, mock_spawn):
+        self.manager._purge_thread = mock.Mock(dead=False)
+
+        self.manager._purge_deleted_rows(self.context)
+
+        mock_spawn.assert_not_called()
+
+    @mock.patch('cinder.db.purge_deleted_rows')
+    @mock.patch('cinder.coordination.COORDINATOR.get_lock')
+    def test_do_purge_deleted_rows(self, mock_get_lock, mock_purge):
+        self.override_config('db_purge_age_in_days', 90)
+        self.override_config('db_purge_periodic_max_rows_per_second', 50)
+        mock_lock = mock_get_lock.return_value
+        mock_lock.acquire.return_value = True
+
+        self.manager._do_purge_deleted_rows(self.context)
+
+        mock_get_lock.assert_called_once_with('purge_deleted_rows')
+        mock_lock.acquire.assert_called_once_with(blocking=False)
+        mock_purge.assert_called_once_with(self.context, 90,
+                                           max_rows_per_second=50)
+        mock_lock.release.assert_called_once_with()
+
+    @mock.patch('cinder.db.purge_deleted_rows')
+    @mock.patch('cinder.coordination.COORDINATOR.get_lock')
+    def test_do_purge_deleted_rows_locked(self, mock_get_lock, mock_purge):
+        mock_lock = mock_get_lock.return_value
+        mock_lock.acquire.return_value = False
+
+        self.manager._do_purge_deleted_rows(self.context)
+
+        mock_purge.assert_not_called()
+        mock_lock.release.assert_not_called()
+
+    @mock.patch('cinder.db.purge_deleted_rows',
+                side_effect=exception.InvalidParameterValue(err='error'))
+    @mock.patch('cinder.coordination.COORDINATOR.get_lock')
+    def test_do_purge_deleted_rows_error(self, mock_get_lock, mock_purge):
+        mock_lock = mock_get_lock.return_value
+        mock_lock.acquire.return_value = True
+
+        self.manager._do_purge_deleted_rows(self.context)
+
+        mock_purge.assert_called_once()
+        mock_lock.release.assert_called_once_with()
+
     @mock.patch('cinder.scheduler.driver.Scheduler.'
                 'update_service_capabilities')
     def test_update_service_capabilities_empty_dict(self, _mock_update_cap):
@@ -30,16 +30,64 @@ class TestLioAdmDriver(tf.TargetDriverFixture):
             self.target = lio.LioAdm(root_helper=utils.get_root_helper(),
                                      configuration=self.configuration)
 
-    @mock.patch.object(lio.LioAdm, '_execute', side_effect=lio.LioAdm._execute)
+    @mock.patch.object(lio.LioAdm, '_privsep_execute',
+                       side_effect=lio.LioAdm._privsep_execute)
     @mock.patch.object(lio.LioAdm, '_persist_configuration')
-    @mock.patch('cinder.utils.execute')
-    def test_get_target(self, mexecute, mpersist_cfg, mlock_exec):
-        mexecute.return_value = (self.test_vol, None)
+    @mock.patch('cinder.privsep.targets.lio.get_targets')
+    def test_get_target(self, mget_targets, mpersist_cfg, mlock_exec):
+        mget_targets.return_value = [self.test_vol]
         self.assertEqual(self.test_vol, self.target._get_target(self.test_vol))
+        self.assertIsNone(self.target._get_target(self.test_vol + '2'))
         self.assertFalse(mpersist_cfg.called)
-        expected_args = ('cinder-rtstool', 'get-targets')
-        mlock_exec.assert_called_once_with(*expected_args, run_as_root=True)
-        mexecute.assert_called_once_with(*expected_args, run_as_root=True)
+        mlock_exec.assert_called_with(mget_targets)
+        mget_targets.assert_called_with()
+
+    @mock.patch('cinder.privsep.targets.lio.save_to_file')
+    def test_persist_configuration(self, msave):
+        self.target._persist_configuration(self.testvol['id'])
+        msave.assert_called_once_with()
+
+    @mock.patch('cinder.privsep.targets.lio.save_to_file',
+                side_effect=OSError)
+    def test_persist_configuration_error(self, msave):
+        # Failing to save the configuration is not an error
+        self.target._persist_configuration(self.testvol['id'])
+        msave.assert_called_once_with()
+
+    @mock.patch('eventlet.spawn_after')
+    @mock.patch('cinder.privsep.targets.lio.save_to_file')
+    def test_persist_configuration_delayed(self, msave, mspawn_after):
+        with mock.patch.object(self.configuration, 'safe_get',
+                               return_value=5):
+            self.target._persist_configuration(self.testvol['id'])
+            self.target._persist_configuration(self.testvol['id'])
+
+        mspawn_after.assert_called_once_with(
+            5, self.target._delayed_save_configuration)
+        msave.assert_not_called()
+
+        self.target._delayed_save_configuration()
+        msave.assert_called_once_with()
+        self.assertIsNone(self.target._save_thread)
+
+    @mock.patch('eventlet.spawn_after')
+    @mock.patch('cinder.privsep.targets.lio.save_to_file')
+    def test_teardown_saves_pending_configuration(self, msave,
+                                                  mspawn_after):
+        with mock.patch.object(self.configuration, 'safe_get',
+                               return_value=5):
+            self.target._persist_configuration(self.testvol['id'])
+
+        self.target.teardown()
+
+        mspawn_after.return_value.cancel.assert_called_once_with()
+        msave.assert_called_once_with()
+        self.assertIsNone(self.target._save_thread)
+
+    @mock.patch('cinder.privsep.targets.lio.save_to_file')
+    def test_teardown_nothing_pending(self, msave):
+        self.target.teardown()
+        msave.assert_not_called()
 
     def test_get_iscsi_target(self):
         ctxt = context.get_admin_context()
@@ -203,18 +251,16 @@ class TestLioAdmDriver(tf.TargetDriverFixture):
         self.assertFalse(mpersist_cfg.called)
 
     @mock.patch.object(lio.LioAdm, '_get_targets')
-    @mock.patch.object(lio.LioAdm, '_execute', side_effect=lio.LioAdm._execute)
-    @mock.patch('cinder.utils.execute')
-    def test_ensure_export(self, mock_exec, mock_execute, mock_get_targets):
+    @mock.patch('cinder.privsep.targets.lio.restore_from_file')
+    def test_ensure_export(self, mock_restore, mock_get_targets):
 
         ctxt = context.get_admin_context()
-        mock_get_targets.return_value = None
+        mock_get_targets.return_value = []
         self.target.ensure_export(ctxt,
                                   self.testvol,
                                   self.fake_volumes_dir)
 
-        expected_args = ('cinder-rtstool', 'restore')
-        mock_exec.assert_called_once_with(*expected_args, run_as_root=True)
+        mock_restore.assert_called_once_with()
 
     @mock.patch.object(lio.LioAdm, '_get_targets')
     @mock.patch.object(lio.LioAdm, '_restore_configuration')
@@ -227,6 +273,86 @@ class TestLioAdmDriver(tf.TargetDriverFixture):
                                   self.fake_volumes_dir)
         self.assertFalse(mock_restore.called)
 
+    def _fake_volume(self, name, provider_auth, initiators=()):
+        attachments = [mock.Mock(connector={'initiator': initiator})
+                       for initiator in initiators]
+        attachments.append(mock.Mock(connector=None))
+        volume = mock.MagicMock(volume_attachment=attachments)
+        volume.__getitem__.side_effect = {
+            'id': name + '_id',
+            'name': name,
+            'provider_auth': provider_auth}.__getitem__
+        return volume
+
+    @mock.patch.object(lio.LioAdm, '_save_configuration')
+    @mock.patch('cinder.privsep.targets.lio.create_targets')
+    @mock.patch('cinder.privsep.targets.lio.restore_from_file')
+    @mock.patch('cinder.privsep.targets.lio.get_targets')
+    def test_ensure_exports(self, mock_get_targets, mock_restore,
+                            mock_create_targets, mock_save):
+        ctxt = context.get_admin_context()
+        volumes = [self._fake_volume('vol1', None),
+                   self._fake_volume('vol2', 'CHAP user2 pass2',
+                                     ['iqn.initiator1', 'iqn.initiator2']),
+                   self._fake_volume('vol3', 'CHAP user3 pass3')]
+        mock_get_targets.side_effect = [[],
+                                        [self.iscsi_target_prefix + 'vol1']]
+        mock_create_targets.return_value = {
+            self.iscsi_target_prefix + 'vol3': 'error'}
+
+        failed = self.target.ensure_exports(ctxt, volumes,
+                                            ['/dev/vg/vol1', '/dev/vg/vol2',
+                                             '/dev/vg/vol3'])
+
+        self.assertEqual(['vol3_id'], list(failed))
+        self.assertIsInstance(failed['vol3_id'],
+                              exception.ISCSITargetCreateFailed)
+        mock_restore.assert_called_once_with()
+        portals = {'portals_ips': [self.configuration.target_ip_address],
+                   'portals_port': self.configuration.target_port}
+        mock_create_targets.assert_called_once_with([
+            {'backing_device': '/dev/vg/vol2',
+             'name': self.iscsi_target_prefix + 'vol2',
+             'userid': 'user2',
+             'password': 'pass2',
+             'iser_enabled': 'False',
+             'initiator_iqns': 'iqn.initiator1,iqn.initiator2',
+             **portals},
+            {'backing_device': '/dev/vg/vol3',
+             'name': self.iscsi_target_prefix + 'vol3',
+             'userid': 'user3',
+             'password': 'pass3',
+             'iser_enabled': 'False',
+             'initiator_iqns': '',
+             **portals}])
+        mock_save.assert_called_once_with()
+
+    @mock.patch.object(lio.LioAdm, '_save_configuration')
+    @mock.patch('cinder.privsep.targets.lio.create_targets')
+    @mock.patch('cinder.privsep.targets.lio.restore_from_file')
+    @mock.patch('cinder.privsep.targets.lio.get_targets')
+    def test_ensure_exports_targets_exist(self, mock_get_targets,
+                                          mock_restore, mock_create_targets,
+                                          mock_save):
+        ctxt = context.get_admin_context()
+        mock_get_targets.return_value = [self.iscsi_target_prefix + 'vol1']
+
+        failed = self.target.ensure_exports(
+            ctxt, [self._fake_volume('vol1', None)], ['/dev/vg/vol1'])
+
+        self.assertEqual({}, failed)
+        mock_get_targets.assert_called_once_with()
+        mock_restore.assert_not_called()
+        mock_create_targets.assert_not_called()
+        mock_save.assert_not_called()
+
+    @mock.patch('cinder.privsep.targets.lio.get_targets')
+    def test_ensure_exports_no_volumes(self, mock_get_targets):
+        ctxt = context.get_admin_context()
+
+        self.assertEqual({}, self.target.ensure_exports(ctxt, [], []))
+        mock_get_targets.assert_not_called()
+
     @mock.patch.object(lio.LioAdm, '_execute', side_effect=lio.LioAdm._execute)
     @mock.patch.object(lio.LioAdm, '_persist_configuration')
     @mock.patch('cinder.utils.execute')
@@ -49,6 +49,7 @@ from cinder.db import migration
 from cinder.db.sqlalchemy import api as sqla_api
 from cinder import i18n
 from cinder.objects import base as objects_base
+from cinder import quota
 from cinder import rpc
 from cinder import service
 from cinder.tests import fixtures as cinder_fixtures
@@ -227,6 +228,10 @@ class TestCase(testtools.TestCase):
         rpc.LAST_OBJ_VERSIONS = {}
         rpc.LAST_RPC_VERSIONS = {}
 
+        # The quota resources of the volume types are cached, and each test
+        # starts with a new database.
+        quota.QUOTAS.invalidate_resources()
+
         # Init AuthProtocol to register some base options first, such as
         # auth_url.
         auth_token.AuthProtocol('fake_app', {'auth_type': 'password',
@@ -14,6 +14,8 @@ import collections
 import datetime
 import errno
 import io
+import json
+import os
 import re
 import sys
 import time
@@ -175,10 +177,25 @@ class TestCinderSchedulerCmd(test.TestCase):
         self.assertEqual(CONF.version, version.version_string())
         log_setup.assert_called_once_with(CONF, "cinder")
         monkey_patch.assert_called_once_with()
-        service_create.assert_called_once_with(binary='cinder-scheduler')
+        service_create.assert_called_once_with(binary='cinder-scheduler',
+                                               coordination=False)
         service_serve.assert_called_once_with(server)
         service_wait.assert_called_once_with()
 
+    @mock.patch('cinder.service.wait')
+    @mock.patch('cinder.service.serve')
+    @mock.patch('cinder.service.Service.create')
+    @mock.patch('cinder.utils.monkey_patch')
+    @mock.patch('oslo_log.log.setup')
+    def test_main_db_purge(self, log_setup, monkey_patch, service_create,
+                           service_serve, service_wait):
+        self.override_config('db_purge_interval', 3600)
+
+        cinder_scheduler.main()
+
+        service_create.assert_called_once_with(binary='cinder-scheduler',
+                                               coordination=True)
+
 
 class TestCinderVolumeCmdPosix(test.TestCase):
 
@@ -615,14 +632,39 @@ class TestCinderManageCmd(test.TestCase):
                                       is_admin=True)
         get_admin_context.return_value = ctxt
 
-        purge_deleted_rows.return_value = None
+        purge_deleted_rows.return_value = {}
 
         db_cmds = cinder_manage.DbCommands()
         db_cmds.purge(age_in_days)
 
         get_admin_context.assert_called_once_with()
         purge_deleted_rows.assert_called_once_with(
-            ctxt, age_in_days=age_in_days)
+            ctxt, age_in_days=age_in_days, batch_size=None,
+            max_rows_per_second=None)
+
+    @mock.patch('sys.stdout', new_callable=io.StringIO)
+    @mock.patch('cinder.db.sqlalchemy.api.purge_deleted_rows')
+    @mock.patch('cinder.context.get_admin_context')
+    def test_purge_batches(self, get_admin_context, purge_deleted_rows,
+                           stdout):
+        get_admin_context.return_value = mock.sentinel.ctxt
+        purge_deleted_rows.return_value = {'volume_metadata': 0,
+                                           'volumes': 12}
+
+        db_cmds = cinder_manage.DbCommands()
+        db_cmds.purge(30, batch_size=5, max_rows_per_second=100)
+
+        purge_deleted_rows.assert_called_once_with(
+            mock.sentinel.ctxt, age_in_days=30, batch_size=5,
+            max_rows_per_second=100)
+        self.assertEqual('Purged 12 rows from table volumes\n',
+                         stdout.getvalue())
+
+    @ddt.data({'batch_size': 0}, {'max_rows_per_second': -1})
+    def test_purge_invalid_batch_options(self, kwargs):
+        db_cmds = cinder_manage.DbCommands()
+        ex = self.assertRaises(SystemExit, db_cmds.purge, 30, **kwargs)
+        self.assertEqual(1, ex.code)
 
     @mock.patch('cinder.db.service_get_all')
     @mock.patch('cinder.context.get_admin_context')
@@ -2011,6 +2053,7 @@ class TestCinderRtstoolCmd(test.TestCase):
         self.assertEqual(0, rc)
 
 
+@ddt.ddt
 class TestCinderVolumeUsageAuditCmd(test.TestCase):
 
     def setUp(self):
@@ -2098,8 +2141,8 @@ class TestCinderVolumeUsageAuditCmd(test.TestCase):
         get_logger.assert_called_once_with('cinder')
         rpc_init.assert_called_once_with(CONF)
         last_completed_audit_period.assert_called_once_with()
-        volume_get_all_active_by_window.assert_called_once_with(ctxt, begin,
-                                                                end)
+        volume_get_all_active_by_window.assert_called_once_with(
+            ctxt, begin, end, marker=None, limit=1000)
         notify_about_volume_usage.assert_has_calls([
             mock.call(ctxt, volume1, 'exists', extra_usage_info=extra_info),
             mock.call(ctxt, volume1, 'create.start',
@@ -2168,8 +2211,8 @@ class TestCinderVolumeUsageAuditCmd(test.TestCase):
         get_logger.assert_called_once_with('cinder')
         rpc_init.assert_called_once_with(CONF)
         last_completed_audit_period.assert_called_once_with()
-        volume_get_all_active_by_window.assert_called_once_with(ctxt, begin,
-                                                                end)
+        volume_get_all_active_by_window.assert_called_once_with(
+            ctxt, begin, end, marker=None, limit=1000)
         notify_about_volume_usage.assert_has_calls([
             mock.call(ctxt, volume1, 'exists', extra_usage_info=extra_info),
             mock.call(ctxt, volume1, 'create.start',
@@ -2248,8 +2291,8 @@ class TestCinderVolumeUsageAuditCmd(test.TestCase):
         get_logger.assert_called_once_with('cinder')
         rpc_init.assert_called_once_with(CONF)
         last_completed_audit_period.assert_called_once_with()
-        volume_get_all_active_by_window.assert_called_once_with(ctxt, begin,
-                                                                end)
+        volume_get_all_active_by_window.assert_called_once_with(
+            ctxt, begin, end, marker=None, limit=1000)
         self.assertFalse(notify_about_volume_usage.called)
         notify_about_snapshot_usage.assert_has_calls([
             mock.call(ctxt, snapshot1, 'exists', extra_info),
@@ -2314,8 +2357,8 @@ class TestCinderVolumeUsageAuditCmd(test.TestCase):
         self.assertEqual(CONF.version, version.version_string())
         rpc_init.assert_called_once_with(CONF)
         last_completed_audit_period.assert_called_once_with()
-        volume_get_all_active_by_window.assert_called_once_with(ctxt,
-                                                                begin, end)
+        volume_get_all_active_by_window.assert_called_once_with(
+            ctxt, begin, end, marker=None, limit=1000)
         self.assertFalse(notify_about_volume_usage.called)
         notify_about_backup_usage.assert_any_call(ctxt, backup1, 'exists',
                                                   extra_info)
@@ -2420,8 +2463,8 @@ class TestCinderVolumeUsageAuditCmd(test.TestCase):
         get_logger.assert_called_once_with('cinder')
         rpc_init.assert_called_once_with(CONF)
         last_completed_audit_period.assert_called_once_with()
-        volume_get_all_active_by_window.assert_called_once_with(ctxt,
-                                                                begin, end)
+        volume_get_all_active_by_window.assert_called_once_with(
+            ctxt, begin, end, marker=None, limit=1000)
         notify_about_volume_usage.assert_has_calls([
             mock.call(ctxt, volume1, 'exists', extra_usage_info=extra_info),
             mock.call(ctxt, volume1, 'create.start',
@@ -2458,6 +2501,136 @@ class TestCinderVolumeUsageAuditCmd(test.TestCase):
                       extra_usage_info=extra_info_backup_delete)
         ])
 
+    def _setup_audit(self, get_admin_context, last_completed_audit_period):
+        CONF.set_override('start_time', '2014-01-01 01:00:00')
+        CONF.set_override('end_time', '2014-02-02 02:00:00')
+        begin = datetime.datetime(2014, 1, 1, 1, 0, tzinfo=iso8601.UTC)
+        end = datetime.datetime(2014, 2, 2, 2, 0, tzinfo=iso8601.UTC)
+        ctxt = context.RequestContext(fake.USER_ID, fake.PROJECT_ID)
+        get_admin_context.return_value = ctxt
+        last_completed_audit_period.return_value = (begin, end)
+        checkpoint_file = os.path.join(
+            self.useFixture(fixtures.TempDir()).path, 'checkpoint')
+        CONF.set_override('checkpoint_file', checkpoint_file)
+        return ctxt, begin, end, checkpoint_file
+
+    @mock.patch('cinder.volume.volume_utils.notify_about_backup_usage')
+    @mock.patch('cinder.objects.backup.BackupList.get_all_active_by_window',
+                return_value=[])
+    @mock.patch('cinder.volume.volume_utils.notify_about_snapshot_usage')
+    @mock.patch('cinder.objects.snapshot.SnapshotList.'
+                'get_all_active_by_window', return_value=[])
+    @mock.patch('cinder.volume.volume_utils.notify_about_volume_usage')
+    @mock.patch('cinder.objects.volume.VolumeList.get_all_active_by_window')
+    @mock.patch('cinder.utils.last_completed_audit_period')
+    @mock.patch('cinder.rpc.init')
+    @mock.patch('oslo_log.log.setup')
+    @mock.patch('cinder.context.get_admin_context')
+    def test_main_batches(self, get_admin_context, log_setup, rpc_init,
+                          last_completed_audit_period,
+                          volume_get_all_active_by_window,
+                          notify_about_volume_usage,
+                          snapshot_get_all_active_by_window,
+                          notify_about_snapshot_usage,
+                          backup_get_all_active_by_window,
+                          notify_about_backup_usage):
+        CONF.set_override('batch_size', 2)
+        ctxt, begin, end, checkpoint_file = self._setup_audit(
+            get_admin_context, last_completed_audit_period)
+        volumes = [mock.MagicMock(id=volume_id, project_id=fake.PROJECT_ID)
+                   for volume_id in (fake.VOLUME_ID, fake.VOLUME2_ID,
+                                     fake.VOLUME3_ID)]
+        checkpoints = []
+
+        def _get_all_active_by_window(*args, **kwargs):
+            if kwargs['marker'] is None:
+                return volumes[:2]
+            with open(checkpoint_file) as f:
+                checkpoints.append(json.load(f))
+            return volumes[2:]
+
+        volume_get_all_active_by_window.side_effect = (
+            _get_all_active_by_window)
+
+        volume_usage_audit.main()
+
+        volume_get_all_active_by_window.assert_has_calls([
+            mock.call(ctxt, begin, end, marker=None, limit=2),
+            mock.call(ctxt, begin, end, marker=fake.VOLUME2_ID, limit=2)])
+        self.assertEqual(2, volume_get_all_active_by_window.call_count)
+        self.assertEqual(3, notify_about_volume_usage.call_count)
+        self.assertEqual([{'audit_period_beginning': str(begin),
+                           'audit_period_ending': str(end),
+                           'resources': {'volumes': fake.VOLUME2_ID}}],
+                         checkpoints)
+        snapshot_get_all_active_by_window.assert_called_once_with(
+            ctxt, begin, end, marker=None, limit=2)
+        backup_get_all_active_by_window.assert_called_once_with(
+            ctxt, begin, end, marker=None, limit=2)
+        self.assertFalse(os.path.exists(checkpoint_file))
+
+    @ddt.data(True, False)
+    @mock.patch('cinder.objects.backup.BackupList.get_all_active_by_window',
+                return_value=[])
+    @mock.patch('cinder.objects.snapshot.SnapshotList.'
+                'get_all_active_by_window', return_value=[])
+    @mock.patch('cinder.objects.volume.VolumeList.get_all_active_by_window',
+                return_value=[])
+    @mock.patch('cinder.utils.last_completed_audit_period')
+    @mock.patch('cinder.rpc.init')
+    @mock.patch('oslo_log.log.setup')
+    @mock.patch('cinder.context.get_admin_context')
+    def test_main_checkpoint(self, same_period, get_admin_context, log_setup,
+                             rpc_init, last_completed_audit_period,
+                             volume_get_all_active_by_window,
+                             snapshot_get_all_active_by_window,
+                             backup_get_all_active_by_window):
+        ctxt, begin, end, checkpoint_file = self._setup_audit(
+            get_admin_context, last_completed_audit_period)
+        with open(checkpoint_file, 'w') as f:
+            json.dump({'audit_period_beginning':
+                       str(begin) if same_period else str(end),
+                       'audit_period_ending': str(end),
+                       'resources': {'volumes': True,
+                                     'snapshots': fake.SNAPSHOT_ID}}, f)
+
+        volume_usage_audit.main()
+
+        if same_period:
+            volume_get_all_active_by_window.assert_not_called()
+            snapshot_get_all_active_by_window.assert_called_once_with(
+                ctxt, begin, end, marker=fake.SNAPSHOT_ID, limit=1000)
+        else:
+            volume_get_all_active_by_window.assert_called_once_with(
+                ctxt, begin, end, marker=None, limit=1000)
+            snapshot_get_all_active_by_window.assert_called_once_with(
+                ctxt, begin, end, marker=None, limit=1000)
+        backup_get_all_active_by_window.assert_called_once_with(
+            ctxt, begin, end, marker=None, limit=1000)
+        self.assertFalse(os.path.exists(checkpoint_file))
+
+    @mock.patch('time.sleep')
+    @mock.patch('time.monotonic')
+    def test_rate_limiter(self, mock_monotonic, mock_sleep):
+        mock_monotonic.side_effect = [10.0, 10.0, 10.1, 11.2]
+        limiter = volume_usage_audit._RateLimiter(2)
+
+        limiter.wait()
+        limiter.wait()
+        limiter.wait()
+
+        mock_sleep.assert_called_once_with(mock.ANY)
+        self.assertAlmostEqual(0.4, mock_sleep.call_args[0][0])
+        self.assertAlmostEqual(11.7, limiter.next_time)
+
+    @mock.patch('time.sleep')
+    def test_rate_limiter_unlimited(self, mock_sleep):
+        limiter = volume_usage_audit._RateLimiter(0)
+
+        limiter.wait()
+
+        mock_sleep.assert_not_called()
+
 
 class TestVolumeSharedTargetsOnlineMigration(test.TestCase):
     """Unit tests for cinder.db.api.service_*."""
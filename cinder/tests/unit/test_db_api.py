@@ -793,6 +793,66 @@ class DBAPIVolumeTestCase(BaseTest):
         self._assertEqualListsOfObjects(volumes[2:], db.volume_get_all(
                                         self.ctxt, 2, 2, ['id'], ['asc']))
 
+    @ddt.data(('asc', 'asc'), ('desc', 'desc'), ('asc', 'desc'))
+    @ddt.unpack
+    def test_volume_get_all_offset(self, name_dir, id_dir):
+        names = (None, 'b', 'a', None, 'b', 'c')
+        volumes = [
+            db.volume_create(
+                self.ctxt, {'id': i, 'display_name': name,
+                            'volume_type_id': fake.VOLUME_TYPE_ID})
+            for i, name in enumerate(names, 1)]
+        expected = db.volume_get_all(self.ctxt, None, None,
+                                     ['display_name', 'id'],
+                                     [name_dir, id_dir])
+        self.assertEqual(len(volumes), len(expected))
+
+        for offset in range(1, len(volumes)):
+            self._assertEqualListsOfObjects(
+                expected[offset:offset + 2],
+                db.volume_get_all(self.ctxt, None, 2,
+                                  ['display_name', 'id'], [name_dir, id_dir],
+                                  offset=offset))
+        self.assertEqual([], db.volume_get_all(self.ctxt, None, 2,
+                                               ['display_name', 'id'],
+                                               [name_dir, id_dir],
+                                               offset=len(volumes)))
+
+    def test_volume_get_all_offset_after_marker(self):
+        volumes = [
+            db.volume_create(
+                self.ctxt, {'id': i, 'volume_type_id': fake.VOLUME_TYPE_ID})
+            for i in range(1, 6)]
+
+        self._assertEqualListsOfObjects(volumes[2:4], db.volume_get_all(
+                                        self.ctxt, 1, 2, ['id'], ['asc'],
+                                        offset=1))
+
+    def test_volume_get_all_summary(self):
+        volumes = [
+            db.volume_create(
+                self.ctxt, {'id': i, 'display_name': 'vol%d' % i,
+                            'volume_type_id': fake.VOLUME_TYPE_ID})
+            for i in range(1, 4)]
+
+        result = db.volume_get_all(self.ctxt, None, None, ['id'], ['asc'],
+                                   summary=True)
+
+        self.assertEqual([{'id': v.id, 'display_name': v.display_name}
+                          for v in volumes], result)
+
+    def test_volume_get_all_by_project_summary(self):
+        volume = db.volume_create(
+            self.ctxt, {'project_id': 'project1', 'display_name': 'vol',
+                        'volume_type_id': fake.VOLUME_TYPE_ID})
+        db.volume_create(self.ctxt, {'project_id': 'project2',
+                                     'volume_type_id': fake.VOLUME_TYPE_ID})
+
+        result = db.volume_get_all_by_project(self.ctxt, 'project1', None,
+                                              None, summary=True)
+
+        self.assertEqual([{'id': volume.id, 'display_name': 'vol'}], result)
+
     def test_volume_get_all_by_host(self):
         volumes = []
         for i in range(3):
@@ -3567,6 +3627,71 @@ class DBAPIImageVolumeCacheEntryTestCase(BaseTest):
         entries = db.image_volume_cache_get_all(self.ctxt, host=host)
         self.assertEqual([], entries)
 
+    def test_cache_entry_get_and_update_last_used_hits(self):
+        host = 'abc@123#poolz'
+        image_id = 'c06764d7-54b0-4471-acce-62e79452a38b'
+        entry = db.image_volume_cache_create(self.ctxt, host, None, image_id,
+                                             datetime.datetime.utcnow(),
+                                             fake.VOLUME_ID, 6)
+        self.assertEqual(0, entry['hits'])
+
+        # Looking up an entry doesn't count as a hit
+        entry = db.image_volume_cache_get_and_update_last_used(
+            self.ctxt, image_id, host=host)
+        self.assertEqual(0, entry['hits'])
+
+        for hits in (1, 2):
+            self.assertEqual(
+                1, db.image_volume_cache_add_hit(self.ctxt, entry['id']))
+            entry = db.image_volume_cache_get_by_volume_id(self.ctxt,
+                                                           fake.VOLUME_ID)
+            self.assertEqual(hits, entry['hits'])
+
+    def test_cache_entry_update_delete_by_id(self):
+        host = 'abc@123#poolz'
+        image_id = 'c06764d7-54b0-4471-acce-62e79452a38b'
+        entry = db.image_volume_cache_create(self.ctxt, host, None, image_id,
+                                             datetime.datetime.utcnow(),
+                                             None, 6, status='warming')
+        self.assertIsNone(entry['volume_id'])
+
+        last_used = datetime.datetime(2000, 1, 1)
+        self.assertEqual(1, db.image_volume_cache_update(
+            self.ctxt, entry['id'], {'last_used': last_used}))
+        entries = db.image_volume_cache_get_all(self.ctxt, id=entry['id'])
+        self.assertEqual(last_used, entries[0]['last_used'])
+
+        db.image_volume_cache_delete_by_id(self.ctxt, entry['id'])
+
+        self.assertEqual([], db.image_volume_cache_get_all(self.ctxt,
+                                                           host=host))
+        self.assertEqual(0, db.image_volume_cache_update(
+            self.ctxt, entry['id'], {'last_used': last_used}))
+
+    def test_cache_entry_get_usage(self):
+        host = 'abc@123#poolz'
+        image_updated_at = datetime.datetime.utcnow()
+        for i, size in enumerate((6, 10)):
+            db.image_volume_cache_create(self.ctxt, host, None,
+                                         'image-%s' % i, image_updated_at,
+                                         'vol-%s' % i, size)
+        db.image_volume_cache_create(self.ctxt, host, None, 'image-2',
+                                     image_updated_at, 'vol-2', 3,
+                                     status='warming')
+        db.image_volume_cache_create(self.ctxt, 'someOtherHost', None,
+                                     'image-3', image_updated_at, 'vol-3',
+                                     20)
+
+        self.assertEqual((2, 16),
+                         db.image_volume_cache_get_usage(
+                             self.ctxt, host=host, status='available'))
+        self.assertEqual((3, 19),
+                         db.image_volume_cache_get_usage(self.ctxt,
+                                                         host=host))
+        self.assertEqual((0, 0),
+                         db.image_volume_cache_get_usage(self.ctxt,
+                                                         host='nohost'))
+
     @ddt.data('host1@backend1#pool1', 'host1@backend1')
     def test_cache_entry_include_in_cluster_by_host(self, host):
         """Basic cache include test filtering by host and with full rename."""
@@ -13,6 +13,8 @@
 #    License for the specific language governing permissions and limitations
 #    under the License.
 
+from unittest import mock
+
 from cinder import exception
 from cinder.scheduler.evaluator import evaluator
 from cinder.tests.unit import test
@@ -144,3 +146,25 @@ class EvaluatorTestCase(test.TestCase):
         self.assertGreater(evaluator.evaluate(
             '(((1 + max(1 + (10 / 20), 2, 3)) / 100) + 1)'),
             1)
+
+    def test_expression_parsed_once(self):
+        expression = 'stats.free_capacity_gb > 10 ? 100 : 50 + 0.5'
+        evaluator._compile.cache_clear()
+        with mock.patch.object(evaluator, '_def_parser',
+                               wraps=evaluator._def_parser) as mock_def:
+            evaluator._parser = None
+            self.assertEqual(100, evaluator.evaluate(
+                expression, stats={'free_capacity_gb': 20}))
+            self.assertEqual(50.5, evaluator.evaluate(
+                expression, stats={'free_capacity_gb': 5}))
+        mock_def.assert_called_once_with()
+        self.assertEqual(1, evaluator._compile.cache_info().misses)
+        self.assertEqual(1, evaluator._compile.cache_info().hits)
+
+    def test_compiled_expression_variables(self):
+        """Variables are looked up on each evaluation, not when parsing."""
+        tree = evaluator._compile('a.x * 2 + max(a.y, 3)')
+        self.assertEqual(7, tree.eval({'a': {'x': 2, 'y': 1}}))
+        self.assertEqual(16, tree.eval({'a': {'x': 3, 'y': '10'}}))
+        self.assertRaises(exception.EvaluatorParseException,
+                          tree.eval, {'b': {}})
@@ -13,11 +13,17 @@
 """Unit tests for image utils."""
 
 import errno
+import gzip
+import itertools
 import math
+import os
+import struct
 from unittest import mock
 
 import cryptography
 import ddt
+import eventlet
+import fixtures
 from oslo_concurrency import processutils
 from oslo_utils import imageutils
 from oslo_utils import units
@@ -1175,6 +1181,133 @@ class TestUploadVolume(test.TestCase):
             store_id=None, base_image_ref='xyz')
 
 
+class TestUploadStream(test.TestCase):
+    def setUp(self):
+        super(TestUploadStream, self).setUp()
+        self.tmp_dir = self.useFixture(fixtures.TempDir()).path
+        self.flags(image_conversion_dir=self.tmp_dir,
+                   image_upload_streaming=True,
+                   allow_compression_on_image_upload=True)
+        self.ctxt = mock.sentinel.context
+        self.image_meta = {'id': fake.IMAGE_ID,
+                           'disk_format': 'raw',
+                           'container_format': 'compressed'}
+        self.uploaded = []
+        self.image_service = mock.Mock()
+        self.image_service.update.side_effect = self._update
+        self.mock_info = self.mock_object(image_utils, 'qemu_img_info')
+        self.mock_info.return_value.file_format = 'raw'
+        self.mock_info.return_value.backing_file = None
+        self.mock_convert = self.mock_object(image_utils, 'convert_image')
+        self.mock_accel = self.mock_object(image_utils.accelerator,
+                                           'ImageAccel')
+
+    def _update(self, context, image_id, image_meta, data, **kwargs):
+        self.uploaded.append(gzip.decompress(data.read()))
+
+    def _create_volume(self):
+        path = os.path.join(self.tmp_dir, 'volume')
+        with open(path, 'wb') as f:
+            f.write(b'head')
+            f.seek(3 * units.Mi)
+            f.write(b'tail')
+        with open(path, 'rb') as f:
+            return path, f.read()
+
+    def test_chunk_reader(self):
+        reader = image_utils._ChunkReader([b'abc', b'', b'defg', b'h'])
+        self.assertEqual(b'ab', reader.read(2))
+        self.assertEqual(b'cdefg', reader.read(5))
+        self.assertEqual(b'h', reader.read())
+        self.assertEqual(b'', reader.read(10))
+
+    def test_chunk_reader_slices_chunk(self):
+        chunk = b'a' * units.Mi
+        reader = image_utils._ChunkReader([chunk, b'b'])
+        for _ in range(16):
+            self.assertEqual(b'a' * 64 * units.Ki, reader.read(64 * units.Ki))
+        self.assertEqual(b'b', reader.read(64 * units.Ki))
+        self.assertEqual(b'', reader.read(64 * units.Ki))
+        self.assertEqual(b'', reader.read())
+
+    def test_read_volume_chunks(self):
+        path, content = self._create_volume()
+        chunks = list(image_utils._read_volume_chunks(path))
+        self.assertEqual(content, b''.join(chunks))
+        self.assertTrue(all(len(chunk) <= units.Mi for chunk in chunks))
+
+    def test_read_volume_chunks_sparse(self):
+        lseek = os.lseek
+
+        def _lseek(fd, offset, whence):
+            # Fake a filesystem reporting the data at the start and the end
+            if whence == os.SEEK_DATA:
+                return offset if offset < 4 else 3 * units.Mi
+            if whence == os.SEEK_HOLE:
+                return 4 if offset < 4 else size
+            return lseek(fd, offset, whence)
+
+        path, content = self._create_volume()
+        size = len(content)
+        self.mock_object(image_utils.os, 'lseek', side_effect=_lseek)
+        mock_execute = self.mock_object(image_utils.tpool, 'execute',
+                                        side_effect=lambda f, *a: f(*a))
+
+        chunks = list(image_utils._read_volume_chunks(path))
+
+        self.assertEqual(content, b''.join(chunks))
+        # Only the data was read
+        self.assertEqual(2, mock_execute.call_count)
+
+    def test_upload_volume_stream_raw(self):
+        volume_path, content = self._create_volume()
+
+        image_utils.upload_volume(self.ctxt, self.image_service,
+                                  self.image_meta, volume_path)
+
+        self.assertEqual([content], self.uploaded)
+        self.image_service.update.assert_called_once_with(
+            self.ctxt, fake.IMAGE_ID, {}, mock.ANY, store_id=None,
+            base_image_ref=None)
+        self.mock_info.assert_called_once_with(volume_path, run_as_root=True)
+        self.mock_convert.assert_not_called()
+        self.mock_accel.assert_not_called()
+
+    def test_upload_volume_stream_converted(self):
+        volume_path, content = self._create_volume()
+        self.image_meta['disk_format'] = 'qcow2'
+        self.mock_info.return_value.file_format = 'qcow2'
+
+        def _convert(source, dest, out_format, **kwargs):
+            with open(dest, 'wb') as f:
+                f.write(b'converted')
+
+        self.mock_convert.side_effect = _convert
+
+        image_utils.upload_volume(self.ctxt, self.image_service,
+                                  self.image_meta, volume_path)
+
+        self.assertEqual([b'converted'], self.uploaded)
+        self.mock_convert.assert_called_once_with(
+            volume_path, mock.ANY, 'qcow2', run_as_root=True, compress=True,
+            image_id=fake.IMAGE_ID, data=self.mock_info.return_value)
+        self.mock_accel.assert_not_called()
+
+    def test_upload_volume_stream_not_raw_volume(self):
+        # A raw volume that doesn't look raw is converted like before
+        volume_path, content = self._create_volume()
+        self.mock_info.return_value.file_format = 'qcow2'
+        self.mock_convert.side_effect = (
+            lambda source, dest, out_format, **kwargs:
+                self.mock_info.return_value.configure_mock(file_format='raw'))
+
+        image_utils.upload_volume(self.ctxt, self.image_service,
+                                  self.image_meta, volume_path)
+
+        self.mock_convert.assert_called_once()
+        self.assertEqual([b''], self.uploaded)
+
+
 class TestFetchToVhd(test.TestCase):
     @mock.patch('cinder.image.image_utils.fetch_to_volume_format')
     def test_defaults(self, mock_fetch_to):
@@ -1549,6 +1682,7 @@ class TestFetchToVolumeFormat(test.TestCase):
     def test_temporary_images(self, mock_temp, mock_info,
                               mock_fetch, mock_repl_xen,
                               mock_copy, mock_convert):
+        self.flags(image_download_sharing=False)
         ctxt = mock.sentinel.context
         ctxt.user_id = mock.sentinel.user_id
         disk_format = 'ploop'
@@ -2055,6 +2189,175 @@ class TestFetchToVolumeFormat(test.TestCase):
         mock_engine.decompress_img.assert_called()
 
 
+@ddt.ddt
+class TestFetchStream(test.TestCase):
+    def setUp(self):
+        super(TestFetchStream, self).setUp()
+        self.tmp_dir = self.useFixture(fixtures.TempDir()).path
+        self.flags(image_conversion_dir=self.tmp_dir,
+                   image_download_streaming=True)
+        self.ctxt = mock.sentinel.context
+        self.ctxt.user_id = mock.sentinel.user_id
+        self.dest = os.path.join(self.tmp_dir, 'volume')
+        self.image_service = mock.Mock(temp_images=None)
+        self.mock_info = self.mock_object(image_utils, 'qemu_img_info')
+        self.mock_convert = self.mock_object(image_utils, 'convert_image')
+        self.mock_fetch = self.mock_object(image_utils, 'fetch')
+
+    @staticmethod
+    def _qcow2_data():
+        header = struct.pack('>4sIQIIQ', b'QFI\xfb', 3, 0, 0, 16, units.Gi)
+        return header.ljust(units.Ki, b'\0') + b'qcow2 data'
+
+    @staticmethod
+    def _split(data, size=1000):
+        return [data[i:i + size] for i in range(0, len(data), size)]
+
+    @ddt.data(({'disk_format': 'raw', 'container_format': 'bare'}, True),
+              ({'disk_format': 'qcow2', 'container_format': 'compressed'},
+               True),
+              ({'disk_format': 'qcow2', 'container_format': 'bare'}, False),
+              ({'disk_format': 'vhd', 'container_format': 'ovf'}, False),
+              ({'disk_format': 'raw', 'container_format': 'bare',
+                'properties': {'img_signature': 'signature'}}, False))
+    @ddt.unpack
+    def test_can_stream_image(self, image_meta, expected):
+        self.assertEqual(expected, image_utils.can_stream_image(image_meta))
+
+    def test_can_stream_image_disabled(self):
+        self.flags(image_download_streaming=False)
+        self.assertFalse(image_utils.can_stream_image(
+            {'disk_format': 'raw', 'container_format': 'bare'}))
+
+    def test_can_stream_image_signature_verification_disabled(self):
+        self.flags(verify_glance_signatures='disabled')
+        self.assertTrue(image_utils.can_stream_image(
+            {'disk_format': 'raw', 'container_format': 'bare',
+             'properties': {'img_signature': 'signature'}}))
+
+    def test_gunzip_chunks(self):
+        data = gzip.compress(b'first member') + gzip.compress(b' second')
+        result = image_utils._gunzip_chunks(self._split(data, 3),
+                                            fake.IMAGE_ID)
+        self.assertEqual(b'first member second', b''.join(result))
+
+    def test_gunzip_chunks_not_gzip(self):
+        result = image_utils._gunzip_chunks([b'not gzip'], fake.IMAGE_ID)
+        self.assertRaises(exception.ImageUnacceptable, list, result)
+
+    def test_gunzip_chunks_truncated(self):
+        data = gzip.compress(b'image data' * 100)
+        result = image_utils._gunzip_chunks([data[:-10]], fake.IMAGE_ID)
+        self.assertRaises(exception.ImageDownloadFailed, list, result)
+
+    def test_detect_stream_format_raw(self):
+        chunks = self._split(b'raw data' * units.Ki)
+        inspector, buffered = image_utils._detect_stream_format(iter(chunks))
+        self.assertEqual('raw', str(inspector))
+        self.assertEqual(chunks, buffered)
+
+    def test_detect_stream_format_qcow2(self):
+        chunks = iter(self._split(self._qcow2_data(), 512))
+        inspector, buffered = image_utils._detect_stream_format(chunks)
+        self.assertEqual('qcow2', str(inspector))
+        self.assertEqual(1, len(buffered))
+        # The data that was not needed for the detection is not consumed
+        self.assertEqual(2, len(list(chunks)))
+
+    @mock.patch('cinder.image.image_utils.STREAM_INSPECTION_LIMIT', 1024)
+    def test_detect_stream_format_limit(self):
+        chunks = self._split(b'raw data' * units.Ki, 512)
+        inspector, buffered = image_utils._detect_stream_format(iter(chunks))
+        self.assertIsNone(inspector)
+        self.assertEqual(chunks[:2], buffered)
+
+    def test_write_image_chunks_sparse(self):
+        chunks = [b'data', b'\0' * 10, b'more', b'\0' * 6]
+        written = image_utils._write_image_chunks(chunks, self.dest,
+                                                  fake.IMAGE_ID, sparse=True)
+        self.assertEqual(24, written)
+        with open(self.dest, 'rb') as f:
+            self.assertEqual(b''.join(chunks), f.read())
+
+    def test_write_image_chunks_too_big(self):
+        chunks = itertools.repeat(b'\0' * units.Mi, 1025)
+        self.assertRaises(exception.ImageUnacceptable,
+                          image_utils._write_image_chunks, chunks, self.dest,
+                          fake.IMAGE_ID, size=1, sparse=True)
+
+    def test_fetch_to_volume_format_stream_raw(self):
+        data = b'raw data' * units.Ki
+        self.image_service.show.return_value = {
+            'disk_format': 'raw', 'container_format': 'bare', 'size': 1}
+        self.image_service.download.return_value = self._split(data)
+
+        image_utils.fetch_to_volume_format(self.ctxt, self.image_service,
+                                           fake.IMAGE_ID, self.dest, 'raw',
+                                           None, size=1)
+
+        with open(self.dest, 'rb') as f:
+            self.assertEqual(data, f.read())
+        self.image_service.download.assert_called_once_with(self.ctxt,
+                                                            fake.IMAGE_ID)
+        self.mock_fetch.assert_not_called()
+        self.mock_convert.assert_not_called()
+        # Only the qemu-img availability probe was done
+        self.mock_info.assert_called_once()
+
+    def test_fetch_to_volume_format_stream_compressed(self):
+        self.flags(allow_compression_on_image_upload=True)
+        data = self._qcow2_data()
+        self.image_service.show.return_value = {
+            'disk_format': 'qcow2', 'container_format': 'compressed',
+            'size': 1}
+        self.image_service.download.return_value = self._split(
+            gzip.compress(data))
+        info = self.mock_info.return_value
+        info.file_format = 'qcow2'
+        info.backing_file = None
+        info.virtual_size = units.Gi
+
+        def _convert(source, dest, *args, **kwargs):
+            with open(source, 'rb') as f:
+                self.assertEqual(data, f.read())
+
+        self.mock_convert.side_effect = _convert
+        mock_accel = self.mock_object(image_utils.accelerator, 'ImageAccel')
+
+        image_utils.fetch_to_volume_format(self.ctxt, self.image_service,
+                                           fake.IMAGE_ID, self.dest, 'raw',
+                                           None, size=1)
+
+        self.mock_fetch.assert_not_called()
+        mock_accel.assert_not_called()
+        self.mock_convert.assert_called_once_with(
+            mock.ANY, self.dest, 'raw', out_subformat=None,
+            src_format='qcow2', run_as_root=True, image_id=fake.IMAGE_ID,
+            data=info, disable_sparse=False)
+        self.assertFalse(os.path.exists(self.dest))
+
+    def test_fetch_to_volume_format_stream_mismatch(self):
+        # A raw image that looks like a qcow2 is not written to the volume
+        # and is rejected when it is converted.
+        self.image_service.show.return_value = {
+            'disk_format': 'raw', 'container_format': 'bare', 'size': 1}
+        self.image_service.download.return_value = [self._qcow2_data()]
+        info = self.mock_info.return_value
+        info.file_format = 'qcow2'
+        info.backing_file = None
+        info.virtual_size = units.Gi
+
+        image_utils.fetch_to_volume_format(self.ctxt, self.image_service,
+                                           fake.IMAGE_ID, self.dest, 'raw',
+                                           None, size=1)
+
+        self.mock_convert.assert_called_once_with(
+            mock.ANY, self.dest, 'raw', out_subformat=None,
+            src_format='raw', run_as_root=True, image_id=fake.IMAGE_ID,
+            data=info, disable_sparse=False)
+        self.assertFalse(os.path.exists(self.dest))
+
+
 class TestXenserverUtils(test.TestCase):
     def test_is_xenserver_format(self):
         image_meta1 = {'disk_format': 'vhd', 'container_format': 'ovf'}
@@ -2317,6 +2620,158 @@ class TestTemporaryFileContextManager(test.TestCase):
         mock_delete.assert_called_once_with(mock.sentinel.temporary_file)
 
 
+class TestImageDownloadManager(test.TestCase):
+    def setUp(self):
+        super(TestImageDownloadManager, self).setUp()
+        self.flags(image_conversion_dir=self.useFixture(
+            fixtures.TempDir()).path)
+        self.manager = image_utils.ImageDownloadManager()
+        self.ctxt = mock.sentinel.context
+        self.image_service = FakeImageService()
+        self.image_meta = {'checksum': 'fake_checksum'}
+        self.mock_fetch = self.mock_object(image_utils, 'fetch_verify_image',
+                                           side_effect=self._fake_fetch)
+
+    @staticmethod
+    def _fake_fetch(context, image_service, image_id, dest):
+        # Let other requests try to get the same image meanwhile
+        eventlet.sleep(0)
+        with open(dest, 'wb') as f:
+            f.write(b'image data')
+
+    def _fetch(self, image_meta=None):
+        return self.manager.fetch(self.ctxt, self.image_service,
+                                  fake.IMAGE_ID, image_meta or self.image_meta,
+                                  'host@backend')
+
+    def test_fetch_concurrent_share_download(self):
+        paths = []
+
+        def _use_image():
+            with self._fetch() as image:
+                paths.append(image.path)
+                with open(image.path, 'rb') as f:
+                    self.assertEqual(b'image data', f.read())
+                eventlet.sleep(0)
+
+        threads = [eventlet.spawn(_use_image) for i in range(3)]
+        for thread in threads:
+            thread.wait()
+
+        self.mock_fetch.assert_called_once()
+        self.assertEqual(1, len(set(paths)))
+        self.assertTrue(paths[0].endswith('host@backend'))
+        # Removed once nobody uses it with the default cache size of 0
+        self.assertFalse(os.path.exists(paths[0]))
+
+    def test_fetch_keeps_images_in_cache_size(self):
+        self.flags(image_download_cache_size_gb=1)
+        with self._fetch() as image:
+            path = image.path
+        self.assertTrue(os.path.exists(path))
+
+        with self._fetch() as image:
+            self.assertEqual(path, image.path)
+        self.mock_fetch.assert_called_once()
+
+        # A different checksum is a different image
+        with self._fetch({'checksum': 'new_checksum'}) as image:
+            new_path = image.path
+        self.assertNotEqual(path, new_path)
+        self.assertEqual(2, self.mock_fetch.call_count)
+
+        # Evict the least recently used image when over the size limit
+        self.flags(image_download_cache_size_gb=0)
+        with self._fetch({'checksum': 'new_checksum'}) as image:
+            self.assertTrue(os.path.exists(path))
+            self.manager._images[
+                (fake.IMAGE_ID, 'fake_checksum', 'host@backend')].size = (
+                    units.Gi)
+        self.assertFalse(os.path.exists(path))
+        self.assertFalse(os.path.exists(new_path))
+
+    def test_fetch_error(self):
+        def _fail_fetch(context, image_service, image_id, dest):
+            eventlet.sleep(0)
+            raise exception.ImageUnacceptable(image_id=image_id,
+                                              reason='bad image')
+
+        self.mock_fetch.side_effect = _fail_fetch
+        errors = []
+
+        def _use_image():
+            try:
+                with self._fetch():
+                    pass
+            except exception.ImageUnacceptable as e:
+                errors.append(e)
+
+        threads = [eventlet.spawn(_use_image) for i in range(2)]
+        for thread in threads:
+            thread.wait()
+
+        self.assertEqual(2, len(errors))
+        self.mock_fetch.assert_called_once()
+        self.assertEqual({}, self.manager._images)
+        self.assertEqual([], os.listdir(image_utils.CONF.image_conversion_dir))
+
+        # The next request tries to download it again
+        self.mock_fetch.side_effect = self._fake_fetch
+        with self._fetch():
+            pass
+        self.assertEqual(2, self.mock_fetch.call_count)
+
+    @mock.patch('cinder.image.image_utils.verify_glance_image_signature',
+                return_value=True)
+    def test_verify_signature_once(self, mock_verify):
+        with self._fetch() as image:
+            with self._fetch() as image2:
+                for path in (image.path, image2.path):
+                    self.assertTrue(self.manager.verify_signature(
+                        self.ctxt, self.image_service, fake.IMAGE_ID, path))
+        mock_verify.assert_called_once_with(self.ctxt, self.image_service,
+                                            fake.IMAGE_ID, image.path)
+
+        self.assertTrue(self.manager.verify_signature(
+            self.ctxt, self.image_service, fake.IMAGE_ID, 'other_path'))
+        self.assertEqual(2, mock_verify.call_count)
+
+    @mock.patch('cinder.image.image_utils.temporary_file')
+    def test_temporary_images_not_shared(self, mock_temp):
+        mock_temp.return_value.__enter__.return_value = mock.sentinel.tmp
+        self.mock_fetch.side_effect = None
+        image_service = FakeImageService()
+        image_service.show = mock.Mock(
+            return_value={'disk_format': 'raw',
+                          'container_format': 'compressed'})
+        ctxt = mock.Mock(user_id=fake.USER_ID)
+
+        with image_utils.TemporaryImages.fetch(image_service, ctxt,
+                                               fake.IMAGE_ID) as tmp:
+            self.assertEqual(mock.sentinel.tmp, tmp)
+        self.mock_fetch.assert_called_once_with(
+            ctxt, image_service, fake.IMAGE_ID, mock.sentinel.tmp,
+            image_meta=image_service.show.return_value)
+
+    @mock.patch('cinder.image.image_utils.temporary_file')
+    def test_temporary_images_sharing_disabled(self, mock_temp):
+        self.flags(image_download_sharing=False)
+        mock_temp.return_value.__enter__.return_value = mock.sentinel.tmp
+        self.mock_fetch.side_effect = None
+        image_service = FakeImageService()
+        image_service.show = mock.Mock()
+        ctxt = mock.Mock(user_id=fake.USER_ID)
+
+        with image_utils.TemporaryImages.fetch(image_service, ctxt,
+                                               fake.IMAGE_ID) as tmp:
+            self.assertEqual(mock.sentinel.tmp, tmp)
+        image_service.show.assert_not_called()
+        self.mock_fetch.assert_called_once_with(ctxt, image_service,
+                                                fake.IMAGE_ID,
+                                                mock.sentinel.tmp,
+                                                image_meta=None)
+
+
 class TestImageUtils(test.TestCase):
     def test_get_virtual_size(self):
         image_id = fake.IMAGE_ID
@@ -40,3 +40,19 @@ class TestPaginateQuery(test.TestCase):
                                                   'size'],
                                        marker=marker_object,
                                        sort_dirs=['desc', 'asc', 'desc'])
+
+    def test_paginate_query_marker_criteria(self):
+        marker_object = self.model(id=fake.VOLUME_ID, display_name='vol')
+
+        query = sqlalchemyutils.paginate_query(self.query, self.model, 10,
+                                               sort_keys=['display_name',
+                                                          'id'],
+                                               marker=marker_object,
+                                               sort_dirs=['desc', 'desc'])
+
+        # Columns are compared directly, so the database can use indexes
+        # on them, and NULL values, sorted as '', follow the marker
+        where = str(query.statement.whereclause)
+        self.assertNotIn('CASE', where)
+        self.assertIn('volumes.display_name IS NULL', where)
+        self.assertNotIn('volumes.id IS NULL', where)
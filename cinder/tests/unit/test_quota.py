@@ -876,6 +876,57 @@ class VolumeTypeQuotaEngineTestCase(test.TestCase):
         engine = quota.VolumeTypeQuotaEngine()
         engine.update_quota_resource(ctx, 'type1', 'type2')
 
+    def test_resources_cached(self):
+        ctx = context.get_admin_context()
+        engine = quota.VolumeTypeQuotaEngine()
+        with mock.patch.object(db, 'volume_type_get_all',
+                               wraps=db.volume_type_get_all) as mock_vtga:
+            self.assertNotIn('volumes_type1', engine.resource_names)
+            db.volume_type_create(ctx, {'name': 'type1'})
+            # Still using the cached resources
+            self.assertNotIn('volumes_type1', engine.resource_names)
+            self.assertEqual(1, mock_vtga.call_count)
+
+            engine.invalidate_resources()
+            self.assertIn('volumes_type1', engine.resource_names)
+            self.assertEqual(2, mock_vtga.call_count)
+
+    @mock.patch('oslo_utils.timeutils.utcnow')
+    def test_resources_cache_expired(self, mock_utcnow):
+        self.override_config('quota_resources_cache_time', 30)
+        now = datetime.datetime(2024, 1, 1, 12, 0, 0)
+        mock_utcnow.return_value = now
+        engine = quota.VolumeTypeQuotaEngine()
+        with mock.patch.object(db, 'volume_type_get_all',
+                               return_value={}) as mock_vtga:
+            engine.resources
+            engine.resources
+            self.assertEqual(1, mock_vtga.call_count)
+
+            mock_utcnow.return_value = now + datetime.timedelta(seconds=31)
+            engine.resources
+            self.assertEqual(2, mock_vtga.call_count)
+
+    def test_resources_cache_disabled(self):
+        self.override_config('quota_resources_cache_time', 0)
+        engine = quota.VolumeTypeQuotaEngine()
+        with mock.patch.object(db, 'volume_type_get_all',
+                               return_value={}) as mock_vtga:
+            engine.resources
+            engine.resources
+            self.assertEqual(2, mock_vtga.call_count)
+
+    def test_reserve_unknown_resource_refreshes_cache(self):
+        ctx = context.get_admin_context()
+        engine = quota.VolumeTypeQuotaEngine()
+        engine.resources
+        db.volume_type_create(ctx, {'name': 'type1'})
+
+        reservations = engine.reserve(ctx, volumes=1, volumes_type1=1,
+                                      project_id=fake.PROJECT_ID)
+        self.assertEqual(2, len(reservations))
+        self.assertIn('volumes_type1', engine.resources)
+
 
 class DbQuotaDriverBaseTestCase(test.TestCase):
     def setUp(self):
@@ -17,13 +17,17 @@
 
 
 import datetime
+import errno
+import filecmp
 import functools
 import io
+import os
 import time
 from unittest import mock
 
 from castellan import key_manager
 import ddt
+import fixtures
 from oslo_concurrency import processutils
 from oslo_config import cfg
 from oslo_utils import units
@@ -682,16 +686,111 @@ class CopyVolumeTestCase(test.TestCase):
         handle2 = io.RawIOBase()
         output = volume_utils.copy_volume(handle1, handle2, 1024, 1)
         self.assertIsNone(output)
-        mock_copy.assert_called_once_with(handle1, handle2, 1024)
+        mock_copy.assert_called_once_with(handle1, handle2, 1024,
+                                          sparse=False)
 
-    @mock.patch('cinder.volume.volume_utils._transfer_data')
+    @mock.patch('cinder.volume.volume_utils._transfer_data',
+                return_value=1073741824)
     @mock.patch('cinder.volume.volume_utils._open_volume_with_path')
     def test_copy_volume_handle_transfer(self, mock_open, mock_transfer):
         handle = io.RawIOBase()
         output = volume_utils.copy_volume('/foo/bar', handle, 1024, 1)
         self.assertIsNone(output)
         mock_transfer.assert_called_once_with(mock.ANY, mock.ANY,
-                                              1073741824, mock.ANY)
+                                              1073741824, mock.ANY,
+                                              sparse=False)
+
+    def _create_sparse_file(self, path, extents, size):
+        with open(path, 'wb') as f:
+            for offset, data in extents:
+                f.seek(offset)
+                f.write(data)
+            f.truncate(size)
+
+    def test_transfer_data_native(self):
+        tmpdir = self.useFixture(fixtures.TempDir()).path
+        src_path = os.path.join(tmpdir, 'src')
+        dest_path = os.path.join(tmpdir, 'dest')
+        self._create_sparse_file(src_path, [(0, b'a' * 100),
+                                            (units.Mi, b'b' * 100)],
+                                 2 * units.Mi)
+
+        with open(src_path, 'rb') as src, open(dest_path, 'wb') as dest:
+            transferred = volume_utils._transfer_data(src, dest,
+                                                      2 * units.Mi, units.Ki)
+            self.assertEqual(2 * units.Mi, transferred)
+            self.assertEqual(2 * units.Mi, src.tell())
+            self.assertEqual(2 * units.Mi, dest.tell())
+
+        self.assertTrue(filecmp.cmp(src_path, dest_path, shallow=False))
+
+    def test_transfer_data_native_sparse(self):
+        tmpdir = self.useFixture(fixtures.TempDir()).path
+        src_path = os.path.join(tmpdir, 'src')
+        dest_path = os.path.join(tmpdir, 'dest')
+        self._create_sparse_file(src_path, [(units.Mi, b'b' * 100)],
+                                 4 * units.Mi)
+
+        with mock.patch.object(volume_utils, '_get_data_ranges',
+                               return_value=[(units.Mi, units.Mi + 100)]):
+            with open(src_path, 'rb') as src, open(dest_path, 'wb') as dest:
+                transferred = volume_utils._transfer_data(
+                    src, dest, 4 * units.Mi, units.Ki, sparse=True)
+
+        self.assertEqual(4 * units.Mi, transferred)
+        self.assertEqual(4 * units.Mi, os.path.getsize(dest_path))
+        self.assertTrue(filecmp.cmp(src_path, dest_path, shallow=False))
+
+    @mock.patch('os.copy_file_range', create=True,
+                side_effect=OSError(errno.EXDEV, 'cross device'))
+    def test_transfer_data_native_sendfile_fallback(self, mock_copy_range):
+        tmpdir = self.useFixture(fixtures.TempDir()).path
+        src_path = os.path.join(tmpdir, 'src')
+        dest_path = os.path.join(tmpdir, 'dest')
+        self._create_sparse_file(src_path, [(0, os.urandom(5000))], 5000)
+
+        with open(src_path, 'rb') as src, open(dest_path, 'wb') as dest:
+            transferred = volume_utils._transfer_data(src, dest, units.Mi,
+                                                      units.Ki)
+
+        self.assertEqual(5000, transferred)
+        mock_copy_range.assert_called_once()
+        self.assertTrue(filecmp.cmp(src_path, dest_path, shallow=False))
+
+    def test_transfer_data_buffered(self):
+        src = io.BytesIO(b'x' * 10000)
+        dest = io.BytesIO()
+
+        transferred = volume_utils._transfer_data(src, dest, 8000, 3000)
+
+        self.assertEqual(8000, transferred)
+        self.assertEqual(b'x' * 8000, dest.getvalue())
+
+    def test_transfer_data_pipe(self):
+        tmpdir = self.useFixture(fixtures.TempDir()).path
+        src_path = os.path.join(tmpdir, 'src')
+        self._create_sparse_file(src_path, [(0, b'x' * 5000)], 5000)
+        read_fd, write_fd = os.pipe()
+
+        with open(src_path, 'rb') as src, \
+                os.fdopen(write_fd, 'wb') as dest, \
+                os.fdopen(read_fd, 'rb') as reader, \
+                mock.patch.object(volume_utils,
+                                  '_transfer_data_native') as mock_native:
+            transferred = volume_utils._transfer_data(src, dest, units.Mi,
+                                                      units.Ki)
+            dest.close()
+            data = reader.read()
+
+        # Pipes can't be seeked, so the data is copied through a buffer.
+        mock_native.assert_not_called()
+        self.assertEqual(5000, transferred)
+        self.assertEqual(b'x' * 5000, data)
+
+    def test_get_data_ranges_unsupported(self):
+        with mock.patch('os.lseek', side_effect=OSError(errno.EINVAL, '')):
+            self.assertEqual([(0, 10)],
+                             volume_utils._get_data_ranges(1, 0, 10))
 
 
 @ddt.ddt
@@ -287,6 +287,60 @@ class LVMVolumeDriverTestCase(test_driver.BaseDriverTestCase):
             lvm_driver.create_volume_from_snapshot(dst_volume,
                                                    snapshot_ref)
 
+    def test_ensure_exports(self):
+        lvm_driver = lvm.LVMVolumeDriver(configuration=self.configuration)
+        volume1 = tests_utils.create_volume(self.context)
+        volume2 = tests_utils.create_volume(self.context)
+        volume3 = tests_utils.create_volume(self.context)
+        activate_error = exception.VolumeBackendAPIException(data='error')
+        export_error = exception.ISCSITargetCreateFailed(
+            volume_id=volume3.id)
+
+        with mock.patch.object(lvm_driver, 'vg') as mock_vg, \
+                mock.patch.object(lvm_driver, 'target_driver') as mock_target:
+            mock_vg.activate_lv.side_effect = [None, activate_error, None]
+            mock_target.ensure_exports.return_value = {
+                volume3.id: export_error}
+
+            failed = lvm_driver.ensure_exports(
+                self.context, [volume1, volume2, volume3])
+
+        self.assertEqual({volume2.id: activate_error,
+                          volume3.id: export_error}, failed)
+        mock_target.ensure_exports.assert_called_once_with(
+            self.context, [volume1, volume3],
+            ['/dev/%s/%s' % (self.configuration.volume_group, volume1.name),
+             '/dev/%s/%s' % (self.configuration.volume_group, volume3.name)])
+
+    def test_ensure_exports_ensure_export_overridden(self):
+        class FakeLVMVolumeDriver(lvm.LVMVolumeDriver):
+            def ensure_export(self, context, volume):
+                if volume.id == volume2.id:
+                    raise export_error
+
+        lvm_driver = FakeLVMVolumeDriver(configuration=self.configuration)
+        volume1 = tests_utils.create_volume(self.context)
+        volume2 = tests_utils.create_volume(self.context)
+        export_error = exception.ISCSITargetCreateFailed(
+            volume_id=volume2.id)
+
+        with mock.patch.object(lvm_driver, 'vg') as mock_vg, \
+                mock.patch.object(lvm_driver, 'target_driver') as mock_target:
+            failed = lvm_driver.ensure_exports(
+                self.context, [volume1, volume2])
+
+        self.assertEqual({volume2.id: export_error}, failed)
+        mock_vg.activate_lv.assert_not_called()
+        mock_target.ensure_exports.assert_not_called()
+
+    def test_do_teardown(self):
+        lvm_driver = lvm.LVMVolumeDriver(configuration=self.configuration)
+
+        with mock.patch.object(lvm_driver, 'target_driver') as mock_target:
+            lvm_driver.do_teardown()
+
+        mock_target.teardown.assert_called_once_with()
+
     def test_create_volume_from_snapshot_sparse_extend(self):
 
         self.configuration.lvm_type = 'thin'
@@ -15,11 +15,14 @@
 """Unit tests for the NFS driver module."""
 
 import errno
+import json
 import os
 from unittest import mock
 
 import castellan
 import ddt
+import fixtures
+from oslo_concurrency import processutils as putils
 from oslo_utils import imageutils
 from oslo_utils import units
 
@@ -773,6 +776,7 @@ class NfsDriverTestCase(test.TestCase):
                                            **info_dic)
 
     def test_get_provisioned_capacity(self):
+        self.override_config('nas_provisioned_capacity_refresh_interval', 0)
         self._set_driver()
         drv = self._driver
 
@@ -785,6 +789,132 @@ class NfsDriverTestCase(test.TestCase):
             ret = drv._get_provisioned_capacity()
 
             self.assertEqual(ret, 0.14)
+            ret = drv._get_provisioned_capacity()
+
+            self.assertEqual(ret, 0.14)
+            self.assertEqual(2, mock_execute.call_count)
+
+    @mock.patch('oslo_service.loopingcall.FixedIntervalLoopingCall')
+    def test_get_provisioned_capacity_tracked(self, mock_loopingcall):
+        self.override_config('nas_provisioned_capacity_refresh_interval', 60)
+        self._set_driver()
+        drv = self._driver
+        drv.shares = {'192.0.2.1:/srv/nfs1': None}
+        mock_execute = self.mock_object(drv, '_execute')
+        mock_execute.return_value = ("%s\t/dir" % units.Gi, "")
+
+        self.assertEqual(1.0, drv._get_provisioned_capacity())
+        mock_loopingcall.assert_called_once_with(
+            drv._refresh_provisioned_capacity)
+        mock_loopingcall.return_value.start.assert_called_once_with(
+            interval=60, initial_delay=60)
+
+        mount_path = self.useFixture(fixtures.TempDir()).path
+        self.mock_object(drv, '_get_mount_point_for_share',
+                         return_value=mount_path)
+        volume = self._simple_volume()
+        volume_path = os.path.join(mount_path, volume.name)
+        snap_file = '%s.%s' % (volume.name, fake.SNAPSHOT_ID)
+        # Only the files of the volume are counted
+        with open(volume_path + '.tmp', 'w') as f:
+            f.truncate(units.Gi)
+
+        with drv._tracking_provisioned_capacity(volume):
+            with open(volume_path, 'w') as f:
+                f.truncate(3 * units.Gi)
+            with open(os.path.join(mount_path, snap_file), 'w') as f:
+                f.truncate(units.Gi)
+            with open(volume_path + '.info', 'w') as f:
+                json.dump({'active': snap_file,
+                           fake.SNAPSHOT_ID: snap_file}, f)
+        self.assertEqual(5.0, drv._get_provisioned_capacity())
+
+        # Files shrinking, e.g. when snapshots are merged, are applied too
+        with drv._tracking_provisioned_capacity(volume):
+            with open(volume_path, 'w') as f:
+                f.truncate(units.Gi // 2)
+        self.assertEqual(2.5, drv._get_provisioned_capacity())
+        mock_execute.assert_called_once()
+        mock_loopingcall.assert_called_once()
+
+        mock_execute.return_value = ("%s\t/dir" % (5 * units.Gi), "")
+        drv._refresh_provisioned_capacity()
+        self.assertEqual(5.0, drv._get_provisioned_capacity())
+
+    def test_refresh_provisioned_capacity_keeps_changes(self):
+        self._set_driver()
+        drv = self._driver
+        drv.shares = {'192.0.2.1:/srv/nfs1': None}
+        drv._provisioned_bytes = units.Gi
+        mount_path = self.useFixture(fixtures.TempDir()).path
+        self.mock_object(drv, '_get_mount_point_for_share',
+                         return_value=mount_path)
+        volume = self._simple_volume()
+
+        def _du(*args, **kwargs):
+            # A volume is created while the shares are walked
+            with drv._tracking_provisioned_capacity(volume):
+                with open(os.path.join(mount_path, volume.name), 'w') as f:
+                    f.truncate(units.Gi)
+            return ("%s\t/dir" % (2 * units.Gi), "")
+        self.mock_object(drv, '_execute', side_effect=_du)
+
+        drv._refresh_provisioned_capacity()
+
+        self.assertEqual(3 * units.Gi, drv._provisioned_bytes)
+        self.assertIsNone(drv._provisioned_refresh_deltas)
+
+    def test_refresh_provisioned_capacity_error(self):
+        self._set_driver()
+        drv = self._driver
+        drv.shares = {'192.0.2.1:/srv/nfs1': None}
+        drv._provisioned_bytes = units.Gi
+        self.mock_object(drv, '_execute',
+                         side_effect=putils.ProcessExecutionError)
+
+        drv._refresh_provisioned_capacity()
+
+        self.assertEqual(units.Gi, drv._provisioned_bytes)
+
+    def test_tracking_provisioned_capacity_not_calculated(self):
+        self._set_driver()
+        drv = self._driver
+        mock_get_size = self.mock_object(drv, '_get_volume_files_bytes')
+
+        with drv._tracking_provisioned_capacity(self._simple_volume()):
+            pass
+
+        mock_get_size.assert_not_called()
+        self.assertIsNone(drv._provisioned_bytes)
+
+    def test_tracking_provisioned_capacity_error(self):
+        self._set_driver()
+        drv = self._driver
+        drv._provisioned_bytes = units.Gi
+        self.mock_object(drv, '_read_info_file',
+                         side_effect=[{}, PermissionError])
+
+        with drv._tracking_provisioned_capacity(self._simple_volume()):
+            pass
+
+        self.assertEqual(units.Gi, drv._provisioned_bytes)
+
+    @mock.patch.object(remotefs.RemoteFSSnapDriverBase, '_write_info_file')
+    @mock.patch.object(remotefs.RemoteFSSnapDriverBase, '_read_info_file',
+                       return_value={})
+    def test_delete_snapshot_tracks_provisioned_capacity(self, mock_read,
+                                                         mock_write):
+        self._set_driver()
+        drv = self._driver
+        drv._provisioned_bytes = units.Gi
+        snapshot = fake_snapshot.fake_snapshot_obj(self.context)
+        snapshot.volume = self._simple_volume()
+        mock_tracking = self.mock_object(drv,
+                                         '_tracking_provisioned_capacity')
+
+        drv._delete_snapshot(snapshot)
+
+        mock_tracking.assert_called_once_with(snapshot.volume)
 
     @mock.patch('cinder.objects.volume.Volume.save')
     def test_create_sparsed_volume(self, mock_save):
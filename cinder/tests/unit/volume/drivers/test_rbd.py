@@ -197,6 +197,10 @@ class RBDTestCase(test.TestCase):
         cfg.rbd_store_chunk_size = 4
         cfg.rados_connection_retries = 3
         cfg.rados_connection_interval = 5
+        cfg.rados_connection_pool_size = 4
+        cfg.rados_connection_pool_idle_timeout = 60
+        cfg.rbd_provisioned_capacity_scan_workers = 8
+        cfg.rbd_provisioned_capacity_refresh_interval = 0
         cfg.backup_use_temp_snapshot = False
         cfg.enable_deferred_deletion = False
         cfg.rbd_concurrent_flatten_operations = 3
@@ -1893,6 +1897,24 @@ class RBDTestCase(test.TestCase):
         self.cfg.image_conversion_dir = '/var/run/cinder/tmp'
         self._copy_image_encrypted()
 
+    @common_mocks
+    def test_copy_image_tracks_provisioned_capacity(self):
+        self.driver._provisioned_bytes = 10 * units.Gi
+        self.mock_object(tempfile, 'NamedTemporaryFile')
+        self.mock_object(image_utils, 'fetch_to_raw')
+        self.mock_object(self.driver, '_resize')
+        # Deleting the image subtracts its size, like the real method does
+        self.mock_object(
+            self.driver, 'delete_volume',
+            side_effect=lambda volume: (
+                self.driver._track_provisioned_capacity(-volume.size)))
+
+        self.driver.copy_image_to_volume(None, self.volume_a,
+                                         mock.MagicMock(), None)
+
+        self.driver.delete_volume.assert_called_once_with(self.volume_a)
+        self.assertEqual(10 * units.Gi, self.driver._provisioned_bytes)
+
     @common_mocks
     def test_copy_image_busy_volume(self):
         self.cfg.image_conversion_dir = '/var/run/cinder/tmp'
@@ -2485,6 +2507,24 @@ class RBDTestCase(test.TestCase):
             self.driver.extend_volume(self.volume_a, fake_size)
             mock_resize.assert_called_once_with(self.volume_a, size=size)
 
+    def test_extend_volume_tracks_provisioned_capacity(self):
+        self.driver._provisioned_bytes = 30 * units.Gi
+        with mock.patch.object(self.driver, '_resize'):
+            self.driver.extend_volume(self.volume_a, '20')
+        self.assertEqual(40 * units.Gi, self.driver._provisioned_bytes)
+
+    @common_mocks
+    def test_delete_volume_tracks_provisioned_capacity(self):
+        self.driver._provisioned_bytes = 30 * units.Gi
+        self.mock_object(self.driver, '_get_clone_info',
+                         return_value=(None, None, None))
+        self.mock_object(self.driver, '_delete_backup_snaps')
+        self.mock_object(self.driver, '_find_clone_snap', return_value=None)
+
+        self.driver.delete_volume(self.volume_a)
+
+        self.assertEqual(20 * units.Gi, self.driver._provisioned_bytes)
+
     @mock.patch.object(driver.RBDDriver, '_qos_specs_from_volume_type')
     @mock.patch.object(driver.RBDDriver, '_supports_qos')
     @ddt.data(False, True)
@@ -2838,7 +2878,7 @@ class RBDTestCase(test.TestCase):
                 'vol_pool', None, None)
 
         mock_driver._disconnect_from_rados.assert_called_once_with(
-            'fake_cl', 'fake_io')
+            'fake_cl', 'fake_io', discard=False)
 
     def test_rbd_volume_proxy_external_conn_error(self):
         mock_driver = mock.Mock(name='driver')
@@ -2925,6 +2965,51 @@ class RBDTestCase(test.TestCase):
         self.assertEqual(
             3, self.mock_rados.Rados.return_value.shutdown.call_count)
 
+    @common_mocks
+    def test_connect_to_rados_reuses_pooled_connection(self):
+        self.cfg.rados_connect_timeout = -1
+        client = self.mock_rados.Rados.return_value
+        client.state = 'connected'
+        client.open_ioctx.return_value.state = 'open'
+
+        first = self.driver._connect_to_rados()
+        self.driver._disconnect_from_rados(*first)
+        second = self.driver._connect_to_rados()
+
+        self.assertEqual(first, second)
+        client.connect.assert_called_once_with()
+        client.shutdown.assert_not_called()
+
+        # A different pool needs its own connection
+        self.driver._connect_to_rados('alt_pool')
+        self.assertEqual(2, client.connect.call_count)
+
+    @common_mocks
+    def test_connect_to_rados_discards_connection_on_error(self):
+        self.cfg.rados_connect_timeout = -1
+        client = self.mock_rados.Rados.return_value
+        client.state = 'connected'
+        client.open_ioctx.return_value.state = 'open'
+
+        conn = self.driver._connect_to_rados()
+        self.driver._disconnect_from_rados(*conn, discard=True)
+        client.shutdown.assert_called_once_with()
+
+        self.driver._connect_to_rados()
+        self.assertEqual(2, client.connect.call_count)
+
+    def test_rbd_volume_proxy_discards_connection_on_error(self):
+        mock_driver = mock.Mock(name='driver')
+        mock_driver._connect_to_rados.return_value = ('fake_cl', 'fake_io')
+
+        def _use_volume():
+            with driver.RBDVolumeProxy(mock_driver, self.volume_a.name):
+                raise MockException()
+
+        self.assertRaises(MockException, _use_volume)
+        mock_driver._disconnect_from_rados.assert_called_once_with(
+            'fake_cl', 'fake_io', discard=True)
+
     @common_mocks
     def test_failover_host_no_replication(self):
         self.driver._is_replication_enabled = False
@@ -3184,47 +3269,112 @@ class RBDTestCase(test.TestCase):
         self.driver.unmanage_snapshot(self.snapshot_b)
         proxy.unprotect_snap.assert_called_with(self.snapshot_b.name)
 
-    @mock.patch('cinder.volume.drivers.rbd.RBDVolumeProxy')
     @mock.patch('cinder.volume.drivers.rbd.RADOSClient')
     @mock.patch('cinder.volume.drivers.rbd.RBDDriver.RBDProxy')
-    def test__get_usage_info(self, rbdproxy_mock, client_mock, volproxy_mock):
-
-        def FakeVolProxy(size_or_exc):
-            return mock.Mock(return_value=mock.Mock(
-                size=mock.Mock(side_effect=(size_or_exc,))))
+    def test__get_usage_info(self, rbdproxy_mock, client_mock):
+        sizes = {
+            'volume-1': 1.0 * units.Gi,
+            'non-existent': MockImageNotFoundException,
+            'non-existent-2': MockOSErrorException,
+            'non-cinder-volume': 2.0 * units.Gi,
+        }
 
-        volumes = [
-            'volume-1',
-            'non-existent',
-            'non-existent',
-            'non-cinder-volume'
-        ]
+        def fake_image(ioctx, name, read_only=False):
+            if not isinstance(sizes[name], float):
+                raise sizes[name]
+            return mock.Mock(**{'size.return_value': sizes[name]})
 
         client = client_mock.return_value.__enter__.return_value
-        rbdproxy_mock.return_value.list.return_value = volumes
+        rbdproxy_mock.return_value.list.return_value = list(sizes)
 
         with mock.patch.object(self.driver, 'rbd',
                                ImageNotFound=MockImageNotFoundException,
                                OSError=MockOSErrorException):
-            volproxy_mock.side_effect = [
-                mock.MagicMock(**{'__enter__': FakeVolProxy(s)})
-                for s in (1.0 * units.Gi,
-                          self.driver.rbd.ImageNotFound,
-                          self.driver.rbd.OSError,
-                          2.0 * units.Gi)
-            ]
+            # librbd older than Nautilus
+            del self.driver.rbd.RBD.pool_stats_get
+            self.driver.rbd.Image.side_effect = fake_image
             total_provision = self.driver._get_usage_info()
 
-        rbdproxy_mock.return_value.list.assert_called_once_with(client.ioctx)
-
-        expected_volproxy_calls = [
-            mock.call(self.driver, v, read_only=True,
-                      client=client.cluster, ioctx=client.ioctx)
-            for v in volumes]
-        self.assertEqual(expected_volproxy_calls, volproxy_mock.mock_calls)
+            rbdproxy_mock.return_value.list.assert_called_once_with(
+                client.ioctx)
+            self.driver.rbd.Image.assert_has_calls(
+                [mock.call(client.ioctx, name, read_only=True)
+                 for name in sizes],
+                any_order=True)
 
         self.assertEqual(3.00, total_provision)
 
+    @mock.patch('cinder.volume.drivers.rbd.RADOSClient')
+    @mock.patch('cinder.volume.drivers.rbd.RBDDriver.RBDProxy')
+    def test__get_usage_info_pool_stats(self, rbdproxy_mock, client_mock):
+        client = client_mock.return_value.__enter__.return_value
+        rbdproxy_mock.return_value.pool_stats_get.return_value = {
+            'image_count': 2,
+            'image_provisioned_bytes': units.Gi,
+            'image_max_provisioned_bytes': 3 * units.Gi,
+        }
+
+        with mock.patch.object(self.driver, 'rbd'):
+            self.assertEqual(3, self.driver._get_usage_info())
+            self.driver.rbd.Image.assert_not_called()
+
+        rbdproxy_mock.return_value.pool_stats_get.assert_called_once_with(
+            client.ioctx)
+        rbdproxy_mock.return_value.list.assert_not_called()
+
+    @mock.patch.object(driver.RBDDriver, '_scan_provisioned_capacity')
+    def test__get_usage_info_changes_during_scan(self, mock_scan):
+        def scan():
+            # Volume created while the pool is scanned
+            self.driver._track_provisioned_capacity(2)
+            return 3 * units.Gi
+
+        mock_scan.side_effect = scan
+
+        self.assertEqual(5, self.driver._get_usage_info())
+        self.assertIsNone(self.driver._provisioned_scan_deltas)
+
+        self.driver._track_provisioned_capacity(1)
+        self.assertEqual(6, self.driver._get_usage_info())
+        mock_scan.assert_called_once_with()
+
+    @mock.patch.object(driver.RBDDriver, '_scan_provisioned_capacity',
+                       return_value=3 * units.Gi)
+    def test__get_usage_info_tracks_changes(self, mock_scan):
+        self.assertEqual(3, self.driver._get_usage_info())
+
+        self.driver._track_provisioned_capacity(2)
+        self.driver._track_provisioned_capacity(-1)
+
+        self.assertEqual(4, self.driver._get_usage_info())
+        mock_scan.assert_called_once_with()
+
+        # A failover makes the next stats update scan the pool again
+        self.driver._reset_provisioned_capacity()
+        self.assertEqual(3, self.driver._get_usage_info())
+        self.assertEqual(2, mock_scan.call_count)
+
+    @mock.patch('time.monotonic')
+    @mock.patch.object(driver.RBDDriver, '_scan_provisioned_capacity',
+                       return_value=3 * units.Gi)
+    def test__get_usage_info_refresh_interval(self, mock_scan, mock_time):
+        self.cfg.rbd_provisioned_capacity_refresh_interval = 60
+        mock_time.return_value = 100
+        self.driver._get_usage_info()
+        self.driver._track_provisioned_capacity(1)
+
+        mock_time.return_value = 159
+        self.assertEqual(4, self.driver._get_usage_info())
+        mock_scan.assert_called_once_with()
+
+        mock_time.return_value = 160
+        self.assertEqual(3, self.driver._get_usage_info())
+        self.assertEqual(2, mock_scan.call_count)
+
+    def test__track_provisioned_capacity_not_scanned(self):
+        self.driver._track_provisioned_capacity(1)
+        self.assertIsNone(self.driver._provisioned_bytes)
+
     def test_migrate_volume_bad_volume_status(self):
         self.volume_a.status = 'backingup'
         ret = self.driver.migrate_volume(context, self.volume_a, None)
@@ -3681,7 +3831,7 @@ class ManagedRBDTestCase(test_driver.BaseDriverTestCase):
                     mock_clone.return_value = {}
                     image_loc = ('rbd://fee/fi/fo/fum', None)
 
-                    volume = {'name': 'vol1'}
+                    volume = fake_volume.fake_volume_obj(self.context)
                     actual = driver.clone_image(mock.Mock(),
                                                 volume,
                                                 image_loc,
@@ -3711,7 +3861,7 @@ class ManagedRBDTestCase(test_driver.BaseDriverTestCase):
             image_loc = ('rbd://bee/bi/bo/bum',
                          [{'url': 'rbd://bee/bi/bo/bum'},
                           {'url': 'rbd://fee/fi/fo/fum'}])
-            volume = {'name': 'vol1'}
+            volume = fake_volume.fake_volume_obj(self.context)
             image_meta = mock.sentinel.image_meta
             image_service = mock.sentinel.image_service
 
@@ -3759,3 +3909,86 @@ class ManagedRBDTestCase(test_driver.BaseDriverTestCase):
                                               image_meta)
             self.assertFalse(mock_clone.called)
             self.assertFalse(mock_resize.called)
+
+
+class RADOSConnectionPoolTestCase(test.TestCase):
+
+    def setUp(self):
+        super(RADOSConnectionPoolTestCase, self).setUp()
+        self.pool = driver.RADOSConnectionPool(max_size=1, idle_timeout=60)
+
+    @staticmethod
+    def _connection():
+        client = mock.Mock(state='connected')
+        ioctx = mock.Mock(state='open')
+        return client, ioctx
+
+    def test_get_reuses_released_connection(self):
+        conn = self._connection()
+        connect = mock.Mock(return_value=conn)
+
+        self.assertEqual(conn, self.pool.get(('key',), connect))
+        self.pool.put(*conn)
+        self.assertEqual(conn, self.pool.get(('key',), connect))
+
+        connect.assert_called_once_with()
+        conn[0].shutdown.assert_not_called()
+
+    def test_get_different_key(self):
+        conn = self._connection()
+        self.pool.put(*self.pool.get(('key',), lambda: conn))
+        other = self._connection()
+
+        self.assertEqual(other, self.pool.get(('other',), lambda: other))
+
+    def test_put_over_max_size(self):
+        first = self._connection()
+        second = self._connection()
+        self.pool.get(('key',), lambda: first)
+        self.pool.get(('key',), lambda: second)
+
+        self.pool.put(*first)
+        self.pool.put(*second)
+
+        first[0].shutdown.assert_not_called()
+        second[1].close.assert_called_once_with()
+        second[0].shutdown.assert_called_once_with()
+
+    def test_put_discard(self):
+        conn = self._connection()
+        self.pool.get(('key',), lambda: conn)
+
+        self.pool.put(*conn, discard=True)
+
+        conn[0].shutdown.assert_called_once_with()
+        new_conn = self._connection()
+        self.assertEqual(new_conn, self.pool.get(('key',), lambda: new_conn))
+
+    def test_get_unhealthy_connection(self):
+        conn = self._connection()
+        self.pool.put(*self.pool.get(('key',), lambda: conn))
+        conn[0].state = 'shutdown'
+        new_conn = self._connection()
+
+        self.assertEqual(new_conn, self.pool.get(('key',), lambda: new_conn))
+        conn[0].shutdown.assert_called_once_with()
+
+    @mock.patch('time.monotonic')
+    def test_get_expired_connection(self, mock_time):
+        mock_time.return_value = 100
+        conn = self._connection()
+        self.pool.put(*self.pool.get(('key',), lambda: conn))
+        mock_time.return_value = 161
+        new_conn = self._connection()
+
+        self.assertEqual(new_conn, self.pool.get(('key',), lambda: new_conn))
+        conn[0].shutdown.assert_called_once_with()
+
+    def test_clear(self):
+        conn = self._connection()
+        self.pool.put(*self.pool.get(('key',), lambda: conn))
+
+        self.pool.clear()
+
+        conn[1].close.assert_called_once_with()
+        conn[0].shutdown.assert_called_once_with()
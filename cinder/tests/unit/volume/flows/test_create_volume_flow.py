@@ -24,6 +24,7 @@ import ddt
 from oslo_utils import imageutils
 
 from cinder import context
+from cinder import coordination
 from cinder import exception
 from cinder.message import message_field
 from cinder.tests.unit.backup import fake_backup
@@ -1233,6 +1234,58 @@ class CreateVolumeFlowManagerTestCase(test.TestCase):
                                                      image_meta=image_meta)
         mock_cleanup_cg.assert_called_once_with(volume)
 
+    @mock.patch('cinder.volume.flows.manager.create_volume.'
+                'CreateVolumeFromSpecTask.'
+                '_cleanup_cg_in_volume')
+    @mock.patch('cinder.volume.flows.manager.create_volume.'
+                'CreateVolumeFromSpecTask.'
+                '_handle_bootable_volume_glance_meta')
+    @mock.patch('cinder.image.image_utils.TemporaryImages.fetch')
+    @mock.patch('cinder.image.image_utils.qemu_img_info')
+    def test_create_volume_from_image_streaming(self,
+                                                mock_qemu_img,
+                                                mock_fetch_img,
+                                                mock_handle_bootable,
+                                                mock_cleanup_cg):
+        self.flags(image_download_streaming=True)
+        fake_db = mock.MagicMock()
+        fake_driver = mock.MagicMock()
+        fake_driver.capabilities = {}
+        fake_driver.clone_image.return_value = (None, False)
+        fake_volume_manager = mock.MagicMock()
+        fake_manager = create_volume_manager.CreateVolumeFromSpecTask(
+            fake_volume_manager, fake_db, fake_driver)
+        volume = fake_volume.fake_volume_obj(self.ctxt,
+                                             host='host@backend#pool')
+
+        fake_image_service = fake_image.FakeImageService()
+        image_id = fakes.IMAGE_ID
+        image_meta = {'id': image_id,
+                      'status': 'active',
+                      'size': 1,
+                      'disk_format': 'raw',
+                      'container_format': 'bare',
+                      'properties': {}}
+        image_location = 'abc'
+
+        fake_db.volume_update.return_value = volume
+        fake_manager._create_from_image(self.ctxt, volume,
+                                        image_location, image_id,
+                                        image_meta, fake_image_service)
+
+        # The image is streamed by the driver instead of being downloaded
+        # and inspected beforehand.
+        mock_fetch_img.assert_not_called()
+        mock_qemu_img.assert_not_called()
+        fake_db.volume_glance_metadata_bulk_create.assert_called_once_with(
+            self.ctxt, volume.id, {'signature_verified': False})
+        fake_driver.copy_image_to_volume.assert_called_once_with(
+            self.ctxt, volume, fake_image_service, image_id,
+            disable_sparse=False)
+        mock_handle_bootable.assert_called_once_with(self.ctxt, volume,
+                                                     image_id=image_id,
+                                                     image_meta=image_meta)
+
     @ddt.data({'driver_error': True},
               {'driver_error': False})
     @mock.patch('cinder.backup.api.API.get_available_backup_service_host')
@@ -1711,6 +1764,7 @@ class CreateVolumeFlowManagerImageCacheTestCase(test.TestCase):
         self.mock_db = mock.MagicMock()
         self.mock_driver = mock.MagicMock()
         self.mock_cache = mock.MagicMock()
+        self.mock_cache.get_warming_entry.return_value = None
         self.mock_image_service = mock.MagicMock()
         self.mock_volume_manager = mock.MagicMock()
 
@@ -1978,9 +2032,8 @@ class CreateVolumeFlowManagerImageCacheTestCase(test.TestCase):
             mock_create_from_src, mock_handle_bootable, mock_fetch_img):
         self.mock_driver.clone_image.return_value = (None, False)
         image_volume_id = '70a599e0-31e7-49b7-b260-868f441e862b'
-        self.mock_cache.get_entry.return_value = {
-            'volume_id': image_volume_id
-        }
+        cache_entry = {'volume_id': image_volume_id}
+        self.mock_cache.get_entry.return_value = cache_entry
 
         volume = fake_volume.fake_volume_obj(self.ctxt,
                                              host='host@backend#pool')
@@ -2010,6 +2063,8 @@ class CreateVolumeFlowManagerImageCacheTestCase(test.TestCase):
         mock_create_from_src.assert_called_once_with(self.ctxt,
                                                      volume,
                                                      image_volume_id)
+        self.mock_cache.record_hit.assert_called_once_with(
+            mock_get_internal_context.return_value, cache_entry)
 
         # The image download should not happen when we get a cache hit
         self.assertFalse(mock_create_from_img_dl.called)
@@ -2510,3 +2565,90 @@ class CreateVolumeFlowManagerImageCacheTestCase(test.TestCase):
                 image_meta,
                 self.mock_image_service,
                 update_cache=True)
+            self.mock_cache.warming.assert_called_once_with(
+                mock_get_internal_context.return_value, volume, image_id,
+                image_meta)
+            warming = self.mock_cache.warming.return_value
+            warming.__enter__.assert_called_once_with()
+            warming.__exit__.assert_called_once_with(None, None, None)
+
+    @mock.patch('cinder.volume.flows.manager.create_volume.'
+                'CreateVolumeFromSpecTask.'
+                '_create_from_image_cache_or_download')
+    def test_prepare_image_cache_entry_warming(
+            self,
+            mock_create_from_image_cache_or_download,
+            mock_get_internal_context,
+            mock_create_from_img_dl, mock_create_from_src,
+            mock_handle_bootable, mock_fetch_img):
+        self.mock_cache.get_entry.return_value = None
+        warming_entry = {'volume_id': fakes.VOLUME2_ID}
+        self.mock_cache.get_warming_entry.return_value = warming_entry
+        volume = fake_volume.fake_volume_obj(self.ctxt,
+                                             id=fakes.VOLUME_ID,
+                                             host='host@backend#pool')
+        image_location = 'someImageLocationStr'
+        image_id = fakes.IMAGE_ID
+        image_meta = {'virtual_size': '1073741824', 'size': 1073741824}
+
+        manager = create_volume_manager.CreateVolumeFromSpecTask(
+            self.mock_volume_manager,
+            self.mock_db,
+            self.mock_driver,
+            image_volume_cache=self.mock_cache
+        )
+        model_update, cloned = manager._prepare_image_cache_entry(
+            self.ctxt,
+            volume,
+            image_location,
+            image_id,
+            image_meta,
+            self.mock_image_service)
+
+        # Another request is creating the entry, wait for it and let the
+        # caller clone it.
+        self.assertFalse(cloned)
+        self.assertIsNone(model_update)
+        self.mock_cache.wait_for_warming_entry.assert_called_once_with(
+            mock_get_internal_context.return_value, warming_entry)
+        self.mock_cache.warming.assert_not_called()
+        mock_create_from_image_cache_or_download.assert_not_called()
+
+    @mock.patch('cinder.volume.flows.manager.create_volume.'
+                'CreateVolumeFromSpecTask.'
+                '_create_from_image_cache_or_download')
+    def test_prepare_image_cache_entry_waits_without_lock(
+            self,
+            mock_create_from_image_cache_or_download,
+            mock_get_internal_context,
+            mock_create_from_img_dl, mock_create_from_src,
+            mock_handle_bootable, mock_fetch_img):
+        self.mock_cache.get_entry.return_value = None
+        self.mock_cache.get_warming_entry.return_value = {'id': 1}
+        volume = fake_volume.fake_volume_obj(self.ctxt,
+                                             id=fakes.VOLUME_ID,
+                                             host='host@backend#pool')
+        manager = create_volume_manager.CreateVolumeFromSpecTask(
+            self.mock_volume_manager,
+            self.mock_db,
+            self.mock_driver,
+            image_volume_cache=self.mock_cache
+        )
+        lock = mock.MagicMock()
+        self.mock_object(coordination.COORDINATOR, 'get_lock',
+                         return_value=lock)
+
+        def wait_for_warming_entry(context, cache_entry):
+            lock.release.assert_called_once_with()
+
+        self.mock_cache.wait_for_warming_entry.side_effect = (
+            wait_for_warming_entry)
+
+        manager._prepare_image_cache_entry(self.ctxt, volume,
+                                           'someImageLocationStr',
+                                           fakes.IMAGE_ID, {},
+                                           self.mock_image_service)
+
+        coordination.COORDINATOR.get_lock.assert_called_once_with(
+            fakes.IMAGE_ID)
+        self.mock_cache.wait_for_warming_entry.assert_called_once()
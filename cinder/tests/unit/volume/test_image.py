@@ -25,6 +25,7 @@ from oslo_utils import units
 
 from cinder import db
 from cinder import exception
+from cinder.image import cache as image_cache
 from cinder.message import message_field
 from cinder import objects
 from cinder.objects import fields
@@ -424,7 +425,9 @@ class ImageVolumeCacheTestCase(base.BaseVolumeTestCase):
         opts = {
             'image_volume_cache_enabled': True,
             'image_volume_cache_max_size_gb': 100,
-            'image_volume_cache_max_count': 20
+            'image_volume_cache_max_count': 20,
+            'image_volume_cache_warming_timeout': 300,
+            'image_volume_cache_eviction_policy': 'lfu'
         }
 
         def conf_get(option):
@@ -447,6 +450,57 @@ class ImageVolumeCacheTestCase(base.BaseVolumeTestCase):
         self.assertIsNotNone(manager.image_volume_cache)
         self.assertEqual(100, manager.image_volume_cache.max_cache_size_gb)
         self.assertEqual(20, manager.image_volume_cache.max_cache_size_count)
+        self.assertEqual(300, manager.image_volume_cache.warming_timeout)
+        self.assertIsInstance(manager.image_volume_cache.eviction_policy,
+                              image_cache.LFUEvictionPolicy)
+
+    def _warm_image_cache(self, cache_entry=None):
+        image_meta = {'id': fake.IMAGE_ID, 'size': 2 * units.Gi + 1,
+                      'min_disk': 0}
+        image_service = mock.Mock()
+        image_service.show.return_value = image_meta
+        self.volume.image_volume_cache = mock.Mock()
+        self.volume.image_volume_cache.get_entry.return_value = cache_entry
+
+        self.patch('cinder.context.get_internal_tenant_context',
+                   return_value=self.context)
+        self.patch('cinder.image.glance.get_remote_image_service',
+                   return_value=(image_service, fake.IMAGE_ID))
+        mock_create = self.mock_object(self.volume, 'create_volume')
+        mock_delete = self.mock_object(self.volume, 'delete_volume')
+
+        self.volume.warm_image_cache(self.user_context, 'host@backend#pool',
+                                     fake.IMAGE_ID)
+        return mock_create, mock_delete
+
+    def test_warm_image_cache(self):
+        mock_create, mock_delete = self._warm_image_cache()
+
+        mock_create.assert_called_once_with(
+            self.user_context, mock.ANY, request_spec=mock.ANY,
+            allow_reschedule=False)
+        seed_volume = mock_create.call_args[0][1]
+        self.assertEqual(3, seed_volume.size)
+        self.assertEqual(self.volume.host + '#pool', seed_volume.host)
+        self.assertEqual(self.context.project_id, seed_volume.project_id)
+        self.assertEqual(fake.IMAGE_ID,
+                         mock_create.call_args[1]['request_spec'].image_id)
+        mock_delete.assert_called_once_with(self.context, seed_volume)
+
+    def test_warm_image_cache_already_cached(self):
+        mock_create, mock_delete = self._warm_image_cache(
+            cache_entry={'volume_id': fake.VOLUME_ID})
+
+        mock_create.assert_not_called()
+        mock_delete.assert_not_called()
+
+    def test_warm_image_cache_disabled(self):
+        self.volume.image_volume_cache = None
+        with mock.patch.object(self.volume, 'create_volume') as mock_create:
+            self.volume.warm_image_cache(self.user_context,
+                                         'host@backend#pool',
+                                         fake.IMAGE_ID)
+        mock_create.assert_not_called()
 
     def test_delete_image_volume(self):
         volume_params = {
@@ -291,6 +291,48 @@ class VolumeInitHostTestCase(base.BaseVolumeTestCase):
             mock.ANY, filters={'cluster_name': cluster},
             limit=None, offset=None)
 
+    @mock.patch('cinder.manager.CleanableManager.init_host')
+    def test_init_host_ensure_exports(self, init_host_mock):
+        vol0 = tests_utils.create_volume(self.context, host=CONF.host,
+                                         status='in-use')
+        vol1 = tests_utils.create_volume(self.context, host=CONF.host,
+                                         status='in-use')
+        tests_utils.create_volume(self.context, host=CONF.host)
+
+        with mock.patch.object(self.volume.driver, 'ensure_exports',
+                               return_value={vol1.id: exception.NotFound()}
+                               ) as ensure_exports_mock:
+            self.volume.init_host(service_id=self.service_id)
+
+        ensure_exports_mock.assert_called_once_with(mock.ANY, mock.ANY)
+        self.assertEqual(
+            {vol0.id, vol1.id},
+            {volume.id for volume in ensure_exports_mock.call_args[0][1]})
+        vol0.refresh()
+        vol1.refresh()
+        self.assertEqual('in-use', vol0.status)
+        self.assertEqual('error', vol1.status)
+
+    @mock.patch('cinder.manager.CleanableManager.init_host')
+    def test_init_host_ensure_exports_error(self, init_host_mock):
+        vol0 = tests_utils.create_volume(self.context, host=CONF.host,
+                                         status='in-use')
+
+        with mock.patch.object(self.volume.driver, 'ensure_exports',
+                               side_effect=exception.NotFound()):
+            self.volume.init_host(service_id=self.service_id)
+
+        vol0.refresh()
+        self.assertEqual('error', vol0.status)
+        self.assertTrue(self.volume.driver.initialized)
+
+    def test_cleanup_host(self):
+        with mock.patch.object(self.volume.driver,
+                               'do_teardown') as do_teardown_mock:
+            self.volume.cleanup_host()
+
+        do_teardown_mock.assert_called_once_with()
+
     @mock.patch('cinder.keymgr.migration.migrate_fixed_key')
     @mock.patch('cinder.volume.manager.VolumeManager._get_my_volumes')
     @mock.patch('cinder.manager.ThreadPoolManager._add_to_threadpool')
@@ -685,3 +685,10 @@ class VolumeRPCAPITestCase(test.RPCAPITestCase):
                                        'container_format': 'fake_type',
                                        'disk_format': 'fake_format'},
                            version='3.18')
+
+    def test_warm_image_cache(self):
+        self._test_rpc_api('warm_image_cache', rpc_method='cast',
+                           server='fake_host@fake_backend#fake_pool',
+                           host='fake_host@fake_backend#fake_pool',
+                           image_id=fake.IMAGE_ID,
+                           version='3.20')
@@ -190,6 +190,25 @@ class GetActiveByWindowTestCase(base.BaseVolumeTestCase):
         self.assertEqual({fake.VOLUME2_ID, fake.VOLUME3_ID, fake.VOLUME4_ID},
                          {v.id for v in volumes})
 
+    def test_volume_get_all_active_by_window_paginated(self):
+        for i in range(3):
+            db.volume_create(self.ctx, self.db_vol_attrs[i])
+        db.volume_create(self.context, self.db_vol_attrs[3])
+        db.volume_create(self.context, self.db_vol_attrs[4])
+        begin = datetime.datetime(1, 3, 1, 1, 1, 1)
+        end = datetime.datetime(1, 4, 1, 1, 1, 1)
+        expected = sorted([fake.VOLUME2_ID, fake.VOLUME3_ID,
+                           fake.VOLUME4_ID])
+
+        volumes = db.volume_get_all_active_by_window(
+            self.context, begin, end, project_id=fake.PROJECT_ID, limit=2)
+        self.assertEqual(expected[:2], [v.id for v in volumes])
+
+        volumes = db.volume_get_all_active_by_window(
+            self.context, begin, end, project_id=fake.PROJECT_ID,
+            marker=volumes[-1].id, limit=2)
+        self.assertEqual(expected[2:], [v.id for v in volumes])
+
     def test_snapshot_get_all_active_by_window(self):
         # Find all all snapshots valid within a timeframe window.
         db.volume_create(self.context, {'id': fake.VOLUME_ID,
@@ -18,6 +18,7 @@
 """Unit tests for Brocade fc zone driver."""
 from unittest import mock
 
+import eventlet
 from oslo_utils import importutils
 import paramiko
 import requests
@@ -27,6 +28,8 @@ from cinder.tests.unit import test
 from cinder.volume import configuration as conf
 from cinder.zonemanager.drivers.brocade import brcd_fabric_opts as fabric_opts
 from cinder.zonemanager.drivers.brocade import brcd_fc_zone_driver as driver
+from cinder.zonemanager.drivers.brocade import brcd_http_fc_zone_client
+from cinder.zonemanager.drivers.brocade import fc_zone_constants
 from cinder.zonemanager import fc_zone_manager as zmanager
 
 _zone_name = 'openstack_fab1_10008c7cff523b0120240002ac000a50'
@@ -69,6 +72,7 @@ class BrcdFcZoneDriverBaseTest(object):
                                    'test_brcd_fc_zone_driver.'
                                    'FakeBrcdFCSanLookupService'),
             fc_fabric_names=fabric_group_name,
+            zoning_batch_window=0,
         )
 
         # Ensure that we have the fabric_name group
@@ -170,6 +174,101 @@ class TestBrcdFcZoneDriver(BrcdFcZoneDriverBaseTest, test.TestCase):
             'BRCD_FAB_1', _initiator_target_map)
         self.assertNotIn(_zone_name_initiator_mode, GlobalVars._zone_state)
 
+    @mock.patch.object(driver.BrcdFCZoneDriver, '_get_southbound_client')
+    def test_add_connection_concurrent(self, get_southbound_client_mock):
+        """Zones of concurrent connections are created and activated once."""
+        client = mock.Mock()
+        client.get_active_zone_set.return_value = (
+            self._active_cfg_before_delete(mode=1))
+        get_southbound_client_mock.return_value = client
+        config = self.setup_config(True, 1)
+        self.override_config('zoning_batch_window', 0.1, 'fc-zone-manager')
+        self.setup_driver(config)
+        other_initiator_target_map = {'10008c7cff523b02': ['20240002ac000a50']}
+        other_zone_name = 'openstack_fab1_10008c7cff523b0220240002ac000a50'
+
+        threads = [eventlet.spawn(self.driver.add_connection, 'BRCD_FAB_1',
+                                  i_t_map)
+                   for i_t_map in (_initiator_target_map,
+                                   other_initiator_target_map)]
+        for thread in threads:
+            thread.wait()
+
+        client.get_active_zone_set.assert_called_once_with()
+        client.add_zones.assert_called_once_with(
+            {other_zone_name: ['10:00:8c:7c:ff:52:3b:02', WWNS[1]]},
+            True, self._active_cfg_before_delete(mode=1))
+        client.update_zones.assert_not_called()
+
+    @mock.patch.object(driver.BrcdFCZoneDriver, '_get_southbound_client')
+    def test_delete_connection_concurrent_initiator_mode(
+            self, get_southbound_client_mock):
+        """Zones are updated and deleted with a single activation."""
+        other_zone_name = 'openstack_fab1_10008c7cff523b02'
+        other_initiator = '10:00:8c:7c:ff:52:3b:02'
+        active_cfg = {'zones': {_zone_name_initiator_mode: WWNS + ['t1'],
+                                other_zone_name: [other_initiator, WWNS[1]]},
+                      'active_zone_config': 'cfg1'}
+        client = mock.Mock()
+        client.get_active_zone_set.return_value = active_cfg
+        get_southbound_client_mock.return_value = client
+        config = self.setup_config(True, 2)
+        self.override_config('zoning_batch_window', 0.1, 'fc-zone-manager')
+        self.setup_driver(config)
+
+        threads = [eventlet.spawn(self.driver.delete_connection, 'BRCD_FAB_1',
+                                  i_t_map)
+                   for i_t_map in (_initiator_target_map,
+                                   {'10008c7cff523b02': ['20240002ac000a50']})]
+        for thread in threads:
+            thread.wait()
+
+        client.get_active_zone_set.assert_called_once_with()
+        client.update_zones.assert_called_once_with(
+            {_zone_name_initiator_mode: [WWNS[1]]}, False,
+            fc_zone_constants.ZONE_REMOVE, active_cfg)
+        client.delete_zones.assert_called_once_with(
+            other_zone_name, True, active_cfg)
+
+    @mock.patch.object(driver.BrcdFCZoneDriver, '_get_southbound_client')
+    def test_add_connection_http_client(self, get_southbound_client_mock):
+        """The zones posted by the HTTP client include the existing ones."""
+        with mock.patch.object(
+                brcd_http_fc_zone_client.BrcdHTTPFCZoneClient, '__init__',
+                return_value=None):
+            client = brcd_http_fc_zone_client.BrcdHTTPFCZoneClient()
+        client.auth_header = 'auth'
+        client.cfgs = {}
+        client.zones = {}
+        client.alias = {}
+        client.qlps = {}
+        client.ifas = {}
+        client.active_cfg = ''
+        zone_info = ('--BEGIN ZONE INFO\n'
+                     '\x01cfg1 zone1 '
+                     '\x02zone1 10:00:00:05:1e:7c:64:96;'
+                     '20:24:00:02:ac:00:0a:50 '
+                     '\x03alias1 10:00:00:05:1e:7c:64:96 '
+                     '\x07cfg1 null 1045274--END ZONE INFO')
+        self.mock_object(client, 'connect', return_value=zone_info)
+        self.mock_object(client, 'post_zone_data', return_value=('0', ''))
+        self.mock_object(client, 'cleanup')
+        get_southbound_client_mock.return_value = client
+
+        self.driver.add_connection('BRCD_FAB_1', _initiator_target_map)
+
+        client.post_zone_data.assert_called_once_with(
+            ('zonecfginfo='
+             '\x01cfg1 %(zone)s;zone1 '
+             '\x02%(zone)s %(members)s '
+             '\x02zone1 10:00:00:05:1e:7c:64:96;20:24:00:02:ac:00:0a:50 '
+             '\x03alias1 10:00:00:05:1e:7c:64:96 '
+             '\x07cfg1 null '
+             '\x05&saveonly=false'
+             % {'zone': _zone_name, 'members': ';'.join(WWNS)}).encode())
+        get_southbound_client_mock.assert_called_once_with('BRCD_FAB_1')
+        client.cleanup.assert_called_once_with()
+
     @mock.patch('cinder.zonemanager.drivers.brocade.brcd_fc_zone_client_cli.'
                 'BrcdFCZoneClientCLI.__init__', side_effect=Exception)
     def test_add_connection_for_invalid_fabric(self, create_client_mock):
@@ -0,0 +1,256 @@
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+"""Unit tests for the zone batcher."""
+
+import contextlib
+import copy
+from unittest import mock
+
+import eventlet
+
+from cinder import exception
+from cinder.tests.unit import test
+from cinder.zonemanager.drivers import zone_batcher
+
+
+class FakeSwitch(object):
+    """Switch keeping its zones in memory and counting transactions."""
+
+    def __init__(self, zones=None, active_zone_config='cfg1'):
+        self.zones = zones or {}
+        self.active_zone_config = active_zone_config
+        self.reads = 0
+        self.transactions = []
+        self.error = None
+
+    def get_active_zone_set(self, session):
+        self.reads += 1
+        if not self.active_zone_config:
+            return {}
+        return {'active_zone_config': self.active_zone_config,
+                'zones': copy.deepcopy(self.zones)}
+
+    def apply(self, session, zone_set, changes):
+        if self.error:
+            error, self.error = self.error, None
+            raise error
+        for zone_name, members in changes.zones_to_add.items():
+            if zone_name in self.zones:
+                raise exception.FCZoneDriverException(
+                    'Zone %s exists' % zone_name)
+            self.zones[zone_name] = members
+        for zone_name, members in changes.members_to_add.items():
+            self.zones[zone_name] = self.zones[zone_name] + members
+        for zone_name, members in changes.members_to_remove.items():
+            self.zones[zone_name] = [x for x in self.zones[zone_name]
+                                     if x not in members]
+        for zone_name in changes.zones_to_delete:
+            del self.zones[zone_name]
+        self.active_zone_config = self.active_zone_config or 'cfg1'
+        self.transactions.append(changes)
+
+
+def plan(zone_set, operation, zone_name, members=None):
+    if operation == zone_batcher.ADD:
+        members = zone_set['zones'].get(zone_name, []) + members
+        return {zone_name: members}
+    if members:
+        return {zone_name: [x for x in zone_set['zones'][zone_name]
+                            if x not in members]}
+    return {zone_name: None}
+
+
+class ZoneBatcherTestCase(test.TestCase):
+
+    def setUp(self):
+        super(ZoneBatcherTestCase, self).setUp()
+        self.switch = FakeSwitch()
+
+    def _get_batcher(self, window=0, session=None):
+        return zone_batcher.ZoneBatcher(self.switch.get_active_zone_set,
+                                        plan, self.switch.apply,
+                                        window=window, session=session)
+
+    def _submit_concurrently(self, batcher, *requests):
+        threads = [eventlet.spawn(batcher.submit, *request)
+                   for request in requests]
+        errors = []
+        for thread in threads:
+            try:
+                thread.wait()
+                errors.append(None)
+            except Exception as exc:
+                errors.append(exc)
+        return errors
+
+    def test_zone_changes(self):
+        changes = zone_batcher.ZoneChanges(
+            {'z1': ['a', 'b'], 'z2': ['a', 'c'], 'z3': ['a']},
+            {'z1': ['a', 'b', 'd'], 'z2': ['a'], 'z4': ['e']})
+
+        self.assertTrue(bool(changes))
+        self.assertEqual({'z4': ['e']}, changes.zones_to_add)
+        self.assertEqual({'z1': ['d']}, changes.members_to_add)
+        self.assertEqual({'z2': ['c']}, changes.members_to_remove)
+        self.assertEqual(['z3'], changes.zones_to_delete)
+
+    def test_zone_changes_empty(self):
+        changes = zone_batcher.ZoneChanges({'z1': ['a']}, {'z1': ['a']})
+
+        self.assertFalse(bool(changes))
+
+    def test_submit_coalesces_requests(self):
+        batcher = self._get_batcher(window=0.05)
+
+        errors = self._submit_concurrently(
+            batcher,
+            (zone_batcher.ADD, 'z1', ['a', 'b']),
+            (zone_batcher.ADD, 'z2', ['a', 'c']),
+            (zone_batcher.ADD, 'z1', ['d']))
+
+        self.assertEqual([None, None, None], errors)
+        self.assertEqual(1, self.switch.reads)
+        self.assertEqual(1, len(self.switch.transactions))
+        self.assertEqual({'z1': ['a', 'b', 'd'], 'z2': ['a', 'c']},
+                         self.switch.zones)
+
+    def test_submit_batches_per_operation(self):
+        self.switch.zones = {'z1': ['a', 'b']}
+        batcher = self._get_batcher(window=0.05)
+
+        errors = self._submit_concurrently(
+            batcher,
+            (zone_batcher.ADD, 'z2', ['a', 'c']),
+            (zone_batcher.DELETE, 'z1'),
+            (zone_batcher.DELETE, 'z2', ['c']),
+            (zone_batcher.ADD, 'z3', ['e']))
+
+        self.assertEqual([None] * 4, errors)
+        self.assertEqual(3, len(self.switch.transactions))
+        self.assertEqual(['z1'], self.switch.transactions[1].zones_to_delete)
+        self.assertEqual({'z2': ['c']},
+                         self.switch.transactions[1].members_to_remove)
+        self.assertEqual({'z2': ['a'], 'z3': ['e']}, self.switch.zones)
+
+    def test_submit_hands_over_processing(self):
+        batcher = self._get_batcher()
+        threads = []
+
+        def apply(session, zone_set, changes):
+            self.switch.apply(session, zone_set, changes)
+            if not threads:
+                # Submitted while the first batch is being applied
+                threads.append(eventlet.spawn(batcher.submit,
+                                              zone_batcher.ADD, 'z2', ['c']))
+                eventlet.sleep(0)
+        batcher._apply = apply
+
+        batcher.submit(zone_batcher.ADD, 'z1', ['a', 'b'])
+
+        # The first thread returns once its own request has been applied
+        self.assertEqual(1, len(self.switch.transactions))
+        self.assertTrue(batcher._processing)
+
+        threads[0].wait()
+        self.assertEqual(2, len(self.switch.transactions))
+        self.assertEqual({'z1': ['a', 'b'], 'z2': ['c']}, self.switch.zones)
+        self.assertFalse(batcher._processing)
+
+    def test_submit_no_changes(self):
+        self.switch.zones = {'z1': ['a', 'b']}
+        batcher = self._get_batcher()
+
+        batcher.submit(zone_batcher.ADD, 'z1', [])
+
+        self.assertEqual([], self.switch.transactions)
+
+    def test_submit_reads_zone_set_per_batch(self):
+        batcher = self._get_batcher()
+
+        batcher.submit(zone_batcher.ADD, 'z1', ['a', 'b'])
+        # Zone created on the switch by someone else between the batches
+        self.switch.zones['z2'] = ['a', 'c']
+        batcher.submit(zone_batcher.ADD, 'z2', ['d'])
+
+        self.assertEqual(2, self.switch.reads)
+        self.assertEqual({'z2': ['d']},
+                         self.switch.transactions[1].members_to_add)
+        self.assertEqual({'z1': ['a', 'b'], 'z2': ['a', 'c', 'd']},
+                         self.switch.zones)
+
+    def test_submit_session(self):
+        sessions = []
+
+        @contextlib.contextmanager
+        def session():
+            sessions.append(mock.sentinel.session)
+            yield mock.sentinel.session
+            sessions.remove(mock.sentinel.session)
+
+        self.mock_object(self.switch, 'get_active_zone_set',
+                         side_effect=self.switch.get_active_zone_set)
+        self.mock_object(self.switch, 'apply', side_effect=self.switch.apply)
+        batcher = self._get_batcher(window=0.05, session=session)
+
+        self._submit_concurrently(batcher,
+                                  (zone_batcher.ADD, 'z1', ['a', 'b']),
+                                  (zone_batcher.ADD, 'z2', ['a', 'c']))
+
+        self.switch.get_active_zone_set.assert_called_once_with(
+            mock.sentinel.session)
+        self.switch.apply.assert_called_once_with(
+            mock.sentinel.session, mock.ANY, mock.ANY)
+        self.assertEqual([], sessions)
+
+    def test_submit_error(self):
+        self.switch.error = exception.FCZoneDriverException('error')
+        batcher = self._get_batcher(window=0.05)
+
+        errors = self._submit_concurrently(
+            batcher,
+            (zone_batcher.ADD, 'z1', ['a', 'b']),
+            (zone_batcher.ADD, 'z2', ['a', 'c']))
+
+        self.assertIsNone(self.switch.error)
+        self.assertIsInstance(errors[0], exception.FCZoneDriverException)
+        self.assertIs(errors[0], errors[1])
+        self.assertEqual({}, self.switch.zones)
+
+        # The next batch is not affected
+        batcher.submit(zone_batcher.ADD, 'z1', ['a', 'b'])
+        self.assertEqual({'z1': ['a', 'b']}, self.switch.zones)
+
+    def test_submit_read_error(self):
+        self.mock_object(self.switch, 'get_active_zone_set',
+                         side_effect=exception.FCZoneDriverException('error'))
+        batcher = self._get_batcher()
+
+        self.assertRaises(exception.FCZoneDriverException,
+                          batcher.submit, zone_batcher.ADD, 'z1', ['a'])
+        self.assertFalse(batcher._processing)
+
+    def test_submit_plan_error(self):
+        self.switch.zones = {'z1': ['a', 'b']}
+        batcher = self._get_batcher(window=0.05)
+
+        errors = self._submit_concurrently(
+            batcher,
+            (zone_batcher.DELETE, 'z1', ['a']),
+            (zone_batcher.DELETE, 'z2', ['a']),
+            (zone_batcher.DELETE, 'z1', ['b']))
+
+        self.assertIsNone(errors[0])
+        self.assertIsInstance(errors[1], KeyError)
+        self.assertIsNone(errors[2])
+        self.assertEqual(1, len(self.switch.transactions))
+        self.assertEqual({'z1': []}, self.switch.zones)
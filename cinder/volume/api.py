@@ -634,7 +634,8 @@ class API(base.Base):
                 sort_dirs: Optional[Iterable[str]] = None,
                 filters: Optional[dict] = None,
                 viewable_admin_meta: bool = False,
-                offset: Optional[int] = None) -> objects.VolumeList:
+                offset: Optional[int] = None,
+                summary: bool = False) -> objects.VolumeList:
         context.authorize(vol_policy.GET_ALL_POLICY)
 
         if filters is None:
@@ -669,14 +670,15 @@ class API(base.Base):
                                                  sort_keys=sort_keys,
                                                  sort_dirs=sort_dirs,
                                                  filters=filters,
-                                                 offset=offset)
+                                                 offset=offset,
+                                                 summary=summary)
         else:
             if viewable_admin_meta:
                 context = context.elevated()
             volumes = objects.VolumeList.get_all_by_project(
                 context, context.project_id, marker, limit,
                 sort_keys=sort_keys, sort_dirs=sort_dirs, filters=filters,
-                offset=offset)
+                offset=offset, summary=summary)
 
         LOG.info("Get all volumes completed successfully.")
         return volumes
@@ -1999,7 +2001,7 @@ class API(base.Base):
     def _get_service_by_host_cluster(
             self,
             context: context.RequestContext,
-            host: str,
+            host: Optional[str],
             cluster_name: Optional[str],
             resource: str = 'volume') -> objects.Service:
         elevated = context.elevated()
@@ -2736,6 +2738,29 @@ class API(base.Base):
                                    volume,
                                    image_meta)
 
+    def warm_image_cache(self,
+                         context: context.RequestContext,
+                         image_id: str,
+                         host: Optional[str] = None,
+                         cluster_name: Optional[str] = None) -> None:
+        """Create the image-volume cache entry for an image on a backend."""
+        if bool(host) == bool(cluster_name):
+            msg = _('Exactly one of host and cluster_name must be provided.')
+            raise exception.InvalidInput(reason=msg)
+
+        # Make sure there is a service up to process the request.
+        self._get_service_by_host_cluster(context, host, cluster_name,
+                                          'image-volume cache')
+        # Fail early if the image doesn't exist or can't be accessed.
+        self.image_service.show(context, image_id)
+
+        # The pool, if any, is kept for the volume service to use.
+        destination = cluster_name or host
+        LOG.info('Warming image-volume cache of %(destination)s with image '
+                 '%(image_id)s.',
+                 {'destination': destination, 'image_id': image_id})
+        self.volume_rpcapi.warm_image_cache(context, destination, image_id)
+
 
 class HostAPI(base.Base):
     """Sub-set of the Volume Manager API for managing host operations."""
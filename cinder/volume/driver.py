@@ -138,6 +138,16 @@ volume_opts = [
                     'Only used for tgtadm to specify backing device flags '
                     'using bsoflags option. The specified string is passed '
                     'as is to the underlying tool.'),
+    cfg.IntOpt('lio_save_config_delay',
+               default=0,
+               min=0,
+               help='Seconds to wait after a change of the LIO targets '
+                    'before saving their configuration, so that the changes '
+                    'made meanwhile are saved at once. 0 saves the '
+                    'configuration after every change. A pending save is '
+                    'made when the volume service stops, but changes are '
+                    'lost if the host crashes before they are saved. Only '
+                    'used when target_helper is lioadm.'),
     cfg.StrOpt('target_protocol',
                default='iscsi',
                choices=['iscsi', 'iser', 'nvmet_rdma', 'nvmet_tcp'],
@@ -329,6 +339,28 @@ image_opts = [
                default=0,
                help='Max number of entries allowed in the image volume cache. '
                     '0 => unlimited.'),
+    cfg.IntOpt('image_volume_cache_warming_timeout',
+               default=600,
+               min=0,
+               help='Maximum number of seconds a request waits for an image '
+                    'volume cache entry that another request is creating '
+                    'for the same image, before downloading the image '
+                    'itself. Requests stop waiting earlier if the request '
+                    'creating the entry stops running. 0 => do not wait.'),
+    cfg.StrOpt('image_volume_cache_eviction_policy',
+               default='lru',
+               choices=[('lru', 'Evict the least recently used entries.'),
+                        ('lfu', 'Evict the least used entries, based on '
+                                'the number of volumes created from them, '
+                                'halved every day they are not used, and '
+                                'the least recently used ones among '
+                                'entries used as often.'),
+                        ('size', 'Evict as few entries as possible to make '
+                                 'room for the new one, the least recently '
+                                 'used ones among those that would free '
+                                 'enough space.')],
+               help='Which entries to remove from the image volume cache '
+                    'when it is full.'),
     cfg.BoolOpt('use_multipath_for_image_xfer',
                 default=False,
                 help='Do we attach/detach volumes in cinder using multipath '
@@ -1404,6 +1436,10 @@ class BaseVD(object, metaclass=abc.ABCMeta):
         """Any initialization the volume driver does while starting."""
         pass
 
+    def do_teardown(self):
+        """Any cleanup the volume driver does while stopping."""
+        pass
+
     def validate_connector(self, connector):
         """Fail if connector doesn't contain all the data needed by driver."""
         pass
@@ -1448,6 +1484,23 @@ class BaseVD(object, metaclass=abc.ABCMeta):
         """Synchronously recreates an export for a volume."""
         return
 
+    def ensure_exports(self, context, volumes):
+        """Synchronously recreates the exports of several volumes.
+
+        Drivers that can recreate many exports faster at once than one by one
+        can override this method.
+
+        :returns: dict with the ids of the volumes whose export could not be
+                  recreated and the exception raised for each of them
+        """
+        failed = {}
+        for volume in volumes:
+            try:
+                self.ensure_export(context, volume)
+            except Exception as exc:
+                failed[volume['id']] = exc
+        return failed
+
     @abc.abstractmethod
     def create_export(self, context, volume, connector):
         """Exports the volume.
@@ -71,6 +71,13 @@ volume_opts = [
                 default=False,
                 help='Whether to share the same target for all LUNs or not '
                      '(currently only supported by nvmet.'),
+    cfg.IntOpt('lvm_metadata_cache_ttl',
+               default=0, min=0,
+               help='Number of seconds the information about the logical '
+                    'volumes of the volume group, gathered with a single '
+                    'lvs call, is reused before LVM is queried again. '
+                    'Changes made by this service refresh it immediately. '
+                    'Set to 0 to query LVM on every request.'),
 ]
 
 CONF = cfg.CONF
@@ -328,7 +335,9 @@ class LVMVolumeDriver(driver.VolumeDriver):
                     executor=self._execute,
                     lvm_conf=lvm_conf_file,
                     suppress_fd_warn=(
-                        self.configuration.lvm_suppress_fd_warnings))
+                        self.configuration.lvm_suppress_fd_warnings),
+                    metadata_cache_ttl=(
+                        self.configuration.lvm_metadata_cache_ttl))
 
             except exception.VolumeGroupNotFound:
                 message = (_("Volume Group %s does not exist") %
@@ -837,6 +846,33 @@ class LVMVolumeDriver(driver.VolumeDriver):
             self.target_driver.ensure_export(context, volume, volume_path)
         return model_update
 
+    def do_teardown(self):
+        self.target_driver.teardown()
+
+    def ensure_exports(self, context, volumes):
+        # Subclasses that change how a single export is recreated must keep
+        # going through their own ensure_export.
+        if type(self).ensure_export is not LVMVolumeDriver.ensure_export:
+            return super(LVMVolumeDriver, self).ensure_exports(context,
+                                                               volumes)
+
+        failed = {}
+        exported_volumes = []
+        volume_paths = []
+        for volume in volumes:
+            try:
+                self.vg.activate_lv(volume['name'])
+            except Exception as exc:
+                failed[volume['id']] = exc
+                continue
+            exported_volumes.append(volume)
+            volume_paths.append("/dev/%s/%s" % (
+                self.configuration.volume_group, volume['name']))
+
+        failed.update(self.target_driver.ensure_exports(
+            context, exported_volumes, volume_paths))
+        return failed
+
     def create_export(self, context, volume, connector, vg=None):
         if vg is None:
             vg = self.configuration.volume_group
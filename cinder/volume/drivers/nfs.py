@@ -399,9 +399,10 @@ class NfsDriver(remotefs.RemoteFSSnapDriverDistributed):
             context.get_admin_context(), volume.id).admin_metadata
         if admin_metadata and 'format' in admin_metadata:
             file_format = admin_metadata['format']
-        image_utils.resize_image(path, new_size,
-                                 run_as_root=self._execute_as_root,
-                                 file_format=file_format)
+        with self._tracking_provisioned_capacity(volume):
+            image_utils.resize_image(path, new_size,
+                                     run_as_root=self._execute_as_root,
+                                     file_format=file_format)
         if file_format == 'qcow2' and not self._is_file_size_equal(
                 path, new_size):
             raise exception.ExtendVolumeError(
@@ -566,14 +567,15 @@ class NfsDriver(remotefs.RemoteFSSnapDriverDistributed):
         info_path = self._local_path_volume_info(volume)
         info = self._read_info_file(info_path, empty_if_missing=True)
 
-        if info:
-            base_volume_path = os.path.join(self._local_volume_dir(volume),
-                                            info['active'])
-            self._delete(info_path)
-        else:
-            base_volume_path = self._local_path_volume(volume)
+        with self._tracking_provisioned_capacity(volume):
+            if info:
+                base_volume_path = os.path.join(
+                    self._local_volume_dir(volume), info['active'])
+                self._delete(info_path)
+            else:
+                base_volume_path = self._local_path_volume(volume)
 
-        self._delete(base_volume_path)
+            self._delete(base_volume_path)
 
     def _qemu_img_info(self, path, volume_name):
         return super(NfsDriver, self)._qemu_img_info_base(
@@ -20,11 +20,14 @@ import json
 import math
 import os
 import tempfile
+import threading
+import time
 import typing
 from typing import Any, Optional, Union
 import urllib.parse
 
 from castellan import key_manager
+from eventlet import greenpool
 from eventlet import tpool
 from os_brick.initiator import linuxrbd
 from oslo_config import cfg
@@ -101,6 +104,13 @@ RBD_OPTS = [
     cfg.IntOpt('rados_connection_interval', default=5,
                help='Interval value (in seconds) between connection '
                     'retries to ceph cluster.'),
+    cfg.IntOpt('rados_connection_pool_size', default=4, min=0,
+               help='Maximum number of idle connections to the ceph cluster '
+                    'that are kept open for reuse for each pool. Set to 0 '
+                    'to open a new connection for every operation.'),
+    cfg.IntOpt('rados_connection_pool_idle_timeout', default=60, min=0,
+               help='Number of seconds an idle connection to the ceph '
+                    'cluster is kept open for reuse before it is closed.'),
     cfg.IntOpt('replication_connect_timeout', default=5,
                help='Timeout value (in seconds) used when connecting to '
                     'ceph cluster to do a demotion/promotion of volumes. '
@@ -121,6 +131,19 @@ RBD_OPTS = [
                      "the Ceph cluster for per image used disk, this is an "
                      "intensive operation having an independent request for "
                      "each image."),
+    cfg.IntOpt('rbd_provisioned_capacity_scan_workers', default=8, min=1,
+               help='Number of images that are opened concurrently when '
+                    'calculating the provisioned capacity of a non '
+                    'exclusive pool. Only used with librbd older than '
+                    'Nautilus, newer versions report the provisioned '
+                    'capacity of the pool directly.'),
+    cfg.IntOpt('rbd_provisioned_capacity_refresh_interval', default=0, min=0,
+               help='Interval in seconds between full scans of the pool to '
+                    'calculate its provisioned capacity when '
+                    'rbd_exclusive_cinder_pool is False. Between scans the '
+                    'provisioned capacity is updated with the changes made '
+                    'by this volume service. Set to 0 to only scan the pool '
+                    'when the service starts.'),
     cfg.BoolOpt('enable_deferred_deletion', default=False,
                 help='Enable deferred deletion. Upon deletion, volumes are '
                      'tagged for deletion but will only be removed '
@@ -201,6 +224,102 @@ class RBDDriverException(exception.VolumeDriverException):
     message = _("RBD Cinder driver failure: %(reason)s")
 
 
+class RADOSConnectionPool(object):
+    """Keeps idle RADOS connections around so they can be reused.
+
+    Idle connections are stored per key, which the caller builds from the
+    cluster configuration and the pool the ioctx was opened on, and at most
+    ``max_size`` of them are kept for each key.  Connections that have been
+    idle for more than ``idle_timeout`` seconds, that are no longer connected
+    or that were released after an error are closed instead of being reused.
+    """
+    def __init__(self, max_size: int, idle_timeout: int) -> None:
+        self.max_size = max_size
+        self.idle_timeout = idle_timeout
+        self._idle: dict[tuple, list[tuple[float,
+                                           'rados.Rados',
+                                           'rados.Ioctx']]] = {}
+        self._in_use: dict[int, tuple] = {}
+        # NOTE: This is a green lock, so the pool must be used from green
+        # threads. Don't wrap RADOSClient in a tpool.Proxy.
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _is_healthy(client: 'rados.Rados', ioctx: 'rados.Ioctx') -> bool:
+        return client.state == 'connected' and ioctx.state == 'open'
+
+    @staticmethod
+    def _close(connections: list[tuple['rados.Rados',
+                                       'rados.Ioctx']]) -> None:
+        for client, ioctx in connections:
+            # closing an ioctx cannot raise an exception
+            ioctx.close()
+            client.shutdown()
+
+    def _pop_expired(self) -> list[tuple['rados.Rados', 'rados.Ioctx']]:
+        deadline = time.monotonic() - self.idle_timeout
+        expired: list[tuple['rados.Rados', 'rados.Ioctx']] = []
+        for key, idle in list(self._idle.items()):
+            expired.extend((client, ioctx) for released, client, ioctx in idle
+                           if released <= deadline)
+            idle[:] = [conn for conn in idle if conn[0] > deadline]
+            if not idle:
+                del self._idle[key]
+        return expired
+
+    def get(self,
+            key: tuple,
+            connect: typing.Callable) -> tuple['rados.Rados', 'rados.Ioctx']:
+        """Return an idle connection for key or open one with connect."""
+        conn = None
+        with self._lock:
+            stale = self._pop_expired()
+            idle = self._idle.get(key, [])
+            while idle and conn is None:
+                released, client, ioctx = idle.pop()
+                if self._is_healthy(client, ioctx):
+                    conn = (client, ioctx)
+                else:
+                    stale.append((client, ioctx))
+        self._close(stale)
+
+        if conn is None:
+            conn = connect()
+        else:
+            LOG.debug("Reusing pooled connection to ceph cluster for %s.",
+                      key)
+
+        with self._lock:
+            self._in_use[id(conn[0])] = key
+        return conn
+
+    def put(self,
+            client: 'rados.Rados',
+            ioctx: 'rados.Ioctx',
+            discard: bool = False) -> None:
+        """Release a connection, keeping it for reuse if possible."""
+        reuse = not discard and self._is_healthy(client, ioctx)
+        with self._lock:
+            key = self._in_use.pop(id(client), None)
+            stale = self._pop_expired()
+            idle = self._idle.setdefault(key, []) if key is not None else []
+            if reuse and key is not None and len(idle) < self.max_size:
+                idle.append((time.monotonic(), client, ioctx))
+            else:
+                stale.append((client, ioctx))
+            if key is not None and not idle:
+                del self._idle[key]
+        self._close(stale)
+
+    def clear(self) -> None:
+        """Close all idle connections."""
+        with self._lock:
+            stale = [(client, ioctx) for idle in self._idle.values()
+                     for released, client, ioctx in idle]
+            self._idle.clear()
+        self._close(stale)
+
+
 class RBDVolumeProxy(object):
     """Context manager for dealing with an existing RBD volume.
 
@@ -253,7 +372,8 @@ class RBDVolumeProxy(object):
             self.volume.close()
         finally:
             if self._close_conn:
-                self.driver._disconnect_from_rados(self.client, self.ioctx)
+                self.driver._disconnect_from_rados(self.client, self.ioctx,
+                                                   discard=type_ is not None)
 
     def __getattr__(self, attrib: str):
         return getattr(self.volume, attrib)
@@ -271,7 +391,9 @@ class RADOSClient(object):
         return self
 
     def __exit__(self, type_, value, traceback) -> None:
-        self.driver._disconnect_from_rados(self.cluster, self.ioctx)
+        # Don't hand a connection that saw an error back to the pool
+        self.driver._disconnect_from_rados(self.cluster, self.ioctx,
+                                           discard=type_ is not None)
 
     @property
     def features(self) -> int:
@@ -362,6 +484,18 @@ class RBDDriver(driver.CloneableImageVD, driver.MigrateVD,
             limit=self.configuration.rbd_concurrent_flatten_operations,
             concurrent_processes=1)
 
+        self._rados_pool = RADOSConnectionPool(
+            self.configuration.rados_connection_pool_size,
+            self.configuration.rados_connection_pool_idle_timeout)
+
+        # Provisioned bytes of all images in the pool, None until the pool
+        # has been scanned.
+        self._provisioned_bytes: Optional[int] = None
+        self._provisioned_scan_time = 0.0
+        # Changes in bytes made while the pool is being scanned, None when
+        # it isn't.
+        self._provisioned_scan_deltas: Optional[list[int]] = None
+
     def _set_keyring_attributes(self) -> None:
         # The rbd_keyring_conf option is not available for OpenStack usage
         # for security reasons (OSSN-0085) and in OpenStack we use
@@ -588,18 +722,11 @@ class RBDDriver(driver.CloneableImageVD, driver.MigrateVD,
         @utils.retry(exception.VolumeBackendAPIException,
                      self.configuration.rados_connection_interval,
                      self.configuration.rados_connection_retries)
-        def _do_conn(pool: Optional[str],
+        def _do_conn(pool: str,
                      remote: Optional[dict],
-                     timeout: Optional[int]) -> tuple['rados.Rados',
-                                                      'rados.Ioctx']:
+                     timeout: int) -> tuple['rados.Rados', 'rados.Ioctx']:
             name, conf, user, secret_uuid = self._get_config_tuple(remote)
 
-            if pool is None:
-                pool = self.configuration.rbd_pool
-
-            if timeout is None:
-                timeout = self.configuration.rados_connect_timeout
-
             LOG.debug("connecting to %(user)s@%(name)s (conf=%(conf)s, "
                       "timeout=%(timeout)s).",
                       {'user': user, 'name': name, 'conf': conf,
@@ -626,14 +753,21 @@ class RBDDriver(driver.CloneableImageVD, driver.MigrateVD,
                 client.shutdown()
                 raise exception.VolumeBackendAPIException(data=msg)
 
-        return _do_conn(pool, remote, timeout)
+        if pool is None:
+            pool = self.configuration.rbd_pool
 
-    @staticmethod
-    def _disconnect_from_rados(client: 'rados.Rados',
-                               ioctx: 'rados.Ioctx') -> None:
-        # closing an ioctx cannot raise an exception
-        ioctx.close()
-        client.shutdown()
+        if timeout is None:
+            timeout = self.configuration.rados_connect_timeout
+
+        key = (self._get_config_tuple(remote), pool, timeout)
+        return self._rados_pool.get(
+            key, lambda: _do_conn(pool, remote, timeout))
+
+    def _disconnect_from_rados(self,
+                               client: 'rados.Rados',
+                               ioctx: 'rados.Ioctx',
+                               discard: bool = False) -> None:
+        self._rados_pool.put(client, ioctx, discard=discard)
 
     def _supports_qos(self):
         return self.RBDProxy().version()[1] >= CEPH_QOS_SUPPORTED_VERSION
@@ -670,6 +804,58 @@ class RBDDriver(driver.CloneableImageVD, driver.MigrateVD,
             ports.append(port)
         return hosts, ports
 
+    def _get_image_size(self, ioctx: 'rados.Ioctx',
+                        name: str) -> Optional[int]:
+        """Return the size of an image, or None if it doesn't exist anymore.
+
+        This runs in a native thread, so it must not log because of eventlet
+        bug https://github.com/eventlet/eventlet/issues/432.
+        """
+        try:
+            image = self.rbd.Image(ioctx, name, read_only=True)
+            try:
+                return image.size()
+            finally:
+                image.close()
+        except (self.rbd.ImageNotFound, self.rbd.OSError):
+            return None
+
+    def _scan_provisioned_capacity(self) -> int:
+        """Return the provisioned size in bytes of all images in the pool.
+
+        librbd reports the size of all images at once since Nautilus, with
+        older versions images are opened concurrently in native threads.
+        """
+        with RADOSClient(self) as client:
+            if hasattr(self.rbd.RBD, 'pool_stats_get'):
+                stats = self.RBDProxy().pool_stats_get(client.ioctx)
+                return stats['image_max_provisioned_bytes']
+
+            names = self.RBDProxy().list(client.ioctx)
+            pool = greenpool.GreenPool(
+                self.configuration.rbd_provisioned_capacity_scan_workers)
+            sizes = list(pool.imap(
+                lambda name: tpool.execute(self._get_image_size,
+                                           client.ioctx, name),
+                names))
+        missing = sizes.count(None)
+        if missing:
+            LOG.debug("%(missing)d of %(count)d images were not found while "
+                      "scanning the pool.",
+                      {'missing': missing, 'count': len(sizes)})
+        return sum(size for size in sizes if size is not None)
+
+    def _track_provisioned_capacity(self, size_diff: int) -> None:
+        """Apply a change in GiB made by this service to the tracked size."""
+        if self._provisioned_bytes is not None:
+            self._provisioned_bytes += size_diff * units.Gi
+        if self._provisioned_scan_deltas is not None:
+            self._provisioned_scan_deltas.append(size_diff * units.Gi)
+
+    def _reset_provisioned_capacity(self) -> None:
+        """Make the next stats update scan the whole pool."""
+        self._provisioned_bytes = None
+
     def _get_usage_info(self) -> int:
         """Calculate provisioned volume space in GiB.
 
@@ -679,21 +865,28 @@ class RBDDriver(driver.CloneableImageVD, driver.MigrateVD,
         We must include all volumes, not only Cinder created volumes, because
         Cinder created volumes are reported by the Cinder core code as
         allocated_capacity_gb.
+
+        The pool is only scanned the first time, after a failover and every
+        rbd_provisioned_capacity_refresh_interval seconds, in between the
+        changes made by this service are applied to the last result.
+        Changes made while the pool is scanned may be missing from the scan,
+        so they are applied to its result as well.
         """
-        total_provisioned = 0
-        with RADOSClient(self) as client:
-            for t in self.RBDProxy().list(client.ioctx):
-                try:
-                    with RBDVolumeProxy(self, t, read_only=True,
-                                        client=client.cluster,
-                                        ioctx=client.ioctx) as v:
-                        size = v.size()
-                except (self.rbd.ImageNotFound, self.rbd.OSError):
-                    LOG.debug("Image %s is not found.", t)
-                else:
-                    total_provisioned += size
+        interval = self.configuration.rbd_provisioned_capacity_refresh_interval
+        now = time.monotonic()
+        if (self._provisioned_bytes is None or
+                (interval and now - self._provisioned_scan_time >= interval)):
+            self._provisioned_scan_deltas = []
+            try:
+                provisioned_bytes = self._scan_provisioned_capacity()
+                self._provisioned_bytes = (provisioned_bytes +
+                                           sum(self._provisioned_scan_deltas))
+            finally:
+                self._provisioned_scan_deltas = None
+            self._provisioned_scan_time = now
 
-        total_provisioned = math.ceil(float(total_provisioned) / units.Gi)
+        total_provisioned = math.ceil(float(self._provisioned_bytes) /
+                                      units.Gi)
         return total_provisioned
 
     def _get_pool_stats(self) -> Union[tuple[str, str],
@@ -878,6 +1071,7 @@ class RBDDriver(driver.CloneableImageVD, driver.MigrateVD,
             with RBDVolumeProxy(self, src_name, read_only=True) as vol:
                 vol.copy(vol.ioctx, dest_name)
                 self._extend_if_required(volume, src_vref)
+            self._track_provisioned_capacity(volume.size)
             return None
 
         # Otherwise do COW clone.
@@ -950,6 +1144,7 @@ class RBDDriver(driver.CloneableImageVD, driver.MigrateVD,
 
             self._extend_if_required(volume, src_vref)
 
+        self._track_provisioned_capacity(volume.size)
         LOG.debug("clone created successfully")
         return volume_update
 
@@ -1153,6 +1348,7 @@ class RBDDriver(driver.CloneableImageVD, driver.MigrateVD,
 
         if volume.encryption_key_id:
             self._create_encrypted_volume(volume, volume.obj_context)
+            self._track_provisioned_capacity(volume.size)
             return {}
 
         size = int(volume.size) * units.Gi
@@ -1179,6 +1375,7 @@ class RBDDriver(driver.CloneableImageVD, driver.MigrateVD,
                           {'vol': vol_name})
                 self.RBDProxy().remove(client.ioctx, vol_name)
 
+        self._track_provisioned_capacity(volume.size)
         return volume_update
 
     @utils.limit_operations
@@ -1292,6 +1489,7 @@ class RBDDriver(driver.CloneableImageVD, driver.MigrateVD,
                 new_size = self._calculate_new_size(size_diff, volume.name)
             self._resize(volume, size=new_size)
 
+        self._track_provisioned_capacity(volume.size)
         self._show_msg_check_clone_v2_api(snapshot.volume_name)
         return volume_update
 
@@ -1491,6 +1689,7 @@ class RBDDriver(driver.CloneableImageVD, driver.MigrateVD,
 
         try:
             self.RBDProxy().remove(client.ioctx, volume.name)
+            self._track_provisioned_capacity(-volume.size)
             return  # the fast path was successful
         except (self.rbd.ImageHasSnapshots, self.rbd.ImageBusy):
             self._flatten_children(client.ioctx, volume.name)
@@ -1501,6 +1700,7 @@ class RBDDriver(driver.CloneableImageVD, driver.MigrateVD,
 
         try:
             if self._try_remove_volume(client, volume.name):
+                self._track_provisioned_capacity(-volume.size)
                 return
         except self.rbd.ImageHasSnapshots:
             # perform trash instead, which can succeed when snapshots exist
@@ -1519,6 +1719,7 @@ class RBDDriver(driver.CloneableImageVD, driver.MigrateVD,
         # That snapshot is not visible but is still in the dependency
         # chain of RBD images.
         self._move_volume_to_trash(client.ioctx, volume.name, delay)
+        self._track_provisioned_capacity(-volume.size)
 
         # If it is a clone, walk back up the parent chain deleting
         # references.
@@ -1813,6 +2014,7 @@ class RBDDriver(driver.CloneableImageVD, driver.MigrateVD,
         self._active_backend_id = secondary_id
         self._active_config = remote
         self._set_default_secret_uuid()
+        self._reset_provisioned_capacity()
         LOG.info('RBD driver failover completion completed.')
 
     def failover_host(self,
@@ -1972,6 +2174,7 @@ class RBDDriver(driver.CloneableImageVD, driver.MigrateVD,
                     volume_update = self._clone(volume, pool, image, snapshot)
                     volume_update['provider_location'] = None
                     self._resize(volume)
+                    self._track_provisioned_capacity(volume.size)
                     return volume_update, True
         return ({}, False)
 
@@ -2072,6 +2275,8 @@ class RBDDriver(driver.CloneableImageVD, driver.MigrateVD,
             args.extend(self._ceph_args())
             self._try_execute(*args)
         self._resize(volume)
+        # Deleting the original image subtracted its size.
+        self._track_provisioned_capacity(volume.size)
         # We may need to re-enable replication because we have deleted the
         # original image and created a new one using the command line import.
         try:
@@ -2107,6 +2312,7 @@ class RBDDriver(driver.CloneableImageVD, driver.MigrateVD,
             LOG.error(msg)
             raise exception.VolumeBackendAPIException(data=msg)
 
+        self._track_provisioned_capacity(int(new_size) - old_size)
         LOG.debug("Extend volume from %(old_size)s GB to %(new_size)s GB.",
                   {'old_size': old_size, 'new_size': new_size})
 
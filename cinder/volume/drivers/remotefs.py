@@ -16,6 +16,7 @@
 
 import binascii
 import collections
+import contextlib
 import errno
 import inspect
 import json
@@ -34,6 +35,7 @@ from os_brick.remotefs import remotefs as remotefs_brick
 from oslo_config import cfg
 from oslo_log import log as logging
 from oslo_serialization import jsonutils
+from oslo_service import loopingcall
 from oslo_utils import imageutils
 from oslo_utils.secretutils import md5
 from oslo_utils import units
@@ -107,6 +109,15 @@ volume_opts = [
                choices=['thin', 'thick'],
                help=('Provisioning type that will be used when '
                      'creating volumes.')),
+    cfg.IntOpt('nas_provisioned_capacity_refresh_interval',
+               default=3600, min=0,
+               help=('Interval in seconds between background recalculations '
+                     'of the provisioned capacity of the shares by walking '
+                     'all the files in them. Between recalculations the '
+                     'provisioned capacity is updated with the volumes and '
+                     'snapshots created, deleted and extended by this '
+                     'service. Set to 0 to walk the shares on every stats '
+                     'update.')),
 ]
 
 CONF = cfg.CONF
@@ -145,6 +156,23 @@ def locked_volume_id_operation(f: Callable) -> Callable:
     return lvo_inner1
 
 
+def tracks_provisioned_capacity(f: Callable) -> Callable:
+    """Provisioned capacity tracking decorator for volume operations.
+
+       Applies the change in size of the files of the volume made by the
+       operation to the provisioned capacity tracked by the driver.
+
+       May be applied to methods that take a 'volume' or 'snapshot' argument.
+    """
+
+    def tpc_inner(inst, *args, **kwargs):
+        call_args = inspect.getcallargs(f, inst, *args, **kwargs)
+        volume = call_args.get('volume') or call_args['snapshot'].volume
+        with inst._tracking_provisioned_capacity(volume):
+            return f(inst, *args, **kwargs)
+    return tpc_inner
+
+
 class BackingFileTemplate(string.Template):
     """Custom Template for substitutions in backing files regex strings
 
@@ -177,6 +205,11 @@ class RemoteFSDriver(driver.BaseVD):
         self._is_voldb_empty_at_startup = kwargs.pop('is_vol_db_empty', None)
         self._supports_encryption = False
         self.format = 'raw'
+        # Provisioned bytes on all shares, None until they have been walked
+        self._provisioned_bytes: Optional[int] = None
+        # Changes in bytes made while the shares are being walked, None when
+        # they aren't.
+        self._provisioned_refresh_deltas: Optional[List[int]] = None
 
         if self.configuration:
             self.configuration.append_config_values(nas_opts)
@@ -229,19 +262,105 @@ class RemoteFSDriver(driver.BaseVD):
                 LOG.error(msg)
                 raise exception.InvalidConfigurationValue(msg)
 
+    def _calculate_provisioned_bytes(self) -> int:
+        """Returns the sum of the sizes of all the files on the shares."""
+        provisioned_size = 0
+        for share in self.shares.keys():
+            mount_path = self._get_mount_point_for_share(share)
+            out, _ = self._execute('du', '--bytes', '-s', mount_path,
+                                   run_as_root=self._execute_as_root)
+            provisioned_size += int(out.split()[0])
+        return provisioned_size
+
+    def _walk_provisioned_capacity(self) -> None:
+        """Walk the shares and set the tracked provisioned capacity.
+
+        Changes made while du walks the shares are added to its result, as
+        it may have walked the files before they were changed.
+        """
+        self._provisioned_refresh_deltas = []
+        try:
+            provisioned_bytes = self._calculate_provisioned_bytes()
+            self._provisioned_bytes = (provisioned_bytes +
+                                       sum(self._provisioned_refresh_deltas))
+        finally:
+            self._provisioned_refresh_deltas = None
+
+    def _refresh_provisioned_capacity(self) -> None:
+        try:
+            self._walk_provisioned_capacity()
+        except Exception:
+            LOG.exception('Failed to recalculate the provisioned capacity.')
+
+    def _get_volume_file_paths(self, volume: objects.Volume) -> List[str]:
+        """Returns the paths of the files of a volume."""
+        return [self.local_path(volume)]
+
+    def _get_volume_files_bytes(self,
+                                volume: objects.Volume) -> Optional[int]:
+        """Returns the sum of the sizes of the files of a volume.
+
+        Apparent sizes are counted like du --bytes does. Files that don't
+        exist count as 0.
+        """
+        size = 0
+        try:
+            for path in self._get_volume_file_paths(volume):
+                try:
+                    size += os.lstat(path).st_size
+                except FileNotFoundError:
+                    pass
+        except (OSError, ValueError):
+            LOG.warning('Failed to get the size of the files of volume %s.',
+                        volume.id)
+            return None
+        return size
+
+    @contextlib.contextmanager
+    def _tracking_provisioned_capacity(self, volume: objects.Volume):
+        """Apply the changes made to the files of a volume to the total.
+
+        The files are measured before and after the block, so the tracked
+        provisioned capacity changes by what walking the shares would count.
+        """
+        if (self._provisioned_bytes is None and
+                self._provisioned_refresh_deltas is None):
+            yield
+            return
+
+        size_before = self._get_volume_files_bytes(volume)
+        yield
+        size_after = self._get_volume_files_bytes(volume)
+        if size_before is None or size_after is None:
+            return
+        if self._provisioned_bytes is not None:
+            self._provisioned_bytes += size_after - size_before
+        if self._provisioned_refresh_deltas is not None:
+            self._provisioned_refresh_deltas.append(size_after - size_before)
+
     def _get_provisioned_capacity(self) -> float:
         """Returns the provisioned capacity.
 
         Get the sum of sizes of volumes, snapshots and any other
         files on the mountpoint.
+
+        Walking the shares is slow when they hold many files, so unless
+        nas_provisioned_capacity_refresh_interval is 0 this is only done the
+        first time, then periodically in the background.  In between, the
+        changes made by this service are applied to the last result.
         """
-        provisioned_size = 0.0
-        for share in self.shares.keys():
-            mount_path = self._get_mount_point_for_share(share)
-            out, _ = self._execute('du', '--bytes', '-s', mount_path,
-                                   run_as_root=self._execute_as_root)
-            provisioned_size += int(out.split()[0])
-        return round(provisioned_size / units.Gi, 2)
+        interval = self.configuration.safe_get(
+            'nas_provisioned_capacity_refresh_interval')
+        if not interval:
+            return round(self._calculate_provisioned_bytes() / units.Gi, 2)
+
+        if self._provisioned_bytes is None:
+            self._walk_provisioned_capacity()
+            refresh_task = loopingcall.FixedIntervalLoopingCall(
+                self._refresh_provisioned_capacity)
+            refresh_task.start(interval=interval, initial_delay=interval)
+
+        return round(self._provisioned_bytes / units.Gi, 2)
 
     def _get_mount_point_base(self) -> Optional[str]:
         """Returns the mount point base for the remote fs.
@@ -294,7 +413,8 @@ class RemoteFSDriver(driver.BaseVD):
 
         LOG.info('casted to %s', volume.provider_location)
 
-        self._do_create_volume(volume)
+        with self._tracking_provisioned_capacity(volume):
+            self._do_create_volume(volume)
 
         return {'provider_location': volume.provider_location}
 
@@ -375,7 +495,8 @@ class RemoteFSDriver(driver.BaseVD):
 
         mounted_path = self.local_path(volume)
 
-        self._delete(mounted_path)
+        with self._tracking_provisioned_capacity(volume):
+            self._delete(mounted_path)
 
     def ensure_export(self,
                       ctx: context.RequestContext,
@@ -820,6 +941,20 @@ class RemoteFSSnapDriverBase(RemoteFSDriver):
     def _local_path_volume_info(self, volume: objects.Volume) -> str:
         return '%s%s' % (self.local_path(volume), '.info')
 
+    def _get_volume_file_paths(self, volume: objects.Volume) -> List[str]:
+        """Returns the paths of the files of a volume.
+
+        These are the volume file, its info file and the snapshot files
+        listed in it.
+        """
+        info_path = self._local_path_volume_info(volume)
+        snap_info = self._read_info_file(info_path, empty_if_missing=True)
+        volume_dir = self._local_volume_dir(volume)
+        paths = {self.local_path(volume), info_path}
+        paths.update(os.path.join(volume_dir, snap_file)
+                     for snap_file in snap_info.values())
+        return sorted(paths)
+
     def _read_file(self, filename: str) -> str:
         """This method is to make it easier to stub out code for testing.
 
@@ -1193,44 +1328,45 @@ class RemoteFSSnapDriverBase(RemoteFSDriver):
                              metadata=src_vref.metadata,
                              obj_context=volume.obj_context)
 
-        if (self._always_use_temp_snap_when_cloning or
-                self._snapshots_exist(src_vref)):
-            kwargs = {
-                'volume_id': src_vref.id,
-                'user_id': context.user_id,
-                'project_id': context.project_id,
-                'status': fields.SnapshotStatus.CREATING,
-                'progress': '0%',
-                'volume_size': src_vref.size,
-                'display_name': 'tmp-snap-%s' % volume.id,
-                'display_description': None,
-                'volume_type_id': src_vref.volume_type_id,
-                'encryption_key_id': src_vref.encryption_key_id,
-            }
-            temp_snapshot = objects.Snapshot(context=context,
-                                             **kwargs)
-            temp_snapshot.create()
-
-            self._create_snapshot(temp_snapshot)
-            try:
-                self._copy_volume_from_snapshot(
-                    temp_snapshot,
-                    volume_info,
-                    volume.size,
-                    src_encryption_key_id=src_vref.encryption_key_id,
-                    new_encryption_key_id=volume.encryption_key_id)
-
-                # remove temp snapshot after the cloning is done
-                temp_snapshot.status = fields.SnapshotStatus.DELETING
-                temp_snapshot.context = context.elevated()
-                temp_snapshot.save()
-            finally:
-                self._delete_snapshot(temp_snapshot)
-                temp_snapshot.destroy()
-        else:
-            self._copy_volume_image(self.local_path(src_vref),
-                                    self.local_path(volume_info))
-            self._extend_volume(volume_info, volume.size)
+        with self._tracking_provisioned_capacity(volume_info):
+            if (self._always_use_temp_snap_when_cloning or
+                    self._snapshots_exist(src_vref)):
+                kwargs = {
+                    'volume_id': src_vref.id,
+                    'user_id': context.user_id,
+                    'project_id': context.project_id,
+                    'status': fields.SnapshotStatus.CREATING,
+                    'progress': '0%',
+                    'volume_size': src_vref.size,
+                    'display_name': 'tmp-snap-%s' % volume.id,
+                    'display_description': None,
+                    'volume_type_id': src_vref.volume_type_id,
+                    'encryption_key_id': src_vref.encryption_key_id,
+                }
+                temp_snapshot = objects.Snapshot(context=context,
+                                                 **kwargs)
+                temp_snapshot.create()
+
+                self._create_snapshot(temp_snapshot)
+                try:
+                    self._copy_volume_from_snapshot(
+                        temp_snapshot,
+                        volume_info,
+                        volume.size,
+                        src_encryption_key_id=src_vref.encryption_key_id,
+                        new_encryption_key_id=volume.encryption_key_id)
+
+                    # remove temp snapshot after the cloning is done
+                    temp_snapshot.status = fields.SnapshotStatus.DELETING
+                    temp_snapshot.context = context.elevated()
+                    temp_snapshot.save()
+                finally:
+                    self._delete_snapshot(temp_snapshot)
+                    temp_snapshot.destroy()
+            else:
+                self._copy_volume_image(self.local_path(src_vref),
+                                        self.local_path(volume_info))
+                self._extend_volume(volume_info, volume.size)
 
         if src_vref.admin_metadata and 'format' in src_vref.admin_metadata:
             volume.admin_metadata['format'] = (
@@ -1261,6 +1397,7 @@ class RemoteFSSnapDriverBase(RemoteFSDriver):
         del (snap_info[snapshot.id])
         self._write_info_file(info_path, snap_info)
 
+    @tracks_provisioned_capacity
     def _delete_snapshot(self, snapshot: objects.Snapshot) -> None:
         """Delete a snapshot.
 
@@ -1459,13 +1596,14 @@ class RemoteFSSnapDriverBase(RemoteFSDriver):
 
         volume.provider_location = self._find_share(volume)
 
-        self._do_create_volume(volume)
+        with self._tracking_provisioned_capacity(volume):
+            self._do_create_volume(volume)
 
-        self._copy_volume_from_snapshot(snapshot,
-                                        volume,
-                                        volume.size,
-                                        snapshot.volume.encryption_key_id,
-                                        volume.encryption_key_id)
+            self._copy_volume_from_snapshot(snapshot,
+                                            volume,
+                                            volume.size,
+                                            snapshot.volume.encryption_key_id,
+                                            volume.encryption_key_id)
 
         return {'provider_location': volume.provider_location}
 
@@ -1587,6 +1725,7 @@ class RemoteFSSnapDriverBase(RemoteFSDriver):
                        new_snap_path]
             self._execute(*command, run_as_root=self._execute_as_root)
 
+    @tracks_provisioned_capacity
     def _create_snapshot(self, snapshot: objects.Snapshot) -> None:
         """Create a snapshot.
 
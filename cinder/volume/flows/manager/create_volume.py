@@ -847,6 +847,8 @@ class CreateVolumeFromSpecTask(flow_utils.CinderTask):
                     volume,
                     cache_entry['volume_id']
                 )
+                self.image_volume_cache.record_hit(internal_context,
+                                                   cache_entry)
                 return model_update, True
         except exception.SnapshotLimitReached:
             # If this exception occurred when cloning the image-volume,
@@ -861,7 +863,6 @@ class CreateVolumeFromSpecTask(flow_utils.CinderTask):
                         'clone. Image will be downloaded from Glance.')
         return None, False
 
-    @coordination.synchronized('{image_id}')
     def _prepare_image_cache_entry(self,
                                    context: cinder_context.RequestContext,
                                    volume: objects.Volume,
@@ -875,6 +876,38 @@ class CreateVolumeFromSpecTask(flow_utils.CinderTask):
         if not internal_context:
             return None, False
 
+        model_update, cloned, warming_entry = (
+            self._prepare_image_cache_entry_locked(context,
+                                                   internal_context,
+                                                   volume,
+                                                   image_location,
+                                                   image_id,
+                                                   image_meta,
+                                                   image_service))
+
+        # If another request is already creating the cache entry, which can
+        # happen when it is not holding the same lock as us, wait for it
+        # without holding the lock and let
+        # _create_from_image_cache_or_download() clone it.
+        if warming_entry:
+            LOG.debug('Waiting for cache entry for image = '
+                      '%(image_id)s on host %(host)s.',
+                      {'image_id': image_id, 'host': volume.host})
+            self.image_volume_cache.wait_for_warming_entry(internal_context,
+                                                           warming_entry)
+        return model_update, cloned
+
+    @coordination.synchronized('{image_id}')
+    def _prepare_image_cache_entry_locked(
+            self,
+            context: cinder_context.RequestContext,
+            internal_context: cinder_context.RequestContext,
+            volume: objects.Volume,
+            image_location: str,
+            image_id: str,
+            image_meta: dict[str, Any],
+            image_service) -> tuple[Optional[dict], bool, Optional[dict]]:
+        assert self.image_volume_cache is not None
         cache_entry = self.image_volume_cache.get_entry(internal_context,
                                                         volume,
                                                         image_id,
@@ -888,11 +921,18 @@ class CreateVolumeFromSpecTask(flow_utils.CinderTask):
             LOG.debug('Found cache entry for image = '
                       '%(image_id)s on host %(host)s.',
                       {'image_id': image_id, 'host': volume.host})
-            return None, False
-        else:
-            LOG.debug('Preparing cache entry for image = '
-                      '%(image_id)s on host %(host)s.',
-                      {'image_id': image_id, 'host': volume.host})
+            return None, False, None
+
+        warming_entry = self.image_volume_cache.get_warming_entry(
+            internal_context, volume, image_id)
+        if warming_entry:
+            return None, False, warming_entry
+
+        LOG.debug('Preparing cache entry for image = '
+                  '%(image_id)s on host %(host)s.',
+                  {'image_id': image_id, 'host': volume.host})
+        with self.image_volume_cache.warming(internal_context, volume,
+                                             image_id, image_meta):
             model_update = self._create_from_image_cache_or_download(
                 context,
                 volume,
@@ -901,7 +941,7 @@ class CreateVolumeFromSpecTask(flow_utils.CinderTask):
                 image_meta,
                 image_service,
                 update_cache=True)
-            return model_update, True
+        return model_update, True, None
 
     def _create_from_image_cache_or_download(
             self,
@@ -977,32 +1017,15 @@ class CreateVolumeFromSpecTask(flow_utils.CinderTask):
         try:
             if not cloned:
                 try:
-                    with image_utils.TemporaryImages.fetch(
-                            image_service, context, image_id,
-                            backend_name) as tmp_image:
+                    if (not should_create_cache_entry and
+                            image_utils.can_stream_image(image_meta)):
+                        # The image is inspected and checked against the
+                        # volume size while it is streamed to the volume, so
+                        # there is no need to download it beforehand.
                         if CONF.verify_glance_signatures != 'disabled':
-                            # Verify image signature via reading content from
-                            # temp image, and store the verification flag if
-                            # required.
-                            verified = \
-                                image_utils.verify_glance_image_signature(
-                                    context, image_service,
-                                    image_id, tmp_image)
                             self.db.volume_glance_metadata_bulk_create(
                                 context, volume.id,
-                                {'signature_verified': verified})
-                        # Try to create the volume as the minimal size,
-                        # then we can extend once the image has been
-                        # downloaded.
-                        data = image_utils.qemu_img_info(tmp_image)
-
-                        virtual_size = image_utils.check_virtual_size(
-                            data.virtual_size, volume.size, image_id)
-
-                        if should_create_cache_entry:
-                            if virtual_size and virtual_size != original_size:
-                                volume.size = virtual_size
-                                volume.save()
+                                {'signature_verified': False})
                         model_update = self._create_from_image_download(
                             context,
                             volume,
@@ -1010,6 +1033,41 @@ class CreateVolumeFromSpecTask(flow_utils.CinderTask):
                             image_meta,
                             image_service
                         )
+                    else:
+                        with image_utils.TemporaryImages.fetch(
+                                image_service, context, image_id,
+                                backend_name) as tmp_image:
+                            if CONF.verify_glance_signatures != 'disabled':
+                                # Verify image signature via reading content
+                                # from temp image, and store the verification
+                                # flag if required.
+                                verified = \
+                                    image_utils.verify_fetched_image_signature(
+                                        context, image_service,
+                                        image_id, tmp_image)
+                                self.db.volume_glance_metadata_bulk_create(
+                                    context, volume.id,
+                                    {'signature_verified': verified})
+                            # Try to create the volume as the minimal size,
+                            # then we can extend once the image has been
+                            # downloaded.
+                            data = image_utils.qemu_img_info(tmp_image)
+
+                            virtual_size = image_utils.check_virtual_size(
+                                data.virtual_size, volume.size, image_id)
+
+                            if should_create_cache_entry:
+                                if (virtual_size and
+                                        virtual_size != original_size):
+                                    volume.size = virtual_size
+                                    volume.save()
+                            model_update = self._create_from_image_download(
+                                context,
+                                volume,
+                                image_location,
+                                image_meta,
+                                image_service
+                            )
                 except exception.ImageTooBig as e:
                     with excutils.save_and_reraise_exception():
                         self.message.create(
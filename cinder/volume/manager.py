@@ -36,6 +36,7 @@ intact.
 """
 
 import functools
+import math
 import time
 import typing
 from typing import Any, Optional, Union
@@ -349,13 +350,19 @@ class VolumeManager(manager.CleanableManager,
                 'image_volume_cache_max_size_gb')
             max_cache_entries = self.driver.configuration.safe_get(
                 'image_volume_cache_max_count')
+            warming_timeout = self.driver.configuration.safe_get(
+                'image_volume_cache_warming_timeout')
+            eviction_policy = self.driver.configuration.safe_get(
+                'image_volume_cache_eviction_policy')
 
             self.image_volume_cache = image_cache.ImageVolumeCache(
                 self.db,
                 cinder_volume.API(),
                 max_cache_size,
                 max_cache_entries,
-                self.driver.capabilities.get('clone_across_pools', False)
+                self.driver.capabilities.get('clone_across_pools', False),
+                warming_timeout or 0,
+                eviction_policy or 'lru'
             )
             LOG.info('Image-volume cache enabled for host %(host)s.',
                      {'host': self.host})
@@ -587,21 +594,32 @@ class VolumeManager(manager.CleanableManager,
             # FIXME volume count for exporting is wrong
 
             try:
+                volumes_to_export = []
                 for volume in volumes:
                     # Account for volumes that have been provisioned already.
                     if volume['host']:
                         # calculate allocated capacity for driver
                         self._count_allocated_capacity(ctxt, volume)
 
-                        try:
-                            if volume['status'] in ['in-use']:
-                                self.driver.ensure_export(ctxt, volume)
-                        except Exception:
-                            LOG.exception("Failed to re-export volume, "
-                                          "setting to ERROR.",
-                                          resource=volume)
-                            volume.conditional_update({'status': 'error'},
-                                                      {'status': 'in-use'})
+                        if volume['status'] in ['in-use']:
+                            volumes_to_export.append(volume)
+
+                # Drivers can recreate all the exports at once, which is a
+                # lot faster for some targets than one volume at a time.
+                try:
+                    failed = self.driver.ensure_exports(ctxt,
+                                                        volumes_to_export)
+                except Exception as exc:
+                    LOG.exception("Failed to re-export volumes.")
+                    failed = {volume.id: exc for volume in volumes_to_export}
+
+                for volume in volumes_to_export:
+                    if volume.id in failed:
+                        LOG.error("Failed to re-export volume, setting to "
+                                  "ERROR: %s", failed[volume.id],
+                                  resource=volume)
+                        volume.conditional_update({'status': 'error'},
+                                                  {'status': 'in-use'})
                 # All other cleanups are processed by parent class -
                 # CleanableManager
 
@@ -643,6 +661,9 @@ class VolumeManager(manager.CleanableManager,
         super(VolumeManager, self).init_host(added_to_cluster=added_to_cluster,
                                              **kwargs)
 
+    def cleanup_host(self) -> None:
+        self.driver.do_teardown()
+
     def init_host_with_rpc(self) -> None:
         LOG.info("Initializing RPC dependent components of volume "
                  "driver %(driver_name)s (%(version)s)",
@@ -1621,6 +1642,87 @@ class VolumeManager(manager.CleanableManager,
             if image_volume:
                 self.delete_volume(ctx, image_volume)
 
+    def warm_image_cache(self,
+                         ctxt: context.RequestContext,
+                         host: str,
+                         image_id: str) -> None:
+        """Create the image-volume cache entry for an image ahead of time.
+
+        A temporary volume is created from the image in the internal tenant,
+        which creates the cache entry for the pool given in host as it would
+        for any other volume, and deleted afterwards.
+        """
+        if not self.image_volume_cache:
+            LOG.warning('Image-volume cache is disabled for %(host)s, not '
+                        'warming it with image %(image_id)s.',
+                        {'host': self.host, 'image_id': image_id})
+            return
+
+        internal_ctx = context.get_internal_tenant_context()
+        if not internal_ctx:
+            LOG.warning('Unable to get Cinder internal context, not warming '
+                        'the image-volume cache with image %(image_id)s.',
+                        {'image_id': image_id})
+            return
+
+        image_service, image_id = glance.get_remote_image_service(ctxt,
+                                                                  image_id)
+        image_meta = image_service.show(ctxt, image_id)
+
+        pool = (volume_utils.extract_host(host, 'pool') or
+                self.driver.configuration.safe_get('volume_backend_name') or
+                volume_utils.extract_host(self.host, 'pool', True))
+        image_size = image_meta.get('virtual_size') or image_meta['size']
+        size = max(int(math.ceil(float(image_size) / units.Gi)),
+                   image_meta.get('min_disk') or 0, 1)
+        volume_type = volume_types.get_default_volume_type(internal_ctx)
+
+        seed_volume = objects.Volume(
+            context=internal_ctx,
+            user_id=internal_ctx.user_id,
+            project_id=internal_ctx.project_id,
+            host=volume_utils.append_host(self.host, pool),
+            cluster_name=self.cluster,
+            availability_zone=self.availability_zone,
+            volume_type_id=volume_type['id'],
+            size=size,
+            status='creating',
+            attach_status=fields.VolumeAttachStatus.DETACHED,
+            display_name='image-%s' % image_id)
+
+        if self.image_volume_cache.get_entry(internal_ctx, seed_volume,
+                                             image_id, image_meta):
+            LOG.info('Image-volume cache for %(host)s already contains '
+                     'image %(image_id)s.',
+                     {'host': seed_volume.host, 'image_id': image_id})
+            return
+
+        reserve_opts: dict = {'volumes': 1, 'gigabytes': size}
+        QUOTAS.add_volume_type_opts(internal_ctx, reserve_opts,
+                                    volume_type['id'])
+        reservations = QUOTAS.reserve(internal_ctx, **reserve_opts)
+        try:
+            seed_volume.create()
+        except Exception:
+            with excutils.save_and_reraise_exception():
+                QUOTAS.rollback(internal_ctx, reservations)
+        QUOTAS.commit(internal_ctx, reservations,
+                      project_id=internal_ctx.project_id)
+
+        LOG.info('Warming image-volume cache for %(host)s with image '
+                 '%(image_id)s.',
+                 {'host': seed_volume.host, 'image_id': image_id})
+        try:
+            # Use the requester's context so that the image is downloaded
+            # with their access rights rather than the internal tenant's.
+            self.create_volume(ctxt, seed_volume,
+                               request_spec=objects.RequestSpec(
+                                   image_id=image_id),
+                               allow_reschedule=False)
+        finally:
+            seed_volume.refresh()
+            self.delete_volume(internal_ctx, seed_volume)
+
     def _clone_image_volume(self,
                             ctx: context.RequestContext,
                             volume,
@@ -139,9 +139,10 @@ class VolumeAPI(rpc.RPCAPI):
         3.17 - Make get_backup_device a cast (async)
         3.18 - Add reimage method
         3.19 - Add extend_volume_completion method
+        3.20 - Add warm_image_cache method
     """
 
-    RPC_API_VERSION = '3.19'
+    RPC_API_VERSION = '3.20'
     RPC_DEFAULT_VERSION = '3.0'
     TOPIC = constants.VOLUME_TOPIC
     BINARY = constants.VOLUME_BINARY
@@ -547,3 +548,8 @@ class VolumeAPI(rpc.RPCAPI):
     def reimage(self, ctxt, volume, image_meta):
         cctxt = self._get_cctxt(volume.service_topic_queue, version='3.18')
         cctxt.cast(ctxt, 'reimage', volume=volume, image_meta=image_meta)
+
+    @rpc.assert_min_rpc_version('3.20')
+    def warm_image_cache(self, ctxt, host, image_id):
+        cctxt = self._get_cctxt(host, version='3.20')
+        cctxt.cast(ctxt, 'warm_image_cache', host=host, image_id=image_id)
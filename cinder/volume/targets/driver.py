@@ -48,6 +48,24 @@ class Target(object, metaclass=abc.ABCMeta):
         """Synchronously recreates an export for a volume."""
         pass
 
+    def teardown(self):
+        """Completes pending work of the target before the service stops."""
+        pass
+
+    def ensure_exports(self, context, volumes, volume_paths):
+        """Synchronously recreates the exports of several volumes.
+
+        :returns: dict with the ids of the volumes whose export could not be
+                  recreated and the exception raised for each of them
+        """
+        failed = {}
+        for volume, volume_path in zip(volumes, volume_paths):
+            try:
+                self.ensure_export(context, volume, volume_path)
+            except Exception as exc:
+                failed[volume['id']] = exc
+        return failed
+
     @abc.abstractmethod
     def create_export(self, context, volume, volume_path):
         """Exports a Target/Volume.
@@ -10,10 +10,12 @@
 #    License for the specific language governing permissions and limitations
 #    under the License.
 
+import eventlet
 from oslo_concurrency import processutils as putils
 from oslo_log import log as logging
 
 from cinder import exception
+from cinder.privsep.targets import lio as lio_privsep
 from cinder import utils
 from cinder.volume.targets import iscsi
 
@@ -28,6 +30,7 @@ class LioAdm(iscsi.ISCSITarget):
 
         # FIXME(jdg): modify executor to use the cinder-rtstool
         self.iscsi_target_prefix = self.configuration.safe_get('target_prefix')
+        self._save_thread = None
 
         self._verify_rtstool()
 
@@ -49,22 +52,20 @@ class LioAdm(iscsi.ISCSITarget):
         """
         return utils.execute(*args, **kwargs)
 
+    @staticmethod
+    @utils.synchronized('lioadm', external=True)
+    def _privsep_execute(func, *args, **kwargs):
+        """Locked privsep call, for the same reason as _execute."""
+        return func(*args, **kwargs)
+
     def _get_target(self, iqn):
-        (out, err) = self._execute('cinder-rtstool',
-                                   'get-targets',
-                                   run_as_root=True)
-        lines = out.split('\n')
-        for line in lines:
-            if iqn in line:
-                return line
+        if iqn in self._get_targets():
+            return iqn
 
         return None
 
     def _get_targets(self):
-        (out, err) = self._execute('cinder-rtstool',
-                                   'get-targets',
-                                   run_as_root=True)
-        return out
+        return self._privsep_execute(lio_privsep.get_targets)
 
     def _get_iscsi_target(self, context, vol_id):
         return 0
@@ -75,23 +76,50 @@ class LioAdm(iscsi.ISCSITarget):
         return iscsi_target, lun
 
     def _persist_configuration(self, vol_id):
+        delay = self.configuration.safe_get('lio_save_config_delay')
+        if not delay:
+            self._save_configuration()
+            return
+
+        # Saving writes the configuration of all the targets, so changes
+        # made while a save is pending are saved together with it.
+        if self._save_thread is None:
+            LOG.debug("Saving iscsi LIO configuration in %(delay)s seconds "
+                      "after modifying volume id: %(vol_id)s.",
+                      {'delay': delay, 'vol_id': vol_id})
+            self._save_thread = eventlet.spawn_after(
+                delay, self._delayed_save_configuration)
+
+    def _delayed_save_configuration(self):
+        # Changes made from now on need a new save
+        self._save_thread = None
+        self._save_configuration()
+
+    def teardown(self):
+        # Save the pending changes now, or they would be missing from the
+        # configuration restored when the host reboots.
+        save_thread, self._save_thread = self._save_thread, None
+        if save_thread is not None:
+            save_thread.cancel()
+            LOG.debug("Saving pending iscsi LIO configuration changes.")
+            self._save_configuration()
+
+    def _save_configuration(self):
         try:
-            self._execute('cinder-rtstool', 'save', run_as_root=True)
+            self._privsep_execute(lio_privsep.save_to_file)
 
         # On persistence failure we don't raise an exception, as target has
         # been successfully created.
-        except putils.ProcessExecutionError:
-            LOG.warning("Failed to save iscsi LIO configuration when "
-                        "modifying volume id: %(vol_id)s.",
-                        {'vol_id': vol_id})
+        except Exception:
+            LOG.warning("Failed to save iscsi LIO configuration.")
 
     def _restore_configuration(self):
         try:
-            self._execute('cinder-rtstool', 'restore', run_as_root=True)
+            self._privsep_execute(lio_privsep.restore_from_file)
 
         # On persistence failure we don't raise an exception, as target has
         # been successfully created.
-        except putils.ProcessExecutionError:
+        except Exception:
             LOG.warning("Failed to restore iscsi LIO configuration.")
 
     def create_iscsi_target(self, name, tid, lun, path,
@@ -217,3 +245,64 @@ class LioAdm(iscsi.ISCSITarget):
             return
 
         LOG.info("Skipping ensure_export. Found existing iSCSI target.")
+
+    def ensure_exports(self, context, volumes, volume_paths):
+        """Recreate the exports of several logical volumes at once.
+
+        As in ensure_export the saved configuration is restored when there
+        are no targets at all, and then the targets that are still missing
+        are created with a single privsep call instead of one cinder-rtstool
+        run per volume.
+        """
+        if not volumes:
+            return {}
+
+        targets = set(self._get_targets())
+        if not targets:
+            LOG.info('Restoring iSCSI targets from configuration file')
+            self._restore_configuration()
+            targets = set(self._get_targets())
+
+        portals_config = self._get_portals_config()
+        missing = {}
+        for volume, volume_path in zip(volumes, volume_paths):
+            name = '%s%s' % (self.iscsi_target_prefix, volume['name'])
+            if name in targets:
+                continue
+
+            userid, password = '', ''
+            if volume['provider_auth']:
+                userid, password = volume['provider_auth'].split(' ', 3)[1:]
+            initiators = [attachment.connector['initiator']
+                          for attachment in volume.volume_attachment
+                          if attachment.connector and
+                          attachment.connector.get('initiator')]
+            missing[name] = (volume,
+                             {'backing_device': volume_path,
+                              'name': name,
+                              'userid': userid,
+                              'password': password,
+                              'iser_enabled': str(self.iscsi_protocol ==
+                                                  'iser'),
+                              'initiator_iqns': ','.join(initiators),
+                              **portals_config})
+
+        if not missing:
+            LOG.info("Skipping ensure_exports. Found existing iSCSI targets.")
+            return {}
+
+        LOG.info('Creating %d missing iSCSI targets', len(missing))
+        failed_targets = self._privsep_execute(
+            lio_privsep.create_targets,
+            [target_args for __, target_args in missing.values()])
+        self._save_configuration()
+
+        failed = {}
+        for name, reason in failed_targets.items():
+            volume = missing[name][0]
+            LOG.error("Failed to create iscsi target for volume "
+                      "id:%(vol_id)s: %(reason)s",
+                      {'vol_id': volume['id'], 'reason': reason})
+            failed[volume['id']] = exception.ISCSITargetCreateFailed(
+                volume_id=volume['id'])
+        return failed
@@ -67,6 +67,7 @@ def create(context: context.RequestContext,
         LOG.exception('DB error:')
         raise exception.VolumeTypeCreateFailed(name=name,
                                                extra_specs=extra_specs)
+    QUOTAS.invalidate_resources()
     return type_ref
 
 
@@ -144,7 +145,9 @@ def destroy(context: context.RequestContext, id: str) -> dict[str, Any]:
         raise exception.VolumeTypeDefaultDeletionError(volume_type_id=id)
 
     elevated = context if context.is_admin else context.elevated()
-    return db.volume_type_destroy(elevated, id)
+    result = db.volume_type_destroy(elevated, id)
+    QUOTAS.invalidate_resources()
+    return result
 
 
 def get_all_types(context: context.RequestContext,
@@ -16,6 +16,7 @@
 
 import abc
 import ast
+import errno
 import functools
 import inspect
 import json
@@ -27,6 +28,7 @@ from os import urandom
 from random import shuffle
 import re
 import socket
+import stat
 import tempfile
 import time
 import types
@@ -528,27 +530,159 @@ def _open_volume_with_path(path: str, mode: str) -> IO[Any]:
         raise
 
 
-def _transfer_data(src: IO, dest: IO,
-                   length: int, chunk_size: int) -> None:
-    """Transfer data between files (Python IO objects)."""
+# Errors meaning a kernel copy method is not available for the given pair of
+# file descriptors, so the next method has to be used.
+_NATIVE_COPY_UNSUPPORTED = (errno.EINVAL, errno.ENOSYS, errno.EXDEV,
+                            errno.EOPNOTSUPP, errno.EBADF, errno.ESPIPE)
+
+
+def _get_fileno(handle: IO) -> Optional[int]:
+    """Return the file descriptor of a file or block device handle.
+
+    Returns None for handles without a file descriptor and for the ones of
+    pipes, sockets and character devices, which can't be seeked.
+    """
+    try:
+        fileno = handle.fileno()
+        if not isinstance(fileno, int):
+            return None
+        mode = os.fstat(fileno).st_mode
+    except (AttributeError, OSError, ValueError):
+        return None
+    if stat.S_ISREG(mode) or stat.S_ISBLK(mode):
+        return fileno
+    return None
+
+
+def _get_data_ranges(fd: int, start: int, end: int) -> list:
+    """Return the (start, end) ranges of fd holding data, skipping holes.
+
+    Uses SEEK_DATA and SEEK_HOLE, so the whole range is returned when the
+    file system or device does not support them.
+    """
+    ranges = []
+    offset = start
+    try:
+        while offset < end:
+            try:
+                data = os.lseek(fd, offset, os.SEEK_DATA)
+            except OSError as exc:
+                # There is no more data after offset.
+                if exc.errno == errno.ENXIO:
+                    break
+                raise
+            if data >= end:
+                break
+            hole = min(os.lseek(fd, data, os.SEEK_HOLE), end)
+            ranges.append((data, hole))
+            offset = hole
+    except (AttributeError, OSError):
+        return [(start, end)]
+    return ranges
+
+
+def _copy_file_range(src_fd: int, dest_fd: int, src_offset: int,
+                     dest_offset: int, count: int) -> int:
+    return os.copy_file_range(src_fd, dest_fd, count, src_offset,
+                              dest_offset)
+
+
+def _sendfile(src_fd: int, dest_fd: int, src_offset: int, dest_offset: int,
+              count: int) -> int:
+    os.lseek(dest_fd, dest_offset, os.SEEK_SET)
+    return os.sendfile(dest_fd, src_fd, src_offset, count)
+
+
+def _transfer_data_native(src_fd: int, dest_fd: int, src_offset: int,
+                          dest_offset: int, length: int, chunk_size: int,
+                          sparse: bool = False) -> Optional[int]:
+    """Copy data between file descriptors without going through Python.
+
+    Tries copy_file_range and then sendfile, so the data is moved by the
+    kernel without being copied to user space. When sparse is True the holes
+    of the source are skipped, leaving the destination untouched there.
+
+    Returns the number of bytes copied, or None if the kernel can't copy
+    between these file descriptors and nothing has been copied.
+    """
+    src_size = os.lseek(src_fd, 0, os.SEEK_END)
+    end = min(src_offset + length, src_size)
+    if sparse:
+        ranges = _get_data_ranges(src_fd, src_offset, end)
+    else:
+        ranges = [(src_offset, end)]
+
+    methods = [_copy_file_range, _sendfile]
+    if not hasattr(os, 'copy_file_range'):
+        methods.pop(0)
+    copied_any = False
+    for start, stop in ranges:
+        offset = start
+        while offset < stop:
+            count = min(chunk_size, stop - offset)
+            try:
+                copied = tpool.execute(methods[0], src_fd, dest_fd, offset,
+                                       dest_offset + offset - src_offset,
+                                       count)
+            except OSError as exc:
+                if exc.errno not in _NATIVE_COPY_UNSUPPORTED:
+                    raise
+                LOG.debug('%(method)s is not supported for this copy: '
+                          '%(error)s', {'method': methods[0].__name__,
+                                        'error': exc})
+                methods.pop(0)
+                if not methods:
+                    if copied_any:
+                        raise
+                    return None
+                continue
+            if not copied:
+                # The source is shorter than it was when we started.
+                return offset - src_offset
+            copied_any = True
+            offset += copied
+            # yield to any other pending operations
+            eventlet.sleep(0)
+
+    # Holes at the end of the source must still extend a regular file.
+    if (sparse and stat.S_ISREG(os.fstat(dest_fd).st_mode) and
+            os.fstat(dest_fd).st_size < dest_offset + end - src_offset):
+        os.ftruncate(dest_fd, dest_offset + end - src_offset)
+    return end - src_offset
+
+
+def _transfer_data_buffered(src: IO, dest: IO, length: int,
+                            chunk_size: int) -> int:
+    """Transfer data between files (Python IO objects) through a buffer."""
 
     chunks = int(math.ceil(length / chunk_size))
     remaining_length = length
+    transferred = 0
 
     LOG.debug("%(chunks)s chunks of %(bytes)s bytes to be transferred.",
               {'chunks': chunks, 'bytes': chunk_size})
 
+    # Reuse the same buffer for all the chunks when the source supports it.
+    readinto = getattr(src, 'readinto', None)
+    buf = memoryview(bytearray(min(chunk_size, length))) if readinto else None
+
     for chunk in range(0, chunks):
         before = time.time()
-        data = tpool.execute(src.read, min(chunk_size, remaining_length))
+        size = min(chunk_size, remaining_length)
+        if buf is not None:
+            read = tpool.execute(readinto, buf[:size])
+            data = buf[:read or 0]
+        else:
+            data = tpool.execute(src.read, size)
 
         # If we have reached end of source, discard any extraneous bytes from
         # destination volume if trim is enabled and stop writing.
-        if data == b'':
+        if len(data) == 0:
             break
 
         tpool.execute(dest.write, data)
         remaining_length -= len(data)
+        transferred += len(data)
         delta = (time.time() - before)
         rate = (chunk_size / delta) / units.Ki
         LOG.debug("Transferred chunk %(chunk)s of %(chunks)s (%(rate)dK/s).",
@@ -557,12 +691,48 @@ def _transfer_data(src: IO, dest: IO,
         # yield to any other pending operations
         eventlet.sleep(0)
 
+    return transferred
+
+
+def _transfer_data(src: IO, dest: IO,
+                   length: int, chunk_size: int,
+                   sparse: bool = False) -> int:
+    """Transfer data between files (Python IO objects).
+
+    When both handles are regular files or block devices the kernel copies
+    the data directly, skipping the holes of the source if sparse is True.
+    Other handles, like pipes or the ones returned by some connectors, are
+    copied through a reused buffer.
+
+    Returns the number of bytes transferred.
+    """
+    src_fd = _get_fileno(src)
+    dest_fd = _get_fileno(dest)
+    transferred = None
+    if src_fd is not None and dest_fd is not None:
+        # Work with the logical positions of the handles, which may differ
+        # from the ones of their file descriptors if they are buffered.
+        src_offset = src.tell()
+        tpool.execute(dest.flush)
+        dest_offset = dest.tell()
+        transferred = _transfer_data_native(src_fd, dest_fd, src_offset,
+                                            dest_offset, length, chunk_size,
+                                            sparse=sparse)
+        if transferred is not None:
+            src.seek(src_offset + transferred)
+            dest.seek(dest_offset + transferred)
+
+    if transferred is None:
+        transferred = _transfer_data_buffered(src, dest, length, chunk_size)
+
     tpool.execute(dest.flush)
+    return transferred
 
 
 def _copy_volume_with_file(src: Union[str, IO],
                            dest: Union[str, IO],
-                           size_in_m: int) -> None:
+                           size_in_m: int,
+                           sparse: bool = False) -> None:
     src_handle = src
     if isinstance(src, str):
         src_handle = _open_volume_with_path(src, 'rb')
@@ -585,19 +755,22 @@ def _copy_volume_with_file(src: Union[str, IO],
 
     start_time = timeutils.utcnow()
 
-    _transfer_data(src_handle, dest_handle, size_in_m * units.Mi, units.Mi * 4)
+    transferred = _transfer_data(src_handle, dest_handle,
+                                 size_in_m * units.Mi, units.Mi * 4,
+                                 sparse=sparse)
 
-    duration = max(1, timeutils.delta_seconds(start_time, timeutils.utcnow()))
+    duration = timeutils.delta_seconds(start_time, timeutils.utcnow())
 
     if isinstance(src, str):
         src_handle.close()
     if isinstance(dest, str):
         dest_handle.close()
 
-    mbps = (size_in_m / duration)
-    LOG.info("Volume copy completed (%(size_in_m).2f MB at "
-             "%(mbps).2f MB/s).",
-             {'size_in_m': size_in_m, 'mbps': mbps})
+    mbps = (transferred / units.Mi) / max(duration, 0.001)
+    LOG.info("Volume copy completed (%(size_in_m).2f MB in %(duration).2f "
+             "sec, %(mbps).2f MB/s).",
+             {'size_in_m': transferred / units.Mi, 'duration': duration,
+              'mbps': mbps})
 
 
 def copy_volume(src: Union[str, BinaryIO],
@@ -617,6 +790,8 @@ def copy_volume(src: Union[str, BinaryIO],
     of type RawIOBase or any derivative that supports file operations such as
     read and write.  In this case, the handles are treated as file handles
     instead of file paths and, at present moment, throttling is unavailable.
+    Handles backed by file descriptors are copied by the kernel, and with
+    sparse=True the holes of the source are not written to the destination.
     """
 
     if (isinstance(src, str) and
@@ -629,7 +804,7 @@ def copy_volume(src: Union[str, BinaryIO],
                                    execute=execute, ionice=ionice,
                                    sparse=sparse)
     else:
-        _copy_volume_with_file(src, dest, size_in_m)
+        _copy_volume_with_file(src, dest, size_in_m, sparse=sparse)
 
 
 def clear_volume(volume_size: int,
@@ -27,6 +27,8 @@ add_connection and delete_connection interfaces.
 :zone_name_prefix: Used by: class: 'FCZoneDriver'. Defaults to 'openstack'
 """
 
+import contextlib
+import functools
 import string
 
 from oslo_concurrency import lockutils
@@ -43,6 +45,7 @@ from cinder.zonemanager.drivers.brocade import exception as b_exception
 from cinder.zonemanager.drivers.brocade import fc_zone_constants
 from cinder.zonemanager.drivers import driver_utils
 from cinder.zonemanager.drivers import fc_zone_driver
+from cinder.zonemanager.drivers import zone_batcher
 from cinder.zonemanager import utils
 
 LOG = logging.getLogger(__name__)
@@ -75,9 +78,10 @@ class BrcdFCZoneDriver(fc_zone_driver.FCZoneDriver):
         1.4 - Adds support to zone in Virtual Fabrics
         1.5 - Initiator zoning updates through zoneadd/zoneremove
         1.6 - Add REST connector
+        1.7 - Coalesce the zoning changes of concurrent connections
     """
 
-    VERSION = "1.6"
+    VERSION = "1.7"
 
     # ThirdPartySystems wiki page
     CI_WIKI_NAME = "Brocade_OpenStack_CI"
@@ -88,6 +92,7 @@ class BrcdFCZoneDriver(fc_zone_driver.FCZoneDriver):
     def __init__(self, **kwargs):
         super(BrcdFCZoneDriver, self).__init__(**kwargs)
         self.sb_conn_map = {}
+        self.zone_batchers = {}
         self.configuration = kwargs.get('configuration', None)
         if self.configuration:
             self.configuration.append_config_values(brcd_opts)
@@ -120,7 +125,6 @@ class BrcdFCZoneDriver(fc_zone_driver.FCZoneDriver):
     def get_driver_options():
         return fabric_opts.brcd_zone_opts + brcd_opts
 
-    @lockutils.synchronized('brcd', 'fcfabric-', True)
     def add_connection(self, fabric, initiator_target_map, host_name=None,
                        storage_system=None):
         """Concrete implementation of add_connection.
@@ -131,6 +135,9 @@ class BrcdFCZoneDriver(fc_zone_driver.FCZoneDriver):
         flag set in cinder.conf returned by volume driver after attach
         operation.
 
+        The zoning changes of connections added or deleted concurrently on
+        the same fabric are pushed together, see ZoneBatcher.
+
         :param fabric: Fabric name from cinder.conf file
         :param initiator_target_map: Mapping of initiator to list of targets
         """
@@ -138,34 +145,91 @@ class BrcdFCZoneDriver(fc_zone_driver.FCZoneDriver):
                  "%(fabric)s for I-T map: %(i_t_map)s",
                  {'fabric': fabric,
                   'i_t_map': initiator_target_map})
-        zoning_policy = self.configuration.zoning_policy
-        zoning_policy_fab = self.fabric_configs[fabric].safe_get(
-            'zoning_policy')
-        zone_name_prefix = self.fabric_configs[fabric].safe_get(
-            'zone_name_prefix')
-        zone_activate = self.fabric_configs[fabric].safe_get(
-            'zone_activate')
-        if zoning_policy_fab:
-            zoning_policy = zoning_policy_fab
-        LOG.info("Zoning policy for Fabric %(policy)s",
-                 {'policy': zoning_policy})
+        zoning_policy = self._get_zoning_policy(fabric)
         if (zoning_policy != 'initiator'
                 and zoning_policy != 'initiator-target'):
             LOG.info("Zoning policy is not valid, "
                      "no zoning will be performed.")
             return
 
-        client = self._get_southbound_client(fabric)
-        cfgmap_from_fabric = self._get_active_zone_set(client)
+        self._get_zone_batcher(fabric).submit(
+            zone_batcher.ADD, zoning_policy, initiator_target_map,
+            host_name, storage_system)
 
-        zone_names = []
-        if cfgmap_from_fabric.get('zones'):
-            zone_names = cfgmap_from_fabric['zones'].keys()
-        # based on zoning policy, create zone member list and
-        # push changes to fabric.
+    def delete_connection(self, fabric, initiator_target_map, host_name=None,
+                          storage_system=None):
+        """Concrete implementation of delete_connection.
+
+        Based on zoning policy and state of each I-T pair, list of zones
+        are created for deletion. The zones are either updated deleted based
+        on the policy and attach/detach state of each I-T pair.
+
+        :param fabric: Fabric name from cinder.conf file
+        :param initiator_target_map: Mapping of initiator to list of targets
+        """
+        LOG.info("BrcdFCZoneDriver - Delete connection for fabric "
+                 "%(fabric)s for I-T map: %(i_t_map)s",
+                 {'fabric': fabric,
+                  'i_t_map': initiator_target_map})
+        zoning_policy = self._get_zoning_policy(fabric)
+        self._get_zone_batcher(fabric).submit(
+            zone_batcher.DELETE, zoning_policy, initiator_target_map,
+            host_name, storage_system)
+
+    def _get_zoning_policy(self, fabric):
+        zoning_policy = self.configuration.zoning_policy
+        zoning_policy_fab = self.fabric_configs[fabric].safe_get(
+            'zoning_policy')
+        if zoning_policy_fab:
+            zoning_policy = zoning_policy_fab
+        LOG.info("Zoning policy for fabric %(policy)s",
+                 {'policy': zoning_policy})
+        return zoning_policy
+
+    def _get_zone_batcher(self, fabric):
+        if fabric not in self.zone_batchers:
+            self.zone_batchers[fabric] = zone_batcher.ZoneBatcher(
+                self._get_active_zone_set,
+                functools.partial(self._plan_zone_changes, fabric),
+                functools.partial(self._apply_zone_changes, fabric),
+                window=self.configuration.safe_get('zoning_batch_window'),
+                session=functools.partial(self._zoning_session, fabric))
+        return self.zone_batchers[fabric]
+
+    @contextlib.contextmanager
+    def _zoning_session(self, fabric):
+        """Southbound client reading and changing the zones of a batch.
+
+        The zone set has to be read with the client pushing the changes,
+        as the HTTP client builds the zone configuration it posts from the
+        zone information it read.
+        """
+        with lockutils.lock('brcd', 'fcfabric-', True):
+            client = self._get_southbound_client(fabric)
+            try:
+                yield client
+            finally:
+                client.cleanup()
+
+    def _plan_zone_changes(self, fabric, zone_set, operation, zoning_policy,
+                           initiator_target_map, host_name, storage_system):
+        if operation == zone_batcher.ADD:
+            return self._plan_add_connection(
+                fabric, zone_set, zoning_policy, initiator_target_map,
+                host_name, storage_system)
+        return self._plan_delete_connection(
+            fabric, zone_set, zoning_policy, initiator_target_map,
+            host_name, storage_system)
+
+    def _plan_add_connection(self, fabric, zone_set, zoning_policy,
+                             initiator_target_map, host_name,
+                             storage_system):
+        zone_name_prefix = self.fabric_configs[fabric].safe_get(
+            'zone_name_prefix')
+        zones = zone_set['zones']
+        # based on zoning policy, create zone member list.
+        zone_map = {}
         for initiator_key in initiator_target_map.keys():
-            zone_map = {}
-            zone_update_map = {}
             initiator = initiator_key.lower()
             target_list = initiator_target_map[initiator_key]
             if zoning_policy == 'initiator-target':
@@ -180,8 +244,7 @@ class BrcdFCZoneDriver(fc_zone_driver.FCZoneDriver):
                         storage_system,
                         zone_name_prefix,
                         SUPPORTED_CHARS)
-                    if (len(cfgmap_from_fabric) == 0 or (
-                            zone_name not in zone_names)):
+                    if zone_name not in zones:
                         zone_map[zone_name] = zone_members
                     else:
                         # This is I-T zoning, skip if zone already exists.
@@ -202,94 +265,36 @@ class BrcdFCZoneDriver(fc_zone_driver.FCZoneDriver):
                     zone_name_prefix,
                     SUPPORTED_CHARS)
 
-                # If zone exists, then do a zoneadd to update
-                # the zone members in the existing zone.  Otherwise,
-                # do a zonecreate to create a new zone.
-                if len(zone_names) > 0 and (zone_name in zone_names):
-                    # Verify that the target WWNs are not already members
-                    # of the existing zone.  If so, remove them from the
-                    # list of members to add, otherwise error will be
-                    # returned from the switch.
-                    for t in target_list:
-                        if t in cfgmap_from_fabric['zones'][zone_name]:
-                            zone_members.remove(utils.get_formatted_wwn(t))
-                    if zone_members:
-                        zone_update_map[zone_name] = zone_members
+                # If zone exists, then add the new members to the existing
+                # zone, which is done with a zoneadd.  Otherwise, the zone
+                # is created with a zonecreate.
+                if zone_name in zones:
+                    # Members already in the zone must not be added again,
+                    # otherwise error will be returned from the switch.
+                    new_members = [x for x in zone_members
+                                   if x not in zones[zone_name]]
+                    if new_members:
+                        zone_map[zone_name] = zones[zone_name] + new_members
                 else:
                     zone_map[zone_name] = zone_members
 
-            LOG.info("Zone map to create: %(zonemap)s",
-                     {'zonemap': zone_map})
-            LOG.info("Zone map to update: %(zone_update_map)s",
-                     {'zone_update_map': zone_update_map})
+        LOG.info("Zone map to create or update: %(zonemap)s",
+                 {'zonemap': zone_map})
+        return zone_map
 
-            try:
-                if zone_map:
-                    client.add_zones(zone_map, zone_activate,
-                                     cfgmap_from_fabric)
-                    LOG.debug("Zones created successfully: %(zonemap)s",
-                              {'zonemap': zone_map})
-                if zone_update_map:
-                    client.update_zones(zone_update_map, zone_activate,
-                                        fc_zone_constants.ZONE_ADD,
-                                        cfgmap_from_fabric)
-                    LOG.debug("Zones updated successfully: %(updatemap)s",
-                              {'updatemap': zone_update_map})
-            except (b_exception.BrocadeZoningCliException,
-                    b_exception.BrocadeZoningHttpException,
-                    b_exception.BrocadeZoningRestException) as brocade_ex:
-                raise exception.FCZoneDriverException(brocade_ex)
-            except Exception:
-                msg = _("Failed to add or update zoning configuration.")
-                LOG.exception(msg)
-                raise exception.FCZoneDriverException(msg)
-            finally:
-                client.cleanup()
-
-    @lockutils.synchronized('brcd', 'fcfabric-', True)
-    def delete_connection(self, fabric, initiator_target_map, host_name=None,
-                          storage_system=None):
-        """Concrete implementation of delete_connection.
-
-        Based on zoning policy and state of each I-T pair, list of zones
-        are created for deletion. The zones are either updated deleted based
-        on the policy and attach/detach state of each I-T pair.
-
-        :param fabric: Fabric name from cinder.conf file
-        :param initiator_target_map: Mapping of initiator to list of targets
-        """
-        LOG.info("BrcdFCZoneDriver - Delete connection for fabric "
-                 "%(fabric)s for I-T map: %(i_t_map)s",
-                 {'fabric': fabric,
-                  'i_t_map': initiator_target_map})
-        zoning_policy = self.configuration.zoning_policy
-        zoning_policy_fab = self.fabric_configs[fabric].safe_get(
-            'zoning_policy')
+    def _plan_delete_connection(self, fabric, zone_set, zoning_policy,
+                                initiator_target_map, host_name,
+                                storage_system):
         zone_name_prefix = self.fabric_configs[fabric].safe_get(
             'zone_name_prefix')
-        zone_activate = self.fabric_configs[fabric].safe_get(
-            'zone_activate')
-        if zoning_policy_fab:
-            zoning_policy = zoning_policy_fab
-        LOG.info("Zoning policy for fabric %(policy)s",
-                 {'policy': zoning_policy})
-        conn = self._get_southbound_client(fabric)
-        cfgmap_from_fabric = self._get_active_zone_set(conn)
-
-        zone_names = []
-        if cfgmap_from_fabric.get('zones'):
-            zone_names = cfgmap_from_fabric['zones'].keys()
-
-        # Based on zoning policy, get zone member list and push changes to
-        # fabric. This operation could result in an update for zone config
-        # with new member list or deleting zones from active cfg.
-        LOG.debug("zone config from Fabric: %(cfgmap)s",
-                  {'cfgmap': cfgmap_from_fabric})
+        zones = zone_set['zones']
+        # Based on zoning policy, get zone member list. This operation could
+        # result in an update for zone config with new member list or
+        # deleting zones from active cfg.
+        zone_map = {}
         for initiator_key in initiator_target_map.keys():
             initiator = initiator_key.lower()
             formatted_initiator = utils.get_formatted_wwn(initiator)
-            zone_map = {}
-            zones_to_delete = []
             t_list = initiator_target_map[initiator_key]
             if zoning_policy == 'initiator-target':
                 # In this case, zone needs to be deleted.
@@ -305,11 +310,11 @@ class BrcdFCZoneDriver(fc_zone_driver.FCZoneDriver):
                         SUPPORTED_CHARS)
                     LOG.debug("Zone name to delete: %(zonename)s",
                               {'zonename': zone_name})
-                    if len(zone_names) > 0 and (zone_name in zone_names):
+                    if zone_name in zones:
                         # delete zone.
                         LOG.debug("Added zone to delete to list: %(zonename)s",
                                   {'zonename': zone_name})
-                        zones_to_delete.append(zone_name)
+                        zone_map[zone_name] = None
 
             elif zoning_policy == 'initiator':
                 zone_members = [formatted_initiator]
@@ -326,74 +331,83 @@ class BrcdFCZoneDriver(fc_zone_driver.FCZoneDriver):
                     zone_name_prefix,
                     SUPPORTED_CHARS)
 
-                if (zone_names and (zone_name in zone_names)):
+                if zone_name in zones:
                     # Check to see if there are other zone members
                     # in the zone besides the initiator and
                     # the targets being removed.
                     has_members = any(
-                        x for x in cfgmap_from_fabric['zones'][zone_name]
-                        if x not in zone_members)
+                        x for x in zones[zone_name] if x not in zone_members)
 
                     # If there are other zone members, proceed with
                     # zone update to remove the targets.  Otherwise,
                     # delete the zone.
                     if has_members:
-                        zone_members.remove(formatted_initiator)
-                        # Verify that the zone members in target list
-                        # are listed in zone definition.  If not, remove
-                        # the zone members from the list of members
-                        # to remove, otherwise switch will return error.
-                        zm_list = cfgmap_from_fabric['zones'][zone_name]
-                        for t in t_list:
-                            formatted_target = utils.get_formatted_wwn(t)
-                            if formatted_target not in zm_list:
-                                zone_members.remove(formatted_target)
-                        if zone_members:
-                            LOG.debug("Zone members to remove: "
-                                      "%(members)s", {'members': zone_members})
-                            zone_map[zone_name] = zone_members
+                        zone_map[zone_name] = [
+                            x for x in zones[zone_name]
+                            if x == formatted_initiator or
+                            x not in zone_members]
                     else:
-                        zones_to_delete.append(zone_name)
+                        zone_map[zone_name] = None
             else:
                 LOG.warning("Zoning policy not recognized: %(policy)s",
                             {'policy': zoning_policy})
-            LOG.debug("Zone map to update: %(zonemap)s",
-                      {'zonemap': zone_map})
-            LOG.debug("Zone list to delete: %(zones)s",
-                      {'zones': zones_to_delete})
-            try:
-                # Update zone membership.
-                if zone_map:
-                    conn.update_zones(zone_map, zone_activate,
-                                      fc_zone_constants.ZONE_REMOVE,
-                                      cfgmap_from_fabric)
-                # Delete zones
-                if zones_to_delete:
-                    zone_name_string = ''
-                    num_zones = len(zones_to_delete)
-                    for i in range(0, num_zones):
-                        if i == 0:
-                            zone_name_string = (
-                                '%s%s' % (
-                                    zone_name_string, zones_to_delete[i]))
-                        else:
-                            zone_name_string = '%s;%s' % (
-                                zone_name_string, zones_to_delete[i])
-
-                    conn.delete_zones(
-                        zone_name_string, zone_activate,
-                        cfgmap_from_fabric)
-            except (b_exception.BrocadeZoningCliException,
-                    b_exception.BrocadeZoningHttpException,
-                    b_exception.BrocadeZoningRestException) as brocade_ex:
-                raise exception.FCZoneDriverException(brocade_ex)
-            except Exception:
-                msg = _("Failed to update or delete zoning "
-                        "configuration.")
-                LOG.exception(msg)
-                raise exception.FCZoneDriverException(msg)
-            finally:
-                conn.cleanup()
+        LOG.debug("Zone map to update or delete: %(zonemap)s",
+                  {'zonemap': zone_map})
+        return zone_map
+
+    def _apply_zone_changes(self, fabric, client, zone_set, changes):
+        """Push the zoning changes of a batch to the fabric.
+
+        The zone configuration is activated, if configured, only by the last
+        change so that it is activated once for the whole batch.
+
+        :param fabric: Fabric name from cinder.conf file
+        :param client: Southbound client the zone set was read with
+        :param zone_set: Active zone set the changes were computed from
+        :param changes: ZoneChanges to push
+        """
+        zone_activate = self.fabric_configs[fabric].safe_get(
+            'zone_activate')
+        LOG.debug("Zoning changes for fabric %(fabric)s: zones to create "
+                  "%(add)s, members to add %(add_members)s, members to "
+                  "remove %(remove_members)s, zones to delete %(delete)s",
+                  {'fabric': fabric,
+                   'add': changes.zones_to_add,
+                   'add_members': changes.members_to_add,
+                   'remove_members': changes.members_to_remove,
+                   'delete': changes.zones_to_delete})
+
+        # Each change is a client method with its arguments preceding and
+        # following the activate flag.
+        client_calls = []
+        if changes.zones_to_add:
+            client_calls.append((client.add_zones,
+                                 [changes.zones_to_add], []))
+        if changes.members_to_add:
+            client_calls.append((client.update_zones,
+                                 [changes.members_to_add],
+                                 [fc_zone_constants.ZONE_ADD]))
+        if changes.members_to_remove:
+            client_calls.append((client.update_zones,
+                                 [changes.members_to_remove],
+                                 [fc_zone_constants.ZONE_REMOVE]))
+        if changes.zones_to_delete:
+            client_calls.append((client.delete_zones,
+                                 [';'.join(changes.zones_to_delete)], []))
+        try:
+            for i, (method, args, extra_args) in enumerate(client_calls):
+                activate = zone_activate and i == len(client_calls) - 1
+                method(*args, activate, *extra_args, zone_set)
+            LOG.debug("Zoning changes pushed successfully to fabric "
+                      "%(fabric)s", {'fabric': fabric})
+        except (b_exception.BrocadeZoningCliException,
+                b_exception.BrocadeZoningHttpException,
+                b_exception.BrocadeZoningRestException) as brocade_ex:
+            raise exception.FCZoneDriverException(brocade_ex)
+        except Exception:
+            msg = _("Failed to update zoning configuration.")
+            LOG.exception(msg)
+            raise exception.FCZoneDriverException(msg)
 
     def get_san_context(self, target_wwn_list):
         """Lookup SAN context for visible end devices.
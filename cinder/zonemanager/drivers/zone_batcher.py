@@ -0,0 +1,201 @@
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+"""
+Zone batcher coalesces the zoning changes of concurrent attach and detach
+operations on a fabric.
+
+Zone drivers read the active zone set from the switch and commit and activate
+a new zone configuration for every connection they add or delete, and
+switches serialize these transactions.  The batcher collects the requests
+made during a short window, computes the zones resulting from all of them and
+lets the zone driver apply the difference with a single transaction.
+"""
+
+import contextlib
+import copy
+import itertools
+import threading
+import time
+
+from oslo_log import log as logging
+
+LOG = logging.getLogger(__name__)
+
+ADD = 'add'
+DELETE = 'delete'
+
+
+class ZoneChanges(object):
+    """Zone changes between the zones of a fabric before and after a batch.
+
+    Zones are dicts of zone names mapped to their list of members.
+    """
+
+    def __init__(self, zones_before, zones_after):
+        self.zones_to_add = {}
+        self.members_to_add = {}
+        self.members_to_remove = {}
+        for zone_name, members in zones_after.items():
+            if zone_name not in zones_before:
+                self.zones_to_add[zone_name] = members
+                continue
+            added = [x for x in members if x not in zones_before[zone_name]]
+            if added:
+                self.members_to_add[zone_name] = added
+            removed = [x for x in zones_before[zone_name] if x not in members]
+            if removed:
+                self.members_to_remove[zone_name] = removed
+        self.zones_to_delete = [zone_name for zone_name in zones_before
+                                if zone_name not in zones_after]
+
+    def __bool__(self):
+        return bool(self.zones_to_add or self.members_to_add or
+                    self.members_to_remove or self.zones_to_delete)
+
+
+class _Request(object):
+    def __init__(self, operation, args):
+        self.operation = operation
+        self.args = args
+        self.done = threading.Event()
+        self.error = None
+        # Whether the thread of the request applies the pending requests
+        self.processing = False
+        # Set when the request is done or its thread must start processing
+        self.wakeup = threading.Event()
+
+    def finish(self, error=None):
+        if error:
+            self.error = error
+        self.done.set()
+        self.wakeup.set()
+
+
+class ZoneBatcher(object):
+    """Applies the zoning requests of a fabric in batches.
+
+    The first request submitted while no batch is being applied waits for
+    the batch window and then applies the pending requests, including the
+    ones submitted meanwhile by other threads.  Once its own request has
+    been applied, the thread hands the processing over to the thread of the
+    next pending request, so that it never waits for requests submitted after
+    its own.  Consecutive requests of the same operation are applied
+    together, so adding and deleting zones are never mixed in the same
+    transaction.
+
+    The zone set is read from the fabric for every batch, so that the
+    requests are always planned from the current zones of the fabric.
+
+    :param get_zone_set: callable receiving the session of the batch and
+                         returning the active zone set of the fabric, as
+                         returned by get_active_zone_set of the southbound
+                         clients
+    :param plan: callable receiving the zone set with the changes of the
+                 previous requests of the batch, the operation and the
+                 arguments of a request, and returning a dict of the zone
+                 names changed by the request mapped to their new list of
+                 members, or to None for the zones to delete
+    :param apply: callable receiving the session of the batch, the zone set
+                  read from the fabric and the ZoneChanges of the batch, that
+                  makes the changes on the fabric
+    :param window: seconds to wait for other requests before applying a batch
+    :param session: callable returning the context manager entered while a
+                    batch is read, planned and applied, whose value is the
+                    session passed to get_zone_set and apply
+    """
+
+    def __init__(self, get_zone_set, plan, apply, window=0, session=None):
+        self._get_zone_set = get_zone_set
+        self._plan = plan
+        self._apply = apply
+        self.window = window
+        self._session_factory = session or contextlib.nullcontext
+        self._pending_lock = threading.Lock()
+        self._pending = []
+        self._processing = False
+
+    def submit(self, operation, *args):
+        """Apply a zoning request and wait until it has been applied."""
+        request = _Request(operation, args)
+        with self._pending_lock:
+            self._pending.append(request)
+            request.processing = not self._processing
+            self._processing = True
+
+        if request.processing and self.window:
+            time.sleep(self.window)
+        while not request.done.is_set():
+            if request.processing:
+                self._process(request)
+            else:
+                request.wakeup.wait()
+        if request.error:
+            raise request.error
+
+    def _process(self, own_request):
+        """Apply batches of pending requests until own_request is done.
+
+        Processing is then handed over to the thread of the next pending
+        request, if any.
+        """
+        try:
+            while not own_request.done.is_set():
+                with self._pending_lock:
+                    operation = self._pending[0].operation
+                    batch = list(itertools.takewhile(
+                        lambda r: r.operation == operation, self._pending))
+                    del self._pending[:len(batch)]
+
+                try:
+                    self._apply_batch(batch)
+                except Exception as exc:
+                    for request in batch:
+                        if not request.done.is_set():
+                            request.error = exc
+                finally:
+                    for request in batch:
+                        request.finish()
+        finally:
+            with self._pending_lock:
+                if self._pending:
+                    self._pending[0].processing = True
+                    self._pending[0].wakeup.set()
+                else:
+                    self._processing = False
+
+    def _apply_batch(self, batch):
+        LOG.debug("Applying a batch of %(count)d zoning requests.",
+                  {'count': len(batch)})
+        with self._session_factory() as session:
+            zone_set = self._get_zone_set(session)
+            new_zone_set = copy.deepcopy(zone_set)
+            zones = new_zone_set.get('zones') or {}
+            new_zone_set['zones'] = zones
+            for request in batch:
+                try:
+                    changes = self._plan(new_zone_set, request.operation,
+                                         *request.args)
+                except Exception as exc:
+                    # Only this request fails, the rest of the batch is
+                    # applied.
+                    request.finish(exc)
+                    continue
+                for zone_name, members in changes.items():
+                    if members is None:
+                        zones.pop(zone_name, None)
+                    else:
+                        zones[zone_name] = members
+
+            changes = ZoneChanges(zone_set.get('zones') or {}, zones)
+            if changes:
+                self._apply(session, zone_set, changes)
@@ -69,6 +69,15 @@ zone_manager_opts = [
                      "as unsupported until CI is working again.  This also "
                      "marks a driver as deprecated and may be removed in the "
                      "next release."),
+    cfg.FloatOpt('zoning_batch_window',
+                 default=0.5,
+                 min=0,
+                 help='Seconds to wait for other connections to be added to '
+                      'or deleted from a fabric, so that their zoning '
+                      'changes are applied and activated in a single '
+                      'transaction. Set to 0 to apply the changes right '
+                      'away, still coalescing the requests made while a '
+                      'transaction is in progress.'),
 
 ]
 